@@ -0,0 +1,534 @@
+# aio_server.py
+# Chế độ asyncio (grpc.aio) của node server: python server.py <port> --server-mode aio
+#
+# Trạng thái của node (store, WAL, trạng thái peer, ring, seq...) và các thao tác trên store
+# vẫn nằm trong server.py. Ở đây forward, sao lưu song song, heartbeat và khôi phục là
+# coroutine, nên một request đang chờ peer chậm không chiếm một luồng nào. Các thao tác có
+# thể block (chờ WAL fsync, đọc nhiều value) chạy trong thread pool mặc định của event loop.
+# Các RPC chỉ làm việc cục bộ dùng lại handler đồng bộ của server.py trong thread pool.
+import asyncio
+import functools
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import demo_pb2
+import demo_pb2_grpc
+import expiry
+import value_codec
+from channel_pool import AsyncChannelPool, SERVER_KEEPALIVE_OPTIONS, COMPRESSION_ALGORITHMS
+
+core = None # Module server (trạng thái và các hàm thao tác store của node), gán trong serve()
+aio_pool = None
+_background_tasks = set() # Giữ tham chiếu để task nền (replica chậm, heartbeat...) không bị thu gom
+
+
+def _spawn(coro):
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def _run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+
+
+class _AbortError(Exception):
+    def __init__(self, code, details):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+
+class _SyncContext:
+    """Context tối thiểu để chạy handler đồng bộ của server.py trong thread pool."""
+
+    def abort(self, code, details):
+        raise _AbortError(code, details)
+
+
+async def _call_sync(method, request, context):
+    try:
+        return await _run_blocking(method, request, _SyncContext())
+    except _AbortError as e:
+        await context.abort(e.code, e.details)
+
+
+def _peer_status(peer_id: str) -> str:
+    with core.peer_status_lock:
+        return core.peer_status.get(peer_id, "UNKNOWN")
+
+
+def _get_stub(peer_id: str):
+    return aio_pool.get_stub(core.CLUSTER_CONFIG[peer_id])
+
+
+def _note_rpc_error(peer_id: str, e: grpc.RpcError):
+    if e.code() == grpc.StatusCode.UNAVAILABLE:
+        aio_pool.report_failure(core.CLUSTER_CONFIG[peer_id])
+
+
+# --- Replication ---
+async def _replicate_to_one(replica_id: str, op_name: str, key: str, send_fn, mutations) -> bool:
+    try:
+        await send_fn(_get_stub(replica_id))
+        core.note_replication(replica_id, "acked")
+        core.note_peer_alive(replica_id)
+        return True
+    except grpc.RpcError as e:
+        print(f"[WARN] Node {core.NODE_ID} (Primary): Lỗi RPC khi sao lưu {op_name}('{key}') tới replica {replica_id}: {e.details()}")
+        _note_rpc_error(replica_id, e)
+        core.note_replication(replica_id, "failed")
+        core.store_hints(replica_id, mutations)
+        return False
+
+
+async def replicate_write(op_name: str, key: str, send_fn, mutations):
+    """Như server.replicate_write nhưng send_fn(stub) trả về awaitable. Các replica chậm vẫn
+    được ghi tiếp ở nền sau khi đủ write quorum."""
+    replica_node_ids = [nid for nid in core.SORTED_NODE_IDS if nid != core.NODE_ID]
+    pending = set()
+    for replica_id in replica_node_ids:
+        status = _peer_status(replica_id)
+        if status != "ALIVE":
+            print(f"[WARN] Node {core.NODE_ID} (Primary): Bỏ qua sao lưu {op_name}('{key}') tới replica {replica_id} (trạng thái: {status}).")
+            core.note_replication(replica_id, "skipped")
+            core.store_hints(replica_id, mutations)
+            continue
+        pending.add(_spawn(_replicate_to_one(replica_id, op_name, key, send_fn, mutations)))
+
+    acks = 1 # Bản ghi trên chính primary
+    needed = core.write_quorum()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + core.REPLICATION_TIMEOUT_SECONDS
+    while pending and acks < needed:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        acks += sum(1 for t in done if t.result())
+    return acks, len(replica_node_ids)
+
+
+# --- Batch ---
+async def run_batch(op_name: str, keys, forwarded: bool, local_fn, remote_fn) -> list:
+    """Như server.run_batch; local_fn(indices) và remote_fn(stub, indices) là coroutine."""
+    results = [None] * len(keys)
+    groups = {core.NODE_ID: list(range(len(keys)))} if forwarded else core.group_indices_by_primary(keys)
+
+    calls = []
+    for primary_id, indices in groups.items():
+        if primary_id == core.NODE_ID:
+            calls.append((primary_id, indices, local_fn(indices)))
+            continue
+        primary_status = _peer_status(primary_id)
+        if primary_status != "ALIVE" and primary_status != "UNKNOWN":
+            error = f"Primary node {primary_id} ({core.CLUSTER_CONFIG.get(primary_id)}) không sẵn sàng."
+            for i in indices:
+                results[i] = demo_pb2.KeyResult(key=keys[i], code=core.BATCH_RESULT_ERROR, error=error)
+            continue
+        calls.append((primary_id, indices, remote_fn(_get_stub(primary_id), indices)))
+
+    outcomes = await asyncio.gather(*(call for _, _, call in calls), return_exceptions=True)
+    for (primary_id, indices, _), outcome in zip(calls, outcomes):
+        if isinstance(outcome, grpc.RpcError):
+            print(f"[ERROR] Node {core.NODE_ID}: Lỗi RPC khi forward {op_name} ({len(indices)} keys) đến {primary_id}: {outcome.details()}")
+            _note_rpc_error(primary_id, outcome)
+            error = f"Lỗi khi chuyển tiếp {op_name} tới {primary_id}: {outcome.details()}"
+            outcome = [demo_pb2.KeyResult(key=keys[i], code=core.BATCH_RESULT_ERROR, error=error) for i in indices]
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        for i, result in zip(indices, outcome):
+            results[i] = result
+    return results
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    """Như server.MetricsInterceptor cho handler coroutine."""
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+        rpc = handler_call_details.method.rsplit("/", 1)[-1]
+        behavior = handler.unary_unary
+
+        async def timed(request, context):
+            started = time.perf_counter()
+            route = core.rpc_route(rpc, request)
+            failed = True
+            try:
+                response = await behavior(request, context)
+                failed = False
+                return response
+            finally:
+                core.observe_rpc(rpc, route, time.perf_counter() - started, failed)
+
+        return grpc.unary_unary_rpc_method_handler(timed, request_deserializer=handler.request_deserializer,
+                                                   response_serializer=handler.response_serializer)
+
+
+class AsyncKeyValueServicer(demo_pb2_grpc.KeyValueServicer):
+
+    def __init__(self):
+        self._sync = core.KeyValueServicer()
+
+    async def _forward(self, method_name: str, primary_id: str, key: str, request, context):
+        # Chuyển tiếp request tới primary; abort nếu primary không sẵn sàng hoặc RPC lỗi.
+        primary_status = _peer_status(primary_id)
+        if primary_status != "ALIVE" and primary_status != "UNKNOWN":
+            print(f"[WARN] Node {core.NODE_ID}: {method_name}('{key}') - Primary node {primary_id} không ALIVE (trạng thái: {primary_status}). Không thể forward.")
+            await context.abort(grpc.StatusCode.UNAVAILABLE, f"Primary node {primary_id} ({core.CLUSTER_CONFIG.get(primary_id)}) không sẵn sàng.")
+        try:
+            return await getattr(_get_stub(primary_id), method_name)(request, timeout=core.FORWARD_TIMEOUT_SECONDS)
+        except grpc.RpcError as e:
+            print(f"[ERROR] Node {core.NODE_ID}: Lỗi RPC khi forward {method_name}('{key}') đến {primary_id}: {e.details()}")
+            _note_rpc_error(primary_id, e)
+            await context.abort(e.code(), f"Lỗi khi chuyển tiếp {method_name}: {e.details()}")
+
+    async def _primary_for(self, key: str, context) -> str:
+        primary_id = core.get_primary_node_id_for_key(key)
+        if not primary_id:
+            await context.abort(grpc.StatusCode.INTERNAL, "Lỗi cấu hình: Không thể xác định primary node.")
+        return primary_id
+
+    async def GetKey(self, request, context):
+        key = request.key
+        primary_id = await self._primary_for(key, context)
+        if core.can_read_locally(request, primary_id):
+            return core.local_read(key, primary_id)
+        return await self._forward("GetKey", primary_id, key, demo_pb2.Key(key=key), context)
+
+    async def PutKey(self, request, context):
+        key = request.key
+        value = request.value
+        primary_id = await self._primary_for(key, context)
+        if request.is_replica:
+            value = value_codec.wrap(request.codec, value)
+            await _run_blocking(core.apply_replicated, [(key, value, request.seq, request.expires_at)], request.origin)
+            if primary_id == core.NODE_ID:
+                return demo_pb2.PutKeyReturn(code=0, message=f"Đã lưu (Primary - Ghi từ replica request): {key}")
+            return demo_pb2.PutKeyReturn(code=0, message=f"Đã lưu (Replica): {key}")
+        if primary_id != core.NODE_ID:
+            return await self._forward("PutKey", primary_id, key,
+                                       demo_pb2.PutKeyRequest(key=key, value=value, is_replica=False,
+                                                              ttl_seconds=request.ttl_seconds), context)
+
+        expires_at = expiry.deadline(request.ttl_seconds)
+        value = await _run_blocking(core.compress_value, value)
+        seq = await _run_blocking(core.apply_put, key, value, expires_at)
+        replica_request = demo_pb2.PutKeyRequest(key=key, value=value, is_replica=True, origin=core.NODE_ID, seq=seq,
+                                                 expires_at=expires_at, codec=value_codec.codec_of(value))
+        acks, replica_count = await replicate_write(
+            "PutKey", key, lambda stub: stub.PutKey(replica_request, timeout=core.REPLICATION_TIMEOUT_SECONDS),
+            [(key, value, seq, expires_at)])
+        needed = core.write_quorum()
+        if acks < needed:
+            return demo_pb2.PutKeyReturn(code=1, acks=acks, message=f"Đã lưu (Primary): {key} nhưng chưa đạt write quorum ({acks}/{needed} ack).")
+        return demo_pb2.PutKeyReturn(code=0, acks=acks, message=f"Đã lưu (Primary): {key}. Sao lưu tới {acks - 1}/{replica_count} replicas (quorum {needed}).")
+
+    async def DeleteKey(self, request, context):
+        key = request.key
+        primary_id = await self._primary_for(key, context)
+        if request.is_replica:
+            await _run_blocking(core.apply_replicated, [(key, None, request.seq, 0)], request.origin)
+            if primary_id == core.NODE_ID:
+                return demo_pb2.Message(msg=f"Đã xóa (Primary - Replica request): '{key}'.")
+            return demo_pb2.Message(msg=f"Lệnh xóa cho '{key}' đã xử lý trên replica.")
+        if primary_id != core.NODE_ID:
+            return await self._forward("DeleteKey", primary_id, key,
+                                       demo_pb2.DeleteKeyRequest(key=key, is_replica=False), context)
+
+        existed, seq = await _run_blocking(core.apply_delete, key)
+        if not existed:
+            return demo_pb2.Message(msg=f"Khóa '{key}' không tồn tại (Primary). Sao lưu tới 0/0 replicas.")
+        replica_request = demo_pb2.DeleteKeyRequest(key=key, is_replica=True, origin=core.NODE_ID, seq=seq)
+        acks, replica_count = await replicate_write(
+            "DeleteKey", key, lambda stub: stub.DeleteKey(replica_request, timeout=core.REPLICATION_TIMEOUT_SECONDS),
+            [(key, None, seq, 0)])
+        return demo_pb2.Message(msg=f"Khóa '{key}' đã được xóa (Primary). Sao lưu tới {acks - 1}/{replica_count} replicas (quorum {core.write_quorum()}).")
+
+    async def MultiGet(self, request, context):
+        keys = list(request.keys)
+
+        async def local_get(indices):
+            if request.raw:
+                return [core.raw_key_result(keys[i]) for i in indices]
+            results = []
+            for i in indices:
+                value, expires_at = core.read_key(keys[i])
+                results.append(demo_pb2.KeyResult(key=keys[i], code=core.BATCH_RESULT_OK, found=value is not None,
+                                                  value=value_codec.decompress(value) if value is not None else b"",
+                                                  expires_at=expires_at))
+            return results
+
+        async def remote_get(stub, indices):
+            sub_request = demo_pb2.MultiGetRequest(keys=[keys[i] for i in indices], forwarded=True, raw=request.raw)
+            return (await stub.MultiGet(sub_request, timeout=core.FORWARD_TIMEOUT_SECONDS)).results
+
+        return demo_pb2.MultiGetResponse(results=await run_batch("MultiGet", keys, request.forwarded, local_get, remote_get))
+
+    async def MultiPut(self, request, context):
+        entries = [(e.key, e.value) for e in request.entries]
+        if request.is_replica:
+            seqs = list(request.seqs) or [0] * len(entries)
+            await _run_blocking(core.apply_replicated, [(e.key, value_codec.wrap(e.codec, e.value), seq, e.expires_at)
+                                                        for e, seq in zip(request.entries, seqs)], request.origin)
+            return demo_pb2.MultiWriteResponse(results=[demo_pb2.KeyResult(key=k, code=core.BATCH_RESULT_OK, acks=1) for k, _ in entries])
+
+        keys = [k for k, _ in entries]
+
+        async def local_put(indices):
+            local_entries = await _run_blocking(lambda: [(entries[i][0], core.compress_value(entries[i][1])) for i in indices])
+            seqs = await _run_blocking(core.apply_put_many, local_entries)
+            replica_request = demo_pb2.MultiPutRequest(
+                entries=[demo_pb2.KeyValuePair(key=k, value=v, codec=value_codec.codec_of(v)) for k, v in local_entries],
+                is_replica=True, origin=core.NODE_ID, seqs=seqs)
+            acks, _ = await replicate_write("MultiPut", f"{len(local_entries)} keys",
+                                            lambda stub: stub.MultiPut(replica_request, timeout=core.REPLICATION_TIMEOUT_SECONDS),
+                                            [(k, v, seq, 0) for (k, v), seq in zip(local_entries, seqs)])
+            code = core._write_result_code(acks)
+            return [demo_pb2.KeyResult(key=k, code=code, acks=acks) for k, _ in local_entries]
+
+        async def remote_put(stub, indices):
+            sub_request = demo_pb2.MultiPutRequest(
+                entries=[demo_pb2.KeyValuePair(key=entries[i][0], value=entries[i][1]) for i in indices], forwarded=True)
+            return (await stub.MultiPut(sub_request, timeout=core.FORWARD_TIMEOUT_SECONDS)).results
+
+        return demo_pb2.MultiWriteResponse(results=await run_batch("MultiPut", keys, request.forwarded, local_put, remote_put))
+
+    async def MultiDelete(self, request, context):
+        keys = list(request.keys)
+        if request.is_replica:
+            seqs = list(request.seqs) or [0] * len(keys)
+            existed = await _run_blocking(core.apply_replicated, [(k, None, seq, 0) for k, seq in zip(keys, seqs)], request.origin)
+            if request.evicted:
+                core.note_evictions("replica", sum(existed))
+            return demo_pb2.MultiWriteResponse(results=[demo_pb2.KeyResult(key=k, code=core.BATCH_RESULT_OK, found=f, acks=1)
+                                                        for k, f in zip(keys, existed)])
+
+        async def local_delete(indices):
+            local_keys = [keys[i] for i in indices]
+            deleted = await _run_blocking(core.apply_delete_many, local_keys)
+            existed = [f for f, _ in deleted]
+            deleted_keys = [k for k, (f, _) in zip(local_keys, deleted) if f]
+            acks = 1
+            if deleted_keys:
+                replica_request = demo_pb2.MultiDeleteRequest(keys=deleted_keys, is_replica=True, origin=core.NODE_ID,
+                                                              seqs=[seq for f, seq in deleted if f])
+                acks, _ = await replicate_write("MultiDelete", f"{len(deleted_keys)} keys",
+                                                lambda stub: stub.MultiDelete(replica_request, timeout=core.REPLICATION_TIMEOUT_SECONDS),
+                                                [(k, None, seq, 0) for k, (f, seq) in zip(local_keys, deleted) if f])
+            code = core._write_result_code(acks)
+            return [demo_pb2.KeyResult(key=k, code=code if f else core.BATCH_RESULT_OK, found=f, acks=acks if f else 1)
+                    for k, f in zip(local_keys, existed)]
+
+        async def remote_delete(stub, indices):
+            sub_request = demo_pb2.MultiDeleteRequest(keys=[keys[i] for i in indices], forwarded=True)
+            return (await stub.MultiDelete(sub_request, timeout=core.FORWARD_TIMEOUT_SECONDS)).results
+
+        return demo_pb2.MultiWriteResponse(results=await run_batch("MultiDelete", keys, request.forwarded, local_delete, remote_delete))
+
+    async def StreamSnapshot(self, request, context):
+        # Mỗi chunk được tạo trong thread pool (đọc value từ store) rồi gửi đi từ event loop.
+        chunks = self._sync.StreamSnapshot(request, _SyncContext())
+        while True:
+            chunk = await _run_blocking(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def Scan(self, request, context):
+        # Như StreamSnapshot: handler đồng bộ (gồm cả các stream Scan con tới primary khác) chạy
+        # trong thread pool, mỗi lần tạo một chunk.
+        chunks = self._sync.Scan(request, _SyncContext())
+        try:
+            while True:
+                try:
+                    chunk = await _run_blocking(next, chunks, None)
+                except _AbortError as e:
+                    await context.abort(e.code, e.details)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            try:
+                chunks.close() # Client ngừng đọc: hủy các stream con
+            except ValueError:
+                pass # Generator vẫn đang chạy trong thread pool, sẽ được đóng khi bị thu gom
+
+    async def Watch(self, request, context):
+        # Chờ thay đổi bằng asyncio.Event (core.notify_watchers đánh thức qua _wake_watchers) thay
+        # vì giữ một luồng của thread pool cho mỗi stream; chỉ từng lần poll chạy trong thread pool.
+        cursor = core.open_watch(request)
+        if cursor is None:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                                f"Node {core.NODE_ID} đã có {core.WATCH_MAX_STREAMS} stream Watch.")
+        changed = asyncio.Event()
+        _watch_waiters.add(changed)
+        try:
+            while True:
+                changed.clear()
+                try:
+                    response = await _run_blocking(cursor.poll)
+                except core.WatchTruncated as e:
+                    await context.abort(grpc.StatusCode.OUT_OF_RANGE, core.watch_truncated_details(str(e)))
+                if response is not None:
+                    yield response
+                elif cursor.caught_up:
+                    try:
+                        await asyncio.wait_for(changed.wait(), cursor.idle_timeout())
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            _watch_waiters.discard(changed)
+            core.close_watch()
+
+    async def RequestFullSnapshot(self, request, context):
+        return await _call_sync(self._sync.RequestFullSnapshot, request, context)
+
+    async def CatchUp(self, request, context):
+        return await _call_sync(self._sync.CatchUp, request, context)
+
+    async def MerkleNodes(self, request, context):
+        return await _call_sync(self._sync.MerkleNodes, request, context)
+
+    async def MerkleLeaves(self, request, context):
+        return await _call_sync(self._sync.MerkleLeaves, request, context)
+
+    async def Repair(self, request, context):
+        return await _call_sync(self._sync.Repair, request, context)
+
+    async def Gossip(self, request, context):
+        core.note_peer_alive(request.sender_id)
+        core.merge_gossip(request)
+        return core.gossip_message()
+
+    async def Resync(self, request, context):
+        return await _call_sync(self._sync.Resync, request, context)
+
+    async def Stats(self, request, context):
+        return core.stats_response()
+
+    async def ClusterView(self, request, context):
+        return self._sync.ClusterView(request, context)
+
+    async def TinhTong(self, request, context):
+        return demo_pb2.KetQuaTinhTong(answer=request.a + request.b)
+
+    async def CheckHealth(self, request, context):
+        core.note_peer_alive(request.sender_id)
+        return demo_pb2.HealthCheckResponse(status="SERVING", local_seq=core.local_seq)
+
+
+# --- Heartbeat ---
+async def _check_peer(peer_id: str):
+    address = core.CLUSTER_CONFIG[peer_id]
+    try:
+        checked_at = time.time()
+        response = await aio_pool.get_stub(address).CheckHealth(demo_pb2.HealthCheckRequest(sender_id=core.NODE_ID),
+                                                                timeout=core.HEARTBEAT_TIMEOUT_SECONDS)
+    except grpc.RpcError as e:
+        _note_rpc_error(peer_id, e) # Để failure detector quyết định DEAD
+        return
+    aio_pool.report_success(address)
+    core.note_peer_seq(peer_id, response.local_seq, checked_at)
+    core.note_heartbeat(peer_id, "ALIVE" if response.status == "SERVING" else "UNHEALTHY")
+
+
+async def _gossip_with(peer_id: str, request):
+    address = core.CLUSTER_CONFIG[peer_id]
+    try:
+        checked_at = time.time()
+        reply = await aio_pool.get_stub(address).Gossip(request, timeout=core.HEARTBEAT_TIMEOUT_SECONDS)
+    except grpc.RpcError as e:
+        _note_rpc_error(peer_id, e)
+        return
+    aio_pool.report_success(address)
+    core.note_peer_alive(peer_id)
+    core.note_peer_seq(peer_id, reply.local_seq, checked_at)
+    core.merge_gossip(reply)
+
+
+async def heartbeat_loop():
+    print(f"[INFO] Node {core.NODE_ID}: Heartbeat (asyncio) bắt đầu ({core.FAILURE_DETECTOR_MODE}, phi >= {core.PHI_THRESHOLD} là DEAD).")
+    await asyncio.sleep(core.INITIAL_RECOVERY_DELAY_SECONDS / 2)
+    core.start_failure_detection()
+    peers = [peer_id for peer_id in core.SORTED_NODE_IDS if peer_id != core.NODE_ID]
+    while True:
+        # Không chờ kết quả: một peer chậm không làm trễ các peer khác hay chu kỳ kế tiếp.
+        if core.FAILURE_DETECTOR_MODE == "gossip":
+            request = core.gossip_message(bump=True)
+            for peer_id in core.gossip_targets():
+                _spawn(_gossip_with(peer_id, request))
+        else:
+            for peer_id in peers:
+                _spawn(_check_peer(peer_id))
+        dead_before = {peer_id for peer_id in peers if _peer_status(peer_id) == "DEAD"}
+        core.check_suspicion()
+        for peer_id in peers:
+            if peer_id not in dead_before and _peer_status(peer_id) == "DEAD":
+                aio_pool.evict(core.CLUSTER_CONFIG[peer_id])
+        await asyncio.sleep(core.HEARTBEAT_INTERVAL_SECONDS)
+
+
+# --- Data Recovery ---
+async def recover():
+    # Cùng trình tự với server.attempt_data_recovery: chờ trên event loop, rồi chạy
+    # server.recover_from_peers (các RPC đồng bộ) trong thread pool.
+    print(f"[RECOVERY] Node {core.NODE_ID}: Chờ {core.INITIAL_RECOVERY_DELAY_SECONDS} giây trước khi thử khôi phục dữ liệu...")
+    await asyncio.sleep(core.INITIAL_RECOVERY_DELAY_SECONDS)
+    await _run_blocking(core.recover_from_peers)
+
+
+_watch_waiters = set() # asyncio.Event của các stream Watch đang mở
+_watch_wake_pending = threading.Event() # Đã hẹn _wake_watchers trên event loop, chưa chạy
+
+
+def _wake_watchers():
+    _watch_wake_pending.clear()
+    for changed in _watch_waiters:
+        changed.set()
+
+
+async def _serve():
+    global aio_pool
+    aio_pool = AsyncChannelPool(compression=core.channel_pool.compression)
+    # Thread pool cho các thao tác block (_run_blocking), đặt tên để đo độ dài hàng đợi.
+    blocking_executor = futures.ThreadPoolExecutor(thread_name_prefix="aio-blocking")
+    asyncio.get_running_loop().set_default_executor(blocking_executor)
+    core.executors["aio_blocking"] = blocking_executor
+    server_obj = grpc.aio.server(interceptors=[AsyncMetricsInterceptor()], options=SERVER_KEEPALIVE_OPTIONS,
+                                 compression=COMPRESSION_ALGORITHMS[core.GRPC_COMPRESSION])
+    demo_pb2_grpc.add_KeyValueServicer_to_server(AsyncKeyValueServicer(), server_obj)
+    server_obj.add_insecure_port(f"[::]:{core.PORT}")
+    await server_obj.start()
+    print(f"[INFO] Node {core.NODE_ID} ({core.PORT}): Đang lắng nghe (asyncio)...")
+    loop = asyncio.get_running_loop()
+
+    def schedule_wake():
+        # Gọi từ luồng áp dụng thay đổi: gộp nhiều thay đổi liên tiếp vào một lần đánh thức.
+        if not _watch_wake_pending.is_set():
+            _watch_wake_pending.set()
+            loop.call_soon_threadsafe(_wake_watchers)
+
+    core.watch_listeners.append(schedule_wake)
+    _spawn(heartbeat_loop())
+    _spawn(recover())
+    try:
+        await server_obj.wait_for_termination()
+    finally:
+        print(f"[INFO] Node {core.NODE_ID} ({core.PORT}): Thống kê channel pool (asyncio): {aio_pool.stats()}")
+        await aio_pool.aclose_all()
+
+
+def serve(node):
+    """Chạy node ở chế độ asyncio. node là module server đã nạp store và cấu hình."""
+    global core
+    core = node
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        print(f"\n[INFO] Node {core.NODE_ID} ({core.PORT}): Nhận tín hiệu tắt (Ctrl+C). Đang tắt server...")
@@ -0,0 +1,343 @@
+# bench_cluster.py
+# Benchmark tải đầu-cuối trên một cụm 3 node chạy cục bộ.
+#
+# Script khởi động các node trong CLUSTER_CONFIG (server.py) thành tiến trình riêng, mỗi node
+# một thư mục dữ liệu tạm, chờ các node thấy nhau ALIVE, nạp trước dữ liệu rồi chạy một tổ hợp
+# GET/PUT/DELETE trong thời gian cho trước. Kết quả (throughput, p50/p99/p999 theo từng thao
+# tác, cùng số đo phía server qua RPC Stats) được in ra dạng JSON để so sánh giữa các lần chạy.
+#
+# Cách dùng:
+#   python bench_cluster.py --duration 20 --concurrency 32 --mix get=80,put=15,delete=5 \
+#       --distribution zipf --zipf-s 0.99 --keys 10000 --value-size 200 --output run.json
+#   python bench_cluster.py --server-args="--server-mode aio --durability os"
+import argparse
+import bisect
+import json
+import multiprocessing
+import os
+import random
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import grpc
+import demo_pb2
+from kv_client import KVClient, ROUTING_ERROR_CODES
+from server import CLUSTER_CONFIG
+
+OPERATIONS = ("get", "put", "delete")
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+STARTUP_TIMEOUT_SECONDS = 60
+SHUTDOWN_TIMEOUT_SECONDS = 10
+PRELOAD_BATCH_SIZE = 500
+
+
+def parse_mix(text: str) -> dict:
+    # "get=80,put=15,delete=5" -> {"get": 0.8, "put": 0.15, "delete": 0.05}
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Thao tác không hợp lệ trong --mix: {name}")
+        weights[name] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("--mix phải có ít nhất một trọng số dương")
+    return {name: w / total for name, w in weights.items() if w > 0}
+
+
+class KeyChooser:
+    """Chọn key theo phân phối uniform hoặc Zipf (hạng r có xác suất tỉ lệ 1 / r^s).
+
+    Thứ hạng được xáo trộn theo seed để các key nóng rải đều trên ring thay vì dồn vào
+    các key có chỉ số nhỏ."""
+
+    def __init__(self, keys: int, distribution: str, zipf_s: float, seed: int):
+        self.keys = keys
+        self.distribution = distribution
+        order = list(range(keys))
+        random.Random(seed).shuffle(order)
+        self._order = order
+        self._cdf = None
+        if distribution == "zipf":
+            cdf = []
+            total = 0.0
+            for rank in range(1, keys + 1):
+                total += 1.0 / rank ** zipf_s
+                cdf.append(total)
+            self._cdf = [c / total for c in cdf]
+
+    def key(self, rnd: random.Random) -> str:
+        if self._cdf is None:
+            index = rnd.randrange(self.keys)
+        else:
+            index = self._order[min(bisect.bisect_left(self._cdf, rnd.random()), self.keys - 1)]
+        return f"bench_{index:09d}"
+
+
+# --- Cụm cục bộ ---
+def start_cluster(data_root: str, server_args: list) -> dict:
+    processes = {}
+    for node_id, address in CLUSTER_CONFIG.items():
+        node_dir = os.path.join(data_root, node_id)
+        os.makedirs(node_dir, exist_ok=True)
+        port = address.rsplit(":", 1)[1]
+        log_file = open(os.path.join(node_dir, "server.log"), "w")
+        processes[node_id] = subprocess.Popen(
+            [sys.executable, "-u", SERVER_SCRIPT, port] + server_args, cwd=node_dir,
+            stdout=log_file, stderr=subprocess.STDOUT)
+        log_file.close()
+    return processes
+
+
+def wait_until_ready(kv: KVClient, processes: dict, timeout: float):
+    # Sẵn sàng khi mọi node trả lời ClusterView và thấy mọi peer ALIVE (nếu không, primary
+    # sẽ bỏ qua sao lưu và số đo không phản ánh đường ghi bình thường).
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for node_id, process in processes.items():
+            if process.poll() is not None:
+                raise RuntimeError(f"Node {node_id} đã thoát (mã {process.returncode}), xem server.log")
+        ready = True
+        for address in CLUSTER_CONFIG.values():
+            try:
+                view = kv.pool.get_stub(address).ClusterView(demo_pb2.ClusterViewRequest(), timeout=1)
+            except grpc.RpcError:
+                ready = False
+                break
+            if any(n.status != "ALIVE" for n in view.nodes):
+                ready = False
+                break
+        if ready:
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"Cụm chưa sẵn sàng sau {timeout} giây")
+
+
+def stop_cluster(processes: dict):
+    for process in processes.values():
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT) # server.py tắt WAL gọn gàng khi nhận Ctrl+C
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS
+    for process in processes.values():
+        try:
+            process.wait(max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+# --- Sinh tải ---
+def preload(kv: KVClient, keys: int, value: str):
+    for start in range(0, keys, PRELOAD_BATCH_SIZE):
+        entries = [(f"bench_{i:09d}", value) for i in range(start, min(start + PRELOAD_BATCH_SIZE, keys))]
+        failed = [r.key for r in kv.multi_put(entries) if r.code != 0]
+        if failed:
+            raise RuntimeError(f"Nạp trước thất bại cho {len(failed)} key (ví dụ {failed[0]})")
+
+
+def _run_thread(kv: KVClient, config: dict, chooser: KeyChooser, seed: int, start_at: float, stop_at: float,
+                results: dict):
+    rnd = random.Random(seed)
+    ops = list(config["mix"])
+    weights = [config["mix"][op] for op in ops]
+    value = "v" * config["value_size"]
+    consistency = demo_pb2.READ_ANY if config["read_any"] else demo_pb2.READ_PRIMARY
+    address_of = None
+    if config["routing"] == "random":
+        addresses = list(CLUSTER_CONFIG.values())
+        address_of = lambda: rnd.choice(addresses)
+    latencies = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            break
+        op = rnd.choices(ops, weights)[0]
+        key = chooser.key(rnd)
+        address = address_of() if address_of else None
+        started = time.perf_counter()
+        try:
+            if op == "get":
+                kv.get(key, consistency=consistency, address=address)
+            elif op == "put":
+                kv.put(key, value, address=address)
+            else:
+                kv.delete(key, address=address)
+            failed = False
+        except grpc.RpcError as e:
+            failed = True
+            if e.code() not in ROUTING_ERROR_CODES and not config["ignore_errors"]:
+                raise
+        elapsed = time.perf_counter() - started
+        if started < start_at: # Khởi động (warmup): không tính
+            continue
+        if failed:
+            errors[op] += 1
+        else:
+            latencies[op].append(elapsed)
+    results[seed] = (latencies, errors)
+
+
+def run_load(config: dict, worker_index: int = 0) -> dict:
+    """Chạy config["concurrency"] luồng trong tiến trình hiện tại. Trả về latency (giây) và số lỗi theo thao tác."""
+    kv = KVClient(CLUSTER_CONFIG, timeout=config["timeout"])
+    chooser = KeyChooser(config["keys"], config["distribution"], config["zipf_s"], config["seed"])
+    start_at = time.perf_counter() + config["warmup"]
+    stop_at = start_at + config["duration"]
+    results = {}
+    threads = [threading.Thread(target=_run_thread,
+                                args=(kv, config, chooser, config["seed"] * 1000003 + worker_index * 1009 + i,
+                                      start_at, stop_at, results))
+               for i in range(config["concurrency"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    kv.close()
+    merged = {op: [] for op in config["mix"]}
+    errors = {op: 0 for op in config["mix"]}
+    for latencies, thread_errors in results.values():
+        for op in merged:
+            merged[op].extend(latencies[op])
+            errors[op] += thread_errors[op]
+    return {"latencies": merged, "errors": errors}
+
+
+def _run_load_process(args):
+    return run_load(*args)
+
+
+# --- Kết quả ---
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(latencies: list, errors: int, duration: float) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "count": count,
+        "errors": errors,
+        "throughput_ops": round(count / duration, 1),
+        "mean_ms": round(sum(latencies) / count * 1e3, 3) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1e3, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1e3, 3),
+        "p999_ms": round(percentile(latencies, 0.999) * 1e3, 3),
+        "max_ms": round(latencies[-1] * 1e3, 3) if count else 0.0,
+    }
+
+
+def server_side_stats(kv: KVClient) -> dict:
+    # Độ trễ từng RPC dữ liệu đo tại server (RPC Stats), theo node và route.
+    stats = {}
+    for node_id, address in CLUSTER_CONFIG.items():
+        try:
+            response = kv.node_stats(address)
+        except grpc.RpcError as e:
+            stats[node_id] = {"error": e.details()}
+            continue
+        node = {}
+        for h in response.histograms:
+            if h.name == "kv_rpc_duration_seconds" and h.labels["rpc"] in ("GetKey", "PutKey", "DeleteKey"):
+                node[f"{h.labels['rpc']}/{h.labels['route']}"] = {
+                    "count": h.count, "p50_ms": round(h.p50_seconds * 1e3, 3),
+                    "p99_ms": round(h.p99_seconds * 1e3, 3), "p999_ms": round(h.p999_seconds * 1e3, 3)}
+        node["replication"] = {f"{c.labels['replica']}/{c.labels['result']}": int(c.value)
+                               for c in response.counters if c.name == "kv_replication_total"}
+        stats[node_id] = node
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tải GET/PUT/DELETE trên cụm 3 node cục bộ.")
+    parser.add_argument("--duration", type=float, default=10, help="Thời gian đo (giây), sau warmup")
+    parser.add_argument("--warmup", type=float, default=2, help="Thời gian chạy tải trước khi bắt đầu đo (giây)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Số luồng gửi request trong mỗi tiến trình")
+    parser.add_argument("--processes", type=int, default=1, help="Số tiến trình sinh tải (tránh giới hạn GIL của client)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("get=80,put=15,delete=5"),
+                        help="Tỉ lệ thao tác, ví dụ get=80,put=15,delete=5")
+    parser.add_argument("--distribution", choices=("uniform", "zipf"), default="uniform")
+    parser.add_argument("--zipf-s", type=float, default=0.99, help="Số mũ của phân phối Zipf")
+    parser.add_argument("--keys", type=int, default=10000, help="Số key trong không gian key (được nạp trước)")
+    parser.add_argument("--value-size", type=int, default=100, help="Kích thước value (byte)")
+    parser.add_argument("--routing", choices=("direct", "random"), default="direct",
+                        help="direct: client gửi thẳng tới primary; random: gửi tới node ngẫu nhiên (server forward)")
+    parser.add_argument("--read-any", action="store_true", help="GET với READ_ANY thay vì READ_PRIMARY")
+    parser.add_argument("--timeout", type=float, default=10, help="Timeout mỗi request (giây)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ignore-errors", action="store_true", help="Đếm mọi lỗi RPC thay vì dừng ở lỗi không phải do định tuyến")
+    parser.add_argument("--server-args", default="", help="Tham số thêm cho server.py, ví dụ \"--server-mode aio\"")
+    parser.add_argument("--no-start", action="store_true", help="Dùng cụm đang chạy thay vì khởi động cụm mới")
+    parser.add_argument("--keep-data", action="store_true", help="Giữ thư mục dữ liệu tạm (kèm log server) sau khi chạy")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file (mặc định chỉ in ra stdout)")
+    args = parser.parse_args()
+
+    config = {
+        "duration": args.duration, "warmup": args.warmup, "concurrency": args.concurrency,
+        "processes": args.processes, "mix": args.mix, "distribution": args.distribution, "zipf_s": args.zipf_s,
+        "keys": args.keys, "value_size": args.value_size, "routing": args.routing, "read_any": args.read_any,
+        "timeout": args.timeout, "seed": args.seed, "ignore_errors": args.ignore_errors,
+        "server_args": args.server_args,
+    }
+    data_root = None
+    processes = {}
+    kv = KVClient(CLUSTER_CONFIG, timeout=args.timeout)
+    try:
+        if not args.no_start:
+            data_root = tempfile.mkdtemp(prefix="kv_bench_")
+            print(f"[BENCH] Khởi động {len(CLUSTER_CONFIG)} node, dữ liệu tại {data_root}", file=sys.stderr)
+            processes = start_cluster(data_root, shlex.split(args.server_args))
+        wait_until_ready(kv, processes, STARTUP_TIMEOUT_SECONDS)
+        print(f"[BENCH] Nạp trước {args.keys} key...", file=sys.stderr)
+        preload(kv, args.keys, "v" * args.value_size)
+
+        print(f"[BENCH] Chạy tải {args.duration}s (warmup {args.warmup}s), {args.processes} x {args.concurrency} luồng...",
+              file=sys.stderr)
+        if args.processes > 1:
+            with multiprocessing.Pool(args.processes) as pool:
+                outcomes = pool.map(_run_load_process, [(config, i) for i in range(args.processes)])
+        else:
+            outcomes = [run_load(config)]
+
+        operations = {}
+        all_latencies = []
+        total_errors = 0
+        for op in args.mix:
+            latencies = [x for outcome in outcomes for x in outcome["latencies"][op]]
+            errors = sum(outcome["errors"][op] for outcome in outcomes)
+            operations[op] = summarize(latencies, errors, args.duration)
+            all_latencies.extend(latencies)
+            total_errors += errors
+        report = {
+            "config": config,
+            "overall": summarize(all_latencies, total_errors, args.duration),
+            "operations": operations,
+            "server": server_side_stats(kv),
+        }
+    finally:
+        kv.close()
+        if processes:
+            stop_cluster(processes)
+        if data_root and not args.keep_data:
+            shutil.rmtree(data_root, ignore_errors=True)
+        elif data_root:
+            print(f"[BENCH] Giữ dữ liệu và log server tại {data_root}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
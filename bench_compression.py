@@ -0,0 +1,72 @@
+# bench_compression.py
+# Đo tỉ lệ nén và tốc độ nén/giải nén value (value_codec.py) với các codec và mức nén, trên
+# các document JSON có cấu trúc lặp lại (kiểu dữ liệu thường lưu trong store).
+#
+#   ratio:           kích thước gốc / kích thước lưu trữ (value không có lợi khi nén được giữ nguyên)
+#   compress_mb_s:   MB dữ liệu gốc nén được mỗi giây (chi phí trên primary khi PutKey)
+#   decompress_mb_s: MB dữ liệu gốc giải nén được mỗi giây (chi phí mỗi lần GetKey)
+#
+# Cách dùng: python bench_compression.py --values 2000 --value-size 4096 --configs zlib:1,zlib:6,zlib:9,lzma:0,lzma:6
+import argparse
+import json
+import random
+import time
+
+import value_codec
+
+
+def make_document(rnd: random.Random, size: int) -> bytes:
+    # Document JSON: các bản ghi cùng schema, giá trị lấy từ một tập nhỏ và vài số ngẫu nhiên.
+    cities = ["Hà Nội", "Hồ Chí Minh", "Đà Nẵng", "Huế", "Cần Thơ", "Hải Phòng"]
+    statuses = ["active", "inactive", "pending", "suspended"]
+    records = []
+    length = 0
+    while length < size:
+        record = {"id": rnd.randrange(10 ** 9), "name": f"user_{rnd.randrange(100000)}",
+                  "city": rnd.choice(cities), "status": rnd.choice(statuses),
+                  "score": round(rnd.random() * 100, 2), "tags": rnd.sample(statuses, 2)}
+        records.append(record)
+        length += len(json.dumps(record, ensure_ascii=False))
+    return json.dumps(records, ensure_ascii=False).encode("utf-8")[:size]
+
+
+def measure(values: list, codec: str, level: int, min_bytes: int) -> dict:
+    codec_id = value_codec.CODECS[codec]
+    raw_bytes = sum(len(v) for v in values)
+    started = time.perf_counter()
+    stored = [value_codec.compress(v, codec_id, level, min_bytes) for v in values]
+    compress_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    restored = [value_codec.decompress(v) for v in stored]
+    decompress_seconds = time.perf_counter() - started
+    if restored != values:
+        raise SystemExit(f"{codec}:{level}: giải nén không khớp value gốc")
+    stored_bytes = sum(len(v) for v in stored)
+    return {"codec": codec, "level": level, "stored_bytes": stored_bytes,
+            "compressed_values": sum(1 for v in stored if value_codec.codec_of(v)),
+            "ratio": round(raw_bytes / max(1, stored_bytes), 2),
+            "compress_mb_s": round(raw_bytes / 1e6 / max(compress_seconds, 1e-9), 1),
+            "decompress_mb_s": round(raw_bytes / 1e6 / max(decompress_seconds, 1e-9), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo tỉ lệ và tốc độ nén value theo codec và mức nén.")
+    parser.add_argument("--values", type=int, default=2000)
+    parser.add_argument("--value-size", type=int, default=4096, help="Kích thước mỗi value (byte)")
+    parser.add_argument("--configs", default="none:0,zlib:1,zlib:6,zlib:9,lzma:0,lzma:6",
+                        help="Danh sách codec:mức nén cần đo")
+    parser.add_argument("--min-bytes", type=int, default=value_codec.DEFAULT_MIN_BYTES)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    values = [make_document(rnd, args.value_size) for _ in range(args.values)]
+    results = []
+    for config in args.configs.split(","):
+        codec, _, level = config.partition(":")
+        results.append(measure(values, codec, int(level or value_codec.DEFAULT_LEVEL), args.min_bytes))
+    print(json.dumps({"values": args.values, "value_size": args.value_size,
+                      "raw_bytes": sum(len(v) for v in values), "results": results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
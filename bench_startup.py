@@ -0,0 +1,69 @@
+# bench_startup.py
+# So sánh thời gian khởi động (nạp store) và bộ nhớ cần thiết giữa file JSON cũ
+# và snapshot nhị phân mở bằng mmap.
+#
+# Cách dùng: python bench_startup.py --keys 200000 --value-size 200
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+import snapshot_format
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thời gian khởi động: JSON vs snapshot nhị phân.")
+    parser.add_argument("--keys", type=int, default=200000)
+    parser.add_argument("--value-size", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=1000, help="Số lần GET ngẫu nhiên sau khi nạp")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    filler = "".join(rnd.choice(string.ascii_letters) for _ in range(args.value_size))
+    data = {f"key_{i:09d}": f"{i}:{filler}" for i in range(args.keys)}
+    sample_keys = rnd.sample(list(data), min(args.lookups, len(data)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "data.json")
+        snap_path = os.path.join(tmp_dir, "data.snap")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        snapshot_format.write_snapshot(snap_path, {k: v.encode("utf-8") for k, v in data.items()})
+        del data
+
+        results = {}
+        for name, loader in (("json", lambda: snapshot_format.load_json_store(json_path)),
+                             ("snapshot", lambda: snapshot_format.SnapshotReader(snap_path))):
+            store, load_seconds, peak_bytes = _measure(loader)
+            start = time.perf_counter()
+            for key in sample_keys:
+                store[key]
+            lookup_seconds = time.perf_counter() - start
+            results[name] = {
+                "file_bytes": os.path.getsize(json_path if name == "json" else snap_path),
+                "load_seconds": round(load_seconds, 4),
+                "load_peak_python_bytes": peak_bytes,
+                "lookup_us": round(lookup_seconds / max(len(sample_keys), 1) * 1e6, 2),
+            }
+            if name == "snapshot":
+                store.close()
+            del store
+
+    print(json.dumps({"keys": args.keys, "value_size": args.value_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# bench_storage.py
+# So sánh các engine lưu trữ (store_engine.ENGINES) của node: thông lượng ghi, thời gian
+# checkpoint (engine memory: ghi snapshot nhị phân; sqlite: commit; bitcask: fsync segment), thông
+# lượng đọc ngẫu nhiên, bộ nhớ đỉnh (RSS) và dung lượng trên đĩa.
+#
+# Mỗi engine chạy trong một tiến trình con riêng để số đo bộ nhớ không lẫn vào nhau. Với
+# --memory-limit-mb, tiến trình con bị giới hạn không gian địa chỉ (RLIMIT_AS): đặt tổng dữ liệu
+# (keys * value-size) lớn hơn giới hạn để mô phỏng dữ liệu lớn hơn RAM; engine không chứa nổi
+# dữ liệu trả về "error": "MemoryError" kèm số key đã ghi được.
+#
+# Cách dùng: python bench_storage.py --keys 100000 --value-size 4096 --memory-limit-mb 256
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import store_engine
+import sqlite_engine
+import bitcask_engine
+
+
+def open_engine(name: str, tmp_dir: str, args):
+    if name == "memory":
+        return store_engine.StripedStore(path=os.path.join(tmp_dir, "data.snap"))
+    if name == "bitcask":
+        return bitcask_engine.BitcaskStore(os.path.join(tmp_dir, "data.bitcask"),
+                                           max_segment_bytes=args.bitcask_segment_mb * 1024 * 1024)
+    return sqlite_engine.SqliteStore(os.path.join(tmp_dir, "data.sqlite"), batch_size=args.sqlite_batch_size,
+                                     cache_bytes=args.sqlite_cache_mb * 1024 * 1024)
+
+
+def disk_bytes(tmp_dir: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(tmp_dir) for name in names)
+
+
+def run_engine(name: str, args) -> dict:
+    if args.memory_limit_mb:
+        limit = args.memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    rnd = random.Random(42)
+    result = {"engine": name}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = open_engine(name, tmp_dir, args)
+        written = 0
+        started = time.perf_counter()
+        try:
+            for i in range(args.keys):
+                key = f"key_{i:09d}"
+                with store.lock_for(key): # Như server: sửa store khi giữ lock stripe của key
+                    store[key] = rnd.randbytes(args.value_size)
+                written += 1
+            result["write_ops_s"] = round(written / (time.perf_counter() - started))
+
+            started = time.perf_counter()
+            store.checkpoint(lambda: {"local_seq": written})
+            result["checkpoint_seconds"] = round(time.perf_counter() - started, 3)
+
+            started = time.perf_counter()
+            for _ in range(args.reads):
+                store.get(f"key_{rnd.randrange(written):09d}")
+            result["read_ops_s"] = round(args.reads / (time.perf_counter() - started))
+        except MemoryError:
+            result["error"] = "MemoryError"
+        result["keys_written"] = written
+        result["data_bytes"] = store.data_bytes()
+        store.close()
+        del store # Giải phóng dữ liệu trước các bước cần cấp phát thêm (khi đã chạm giới hạn bộ nhớ)
+        result["disk_bytes"] = disk_bytes(tmp_dir)
+        result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh thông lượng và bộ nhớ giữa các engine lưu trữ.")
+    parser.add_argument("--engines", default=",".join(store_engine.ENGINES))
+    parser.add_argument("--keys", type=int, default=50000)
+    parser.add_argument("--value-size", type=int, default=1024)
+    parser.add_argument("--reads", type=int, default=20000, help="Số lần GET ngẫu nhiên sau khi ghi")
+    parser.add_argument("--memory-limit-mb", type=int, default=0,
+                        help="Giới hạn không gian địa chỉ của mỗi tiến trình con (MB); 0 = không giới hạn")
+    parser.add_argument("--sqlite-batch-size", type=int, default=sqlite_engine.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--sqlite-cache-mb", type=int, default=sqlite_engine.DEFAULT_CACHE_BYTES // (1024 * 1024))
+    parser.add_argument("--bitcask-segment-mb", type=int,
+                        default=bitcask_engine.DEFAULT_MAX_SEGMENT_BYTES // (1024 * 1024))
+    parser.add_argument("--child", help=argparse.SUPPRESS) # Tên engine khi chạy như tiến trình con
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_engine(args.child, args)))
+        return
+
+    results = []
+    for name in args.engines.split(","):
+        child = subprocess.run([sys.executable, __file__, "--child", name] + sys.argv[1:], capture_output=True, text=True)
+        if child.returncode != 0:
+            # Tiến trình con có thể bị hủy hẳn khi hết bộ nhớ thay vì nhận MemoryError.
+            results.append({"engine": name, "error": f"exit code {child.returncode}", "stderr": child.stderr[-500:]})
+        else:
+            results.append(json.loads(child.stdout))
+    print(json.dumps({"keys": args.keys, "value_size": args.value_size, "dataset_bytes": args.keys * args.value_size,
+                      "memory_limit_mb": args.memory_limit_mb, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
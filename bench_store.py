@@ -0,0 +1,207 @@
+# bench_store.py
+# Stress test nhiều luồng cho store chia stripe (store_engine.py): kiểm tra tính đúng đắn và đo
+# khả năng mở rộng theo số luồng/số stripe.
+#
+#   counters:  các luồng cùng tăng bộ đếm trên một tập key nhỏ (đọc-sửa-ghi khi giữ lock_for),
+#              tổng cuối cùng phải bằng số lần tăng (không mất cập nhật).
+#   snapshots: các luồng ghi/xóa key theo thứ tự trong khi một luồng liên tục chụp snapshot();
+#              mỗi snapshot phải là một thời điểm cố định (thứ tự ghi của từng luồng được giữ,
+#              len() khớp số key duyệt được, không trùng key).
+#   scaling:   thông lượng get/put theo số luồng, với 1 stripe (tương đương một lock toàn cục)
+#              và nhiều stripe.
+#   stall:     độ trễ của thao tác ghi trong lúc một luồng khác liên tục ghi snapshot ra file,
+#              so sánh chép store khi giữ mọi lock (cách cũ) với view copy-on-write.
+#
+# Cách dùng: python bench_store.py --duration 3 --threads 1,2,4,8 --stripes 1,64
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import snapshot_format
+import store_engine
+
+
+def _run_threads(count: int, target, *args) -> float:
+    threads = [threading.Thread(target=target, args=(i,) + args) for i in range(count)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started
+
+
+def check_counters(threads: int, increments: int, keys: int, stripes: int) -> dict:
+    store = store_engine.StripedStore(stripes=stripes)
+    names = [f"counter_{i}" for i in range(keys)]
+
+    def worker(index):
+        rnd = random.Random(index)
+        for _ in range(increments):
+            key = rnd.choice(names)
+            with store.lock_for(key):
+                store[key] = str(int(store.get(key, "0")) + 1)
+
+    elapsed = _run_threads(threads, worker)
+    total = sum(int(store.get(k, "0")) for k in names)
+    expected = threads * increments
+    return {"ok": total == expected, "total": total, "expected": expected, "seconds": round(elapsed, 3)}
+
+
+def check_snapshots(writers: int, duration: float, base_keys: int, window: int, stripes: int) -> dict:
+    # Luồng w lặp: ghi w:i, ghi w:last = i, xóa w:(i - window), ghi đè một key nền ngẫu nhiên.
+    # Tại mọi thời điểm với last = n: có đủ các key (n - window, n], có thể còn n - window và có
+    # thể đã có n + 1; không có key nào khác của luồng w.
+    base = {f"base_{i:07d}": "0" for i in range(base_keys)}
+    store = store_engine.StripedStore(base, stripes=stripes)
+    stop = threading.Event()
+    errors = []
+    counts = {"snapshots": 0, "writes": 0}
+
+    def writer(w):
+        rnd = random.Random(w)
+        i = 0
+        while not stop.is_set():
+            store[f"w{w}:{i:09d}"] = str(i)
+            store[f"w{w}:last"] = str(i)
+            if i >= window:
+                del store[f"w{w}:{i - window:09d}"]
+            base_key = f"base_{rnd.randrange(base_keys):07d}"
+            if rnd.random() < 0.2:
+                store.pop(base_key, None)
+            else:
+                store[base_key] = str(i)
+            i += 1
+        counts["writes"] += i
+
+    def verify(view):
+        seen = list(view)
+        if len(seen) != len(set(seen)):
+            errors.append("key bị trùng khi duyệt snapshot")
+        if len(seen) != len(view):
+            errors.append(f"len() = {len(view)} nhưng duyệt được {len(seen)} key")
+        per_writer = {}
+        for key in seen:
+            if key.startswith("w") and not key.endswith(":last"):
+                w, i = key[1:].split(":")
+                per_writer.setdefault(int(w), set()).add(int(i))
+        for w in range(writers):
+            last = view.get(f"w{w}:last")
+            present = per_writer.get(w, set())
+            if last is None:
+                if present - {0}:
+                    errors.append(f"luồng {w}: chưa có last nhưng có key {sorted(present)[:3]}")
+                continue
+            n = int(last)
+            required = set(range(max(0, n - window + 1), n + 1))
+            allowed = required | {n - window, n + 1}
+            if not required <= present or not present <= allowed:
+                errors.append(f"luồng {w}: last={n}, thiếu {sorted(required - present)[:3]}, thừa {sorted(present - allowed)[:3]}")
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline and len(errors) < 10:
+        with store.snapshot() as view:
+            verify(view)
+        counts["snapshots"] += 1
+    stop.set()
+    for t in threads:
+        t.join()
+    with store.snapshot() as view: # Khi không còn luồng ghi, view phải trùng với store
+        if dict(view) != dict(store):
+            errors.append("snapshot lúc đứng yên khác store")
+    return {"ok": not errors, "errors": errors[:10], **counts, "final_keys": len(store)}
+
+
+def measure_scaling(threads: int, stripes: int, ops: int, keys: int, value: bytes) -> dict:
+    store = store_engine.StripedStore(stripes=stripes)
+    names = [f"key_{i:07d}" for i in range(keys)]
+    for key in names:
+        store[key] = value
+
+    def worker(index):
+        # Giống đường ghi của server: sửa store khi giữ lock stripe của key.
+        rnd = random.Random(index)
+        for _ in range(ops):
+            key = names[rnd.randrange(keys)]
+            if rnd.random() < 0.5:
+                store.get(key)
+            else:
+                with store.lock_for(key):
+                    store[key] = value
+
+    elapsed = _run_threads(threads, worker)
+    return {"threads": threads, "stripes": stripes, "ops_per_sec": round(threads * ops / elapsed)}
+
+
+def measure_stall(mode: str, duration: float, keys: int, value: bytes, stripes: int, path: str) -> dict:
+    store = store_engine.StripedStore({f"key_{i:07d}": value for i in range(keys)}, stripes=stripes)
+    names = list(store.base)
+    stop = threading.Event()
+    dumps = [0]
+
+    def dumper():
+        while not stop.is_set():
+            if mode == "copy":
+                with store.lock_all():
+                    data = dict(store)
+                snapshot_format.write_snapshot(path, data)
+            else:
+                with store.snapshot() as view:
+                    snapshot_format.write_snapshot(path, view)
+            dumps[0] += 1
+
+    thread = threading.Thread(target=dumper)
+    thread.start()
+    rnd = random.Random(1)
+    latencies = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        key = names[rnd.randrange(keys)]
+        started = time.perf_counter()
+        with store.lock_for(key):
+            store[key] = value
+        latencies.append(time.perf_counter() - started)
+    stop.set()
+    thread.join()
+    latencies.sort()
+    return {"mode": mode, "dumps": dumps[0], "writes": len(latencies),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test nhiều luồng cho store chia stripe.")
+    parser.add_argument("--duration", type=float, default=3, help="Thời gian (giây) cho phần snapshots và stall")
+    parser.add_argument("--threads", default="1,2,4,8", help="Danh sách số luồng cho phần scaling")
+    parser.add_argument("--stripes", default=f"1,{store_engine.DEFAULT_STRIPES}", help="Danh sách số stripe cho phần scaling")
+    parser.add_argument("--ops", type=int, default=50000, help="Số thao tác mỗi luồng ở phần scaling")
+    parser.add_argument("--keys", type=int, default=100000)
+    parser.add_argument("--value-size", type=int, default=100)
+    args = parser.parse_args()
+
+    thread_counts = [int(x) for x in args.threads.split(",")]
+    stripe_counts = [int(x) for x in args.stripes.split(",")]
+    value = b"v" * args.value_size
+    results = {
+        "counters": check_counters(max(thread_counts), 20000, 16, store_engine.DEFAULT_STRIPES),
+        "snapshots": check_snapshots(max(thread_counts), args.duration, min(args.keys, 20000), 50, store_engine.DEFAULT_STRIPES),
+        "scaling": [measure_scaling(t, s, args.ops, args.keys, value) for s in stripe_counts for t in thread_counts],
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bench.snap")
+        results["stall"] = [measure_stall(mode, args.duration, args.keys, value, store_engine.DEFAULT_STRIPES, path)
+                            for mode in ("copy", "cow")]
+    print(json.dumps({"keys": args.keys, "value_size": args.value_size, "results": results}, indent=2))
+    if not (results["counters"]["ok"] and results["snapshots"]["ok"]):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+# bitcask_engine.py
+# Engine lưu trữ kiểu Bitcask (log-structured) cho node server: --storage-engine bitcask
+#
+# Mọi thao tác ghi (value hoặc tombstone khi xóa) được nối vào cuối segment đang ghi trong thư mục
+# data_<node_id>.bitcask/. Bộ nhớ chỉ giữ key directory: key -> (file, offset, độ dài value,
+# timestamp, codec, seq); GetKey đọc value qua mmap của segment, không cần giữ value trong RAM.
+# Segment đầy (max_segment_bytes) được đóng lại, kèm một file hint (key và vị trí value, không có
+# value) để lần mở sau dựng lại key directory mà không phải đọc value.
+#
+# Key bị ghi đè hoặc bị xóa để lại record chết trong các segment cũ. Luồng nền merge() chép các
+# record còn sống sang segment mới (giữ nguyên seq và timestamp) rồi xóa các segment cũ khi tỉ lệ
+# byte chết vượt merge_ratio. Mỗi record mang seq tăng dần của engine, nên khi mở lại, bản có seq
+# lớn nhất của mỗi key thắng bất kể nằm ở file nào.
+#
+# Độ bền của từng thao tác vẫn do WAL của node đảm bảo (wal.py): checkpoint() fsync segment đang
+# ghi và ghi meta.json, sau đó WAL mới xóa phần log cũ. Record ghi dở cuối segment (node chết giữa
+# chừng) bị phát hiện bằng CRC và cắt bỏ khi mở lại; phát lại WAL ghi lại các thao tác đó.
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+import value_codec
+from store_engine import StorageEngine, DEFAULT_STRIPES
+
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_MERGE_RATIO = 0.5 # Merge khi byte chết chiếm từ tỉ lệ này của tổng dung lượng segment
+DEFAULT_MERGE_MIN_BYTES = 16 * 1024 * 1024 # ... và có ít nhất chừng này byte chết
+DEFAULT_MERGE_INTERVAL_SECONDS = 10 # Chu kỳ kiểm tra của luồng merge; 0 = chỉ merge khi gọi merge()
+
+FLAG_TOMBSTONE = 1
+_RECORD = struct.Struct("<IQdIIBB") # crc32 (của phần sau nó), seq, timestamp, độ dài key, độ dài value, codec, cờ
+_HINT = struct.Struct("<QdIQIBB") # seq, timestamp, độ dài key, offset của value, độ dài value, codec, cờ
+_DATA_SUFFIX = ".data"
+_HINT_SUFFIX = ".hint"
+_META_FILE = "meta.json"
+_MERGE_MANIFEST = "merge.pending" # Danh sách segment cũ cần xóa sau khi merge xong
+_INCOMING_DIR = "incoming" # Nơi nhận file segment từ node khác (StreamSnapshot)
+_SEGMENT_NAME = re.compile(r"^\d{10}\.(data|hint)$")
+_KEYDIR_ENTRY_BYTES = 200 # Ước lượng bộ nhớ của một mục key directory (tuple và mục dict), chưa gồm key
+
+
+def is_segment_file(name: str) -> bool:
+    return bool(_SEGMENT_NAME.match(name))
+
+
+def _segment_name(file_id: int, suffix: str) -> str:
+    return f"{file_id:010d}{suffix}"
+
+
+def _encode_record(seq: int, timestamp: float, key_bytes: bytes, value: bytes, codec: int, flags: int) -> bytes:
+    body = _RECORD.pack(0, seq, timestamp, len(key_bytes), len(value), codec, flags)[4:] + key_bytes + value
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def _scan_segment(path: str):
+    """Đọc các record hợp lệ của một file data theo thứ tự, dừng ở record hỏng hoặc ghi dở đầu tiên.
+    Trả về (hints, độ dài phần hợp lệ); mỗi hint là (seq, timestamp, key, offset value, độ dài value, codec, cờ)."""
+    hints = []
+    offset = 0
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hints, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                while offset + _RECORD.size <= len(mm):
+                    crc, seq, timestamp, key_size, value_size, codec, flags = _RECORD.unpack_from(mm, offset)
+                    end = offset + _RECORD.size + key_size + value_size
+                    if end > len(mm) or zlib.crc32(view[offset + 4:end]) != crc:
+                        break
+                    key_start = offset + _RECORD.size
+                    key = bytes(view[key_start:key_start + key_size]).decode("utf-8")
+                    hints.append((seq, timestamp, key, key_start + key_size, value_size, codec, flags))
+                    offset = end
+            finally:
+                view.release()
+    return hints, offset
+
+
+def _encode_hint(seq, timestamp, key_bytes, value_offset, value_size, codec, flags) -> bytes:
+    return _HINT.pack(seq, timestamp, len(key_bytes), value_offset, value_size, codec, flags) + key_bytes
+
+
+def _read_hints(path: str) -> list:
+    with open(path, "rb") as f:
+        data = f.read()
+    hints = []
+    offset = 0
+    while offset + _HINT.size <= len(data):
+        seq, timestamp, key_size, value_offset, value_size, codec, flags = _HINT.unpack_from(data, offset)
+        offset += _HINT.size
+        key = data[offset:offset + key_size].decode("utf-8")
+        offset += key_size
+        hints.append((seq, timestamp, key, value_offset, value_size, codec, flags))
+    return hints
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _Segment:
+    """Một file data. Chỉ segment đang ghi có file mở để nối thêm; đọc luôn qua mmap, map lại khi
+    vị trí cần đọc nằm ngoài phần đã map (segment đang ghi lớn dần)."""
+
+    def __init__(self, directory: str, file_id: int, writable: bool = False):
+        self.file_id = file_id
+        self.path = os.path.join(directory, _segment_name(file_id, _DATA_SUFFIX))
+        self.hint_path = os.path.join(directory, _segment_name(file_id, _HINT_SUFFIX))
+        self._file = open(self.path, "ab", buffering=0) if writable else None
+        self.size = os.path.getsize(self.path)
+        self._mm = None
+        self.hints = [] if writable else None # Hint đã mã hóa của các record trong segment đang ghi
+
+    def append(self, record: bytes) -> int:
+        offset = self.size
+        view = memoryview(record)
+        while view:
+            view = view[self._file.write(view):]
+        self.size += len(record)
+        return offset
+
+    def read(self, offset: int, size: int) -> bytes:
+        if size == 0:
+            return b""
+        if self._mm is None or offset + size > len(self._mm):
+            self.remap()
+        return self._mm[offset:offset + size]
+
+    def remap(self):
+        if self.size == 0:
+            return
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+
+    def mapped_bytes(self) -> int:
+        return 0 if self._mm is None else len(self._mm)
+
+    def sync(self):
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def seal(self):
+        # Segment thôi nhận ghi: fsync, ghi file hint, map toàn bộ file để view đang mở vẫn đọc
+        # được kể cả khi merge xóa file sau này.
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+        if self.hints is not None:
+            _write_atomic(self.hint_path, b"".join(self.hints))
+            self.hints = None
+        self.remap()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BitcaskStore(StorageEngine):
+    """Store Bitcask, cùng giao diện với StripedStore (xem store_engine.StorageEngine).
+
+    Key directory, segment và các bộ đếm được bảo vệ bởi một lock; các stripe lock chỉ để người
+    gọi giữ nhất quán giữa store và trạng thái khác của key, như với StripedStore.
+    """
+
+    def __init__(self, directory: str, stripes: int = DEFAULT_STRIPES,
+                 max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES, merge_ratio: float = DEFAULT_MERGE_RATIO,
+                 merge_min_bytes: int = DEFAULT_MERGE_MIN_BYTES,
+                 merge_interval: float = DEFAULT_MERGE_INTERVAL_SECONDS):
+        self.directory = directory
+        self.max_segment_bytes = max(1, max_segment_bytes)
+        self.merge_ratio = merge_ratio
+        self.merge_min_bytes = merge_min_bytes
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock() # Tuần tự hóa merge, gửi và thay segment
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, _META_FILE)
+        self._meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self._meta = json.load(f)
+        with self._lock:
+            self._finish_merge()
+            shutil.rmtree(os.path.join(directory, _INCOMING_DIR), ignore_errors=True)
+            self._load_locked()
+        self._closed = threading.Event()
+        if merge_interval > 0:
+            threading.Thread(target=self._merge_loop, args=(merge_interval,), daemon=True).start()
+
+    @property
+    def meta(self) -> dict:
+        return self._meta
+
+    @property
+    def stripe_count(self) -> int:
+        return len(self._locks)
+
+    def lock_for(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def lock_all(self):
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    # Các hàm *_locked chạy khi đang giữ self._lock.
+    def _load_locked(self):
+        # Dựng key directory từ các segment trong thư mục (hint nếu có, nếu không thì đọc file data)
+        # rồi mở một segment mới để ghi.
+        self._keydir = {}
+        self._segments = {}
+        self._seq = 0
+        self._data_bytes = 0 # Tổng entry_size của các key còn sống
+        self._live_bytes = 0 # Tổng kích thước record của các key còn sống
+        self._total_bytes = 0 # Tổng kích thước các file data
+        self._key_bytes = 0 # Bộ nhớ của các object key trong key directory
+        deleted = {} # key -> seq của tombstone mới nhất đã gặp
+        ids = sorted(int(name[:-len(_DATA_SUFFIX)]) for name in os.listdir(self.directory)
+                     if is_segment_file(name) and name.endswith(_DATA_SUFFIX))
+        for file_id in ids:
+            segment = _Segment(self.directory, file_id)
+            if os.path.exists(segment.hint_path):
+                hints = _read_hints(segment.hint_path)
+            else:
+                hints, valid = _scan_segment(segment.path)
+                if valid != segment.size:
+                    print(f"[WARN] Bitcask {self.directory}: Cắt bỏ {segment.size - valid} byte hỏng/ghi dở "
+                          f"cuối segment {file_id}")
+                    os.truncate(segment.path, valid)
+                    segment.size = valid
+                _write_atomic(segment.hint_path, b"".join(
+                    _encode_hint(seq, ts, key.encode("utf-8"), offset, size, codec, flags)
+                    for seq, ts, key, offset, size, codec, flags in hints))
+            segment.remap()
+            self._segments[file_id] = segment
+            self._total_bytes += segment.size
+            for seq, timestamp, key, offset, size, codec, flags in hints:
+                self._seq = max(self._seq, seq)
+                current = self._keydir.get(key)
+                if current is not None and current[5] >= seq:
+                    continue
+                if flags & FLAG_TOMBSTONE:
+                    if current is not None:
+                        self._forget_locked(key, current)
+                    deleted[key] = max(deleted.get(key, 0), seq)
+                elif deleted.get(key, 0) < seq:
+                    if current is not None:
+                        self._forget_locked(key, current)
+                    self._remember_locked(key, (file_id, offset, size, timestamp, codec, seq))
+        self._next_id = ids[-1] + 1 if ids else 1
+        self._open_active_locked()
+
+    def _open_active_locked(self):
+        self._active = _Segment(self.directory, self._next_id, writable=True)
+        self._segments[self._next_id] = self._active
+        self._next_id += 1
+
+    def _rotate_locked(self):
+        self._active.seal()
+        self._open_active_locked()
+
+    def _remember_locked(self, key, entry):
+        key_size = len(key.encode("utf-8"))
+        self._keydir[key] = entry
+        self._data_bytes += key_size + entry[2]
+        self._live_bytes += _RECORD.size + key_size + entry[2]
+        self._key_bytes += sys.getsizeof(key)
+
+    def _forget_locked(self, key, entry):
+        key_size = len(key.encode("utf-8"))
+        del self._keydir[key]
+        self._data_bytes -= key_size + entry[2]
+        self._live_bytes -= _RECORD.size + key_size + entry[2]
+        self._key_bytes -= sys.getsizeof(key)
+
+    def _append_locked(self, segment: _Segment, seq: int, timestamp: float, key: str, value: bytes, codec: int,
+                       flags: int) -> tuple:
+        key_bytes = key.encode("utf-8")
+        record = _encode_record(seq, timestamp, key_bytes, value, codec, flags)
+        value_offset = segment.append(record) + _RECORD.size + len(key_bytes)
+        segment.hints.append(_encode_hint(seq, timestamp, key_bytes, value_offset, len(value), codec, flags))
+        self._total_bytes += len(record)
+        return (segment.file_id, value_offset, len(value), timestamp, codec, seq)
+
+    def _write_locked(self, key: str, value: bytes, codec: int, flags: int) -> tuple:
+        if self._active.size and self._active.size + _RECORD.size + len(value) > self.max_segment_bytes:
+            self._rotate_locked()
+        self._seq += 1
+        return self._append_locked(self._active, self._seq, time.time(), key, value, codec, flags)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._keydir.get(key)
+            if entry is None:
+                return default
+            value = self._segments[entry[0]].read(entry[1], entry[2])
+        return value_codec.wrap(entry[4], value)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._keydir
+
+    def __setitem__(self, key, value):
+        with self.lock_for(key), self._lock:
+            entry = self._write_locked(key, value, value_codec.codec_of(value), 0)
+            current = self._keydir.get(key)
+            if current is not None:
+                self._forget_locked(key, current)
+            self._remember_locked(key, entry)
+
+    def __delitem__(self, key):
+        with self.lock_for(key), self._lock:
+            current = self._keydir.get(key)
+            if current is None:
+                raise KeyError(key)
+            self._write_locked(key, b"", 0, FLAG_TOMBSTONE)
+            self._forget_locked(key, current)
+
+    def __iter__(self):
+        # Duyệt trên bản chép danh sách key lúc gọi: dùng snapshot() nếu cần cả value.
+        with self._lock:
+            keys = list(self._keydir)
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return len(self._keydir)
+
+    def snapshot(self) -> "BitcaskSnapshot":
+        with self.lock_all():
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> "BitcaskSnapshot":
+        # Segment chỉ được nối thêm, không bị sửa: view chỉ cần bản chép key directory và tham
+        # chiếu tới các segment (mmap vẫn đọc được sau khi merge xóa file).
+        with self._lock:
+            return BitcaskSnapshot(self, dict(self._keydir), dict(self._segments))
+
+    def checkpoint(self, meta_fn):
+        # Segment đã đóng được fsync lúc đóng: chỉ cần fsync segment đang ghi rồi ghi meta.
+        with self.lock_all():
+            meta = meta_fn()
+            with self._lock:
+                self._active.sync()
+        _write_atomic(os.path.join(self.directory, _META_FILE), json.dumps(meta).encode("utf-8"))
+        self._meta = meta
+
+    def data_bytes(self) -> int:
+        return self._data_bytes
+
+    def memory_usage(self) -> dict:
+        with self._lock:
+            mapped = sum(segment.mapped_bytes() for segment in self._segments.values())
+            keydir = sys.getsizeof(self._keydir) + len(self._keydir) * _KEYDIR_ENTRY_BYTES + self._key_bytes
+        # Phần mmap là page cache của hệ điều hành, có thể bị thu hồi khi thiếu bộ nhớ.
+        return {"bitcask_keydir": keydir, "bitcask_mmap": mapped}
+
+    def disk_bytes(self) -> int:
+        return self._total_bytes
+
+    def dead_bytes(self) -> int:
+        return self._total_bytes - self._live_bytes
+
+    def needs_merge(self) -> bool:
+        dead = self.dead_bytes()
+        return dead >= self.merge_min_bytes and dead >= self.merge_ratio * self._total_bytes
+
+    def merge(self) -> int:
+        """Chép các record còn sống của mọi segment đã đóng (đóng luôn segment đang ghi) sang
+        segment mới rồi xóa các segment cũ. Trả về số byte thu hồi được."""
+        with self._merge_lock:
+            with self._lock:
+                if self._active.size:
+                    self._rotate_locked()
+                inputs = {file_id: segment for file_id, segment in self._segments.items()
+                          if segment is not self._active}
+                live = [(key, entry) for key, entry in self._keydir.items() if entry[0] in inputs]
+                before = self._total_bytes
+            if not inputs:
+                return 0
+            output = None
+            for key, entry in live:
+                file_id, offset, size, timestamp, codec, seq = entry
+                value = inputs[file_id].read(offset, size) # Segment đã đóng được map toàn bộ: không cần lock
+                with self._lock:
+                    if self._keydir.get(key) != entry:
+                        continue # Key đã được ghi lại hoặc bị xóa trong lúc merge
+                    if output is None or output.size + _RECORD.size + size > self.max_segment_bytes:
+                        if output is not None:
+                            output.seal()
+                        output = _Segment(self.directory, self._next_id, writable=True)
+                        self._segments[self._next_id] = output
+                        self._next_id += 1
+                    self._keydir[key] = self._append_locked(output, seq, timestamp, key, value, codec, 0)
+            with self._lock:
+                if output is not None:
+                    output.seal()
+            # Segment mới đã bền vững: ghi danh sách segment cũ trước khi xóa để nếu node chết giữa
+            # chừng, lần mở sau xóa nốt thay vì giữ lại cả hai bản.
+            _write_atomic(os.path.join(self.directory, _MERGE_MANIFEST), json.dumps(sorted(inputs)).encode("utf-8"))
+            with self._lock:
+                for file_id, segment in inputs.items():
+                    del self._segments[file_id]
+                    self._total_bytes -= segment.size
+                reclaimed = before - self._total_bytes
+                self._finish_merge()
+            return reclaimed
+
+    def _finish_merge(self):
+        manifest = os.path.join(self.directory, _MERGE_MANIFEST)
+        if not os.path.exists(manifest):
+            return
+        with open(manifest, "r", encoding="utf-8") as f:
+            file_ids = json.load(f)
+        for file_id in file_ids:
+            for suffix in (_DATA_SUFFIX, _HINT_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.directory, _segment_name(file_id, suffix)))
+                except FileNotFoundError:
+                    pass
+        os.remove(manifest)
+
+    def _merge_loop(self, interval: float):
+        while not self._closed.wait(interval):
+            if not self.needs_merge():
+                continue
+            try:
+                reclaimed = self.merge()
+                print(f"[INFO] Bitcask {self.directory}: Merge xong, thu hồi {reclaimed} byte")
+            except Exception as e:
+                print(f"[ERROR] Bitcask {self.directory}: Lỗi khi merge segment: {e}")
+
+    @contextmanager
+    def frozen_segments(self, state_fn):
+        """Đóng segment đang ghi rồi cho (đường dẫn các file data/hint đã đóng, số key, state_fn()),
+        với state_fn được gọi khi đang giữ lock_all() nên khớp với nội dung các file. Merge tạm
+        dừng (file không bị xóa) cho tới khi ra khỏi context."""
+        with self._merge_lock:
+            with self.lock_all():
+                with self._lock:
+                    if self._active.size:
+                        self._rotate_locked()
+                    segments = [self._segments[file_id] for file_id in sorted(self._segments)
+                                if self._segments[file_id] is not self._active]
+                    count = len(self._keydir)
+                state = state_fn()
+            yield [path for segment in segments for path in (segment.path, segment.hint_path)], count, state
+
+    def incoming_dir(self) -> str:
+        """Thư mục trống để nhận file segment từ node khác (dùng với install_segments)."""
+        path = os.path.join(self.directory, _INCOMING_DIR)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        return path
+
+    def install_segments(self, on_installed=None, before_install=None) -> int:
+        """Thay toàn bộ nội dung store bằng các file segment trong incoming_dir() và dựng lại key
+        directory từ file hint. before_install() (trước khi thay, vẫn đọc được nội dung cũ) và
+        on_installed() được gọi khi còn giữ lock_all(). Trả về số key."""
+        incoming = os.path.join(self.directory, _INCOMING_DIR)
+        with self._merge_lock:
+            with self.lock_all():
+                if before_install is not None:
+                    before_install()
+                with self._lock:
+                    for segment in self._segments.values():
+                        segment.close()
+                        for path in (segment.path, segment.hint_path):
+                            if os.path.exists(path):
+                                os.remove(path)
+                    for name in os.listdir(incoming):
+                        if is_segment_file(name):
+                            os.replace(os.path.join(incoming, name), os.path.join(self.directory, name))
+                    shutil.rmtree(incoming, ignore_errors=True)
+                    self._load_locked()
+                    count = len(self._keydir)
+                if on_installed is not None:
+                    on_installed()
+        return count
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            for segment in self._segments.values():
+                segment.sync()
+                segment.close()
+
+
+class BitcaskSnapshot(Mapping):
+    """View chỉ-đọc của BitcaskStore: bản chép key directory tại một thời điểm."""
+
+    def __init__(self, store: BitcaskStore, keydir: dict, segments: dict):
+        self._store = store
+        self._keydir = keydir
+        self._segments = segments
+
+    def __getitem__(self, key):
+        entry = self._keydir[key]
+        with self._store._lock: # Segment đang ghi có thể phải map lại
+            value = self._segments[entry[0]].read(entry[1], entry[2])
+        return value_codec.wrap(entry[4], value)
+
+    def __iter__(self):
+        return iter(self._keydir)
+
+    def __len__(self) -> int:
+        return len(self._keydir)
+
+    def close(self):
+        self._keydir = {}
+        self._segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
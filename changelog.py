@@ -0,0 +1,105 @@
+# changelog.py
+# Số thứ tự (sequence number) cho các thao tác ghi và lịch sử thay đổi phục vụ catch-up.
+#
+# Mỗi node khi là primary đánh số tăng dần cho các thao tác ghi của mình (origin = node đó).
+# Mọi node ghi nhớ, với từng origin, số thứ tự lớn nhất đã áp dụng liên tục (watermark) và
+# giữ một lịch sử có giới hạn các thay đổi gần đây. Node khởi động lại chỉ cần xin các thay
+# đổi có seq > watermark của mình thay vì toàn bộ snapshot.
+from collections import deque
+
+DEFAULT_HISTORY_PER_ORIGIN = 100000
+
+
+class SeqTracker:
+    """Theo dõi các seq đã áp dụng của một origin.
+
+    watermark: mọi seq <= watermark đều đã được áp dụng. Seq đến không theo thứ tự (do sao
+    lưu song song) được giữ trong tập chờ cho tới khi khoảng trống phía trước được lấp.
+    """
+
+    def __init__(self, watermark: int = 0):
+        self.watermark = watermark
+        self._ahead = set()
+
+    def observe(self, seq: int) -> bool:
+        # Trả về False nếu seq này đã được áp dụng trước đó.
+        if seq <= self.watermark or seq in self._ahead:
+            return False
+        self._ahead.add(seq)
+        while self.watermark + 1 in self._ahead:
+            self.watermark += 1
+            self._ahead.discard(self.watermark)
+        return True
+
+    def reset(self, watermark: int):
+        self.watermark = watermark
+        self._ahead = {seq for seq in self._ahead if seq > watermark}
+
+
+class ChangeHistory:
+    """Lịch sử các thay đổi gần đây của từng origin, giới hạn số entry mỗi origin.
+
+    Entry: (seq, key, value, expires_at), value là None với thao tác xóa, expires_at là 0 nếu
+    key không có TTL. Không tự khóa; người gọi giữ state_lock khi ghi và đọc.
+    """
+
+    def __init__(self, max_per_origin: int = DEFAULT_HISTORY_PER_ORIGIN):
+        self.max_per_origin = max_per_origin
+        self._entries = {}
+
+    def append(self, origin: str, seq: int, key: str, value, expires_at: float = 0):
+        entries = self._entries.get(origin)
+        if entries is None:
+            entries = self._entries[origin] = deque(maxlen=self.max_per_origin)
+        entries.append((seq, key, value, expires_at))
+
+    def changes_between(self, origin: str, after_seq: int, up_to_seq: int):
+        """Trả về list entry có after_seq < seq <= up_to_seq theo thứ tự seq, hoặc None nếu
+        lịch sử không còn đủ (đã bị cắt bớt hoặc node này chưa từng thấy một phần trong đó)."""
+        if up_to_seq <= after_seq:
+            return []
+        # Duyệt từ entry mới nhất và dừng khi đã đủ, để chi phí tỉ lệ với số thay đổi cần gửi.
+        wanted = up_to_seq - after_seq
+        selected = {}
+        for entry in reversed(self._entries.get(origin, ())):
+            if after_seq < entry[0] <= up_to_seq:
+                selected[entry[0]] = entry
+                if len(selected) == wanted:
+                    break
+        if len(selected) != wanted:
+            return None
+        return [selected[seq] for seq in sorted(selected)]
+
+
+class TombstoneSet:
+    """Dấu xóa: key -> (origin, seq, thời điểm xóa). Giúp thao tác ghi cũ đến trễ (hoặc được
+    phát lại khi catch-up) không làm sống lại key đã bị xóa. Dấu xóa quá hạn bị dọn đi.
+    Không tự khóa; người gọi giữ lock stripe của key, riêng purge()/to_dict() cần giữ mọi stripe."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._items = {}
+
+    def add(self, key: str, origin: str, seq: int, deleted_at: float):
+        self._items[key] = (origin, seq, deleted_at)
+
+    def discard(self, key: str):
+        self._items.pop(key, None)
+
+    def get(self, key: str):
+        return self._items.get(key)
+
+    def purge(self, now: float) -> int:
+        expired = [k for k, (_, _, t) in self._items.items() if now - t > self.ttl_seconds]
+        for key in expired:
+            del self._items[key]
+        return len(expired)
+
+    def to_dict(self) -> dict:
+        return {k: list(v) for k, v in self._items.items()}
+
+    def load(self, data: dict):
+        self._items = {k: tuple(v) for k, v in data.items()}
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,131 @@
+# channel_pool.py
+# Pool các gRPC channel dùng chung trong cả tiến trình, mỗi peer (địa chỉ) một channel sống lâu.
+#
+# Tạo channel mới cho mỗi request nghĩa là mỗi request phải trả giá bắt tay TCP + HTTP/2.
+# Pool giữ channel mở với keepalive và để gRPC tự kết nối lại (có backoff). Channel bị
+# loại bỏ khi peer được xác định là chết hoặc lỗi liên tiếp quá nhiều lần, lần dùng sau
+# sẽ tạo channel mới.
+import asyncio
+import threading
+import grpc
+import demo_pb2_grpc
+
+DEFAULT_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 10000),
+    ("grpc.keepalive_timeout_ms", 3000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.initial_reconnect_backoff_ms", 200),
+    ("grpc.min_reconnect_backoff_ms", 200),
+    ("grpc.max_reconnect_backoff_ms", 5000),
+]
+
+# Server phải cho phép keepalive ping của client, nếu không sẽ đóng kết nối (GOAWAY too_many_pings).
+SERVER_KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 5000),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
+MAX_CONSECUTIVE_FAILURES = 3
+
+# Nén message gRPC (mức transport) theo tên dùng trên dòng lệnh.
+COMPRESSION_ALGORITHMS = {"none": grpc.Compression.NoCompression, "gzip": grpc.Compression.Gzip,
+                    "deflate": grpc.Compression.Deflate}
+
+
+class _PooledChannel:
+    def __init__(self, channel):
+        self.channel = channel
+        self.stub = demo_pb2_grpc.KeyValueStub(channel)
+        self.failures = 0
+
+
+class ChannelPool:
+    def __init__(self, options=None, max_consecutive_failures: int = MAX_CONSECUTIVE_FAILURES, compression=None):
+        # compression: grpc.Compression áp dụng cho mọi request gửi qua các channel của pool.
+        self.options = options if options is not None else DEFAULT_CHANNEL_OPTIONS
+        self.compression = compression
+        self.max_consecutive_failures = max_consecutive_failures
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._stats = {"created": 0, "reused": 0, "evicted": 0}
+
+    def get_stub(self, address: str) -> demo_pb2_grpc.KeyValueStub:
+        with self._lock:
+            pooled = self._channels.get(address)
+            if pooled is not None:
+                self._stats["reused"] += 1
+                return pooled.stub
+            pooled = _PooledChannel(self._new_channel(address))
+            self._channels[address] = pooled
+            self._stats["created"] += 1
+            return pooled.stub
+
+    def report_success(self, address: str):
+        with self._lock:
+            pooled = self._channels.get(address)
+            if pooled is not None:
+                pooled.failures = 0
+
+    def report_failure(self, address: str):
+        # Gọi khi RPC tới address lỗi UNAVAILABLE; lỗi liên tiếp quá nhiều lần thì bỏ channel.
+        with self._lock:
+            pooled = self._channels.get(address)
+            if pooled is None:
+                return
+            pooled.failures += 1
+            if pooled.failures < self.max_consecutive_failures:
+                return
+            self._remove_locked(address)
+        self._close_channel(pooled.channel)
+
+    def evict(self, address: str):
+        with self._lock:
+            pooled = self._remove_locked(address)
+        if pooled is not None:
+            self._close_channel(pooled.channel)
+
+    def _new_channel(self, address: str):
+        return grpc.insecure_channel(address, options=self.options, compression=self.compression)
+
+    def _close_channel(self, channel):
+        channel.close()
+
+    def _remove_locked(self, address: str):
+        pooled = self._channels.pop(address, None)
+        if pooled is not None:
+            self._stats["evicted"] += 1
+        return pooled
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+            result["open"] = len(self._channels)
+            return result
+
+    def close_all(self):
+        with self._lock:
+            channels = list(self._channels.values())
+            self._channels.clear()
+        for pooled in channels:
+            self._close_channel(pooled.channel)
+
+
+class AsyncChannelPool(ChannelPool):
+    """Pool channel grpc.aio cho server chạy ở chế độ asyncio; stub trả về awaitable.
+    Chỉ dùng từ bên trong event loop."""
+
+    def _new_channel(self, address: str):
+        return grpc.aio.insecure_channel(address, options=self.options, compression=self.compression)
+
+    def _close_channel(self, channel):
+        # close() của grpc.aio là coroutine, chạy nền trên event loop hiện tại.
+        asyncio.ensure_future(channel.close())
+
+    async def aclose_all(self):
+        with self._lock:
+            channels = list(self._channels.values())
+            self._channels.clear()
+        for pooled in channels:
+            await pooled.channel.close()
@@ -3,8 +3,8 @@ import sys
 import grpc
 import time 
 import demo_pb2
-import demo_pb2_grpc
 import random # Để tìm key ngẫu nhiên
+from kv_client import KVClient, KEY_NOT_FOUND_MSG, display_value
 
 # --- Cấu hình Client (nên đồng bộ với server) ---
 SERVERS = [ 
@@ -12,7 +12,6 @@ SERVERS = [
     "localhost:50052",
     "localhost:50053"
 ]
-KEY_NOT_FOUND_MSG = "<KEY_NOT_FOUND>"
 
 CLIENT_SIDE_CLUSTER_CONFIG = {
     "node1": "localhost:50051",
@@ -20,6 +19,9 @@ CLIENT_SIDE_CLUSTER_CONFIG = {
     "node3": "localhost:50053",
 }
 CLIENT_SIDE_SORTED_NODE_IDS = sorted(CLIENT_SIDE_CLUSTER_CONFIG.keys())
+# Client dùng chung: hash ring phải trùng với cấu hình của server (RING trong server.py),
+# channel tới từng node được giữ trong pool thay vì mở mới cho mỗi lệnh.
+kv = KVClient(CLIENT_SIDE_CLUSTER_CONFIG)
 
 # Giả định khoảng thời gian heartbeat của server (tính bằng giây)
 # Giá trị này nên tương ứng với HEARTBEAT_INTERVAL_SECONDS trong server.py
@@ -30,73 +32,66 @@ ASSUMED_SERVER_INITIAL_RECOVERY_DELAY = 3
 def get_primary_node_id_for_key_client(key: str) -> str:
     if not CLIENT_SIDE_SORTED_NODE_IDS:
         return "N/A (Chưa cấu hình client cluster)"
-    key_hash = 0
-    for char in key:
-        key_hash = (key_hash * 31 + ord(char)) & 0xFFFFFFFF
-    primary_node_index = key_hash % len(CLIENT_SIDE_SORTED_NODE_IDS)
-    return CLIENT_SIDE_SORTED_NODE_IDS[primary_node_index]
+    return kv.primary_for(key)
 
+# server_address = None: gửi thẳng tới primary của key theo view của client.
 def put_key(server_address, key, value, suppress_error_for_test=False):
     expected_primary_node = get_primary_node_id_for_key_client(key)
-    print(f"\n>>> Client: Gửi PUT ('{key}' = '{value}') đến {server_address}. (Dự kiến primary: {expected_primary_node})")
+    target = server_address or f"primary {expected_primary_node}"
+    print(f"\n>>> Client: Gửi PUT ('{key}' = '{value}') đến {target}. (Dự kiến primary: {expected_primary_node})")
     try:
-        with grpc.insecure_channel(server_address) as channel:
-            stub = demo_pb2_grpc.KeyValueStub(channel)
-            response = stub.PutKey(demo_pb2.PutKeyRequest(key=key, value=value, is_replica=False), timeout=10) 
-            print(f"<<< Server {server_address} phản hồi PutKey: {response.message} (Code: {response.code})")
-            return True # Thành công
+        response = kv.put(key, value, address=server_address)
+        print(f"<<< Server {target} phản hồi PutKey: {response.message} (Code: {response.code})")
+        return True # Thành công
     except grpc.RpcError as e:
         if not suppress_error_for_test: # Chỉ in lỗi nếu không phải đang cố tình test lỗi
-            print(f"!!! Lỗi RPC khi PUT đến {server_address} cho key '{key}': {e.code()} - {e.details()}")
+            print(f"!!! Lỗi RPC khi PUT đến {target} cho key '{key}': {e.code()} - {e.details()}")
         else:
-            print(f"--- (Mong đợi) Lỗi RPC khi PUT đến {server_address} cho key '{key}': {e.code()} - {e.details()}")
+            print(f"--- (Mong đợi) Lỗi RPC khi PUT đến {target} cho key '{key}': {e.code()} - {e.details()}")
         return False # Thất bại
 
-def get_key(server_address, key, suppress_error_for_test=False):
+def get_key(server_address, key, suppress_error_for_test=False, consistency=demo_pb2.READ_PRIMARY, max_staleness_seconds=0):
     expected_primary_node = get_primary_node_id_for_key_client(key)
-    print(f"\n>>> Client: Gửi GET ('{key}') đến {server_address}. (Dự kiến primary: {expected_primary_node})")
+    target = server_address or f"primary {expected_primary_node}"
+    print(f"\n>>> Client: Gửi GET ('{key}') đến {target}. (Dự kiến primary: {expected_primary_node}, "
+          f"nhất quán: {demo_pb2.ReadConsistency.Name(consistency)})")
     try:
-        with grpc.insecure_channel(server_address) as channel:
-            stub = demo_pb2_grpc.KeyValueStub(channel)
-            response = stub.GetKey(demo_pb2.Key(key=key), timeout=10)
-            if response.value == KEY_NOT_FOUND_MSG:
-                print(f"<<< Server {server_address} phản hồi GetKey('{key}'): KHÔNG TÌM THẤY")
-            else:
-                print(f"<<< Server {server_address} phản hồi GetKey('{key}'): '{response.value}'")
-            return response.value
+        response = kv.get(key, consistency=consistency, max_staleness_seconds=max_staleness_seconds, address=server_address)
+        served = f"(đọc từ {response.served_by}, độ cũ {response.staleness_seconds:.1f}s)"
+        if response.value == KEY_NOT_FOUND_MSG:
+            print(f"<<< Server {target} phản hồi GetKey('{key}'): KHÔNG TÌM THẤY {served}")
+        else:
+            print(f"<<< Server {target} phản hồi GetKey('{key}'): '{display_value(response.value)}' {served}")
+        return response.value
     except grpc.RpcError as e:
         if not suppress_error_for_test:
-            print(f"!!! Lỗi RPC khi GET từ {server_address} cho key '{key}': {e.code()} - {e.details()}")
+            print(f"!!! Lỗi RPC khi GET từ {target} cho key '{key}': {e.code()} - {e.details()}")
         else:
-            print(f"--- (Mong đợi) Lỗi RPC khi GET từ {server_address} cho key '{key}': {e.code()} - {e.details()}")
+            print(f"--- (Mong đợi) Lỗi RPC khi GET từ {target} cho key '{key}': {e.code()} - {e.details()}")
         return None
 
 def delete_key(server_address, key, suppress_error_for_test=False):
     expected_primary_node = get_primary_node_id_for_key_client(key)
-    print(f"\n>>> Client: Gửi DELETE ('{key}') đến {server_address}. (Dự kiến primary: {expected_primary_node})")
+    target = server_address or f"primary {expected_primary_node}"
+    print(f"\n>>> Client: Gửi DELETE ('{key}') đến {target}. (Dự kiến primary: {expected_primary_node})")
     try:
-        with grpc.insecure_channel(server_address) as channel:
-            stub = demo_pb2_grpc.KeyValueStub(channel)
-            response = stub.DeleteKey(demo_pb2.DeleteKeyRequest(key=key, is_replica=False), timeout=10)
-            print(f"<<< Server {server_address} phản hồi DeleteKey: {response.msg}")
-            return True # Thành công
+        response = kv.delete(key, address=server_address)
+        print(f"<<< Server {target} phản hồi DeleteKey: {response.msg}")
+        return True # Thành công
     except grpc.RpcError as e:
         if not suppress_error_for_test:
-            print(f"!!! Lỗi RPC khi DELETE đến {server_address} cho key '{key}': {e.code()} - {e.details()}")
+            print(f"!!! Lỗi RPC khi DELETE đến {target} cho key '{key}': {e.code()} - {e.details()}")
         else:
-            print(f"--- (Mong đợi) Lỗi RPC khi DELETE đến {server_address} cho key '{key}': {e.code()} - {e.details()}")
+            print(f"--- (Mong đợi) Lỗi RPC khi DELETE đến {target} cho key '{key}': {e.code()} - {e.details()}")
         return False # Thất bại
 
 def check_health(server_address):
-    try:
-        with grpc.insecure_channel(server_address) as channel:
-            stub = demo_pb2_grpc.KeyValueStub(channel)
-            response = stub.CheckHealth(demo_pb2.HealthCheckRequest(), timeout=1)
-            print(f"--- Health của {server_address}: {response.status}")
-            return True
-    except grpc.RpcError:
+    status = kv.check_health(server_address)
+    if status is None:
         print(f"--- Health của {server_address}: FAILED (Không kết nối được hoặc timeout)")
         return False
+    print(f"--- Health của {server_address}: {status}")
+    return True
 
 def find_key_for_node(target_node_id: str, prefix="testkey", max_attempts=1000) -> str:
     """Tìm một key ngẫu nhiên mà hash về target_node_id."""
@@ -156,6 +151,12 @@ def fault_tolerance_test_scenario():
     print(f"\nThử GET key '{key_on_killed_node}' (primary là {node_to_kill_id} đã chết):")
     get_key(client_connect_to_server, key_on_killed_node, suppress_error_for_test=True) 
 
+    print(f"\nThử GET key '{key_on_killed_node}' với READ_ANY (đọc bản replica cục bộ khi primary đã chết):")
+    get_key(client_connect_to_server, key_on_killed_node, consistency=demo_pb2.READ_ANY)
+
+    print(f"\nThử GET key '{key_on_killed_node}' định tuyến thẳng tới primary (client tự chuyển sang replica):")
+    get_key(None, key_on_killed_node)
+
     print(f"\nThử PUT key '{key_on_killed_node}' (primary là {node_to_kill_id} đã chết):")
     put_key(client_connect_to_server, key_on_killed_node, "New value when primary dead", suppress_error_for_test=True) 
 
@@ -247,11 +248,24 @@ def recovery_test_scenario():
 
     print("\n" + "="*20 + " KẾT THÚC KỊCH BẢN KHÔI PHỤC " + "="*20)
 
+def direct_routing_demo():
+    print("\n" + "="*10 + " ĐỊNH TUYẾN TRỰC TIẾP TỚI PRIMARY " + "="*10)
+    keys_to_test = {"alpha": "Value for Alpha", "beta": "Value for Beta", "gamma": "Value for Gamma"}
+    for k, v in keys_to_test.items():
+        put_key(None, k, v)
+    for k in keys_to_test:
+        get_key(None, k)
+    print(f"\nThống kê client: {kv.stats()}")
+
 def main():
     # Luôn kiểm tra health ban đầu
     print("Đang kiểm tra trạng thái các server...")
     initial_server_status = {addr: check_health(addr) for addr in CLIENT_SIDE_CLUSTER_CONFIG.values()}
     
+    # --- Định tuyến trực tiếp: mỗi lệnh đi thẳng tới primary của key ---
+    if any(initial_server_status.values()):
+        direct_routing_demo()
+
     # --- Chạy kịch bản demo thông thường (tùy chọn) ---
     # print("\n" + "="*10 + " BẮT ĐẦU KỊCH BẢN DEMO THÔNG THƯỜNG " + "="*10)
     # keys_to_test = { "alpha": "Value for Alpha", "beta": "Value for Beta"}
@@ -0,0 +1,39 @@
+# convert_snapshot.py
+# Chuyển các file dữ liệu JSON cũ (data_<node_id>.json) sang định dạng snapshot nhị phân
+# (data_<node_id>.snap) mà server.py dùng khi khởi động.
+import argparse
+import os
+import sys
+import snapshot_format
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chuyển data_*.json sang snapshot nhị phân (.snap).")
+    parser.add_argument("json_files", nargs="+", help="Các file JSON cần chuyển, ví dụ data_node1.json")
+    parser.add_argument("--verify", action="store_true", help="Đọc lại và kiểm tra checksum sau khi ghi")
+    args = parser.parse_args()
+
+    failed = False
+    for json_path in args.json_files:
+        snapshot_path = os.path.splitext(json_path)[0] + ".snap"
+        node_id = os.path.splitext(os.path.basename(json_path))[0]
+        if node_id.startswith("data_"):
+            node_id = node_id[len("data_"):]
+        try:
+            count = snapshot_format.convert_json_to_snapshot(json_path, snapshot_path, node_id=node_id)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Không chuyển được {json_path}: {e}")
+            failed = True
+            continue
+        if args.verify:
+            reader = snapshot_format.SnapshotReader(snapshot_path, verify_index=True)
+            try:
+                reader.verify()
+            finally:
+                reader.close()
+        print(f"[INFO] {json_path} -> {snapshot_path}: {count} keys.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ndemo.proto\x12\x08keyvalue\"?\n\rPutKeyRequest\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\x12\x12\n\nis_replica\x18\x03 \x01(\x08\"-\n\x0cPutKeyReturn\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0f\n\x07message\x18\x02 \x01(\t\"2\n\x0fTinhTongRequest\x12\t\n\x01\x61\x18\x01 \x01(\x05\x12\t\n\x01\x62\x18\x02 \x01(\x05\x12\t\n\x01\x63\x18\x03 \x01(\t\" \n\x0eKetQuaTinhTong\x12\x0e\n\x06\x61nswer\x18\x01 \x01(\x05\"\x16\n\x07Message\x12\x0b\n\x03msg\x18\x01 \x01(\t\"\x12\n\x03Key\x12\x0b\n\x03key\x18\x01 \x01(\t\"3\n\x10\x44\x65leteKeyRequest\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x12\n\nis_replica\x18\x02 \x01(\x08\"\x16\n\x05Value\x12\r\n\x05value\x18\x01 \x01(\t\"\x14\n\x12HealthCheckRequest\"%\n\x13HealthCheckResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"\x0e\n\x0c\x45mptyRequest\")\n\x14\x46ullSnapshotResponse\x12\x11\n\tdata_json\x18\x01 \x01(\t2\x93\x03\n\x08KeyValue\x12\x41\n\x08TinhTong\x12\x19.keyvalue.TinhTongRequest\x1a\x18.keyvalue.KetQuaTinhTong\"\x00\x12;\n\x06PutKey\x12\x17.keyvalue.PutKeyRequest\x1a\x16.keyvalue.PutKeyReturn\"\x00\x12*\n\x06GetKey\x12\r.keyvalue.Key\x1a\x0f.keyvalue.Value\"\x00\x12<\n\tDeleteKey\x12\x1a.keyvalue.DeleteKeyRequest\x1a\x11.keyvalue.Message\"\x00\x12L\n\x0b\x43heckHealth\x12\x1c.keyvalue.HealthCheckRequest\x1a\x1d.keyvalue.HealthCheckResponse\"\x00\x12O\n\x13RequestFullSnapshot\x12\x16.keyvalue.EmptyRequest\x1a\x1e.keyvalue.FullSnapshotResponse\"\x00\x42\x32\n\x19io.grpc.examples.keyvalueB\rkeyvalueProtoP\x01\xa2\x02\x03RTGb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ndemo.proto\x12\x08keyvalue\"\x94\x01\n\rPutKeyRequest\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c\x12\x12\n\nis_replica\x18\x03 \x01(\x08\x12\x0e\n\x06origin\x18\x04 \x01(\t\x12\x0b\n\x03seq\x18\x05 \x01(\x04\x12\x13\n\x0bttl_seconds\x18\x06 \x01(\x01\x12\x12\n\nexpires_at\x18\x07 \x01(\x01\x12\r\n\x05\x63odec\x18\x08 \x01(\r\";\n\x0cPutKeyReturn\x12\x0c\n\x04\x63ode\x18\x01 \x01(\x05\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0c\n\x04\x61\x63ks\x18\x03 \x01(\x05\"2\n\x0fTinhTongRequest\x12\t\n\x01\x61\x18\x01 \x01(\x05\x12\t\n\x01\x62\x18\x02 \x01(\x05\x12\t\n\x01\x63\x18\x03 \x01(\t\" \n\x0eKetQuaTinhTong\x12\x0e\n\x06\x61nswer\x18\x01 \x01(\x05\"\x16\n\x07Message\x12\x0b\n\x03msg\x18\x01 \x01(\t\"a\n\x03Key\x12\x0b\n\x03key\x18\x01 \x01(\t\x12.\n\x0b\x63onsistency\x18\x02 \x01(\x0e\x32\x19.keyvalue.ReadConsistency\x12\x1d\n\x15max_staleness_seconds\x18\x03 \x01(\x01\"P\n\x10\x44\x65leteKeyRequest\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x12\n\nis_replica\x18\x02 \x01(\x08\x12\x0e\n\x06origin\x18\x03 \x01(\t\x12\x0b\n\x03seq\x18\x04 \x01(\x04\"X\n\x05Value\x12\r\n\x05value\x18\x01 \x01(\x0c\x12\x11\n\tserved_by\x18\x02 \x01(\t\x12\x19\n\x11staleness_seconds\x18\x03 \x01(\x01\x12\x12\n\nexpires_at\x18\x04 \x01(\x01\"\'\n\x12HealthCheckRequest\x12\x11\n\tsender_id\x18\x01 \x01(\t\"\x14\n\x12\x43lusterViewRequest\"L\n\x08NodeInfo\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61\x64\x64ress\x18\x02 \x01(\t\x12\x0e\n\x06status\x18\x03 \x01(\t\x12\x0e\n\x06weight\x18\x04 \x01(\x01\"Y\n\x13\x43lusterViewResponse\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12!\n\x05nodes\x18\x02 \x03(\x0b\x32\x12.keyvalue.NodeInfo\x12\x0e\n\x06vnodes\x18\x03 \x01(\r\"8\n\x13HealthCheckResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x11\n\tlocal_seq\x18\x02 \x01(\x04\"\x0e\n\x0c\x45mptyRequest\")\n\x14\x46ullSnapshotResponse\x12\x11\n\tdata_json\x18\x01 \x01(\t\"I\n\x15SnapshotStreamRequest\x12\x17\n\x0fmax_chunk_bytes\x18\x01 \x01(\x05\x12\x17\n\x0f\x61\x63\x63\x65pt_segments\x18\x02 \x01(\x08\")\n\x0bSegmentPart\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\"\x89\x03\n\rSnapshotChunk\x12\'\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x16.keyvalue.KeyValuePair\x12\x0c\n\x04last\x18\x02 \x01(\x08\x12\x15\n\rtotal_entries\x18\x03 \x01(\x04\x12\x10\n\x08\x63hecksum\x18\x04 \x01(\t\x12>\n\x0c\x61pplied_seqs\x18\x05 \x03(\x0b\x32(.keyvalue.SnapshotChunk.AppliedSeqsEntry\x12\'\n\x08segments\x18\x06 \x03(\x0b\x32\x15.keyvalue.SegmentPart\x12\x35\n\x07\x65xpires\x18\x07 \x03(\x0b\x32$.keyvalue.SnapshotChunk.ExpiresEntry\x12\x14\n\x0craw_segments\x18\x08 \x01(\x08\x1a\x32\n\x10\x41ppliedSeqsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x04:\x02\x38\x01\x1a.\n\x0c\x45xpiresEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01:\x02\x38\x01\"w\n\x08Mutation\x12\x0e\n\x06origin\x18\x01 \x01(\t\x12\x0b\n\x03seq\x18\x02 \x01(\x04\x12\x0b\n\x03key\x18\x03 \x01(\t\x12\r\n\x05value\x18\x04 \x01(\x0c\x12\x0f\n\x07\x64\x65leted\x18\x05 \x01(\x08\x12\x12\n\nexpires_at\x18\x06 \x01(\x01\x12\r\n\x05\x63odec\x18\x07 \x01(\r\"\x89\x01\n\x0e\x43\x61tchUpRequest\x12\x32\n\x05since\x18\x01 \x03(\x0b\x32#.keyvalue.CatchUpRequest.SinceEntry\x12\x15\n\rmax_mutations\x18\x02 \x01(\x05\x1a,\n\nSinceEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x04:\x02\x38\x01\"e\n\x0f\x43\x61tchUpResponse\x12%\n\tmutations\x18\x01 \x03(\x0b\x32\x12.keyvalue.Mutation\x12\x19\n\x11truncated_origins\x18\x02 \x03(\t\x12\x10\n\x08has_more\x18\x03 \x01(\x08\"j\n\x0cKeyValuePair\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c\x12\x12\n\nexpires_at\x18\x03 \x01(\x01\x12\r\n\x05\x63odec\x18\x04 \x01(\r\x12\x0e\n\x06origin\x18\x05 \x01(\t\x12\x0b\n\x03seq\x18\x06 \x01(\x04\"\x84\x01\n\tKeyResult\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x0c\n\x04\x63ode\x18\x02 \x01(\x05\x12\r\n\x05\x66ound\x18\x03 \x01(\x08\x12\r\n\x05value\x18\x04 \x01(\x0c\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\x0c\n\x04\x61\x63ks\x18\x06 \x01(\x05\x12\x12\n\nexpires_at\x18\x07 \x01(\x01\x12\r\n\x05\x63odec\x18\x08 \x01(\r\"?\n\x0fMultiGetRequest\x12\x0c\n\x04keys\x18\x01 \x03(\t\x12\x11\n\tforwarded\x18\x02 \x01(\x08\x12\x0b\n\x03raw\x18\x03 \x01(\x08\"8\n\x10MultiGetResponse\x12$\n\x07results\x18\x01 \x03(\x0b\x32\x13.keyvalue.KeyResult\"\x7f\n\x0fMultiPutRequest\x12\'\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x16.keyvalue.KeyValuePair\x12\x12\n\nis_replica\x18\x02 \x01(\x08\x12\x11\n\tforwarded\x18\x03 \x01(\x08\x12\x0e\n\x06origin\x18\x04 \x01(\t\x12\x0c\n\x04seqs\x18\x05 \x03(\x04\"x\n\x12MultiDeleteRequest\x12\x0c\n\x04keys\x18\x01 \x03(\t\x12\x12\n\nis_replica\x18\x02 \x01(\x08\x12\x11\n\tforwarded\x18\x03 \x01(\x08\x12\x0e\n\x06origin\x18\x04 \x01(\t\x12\x0c\n\x04seqs\x18\x05 \x03(\x04\x12\x0f\n\x07\x65victed\x18\x06 \x01(\x08\":\n\x12MultiWriteResponse\x12$\n\x07results\x18\x01 \x03(\x0b\x32\x13.keyvalue.KeyResult\"\xb2\x01\n\x0bScanRequest\x12\r\n\x05start\x18\x01 \x01(\t\x12\x0b\n\x03\x65nd\x18\x02 \x01(\t\x12\x0e\n\x06prefix\x18\x03 \x01(\t\x12\r\n\x05limit\x18\x04 \x01(\r\x12\x12\n\npage_token\x18\x05 \x01(\t\x12\x11\n\tkeys_only\x18\x06 \x01(\x08\x12.\n\x0b\x63onsistency\x18\x07 \x01(\x0e\x32\x19.keyvalue.ReadConsistency\x12\x11\n\tforwarded\x18\x08 \x01(\x08\"J\n\tScanEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c\x12\x12\n\nexpires_at\x18\x03 \x01(\x01\x12\r\n\x05\x63odec\x18\x04 \x01(\r\"J\n\tScanChunk\x12$\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x13.keyvalue.ScanEntry\x12\x17\n\x0fnext_page_token\x18\x02 \x01(\t\"\xaf\x01\n\x0cWatchRequest\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x0e\n\x06prefix\x18\x02 \x01(\t\x12\x30\n\x05since\x18\x03 \x03(\x0b\x32!.keyvalue.WatchRequest.SinceEntry\x12\x11\n\tkeys_only\x18\x04 \x01(\x08\x12\x0f\n\x07origins\x18\x05 \x03(\t\x1a,\n\nSinceEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x04:\x02\x38\x01\"\x9f\x01\n\nWatchEvent\x12\'\n\x04type\x18\x01 \x01(\x0e\x32\x19.keyvalue.WatchEvent.Type\x12\x0b\n\x03key\x18\x02 \x01(\t\x12\r\n\x05value\x18\x03 \x01(\x0c\x12\x12\n\nexpires_at\x18\x04 \x01(\x01\x12\x0e\n\x06origin\x18\x05 \x01(\t\x12\x0b\n\x03seq\x18\x06 \x01(\x04\"\x1b\n\x04Type\x12\x07\n\x03PUT\x10\x00\x12\n\n\x06\x44\x45LETE\x10\x01\"\xa2\x01\n\rWatchResponse\x12$\n\x06\x65vents\x18\x01 \x03(\x0b\x32\x14.keyvalue.WatchEvent\x12\x39\n\tpositions\x18\x02 \x03(\x0b\x32&.keyvalue.WatchResponse.PositionsEntry\x1a\x30\n\x0ePositionsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x04:\x02\x38\x01\"4\n\x12MerkleNodesRequest\x12\r\n\x05\x64\x65pth\x18\x01 \x01(\r\x12\x0f\n\x07indices\x18\x02 \x03(\x04\"%\n\x13MerkleNodesResponse\x12\x0e\n\x06hashes\x18\x01 \x03(\x0c\"(\n\tKeyDigest\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x0e\n\x06\x64igest\x18\x02 \x01(\x0c\"<\n\x14MerkleLeavesResponse\x12$\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x13.keyvalue.KeyDigest\"v\n\x0bRepairEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x0c\x12\x0f\n\x07\x64\x65leted\x18\x03 \x01(\x08\x12\x17\n\x0f\x65xpected_digest\x18\x04 \x01(\x0c\x12\x12\n\nexpires_at\x18\x05 \x01(\x01\x12\r\n\x05\x63odec\x18\x06 \x01(\r\"7\n\rRepairRequest\x12&\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x15.keyvalue.RepairEntry\"2\n\x0eRepairResponse\x12\x0f\n\x07\x61pplied\x18\x01 \x01(\r\x12\x0f\n\x07skipped\x18\x02 \x01(\r\"\x0e\n\x0cStatsRequest\"\xf8\x01\n\x0cLatencyStats\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x32\n\x06labels\x18\x02 \x03(\x0b\x32\".keyvalue.LatencyStats.LabelsEntry\x12\r\n\x05\x63ount\x18\x03 \x01(\x04\x12\x13\n\x0bsum_seconds\x18\x04 \x01(\x01\x12\x13\n\x0bmax_seconds\x18\x05 \x01(\x01\x12\x13\n\x0bp50_seconds\x18\x06 \x01(\x01\x12\x13\n\x0bp99_seconds\x18\x07 \x01(\x01\x12\x14\n\x0cp999_seconds\x18\x08 \x01(\x01\x1a-\n\x0bLabelsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x8c\x01\n\x0bMetricValue\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x31\n\x06labels\x18\x02 \x03(\x0b\x32!.keyvalue.MetricValue.LabelsEntry\x12\r\n\x05value\x18\x03 \x01(\x01\x1a-\n\x0bLabelsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x9c\x01\n\rStatsResponse\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12*\n\nhistograms\x18\x02 \x03(\x0b\x32\x16.keyvalue.LatencyStats\x12\'\n\x08\x63ounters\x18\x03 \x03(\x0b\x32\x15.keyvalue.MetricValue\x12%\n\x06gauges\x18\x04 \x03(\x0b\x32\x15.keyvalue.MetricValue\"\"\n\rResyncRequest\x12\x11\n\tsource_id\x18\x01 \x01(\t\"\"\n\x0eResyncResponse\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x01 \x01(\x08\"E\n\x0bGossipEntry\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x12\n\ngeneration\x18\x02 \x01(\x04\x12\x11\n\theartbeat\x18\x03 \x01(\x04\"]\n\rGossipMessage\x12\x11\n\tsender_id\x18\x01 \x01(\t\x12\x11\n\tlocal_seq\x18\x02 \x01(\x04\x12&\n\x07\x65ntries\x18\x03 \x03(\x0b\x32\x15.keyvalue.GossipEntry*M\n\x0fReadConsistency\x12\x10\n\x0cREAD_PRIMARY\x10\x00\x12\x0c\n\x08READ_ANY\x10\x01\x12\x1a\n\x16READ_BOUNDED_STALENESS\x10\x02\x32\xd8\n\n\x08KeyValue\x12\x41\n\x08TinhTong\x12\x19.keyvalue.TinhTongRequest\x1a\x18.keyvalue.KetQuaTinhTong\"\x00\x12;\n\x06PutKey\x12\x17.keyvalue.PutKeyRequest\x1a\x16.keyvalue.PutKeyReturn\"\x00\x12*\n\x06GetKey\x12\r.keyvalue.Key\x1a\x0f.keyvalue.Value\"\x00\x12<\n\tDeleteKey\x12\x1a.keyvalue.DeleteKeyRequest\x1a\x11.keyvalue.Message\"\x00\x12L\n\x0b\x43heckHealth\x12\x1c.keyvalue.HealthCheckRequest\x1a\x1d.keyvalue.HealthCheckResponse\"\x00\x12L\n\x0b\x43lusterView\x12\x1c.keyvalue.ClusterViewRequest\x1a\x1d.keyvalue.ClusterViewResponse\"\x00\x12:\n\x05Stats\x12\x16.keyvalue.StatsRequest\x1a\x17.keyvalue.StatsResponse\"\x00\x12=\n\x06Resync\x12\x17.keyvalue.ResyncRequest\x1a\x18.keyvalue.ResyncResponse\"\x00\x12<\n\x06Gossip\x12\x17.keyvalue.GossipMessage\x1a\x17.keyvalue.GossipMessage\"\x00\x12O\n\x13RequestFullSnapshot\x12\x16.keyvalue.EmptyRequest\x1a\x1e.keyvalue.FullSnapshotResponse\"\x00\x12N\n\x0eStreamSnapshot\x12\x1f.keyvalue.SnapshotStreamRequest\x1a\x17.keyvalue.SnapshotChunk\"\x00\x30\x01\x12@\n\x07\x43\x61tchUp\x12\x18.keyvalue.CatchUpRequest\x1a\x19.keyvalue.CatchUpResponse\"\x00\x12\x43\n\x08MultiGet\x12\x19.keyvalue.MultiGetRequest\x1a\x1a.keyvalue.MultiGetResponse\"\x00\x12\x45\n\x08MultiPut\x12\x19.keyvalue.MultiPutRequest\x1a\x1c.keyvalue.MultiWriteResponse\"\x00\x12K\n\x0bMultiDelete\x12\x1c.keyvalue.MultiDeleteRequest\x1a\x1c.keyvalue.MultiWriteResponse\"\x00\x12\x36\n\x04Scan\x12\x15.keyvalue.ScanRequest\x1a\x13.keyvalue.ScanChunk\"\x00\x30\x01\x12<\n\x05Watch\x12\x16.keyvalue.WatchRequest\x1a\x17.keyvalue.WatchResponse\"\x00\x30\x01\x12L\n\x0bMerkleNodes\x12\x1c.keyvalue.MerkleNodesRequest\x1a\x1d.keyvalue.MerkleNodesResponse\"\x00\x12N\n\x0cMerkleLeaves\x12\x1c.keyvalue.MerkleNodesRequest\x1a\x1e.keyvalue.MerkleLeavesResponse\"\x00\x12=\n\x06Repair\x12\x17.keyvalue.RepairRequest\x1a\x18.keyvalue.RepairResponse\"\x00\x42\x32\n\x19io.grpc.examples.keyvalueB\rkeyvalueProtoP\x01\xa2\x02\x03RTGb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -32,30 +32,136 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'demo_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._loaded_options = None
   _globals['DESCRIPTOR']._serialized_options = b'\n\031io.grpc.examples.keyvalueB\rkeyvalueProtoP\001\242\002\003RTG'
-  _globals['_PUTKEYREQUEST']._serialized_start=24
-  _globals['_PUTKEYREQUEST']._serialized_end=87
-  _globals['_PUTKEYRETURN']._serialized_start=89
-  _globals['_PUTKEYRETURN']._serialized_end=134
-  _globals['_TINHTONGREQUEST']._serialized_start=136
-  _globals['_TINHTONGREQUEST']._serialized_end=186
-  _globals['_KETQUATINHTONG']._serialized_start=188
-  _globals['_KETQUATINHTONG']._serialized_end=220
-  _globals['_MESSAGE']._serialized_start=222
-  _globals['_MESSAGE']._serialized_end=244
-  _globals['_KEY']._serialized_start=246
-  _globals['_KEY']._serialized_end=264
-  _globals['_DELETEKEYREQUEST']._serialized_start=266
-  _globals['_DELETEKEYREQUEST']._serialized_end=317
-  _globals['_VALUE']._serialized_start=319
-  _globals['_VALUE']._serialized_end=341
-  _globals['_HEALTHCHECKREQUEST']._serialized_start=343
-  _globals['_HEALTHCHECKREQUEST']._serialized_end=363
-  _globals['_HEALTHCHECKRESPONSE']._serialized_start=365
-  _globals['_HEALTHCHECKRESPONSE']._serialized_end=402
-  _globals['_EMPTYREQUEST']._serialized_start=404
-  _globals['_EMPTYREQUEST']._serialized_end=418
-  _globals['_FULLSNAPSHOTRESPONSE']._serialized_start=420
-  _globals['_FULLSNAPSHOTRESPONSE']._serialized_end=461
-  _globals['_KEYVALUE']._serialized_start=464
-  _globals['_KEYVALUE']._serialized_end=867
+  _globals['_SNAPSHOTCHUNK_APPLIEDSEQSENTRY']._loaded_options = None
+  _globals['_SNAPSHOTCHUNK_APPLIEDSEQSENTRY']._serialized_options = b'8\001'
+  _globals['_SNAPSHOTCHUNK_EXPIRESENTRY']._loaded_options = None
+  _globals['_SNAPSHOTCHUNK_EXPIRESENTRY']._serialized_options = b'8\001'
+  _globals['_CATCHUPREQUEST_SINCEENTRY']._loaded_options = None
+  _globals['_CATCHUPREQUEST_SINCEENTRY']._serialized_options = b'8\001'
+  _globals['_WATCHREQUEST_SINCEENTRY']._loaded_options = None
+  _globals['_WATCHREQUEST_SINCEENTRY']._serialized_options = b'8\001'
+  _globals['_WATCHRESPONSE_POSITIONSENTRY']._loaded_options = None
+  _globals['_WATCHRESPONSE_POSITIONSENTRY']._serialized_options = b'8\001'
+  _globals['_LATENCYSTATS_LABELSENTRY']._loaded_options = None
+  _globals['_LATENCYSTATS_LABELSENTRY']._serialized_options = b'8\001'
+  _globals['_METRICVALUE_LABELSENTRY']._loaded_options = None
+  _globals['_METRICVALUE_LABELSENTRY']._serialized_options = b'8\001'
+  _globals['_READCONSISTENCY']._serialized_start=4592
+  _globals['_READCONSISTENCY']._serialized_end=4669
+  _globals['_PUTKEYREQUEST']._serialized_start=25
+  _globals['_PUTKEYREQUEST']._serialized_end=173
+  _globals['_PUTKEYRETURN']._serialized_start=175
+  _globals['_PUTKEYRETURN']._serialized_end=234
+  _globals['_TINHTONGREQUEST']._serialized_start=236
+  _globals['_TINHTONGREQUEST']._serialized_end=286
+  _globals['_KETQUATINHTONG']._serialized_start=288
+  _globals['_KETQUATINHTONG']._serialized_end=320
+  _globals['_MESSAGE']._serialized_start=322
+  _globals['_MESSAGE']._serialized_end=344
+  _globals['_KEY']._serialized_start=346
+  _globals['_KEY']._serialized_end=443
+  _globals['_DELETEKEYREQUEST']._serialized_start=445
+  _globals['_DELETEKEYREQUEST']._serialized_end=525
+  _globals['_VALUE']._serialized_start=527
+  _globals['_VALUE']._serialized_end=615
+  _globals['_HEALTHCHECKREQUEST']._serialized_start=617
+  _globals['_HEALTHCHECKREQUEST']._serialized_end=656
+  _globals['_CLUSTERVIEWREQUEST']._serialized_start=658
+  _globals['_CLUSTERVIEWREQUEST']._serialized_end=678
+  _globals['_NODEINFO']._serialized_start=680
+  _globals['_NODEINFO']._serialized_end=756
+  _globals['_CLUSTERVIEWRESPONSE']._serialized_start=758
+  _globals['_CLUSTERVIEWRESPONSE']._serialized_end=847
+  _globals['_HEALTHCHECKRESPONSE']._serialized_start=849
+  _globals['_HEALTHCHECKRESPONSE']._serialized_end=905
+  _globals['_EMPTYREQUEST']._serialized_start=907
+  _globals['_EMPTYREQUEST']._serialized_end=921
+  _globals['_FULLSNAPSHOTRESPONSE']._serialized_start=923
+  _globals['_FULLSNAPSHOTRESPONSE']._serialized_end=964
+  _globals['_SNAPSHOTSTREAMREQUEST']._serialized_start=966
+  _globals['_SNAPSHOTSTREAMREQUEST']._serialized_end=1039
+  _globals['_SEGMENTPART']._serialized_start=1041
+  _globals['_SEGMENTPART']._serialized_end=1082
+  _globals['_SNAPSHOTCHUNK']._serialized_start=1085
+  _globals['_SNAPSHOTCHUNK']._serialized_end=1478
+  _globals['_SNAPSHOTCHUNK_APPLIEDSEQSENTRY']._serialized_start=1380
+  _globals['_SNAPSHOTCHUNK_APPLIEDSEQSENTRY']._serialized_end=1430
+  _globals['_SNAPSHOTCHUNK_EXPIRESENTRY']._serialized_start=1432
+  _globals['_SNAPSHOTCHUNK_EXPIRESENTRY']._serialized_end=1478
+  _globals['_MUTATION']._serialized_start=1480
+  _globals['_MUTATION']._serialized_end=1599
+  _globals['_CATCHUPREQUEST']._serialized_start=1602
+  _globals['_CATCHUPREQUEST']._serialized_end=1739
+  _globals['_CATCHUPREQUEST_SINCEENTRY']._serialized_start=1695
+  _globals['_CATCHUPREQUEST_SINCEENTRY']._serialized_end=1739
+  _globals['_CATCHUPRESPONSE']._serialized_start=1741
+  _globals['_CATCHUPRESPONSE']._serialized_end=1842
+  _globals['_KEYVALUEPAIR']._serialized_start=1844
+  _globals['_KEYVALUEPAIR']._serialized_end=1950
+  _globals['_KEYRESULT']._serialized_start=1953
+  _globals['_KEYRESULT']._serialized_end=2085
+  _globals['_MULTIGETREQUEST']._serialized_start=2087
+  _globals['_MULTIGETREQUEST']._serialized_end=2150
+  _globals['_MULTIGETRESPONSE']._serialized_start=2152
+  _globals['_MULTIGETRESPONSE']._serialized_end=2208
+  _globals['_MULTIPUTREQUEST']._serialized_start=2210
+  _globals['_MULTIPUTREQUEST']._serialized_end=2337
+  _globals['_MULTIDELETEREQUEST']._serialized_start=2339
+  _globals['_MULTIDELETEREQUEST']._serialized_end=2459
+  _globals['_MULTIWRITERESPONSE']._serialized_start=2461
+  _globals['_MULTIWRITERESPONSE']._serialized_end=2519
+  _globals['_SCANREQUEST']._serialized_start=2522
+  _globals['_SCANREQUEST']._serialized_end=2700
+  _globals['_SCANENTRY']._serialized_start=2702
+  _globals['_SCANENTRY']._serialized_end=2776
+  _globals['_SCANCHUNK']._serialized_start=2778
+  _globals['_SCANCHUNK']._serialized_end=2852
+  _globals['_WATCHREQUEST']._serialized_start=2855
+  _globals['_WATCHREQUEST']._serialized_end=3030
+  _globals['_WATCHREQUEST_SINCEENTRY']._serialized_start=1695
+  _globals['_WATCHREQUEST_SINCEENTRY']._serialized_end=1739
+  _globals['_WATCHEVENT']._serialized_start=3033
+  _globals['_WATCHEVENT']._serialized_end=3192
+  _globals['_WATCHEVENT_TYPE']._serialized_start=3165
+  _globals['_WATCHEVENT_TYPE']._serialized_end=3192
+  _globals['_WATCHRESPONSE']._serialized_start=3195
+  _globals['_WATCHRESPONSE']._serialized_end=3357
+  _globals['_WATCHRESPONSE_POSITIONSENTRY']._serialized_start=3309
+  _globals['_WATCHRESPONSE_POSITIONSENTRY']._serialized_end=3357
+  _globals['_MERKLENODESREQUEST']._serialized_start=3359
+  _globals['_MERKLENODESREQUEST']._serialized_end=3411
+  _globals['_MERKLENODESRESPONSE']._serialized_start=3413
+  _globals['_MERKLENODESRESPONSE']._serialized_end=3450
+  _globals['_KEYDIGEST']._serialized_start=3452
+  _globals['_KEYDIGEST']._serialized_end=3492
+  _globals['_MERKLELEAVESRESPONSE']._serialized_start=3494
+  _globals['_MERKLELEAVESRESPONSE']._serialized_end=3554
+  _globals['_REPAIRENTRY']._serialized_start=3556
+  _globals['_REPAIRENTRY']._serialized_end=3674
+  _globals['_REPAIRREQUEST']._serialized_start=3676
+  _globals['_REPAIRREQUEST']._serialized_end=3731
+  _globals['_REPAIRRESPONSE']._serialized_start=3733
+  _globals['_REPAIRRESPONSE']._serialized_end=3783
+  _globals['_STATSREQUEST']._serialized_start=3785
+  _globals['_STATSREQUEST']._serialized_end=3799
+  _globals['_LATENCYSTATS']._serialized_start=3802
+  _globals['_LATENCYSTATS']._serialized_end=4050
+  _globals['_LATENCYSTATS_LABELSENTRY']._serialized_start=4005
+  _globals['_LATENCYSTATS_LABELSENTRY']._serialized_end=4050
+  _globals['_METRICVALUE']._serialized_start=4053
+  _globals['_METRICVALUE']._serialized_end=4193
+  _globals['_METRICVALUE_LABELSENTRY']._serialized_start=4005
+  _globals['_METRICVALUE_LABELSENTRY']._serialized_end=4050
+  _globals['_STATSRESPONSE']._serialized_start=4196
+  _globals['_STATSRESPONSE']._serialized_end=4352
+  _globals['_RESYNCREQUEST']._serialized_start=4354
+  _globals['_RESYNCREQUEST']._serialized_end=4388
+  _globals['_RESYNCRESPONSE']._serialized_start=4390
+  _globals['_RESYNCRESPONSE']._serialized_end=4424
+  _globals['_GOSSIPENTRY']._serialized_start=4426
+  _globals['_GOSSIPENTRY']._serialized_end=4495
+  _globals['_GOSSIPMESSAGE']._serialized_start=4497
+  _globals['_GOSSIPMESSAGE']._serialized_end=4590
+  _globals['_KEYVALUE']._serialized_start=4672
+  _globals['_KEYVALUE']._serialized_end=6040
 # @@protoc_insertion_point(module_scope)
@@ -1,24 +1,49 @@
+from google.protobuf.internal import containers as _containers
+from google.protobuf.internal import enum_type_wrapper as _enum_type_wrapper
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
-from typing import ClassVar as _ClassVar, Optional as _Optional
+from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
+class ReadConsistency(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    READ_PRIMARY: _ClassVar[ReadConsistency]
+    READ_ANY: _ClassVar[ReadConsistency]
+    READ_BOUNDED_STALENESS: _ClassVar[ReadConsistency]
+READ_PRIMARY: ReadConsistency
+READ_ANY: ReadConsistency
+READ_BOUNDED_STALENESS: ReadConsistency
+
 class PutKeyRequest(_message.Message):
-    __slots__ = ("key", "value")
+    __slots__ = ("key", "value", "is_replica", "origin", "seq", "ttl_seconds", "expires_at", "codec")
     KEY_FIELD_NUMBER: _ClassVar[int]
     VALUE_FIELD_NUMBER: _ClassVar[int]
+    IS_REPLICA_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQ_FIELD_NUMBER: _ClassVar[int]
+    TTL_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    CODEC_FIELD_NUMBER: _ClassVar[int]
     key: str
-    value: str
-    def __init__(self, key: _Optional[str] = ..., value: _Optional[str] = ...) -> None: ...
+    value: bytes
+    is_replica: bool
+    origin: str
+    seq: int
+    ttl_seconds: float
+    expires_at: float
+    codec: int
+    def __init__(self, key: _Optional[str] = ..., value: _Optional[bytes] = ..., is_replica: bool = ..., origin: _Optional[str] = ..., seq: _Optional[int] = ..., ttl_seconds: _Optional[float] = ..., expires_at: _Optional[float] = ..., codec: _Optional[int] = ...) -> None: ...
 
 class PutKeyReturn(_message.Message):
-    __slots__ = ("code", "message")
+    __slots__ = ("code", "message", "acks")
     CODE_FIELD_NUMBER: _ClassVar[int]
     MESSAGE_FIELD_NUMBER: _ClassVar[int]
+    ACKS_FIELD_NUMBER: _ClassVar[int]
     code: int
     message: str
-    def __init__(self, code: _Optional[int] = ..., message: _Optional[str] = ...) -> None: ...
+    acks: int
+    def __init__(self, code: _Optional[int] = ..., message: _Optional[str] = ..., acks: _Optional[int] = ...) -> None: ...
 
 class TinhTongRequest(_message.Message):
     __slots__ = ("a", "b", "c")
@@ -43,13 +68,514 @@ class Message(_message.Message):
     def __init__(self, msg: _Optional[str] = ...) -> None: ...
 
 class Key(_message.Message):
-    __slots__ = ("key",)
+    __slots__ = ("key", "consistency", "max_staleness_seconds")
     KEY_FIELD_NUMBER: _ClassVar[int]
+    CONSISTENCY_FIELD_NUMBER: _ClassVar[int]
+    MAX_STALENESS_SECONDS_FIELD_NUMBER: _ClassVar[int]
     key: str
-    def __init__(self, key: _Optional[str] = ...) -> None: ...
+    consistency: ReadConsistency
+    max_staleness_seconds: float
+    def __init__(self, key: _Optional[str] = ..., consistency: _Optional[_Union[ReadConsistency, str]] = ..., max_staleness_seconds: _Optional[float] = ...) -> None: ...
+
+class DeleteKeyRequest(_message.Message):
+    __slots__ = ("key", "is_replica", "origin", "seq")
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    IS_REPLICA_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQ_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    is_replica: bool
+    origin: str
+    seq: int
+    def __init__(self, key: _Optional[str] = ..., is_replica: bool = ..., origin: _Optional[str] = ..., seq: _Optional[int] = ...) -> None: ...
 
 class Value(_message.Message):
-    __slots__ = ("value",)
+    __slots__ = ("value", "served_by", "staleness_seconds", "expires_at")
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    SERVED_BY_FIELD_NUMBER: _ClassVar[int]
+    STALENESS_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    value: bytes
+    served_by: str
+    staleness_seconds: float
+    expires_at: float
+    def __init__(self, value: _Optional[bytes] = ..., served_by: _Optional[str] = ..., staleness_seconds: _Optional[float] = ..., expires_at: _Optional[float] = ...) -> None: ...
+
+class HealthCheckRequest(_message.Message):
+    __slots__ = ("sender_id",)
+    SENDER_ID_FIELD_NUMBER: _ClassVar[int]
+    sender_id: str
+    def __init__(self, sender_id: _Optional[str] = ...) -> None: ...
+
+class ClusterViewRequest(_message.Message):
+    __slots__ = ()
+    def __init__(self) -> None: ...
+
+class NodeInfo(_message.Message):
+    __slots__ = ("node_id", "address", "status", "weight")
+    NODE_ID_FIELD_NUMBER: _ClassVar[int]
+    ADDRESS_FIELD_NUMBER: _ClassVar[int]
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    WEIGHT_FIELD_NUMBER: _ClassVar[int]
+    node_id: str
+    address: str
+    status: str
+    weight: float
+    def __init__(self, node_id: _Optional[str] = ..., address: _Optional[str] = ..., status: _Optional[str] = ..., weight: _Optional[float] = ...) -> None: ...
+
+class ClusterViewResponse(_message.Message):
+    __slots__ = ("node_id", "nodes", "vnodes")
+    NODE_ID_FIELD_NUMBER: _ClassVar[int]
+    NODES_FIELD_NUMBER: _ClassVar[int]
+    VNODES_FIELD_NUMBER: _ClassVar[int]
+    node_id: str
+    nodes: _containers.RepeatedCompositeFieldContainer[NodeInfo]
+    vnodes: int
+    def __init__(self, node_id: _Optional[str] = ..., nodes: _Optional[_Iterable[_Union[NodeInfo, _Mapping]]] = ..., vnodes: _Optional[int] = ...) -> None: ...
+
+class HealthCheckResponse(_message.Message):
+    __slots__ = ("status", "local_seq")
+    STATUS_FIELD_NUMBER: _ClassVar[int]
+    LOCAL_SEQ_FIELD_NUMBER: _ClassVar[int]
+    status: str
+    local_seq: int
+    def __init__(self, status: _Optional[str] = ..., local_seq: _Optional[int] = ...) -> None: ...
+
+class EmptyRequest(_message.Message):
+    __slots__ = ()
+    def __init__(self) -> None: ...
+
+class FullSnapshotResponse(_message.Message):
+    __slots__ = ("data_json",)
+    DATA_JSON_FIELD_NUMBER: _ClassVar[int]
+    data_json: str
+    def __init__(self, data_json: _Optional[str] = ...) -> None: ...
+
+class SnapshotStreamRequest(_message.Message):
+    __slots__ = ("max_chunk_bytes", "accept_segments")
+    MAX_CHUNK_BYTES_FIELD_NUMBER: _ClassVar[int]
+    ACCEPT_SEGMENTS_FIELD_NUMBER: _ClassVar[int]
+    max_chunk_bytes: int
+    accept_segments: bool
+    def __init__(self, max_chunk_bytes: _Optional[int] = ..., accept_segments: bool = ...) -> None: ...
+
+class SegmentPart(_message.Message):
+    __slots__ = ("name", "data")
+    NAME_FIELD_NUMBER: _ClassVar[int]
+    DATA_FIELD_NUMBER: _ClassVar[int]
+    name: str
+    data: bytes
+    def __init__(self, name: _Optional[str] = ..., data: _Optional[bytes] = ...) -> None: ...
+
+class SnapshotChunk(_message.Message):
+    __slots__ = ("entries", "last", "total_entries", "checksum", "applied_seqs", "segments", "expires", "raw_segments")
+    class AppliedSeqsEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: int
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[int] = ...) -> None: ...
+    class ExpiresEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: float
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[float] = ...) -> None: ...
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    LAST_FIELD_NUMBER: _ClassVar[int]
+    TOTAL_ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    CHECKSUM_FIELD_NUMBER: _ClassVar[int]
+    APPLIED_SEQS_FIELD_NUMBER: _ClassVar[int]
+    SEGMENTS_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_FIELD_NUMBER: _ClassVar[int]
+    RAW_SEGMENTS_FIELD_NUMBER: _ClassVar[int]
+    entries: _containers.RepeatedCompositeFieldContainer[KeyValuePair]
+    last: bool
+    total_entries: int
+    checksum: str
+    applied_seqs: _containers.ScalarMap[str, int]
+    segments: _containers.RepeatedCompositeFieldContainer[SegmentPart]
+    expires: _containers.ScalarMap[str, float]
+    raw_segments: bool
+    def __init__(self, entries: _Optional[_Iterable[_Union[KeyValuePair, _Mapping]]] = ..., last: bool = ..., total_entries: _Optional[int] = ..., checksum: _Optional[str] = ..., applied_seqs: _Optional[_Mapping[str, int]] = ..., segments: _Optional[_Iterable[_Union[SegmentPart, _Mapping]]] = ..., expires: _Optional[_Mapping[str, float]] = ..., raw_segments: bool = ...) -> None: ...
+
+class Mutation(_message.Message):
+    __slots__ = ("origin", "seq", "key", "value", "deleted", "expires_at", "codec")
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQ_FIELD_NUMBER: _ClassVar[int]
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    DELETED_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    CODEC_FIELD_NUMBER: _ClassVar[int]
+    origin: str
+    seq: int
+    key: str
+    value: bytes
+    deleted: bool
+    expires_at: float
+    codec: int
+    def __init__(self, origin: _Optional[str] = ..., seq: _Optional[int] = ..., key: _Optional[str] = ..., value: _Optional[bytes] = ..., deleted: bool = ..., expires_at: _Optional[float] = ..., codec: _Optional[int] = ...) -> None: ...
+
+class CatchUpRequest(_message.Message):
+    __slots__ = ("since", "max_mutations")
+    class SinceEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: int
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[int] = ...) -> None: ...
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    MAX_MUTATIONS_FIELD_NUMBER: _ClassVar[int]
+    since: _containers.ScalarMap[str, int]
+    max_mutations: int
+    def __init__(self, since: _Optional[_Mapping[str, int]] = ..., max_mutations: _Optional[int] = ...) -> None: ...
+
+class CatchUpResponse(_message.Message):
+    __slots__ = ("mutations", "truncated_origins", "has_more")
+    MUTATIONS_FIELD_NUMBER: _ClassVar[int]
+    TRUNCATED_ORIGINS_FIELD_NUMBER: _ClassVar[int]
+    HAS_MORE_FIELD_NUMBER: _ClassVar[int]
+    mutations: _containers.RepeatedCompositeFieldContainer[Mutation]
+    truncated_origins: _containers.RepeatedScalarFieldContainer[str]
+    has_more: bool
+    def __init__(self, mutations: _Optional[_Iterable[_Union[Mutation, _Mapping]]] = ..., truncated_origins: _Optional[_Iterable[str]] = ..., has_more: bool = ...) -> None: ...
+
+class KeyValuePair(_message.Message):
+    __slots__ = ("key", "value", "expires_at", "codec", "origin", "seq")
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    CODEC_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQ_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    value: bytes
+    expires_at: float
+    codec: int
+    origin: str
+    seq: int
+    def __init__(self, key: _Optional[str] = ..., value: _Optional[bytes] = ..., expires_at: _Optional[float] = ..., codec: _Optional[int] = ..., origin: _Optional[str] = ..., seq: _Optional[int] = ...) -> None: ...
+
+class KeyResult(_message.Message):
+    __slots__ = ("key", "code", "found", "value", "error", "acks", "expires_at", "codec")
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    CODE_FIELD_NUMBER: _ClassVar[int]
+    FOUND_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    ERROR_FIELD_NUMBER: _ClassVar[int]
+    ACKS_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    CODEC_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    code: int
+    found: bool
+    value: bytes
+    error: str
+    acks: int
+    expires_at: float
+    codec: int
+    def __init__(self, key: _Optional[str] = ..., code: _Optional[int] = ..., found: bool = ..., value: _Optional[bytes] = ..., error: _Optional[str] = ..., acks: _Optional[int] = ..., expires_at: _Optional[float] = ..., codec: _Optional[int] = ...) -> None: ...
+
+class MultiGetRequest(_message.Message):
+    __slots__ = ("keys", "forwarded", "raw")
+    KEYS_FIELD_NUMBER: _ClassVar[int]
+    FORWARDED_FIELD_NUMBER: _ClassVar[int]
+    RAW_FIELD_NUMBER: _ClassVar[int]
+    keys: _containers.RepeatedScalarFieldContainer[str]
+    forwarded: bool
+    raw: bool
+    def __init__(self, keys: _Optional[_Iterable[str]] = ..., forwarded: bool = ..., raw: bool = ...) -> None: ...
+
+class MultiGetResponse(_message.Message):
+    __slots__ = ("results",)
+    RESULTS_FIELD_NUMBER: _ClassVar[int]
+    results: _containers.RepeatedCompositeFieldContainer[KeyResult]
+    def __init__(self, results: _Optional[_Iterable[_Union[KeyResult, _Mapping]]] = ...) -> None: ...
+
+class MultiPutRequest(_message.Message):
+    __slots__ = ("entries", "is_replica", "forwarded", "origin", "seqs")
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    IS_REPLICA_FIELD_NUMBER: _ClassVar[int]
+    FORWARDED_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQS_FIELD_NUMBER: _ClassVar[int]
+    entries: _containers.RepeatedCompositeFieldContainer[KeyValuePair]
+    is_replica: bool
+    forwarded: bool
+    origin: str
+    seqs: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, entries: _Optional[_Iterable[_Union[KeyValuePair, _Mapping]]] = ..., is_replica: bool = ..., forwarded: bool = ..., origin: _Optional[str] = ..., seqs: _Optional[_Iterable[int]] = ...) -> None: ...
+
+class MultiDeleteRequest(_message.Message):
+    __slots__ = ("keys", "is_replica", "forwarded", "origin", "seqs", "evicted")
+    KEYS_FIELD_NUMBER: _ClassVar[int]
+    IS_REPLICA_FIELD_NUMBER: _ClassVar[int]
+    FORWARDED_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQS_FIELD_NUMBER: _ClassVar[int]
+    EVICTED_FIELD_NUMBER: _ClassVar[int]
+    keys: _containers.RepeatedScalarFieldContainer[str]
+    is_replica: bool
+    forwarded: bool
+    origin: str
+    seqs: _containers.RepeatedScalarFieldContainer[int]
+    evicted: bool
+    def __init__(self, keys: _Optional[_Iterable[str]] = ..., is_replica: bool = ..., forwarded: bool = ..., origin: _Optional[str] = ..., seqs: _Optional[_Iterable[int]] = ..., evicted: bool = ...) -> None: ...
+
+class MultiWriteResponse(_message.Message):
+    __slots__ = ("results",)
+    RESULTS_FIELD_NUMBER: _ClassVar[int]
+    results: _containers.RepeatedCompositeFieldContainer[KeyResult]
+    def __init__(self, results: _Optional[_Iterable[_Union[KeyResult, _Mapping]]] = ...) -> None: ...
+
+class ScanRequest(_message.Message):
+    __slots__ = ("start", "end", "prefix", "limit", "page_token", "keys_only", "consistency", "forwarded")
+    START_FIELD_NUMBER: _ClassVar[int]
+    END_FIELD_NUMBER: _ClassVar[int]
+    PREFIX_FIELD_NUMBER: _ClassVar[int]
+    LIMIT_FIELD_NUMBER: _ClassVar[int]
+    PAGE_TOKEN_FIELD_NUMBER: _ClassVar[int]
+    KEYS_ONLY_FIELD_NUMBER: _ClassVar[int]
+    CONSISTENCY_FIELD_NUMBER: _ClassVar[int]
+    FORWARDED_FIELD_NUMBER: _ClassVar[int]
+    start: str
+    end: str
+    prefix: str
+    limit: int
+    page_token: str
+    keys_only: bool
+    consistency: ReadConsistency
+    forwarded: bool
+    def __init__(self, start: _Optional[str] = ..., end: _Optional[str] = ..., prefix: _Optional[str] = ..., limit: _Optional[int] = ..., page_token: _Optional[str] = ..., keys_only: bool = ..., consistency: _Optional[_Union[ReadConsistency, str]] = ..., forwarded: bool = ...) -> None: ...
+
+class ScanEntry(_message.Message):
+    __slots__ = ("key", "value", "expires_at", "codec")
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    CODEC_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    value: bytes
+    expires_at: float
+    codec: int
+    def __init__(self, key: _Optional[str] = ..., value: _Optional[bytes] = ..., expires_at: _Optional[float] = ..., codec: _Optional[int] = ...) -> None: ...
+
+class ScanChunk(_message.Message):
+    __slots__ = ("entries", "next_page_token")
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    NEXT_PAGE_TOKEN_FIELD_NUMBER: _ClassVar[int]
+    entries: _containers.RepeatedCompositeFieldContainer[ScanEntry]
+    next_page_token: str
+    def __init__(self, entries: _Optional[_Iterable[_Union[ScanEntry, _Mapping]]] = ..., next_page_token: _Optional[str] = ...) -> None: ...
+
+class WatchRequest(_message.Message):
+    __slots__ = ("key", "prefix", "since", "keys_only", "origins")
+    class SinceEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: int
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[int] = ...) -> None: ...
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    PREFIX_FIELD_NUMBER: _ClassVar[int]
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    KEYS_ONLY_FIELD_NUMBER: _ClassVar[int]
+    ORIGINS_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    prefix: str
+    since: _containers.ScalarMap[str, int]
+    keys_only: bool
+    origins: _containers.RepeatedScalarFieldContainer[str]
+    def __init__(self, key: _Optional[str] = ..., prefix: _Optional[str] = ..., since: _Optional[_Mapping[str, int]] = ..., keys_only: bool = ..., origins: _Optional[_Iterable[str]] = ...) -> None: ...
+
+class WatchEvent(_message.Message):
+    __slots__ = ("type", "key", "value", "expires_at", "origin", "seq")
+    class Type(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+        __slots__ = ()
+        PUT: _ClassVar[WatchEvent.Type]
+        DELETE: _ClassVar[WatchEvent.Type]
+    PUT: WatchEvent.Type
+    DELETE: WatchEvent.Type
+    TYPE_FIELD_NUMBER: _ClassVar[int]
+    KEY_FIELD_NUMBER: _ClassVar[int]
     VALUE_FIELD_NUMBER: _ClassVar[int]
-    value: str
-    def __init__(self, value: _Optional[str] = ...) -> None: ...
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_FIELD_NUMBER: _ClassVar[int]
+    SEQ_FIELD_NUMBER: _ClassVar[int]
+    type: WatchEvent.Type
+    key: str
+    value: bytes
+    expires_at: float
+    origin: str
+    seq: int
+    def __init__(self, type: _Optional[_Union[WatchEvent.Type, str]] = ..., key: _Optional[str] = ..., value: _Optional[bytes] = ..., expires_at: _Optional[float] = ..., origin: _Optional[str] = ..., seq: _Optional[int] = ...) -> None: ...
+
+class WatchResponse(_message.Message):
+    __slots__ = ("events", "positions")
+    class PositionsEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: int
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[int] = ...) -> None: ...
+    EVENTS_FIELD_NUMBER: _ClassVar[int]
+    POSITIONS_FIELD_NUMBER: _ClassVar[int]
+    events: _containers.RepeatedCompositeFieldContainer[WatchEvent]
+    positions: _containers.ScalarMap[str, int]
+    def __init__(self, events: _Optional[_Iterable[_Union[WatchEvent, _Mapping]]] = ..., positions: _Optional[_Mapping[str, int]] = ...) -> None: ...
+
+class MerkleNodesRequest(_message.Message):
+    __slots__ = ("depth", "indices")
+    DEPTH_FIELD_NUMBER: _ClassVar[int]
+    INDICES_FIELD_NUMBER: _ClassVar[int]
+    depth: int
+    indices: _containers.RepeatedScalarFieldContainer[int]
+    def __init__(self, depth: _Optional[int] = ..., indices: _Optional[_Iterable[int]] = ...) -> None: ...
+
+class MerkleNodesResponse(_message.Message):
+    __slots__ = ("hashes",)
+    HASHES_FIELD_NUMBER: _ClassVar[int]
+    hashes: _containers.RepeatedScalarFieldContainer[bytes]
+    def __init__(self, hashes: _Optional[_Iterable[bytes]] = ...) -> None: ...
+
+class KeyDigest(_message.Message):
+    __slots__ = ("key", "digest")
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    DIGEST_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    digest: bytes
+    def __init__(self, key: _Optional[str] = ..., digest: _Optional[bytes] = ...) -> None: ...
+
+class MerkleLeavesResponse(_message.Message):
+    __slots__ = ("entries",)
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    entries: _containers.RepeatedCompositeFieldContainer[KeyDigest]
+    def __init__(self, entries: _Optional[_Iterable[_Union[KeyDigest, _Mapping]]] = ...) -> None: ...
+
+class RepairEntry(_message.Message):
+    __slots__ = ("key", "value", "deleted", "expected_digest", "expires_at", "codec")
+    KEY_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    DELETED_FIELD_NUMBER: _ClassVar[int]
+    EXPECTED_DIGEST_FIELD_NUMBER: _ClassVar[int]
+    EXPIRES_AT_FIELD_NUMBER: _ClassVar[int]
+    CODEC_FIELD_NUMBER: _ClassVar[int]
+    key: str
+    value: bytes
+    deleted: bool
+    expected_digest: bytes
+    expires_at: float
+    codec: int
+    def __init__(self, key: _Optional[str] = ..., value: _Optional[bytes] = ..., deleted: bool = ..., expected_digest: _Optional[bytes] = ..., expires_at: _Optional[float] = ..., codec: _Optional[int] = ...) -> None: ...
+
+class RepairRequest(_message.Message):
+    __slots__ = ("entries",)
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    entries: _containers.RepeatedCompositeFieldContainer[RepairEntry]
+    def __init__(self, entries: _Optional[_Iterable[_Union[RepairEntry, _Mapping]]] = ...) -> None: ...
+
+class RepairResponse(_message.Message):
+    __slots__ = ("applied", "skipped")
+    APPLIED_FIELD_NUMBER: _ClassVar[int]
+    SKIPPED_FIELD_NUMBER: _ClassVar[int]
+    applied: int
+    skipped: int
+    def __init__(self, applied: _Optional[int] = ..., skipped: _Optional[int] = ...) -> None: ...
+
+class StatsRequest(_message.Message):
+    __slots__ = ()
+    def __init__(self) -> None: ...
+
+class LatencyStats(_message.Message):
+    __slots__ = ("name", "labels", "count", "sum_seconds", "max_seconds", "p50_seconds", "p99_seconds", "p999_seconds")
+    class LabelsEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: str
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[str] = ...) -> None: ...
+    NAME_FIELD_NUMBER: _ClassVar[int]
+    LABELS_FIELD_NUMBER: _ClassVar[int]
+    COUNT_FIELD_NUMBER: _ClassVar[int]
+    SUM_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    MAX_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    P50_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    P99_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    P999_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    name: str
+    labels: _containers.ScalarMap[str, str]
+    count: int
+    sum_seconds: float
+    max_seconds: float
+    p50_seconds: float
+    p99_seconds: float
+    p999_seconds: float
+    def __init__(self, name: _Optional[str] = ..., labels: _Optional[_Mapping[str, str]] = ..., count: _Optional[int] = ..., sum_seconds: _Optional[float] = ..., max_seconds: _Optional[float] = ..., p50_seconds: _Optional[float] = ..., p99_seconds: _Optional[float] = ..., p999_seconds: _Optional[float] = ...) -> None: ...
+
+class MetricValue(_message.Message):
+    __slots__ = ("name", "labels", "value")
+    class LabelsEntry(_message.Message):
+        __slots__ = ("key", "value")
+        KEY_FIELD_NUMBER: _ClassVar[int]
+        VALUE_FIELD_NUMBER: _ClassVar[int]
+        key: str
+        value: str
+        def __init__(self, key: _Optional[str] = ..., value: _Optional[str] = ...) -> None: ...
+    NAME_FIELD_NUMBER: _ClassVar[int]
+    LABELS_FIELD_NUMBER: _ClassVar[int]
+    VALUE_FIELD_NUMBER: _ClassVar[int]
+    name: str
+    labels: _containers.ScalarMap[str, str]
+    value: float
+    def __init__(self, name: _Optional[str] = ..., labels: _Optional[_Mapping[str, str]] = ..., value: _Optional[float] = ...) -> None: ...
+
+class StatsResponse(_message.Message):
+    __slots__ = ("node_id", "histograms", "counters", "gauges")
+    NODE_ID_FIELD_NUMBER: _ClassVar[int]
+    HISTOGRAMS_FIELD_NUMBER: _ClassVar[int]
+    COUNTERS_FIELD_NUMBER: _ClassVar[int]
+    GAUGES_FIELD_NUMBER: _ClassVar[int]
+    node_id: str
+    histograms: _containers.RepeatedCompositeFieldContainer[LatencyStats]
+    counters: _containers.RepeatedCompositeFieldContainer[MetricValue]
+    gauges: _containers.RepeatedCompositeFieldContainer[MetricValue]
+    def __init__(self, node_id: _Optional[str] = ..., histograms: _Optional[_Iterable[_Union[LatencyStats, _Mapping]]] = ..., counters: _Optional[_Iterable[_Union[MetricValue, _Mapping]]] = ..., gauges: _Optional[_Iterable[_Union[MetricValue, _Mapping]]] = ...) -> None: ...
+
+class ResyncRequest(_message.Message):
+    __slots__ = ("source_id",)
+    SOURCE_ID_FIELD_NUMBER: _ClassVar[int]
+    source_id: str
+    def __init__(self, source_id: _Optional[str] = ...) -> None: ...
+
+class ResyncResponse(_message.Message):
+    __slots__ = ("accepted",)
+    ACCEPTED_FIELD_NUMBER: _ClassVar[int]
+    accepted: bool
+    def __init__(self, accepted: bool = ...) -> None: ...
+
+class GossipEntry(_message.Message):
+    __slots__ = ("node_id", "generation", "heartbeat")
+    NODE_ID_FIELD_NUMBER: _ClassVar[int]
+    GENERATION_FIELD_NUMBER: _ClassVar[int]
+    HEARTBEAT_FIELD_NUMBER: _ClassVar[int]
+    node_id: str
+    generation: int
+    heartbeat: int
+    def __init__(self, node_id: _Optional[str] = ..., generation: _Optional[int] = ..., heartbeat: _Optional[int] = ...) -> None: ...
+
+class GossipMessage(_message.Message):
+    __slots__ = ("sender_id", "local_seq", "entries")
+    SENDER_ID_FIELD_NUMBER: _ClassVar[int]
+    LOCAL_SEQ_FIELD_NUMBER: _ClassVar[int]
+    ENTRIES_FIELD_NUMBER: _ClassVar[int]
+    sender_id: str
+    local_seq: int
+    entries: _containers.RepeatedCompositeFieldContainer[GossipEntry]
+    def __init__(self, sender_id: _Optional[str] = ..., local_seq: _Optional[int] = ..., entries: _Optional[_Iterable[_Union[GossipEntry, _Mapping]]] = ...) -> None: ...
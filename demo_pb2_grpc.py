@@ -59,11 +59,81 @@ class KeyValueStub(object):
                 request_serializer=demo__pb2.HealthCheckRequest.SerializeToString,
                 response_deserializer=demo__pb2.HealthCheckResponse.FromString,
                 _registered_method=True)
+        self.ClusterView = channel.unary_unary(
+                '/keyvalue.KeyValue/ClusterView',
+                request_serializer=demo__pb2.ClusterViewRequest.SerializeToString,
+                response_deserializer=demo__pb2.ClusterViewResponse.FromString,
+                _registered_method=True)
+        self.Stats = channel.unary_unary(
+                '/keyvalue.KeyValue/Stats',
+                request_serializer=demo__pb2.StatsRequest.SerializeToString,
+                response_deserializer=demo__pb2.StatsResponse.FromString,
+                _registered_method=True)
+        self.Resync = channel.unary_unary(
+                '/keyvalue.KeyValue/Resync',
+                request_serializer=demo__pb2.ResyncRequest.SerializeToString,
+                response_deserializer=demo__pb2.ResyncResponse.FromString,
+                _registered_method=True)
+        self.Gossip = channel.unary_unary(
+                '/keyvalue.KeyValue/Gossip',
+                request_serializer=demo__pb2.GossipMessage.SerializeToString,
+                response_deserializer=demo__pb2.GossipMessage.FromString,
+                _registered_method=True)
         self.RequestFullSnapshot = channel.unary_unary(
                 '/keyvalue.KeyValue/RequestFullSnapshot',
                 request_serializer=demo__pb2.EmptyRequest.SerializeToString,
                 response_deserializer=demo__pb2.FullSnapshotResponse.FromString,
                 _registered_method=True)
+        self.StreamSnapshot = channel.unary_stream(
+                '/keyvalue.KeyValue/StreamSnapshot',
+                request_serializer=demo__pb2.SnapshotStreamRequest.SerializeToString,
+                response_deserializer=demo__pb2.SnapshotChunk.FromString,
+                _registered_method=True)
+        self.CatchUp = channel.unary_unary(
+                '/keyvalue.KeyValue/CatchUp',
+                request_serializer=demo__pb2.CatchUpRequest.SerializeToString,
+                response_deserializer=demo__pb2.CatchUpResponse.FromString,
+                _registered_method=True)
+        self.MultiGet = channel.unary_unary(
+                '/keyvalue.KeyValue/MultiGet',
+                request_serializer=demo__pb2.MultiGetRequest.SerializeToString,
+                response_deserializer=demo__pb2.MultiGetResponse.FromString,
+                _registered_method=True)
+        self.MultiPut = channel.unary_unary(
+                '/keyvalue.KeyValue/MultiPut',
+                request_serializer=demo__pb2.MultiPutRequest.SerializeToString,
+                response_deserializer=demo__pb2.MultiWriteResponse.FromString,
+                _registered_method=True)
+        self.MultiDelete = channel.unary_unary(
+                '/keyvalue.KeyValue/MultiDelete',
+                request_serializer=demo__pb2.MultiDeleteRequest.SerializeToString,
+                response_deserializer=demo__pb2.MultiWriteResponse.FromString,
+                _registered_method=True)
+        self.Scan = channel.unary_stream(
+                '/keyvalue.KeyValue/Scan',
+                request_serializer=demo__pb2.ScanRequest.SerializeToString,
+                response_deserializer=demo__pb2.ScanChunk.FromString,
+                _registered_method=True)
+        self.Watch = channel.unary_stream(
+                '/keyvalue.KeyValue/Watch',
+                request_serializer=demo__pb2.WatchRequest.SerializeToString,
+                response_deserializer=demo__pb2.WatchResponse.FromString,
+                _registered_method=True)
+        self.MerkleNodes = channel.unary_unary(
+                '/keyvalue.KeyValue/MerkleNodes',
+                request_serializer=demo__pb2.MerkleNodesRequest.SerializeToString,
+                response_deserializer=demo__pb2.MerkleNodesResponse.FromString,
+                _registered_method=True)
+        self.MerkleLeaves = channel.unary_unary(
+                '/keyvalue.KeyValue/MerkleLeaves',
+                request_serializer=demo__pb2.MerkleNodesRequest.SerializeToString,
+                response_deserializer=demo__pb2.MerkleLeavesResponse.FromString,
+                _registered_method=True)
+        self.Repair = channel.unary_unary(
+                '/keyvalue.KeyValue/Repair',
+                request_serializer=demo__pb2.RepairRequest.SerializeToString,
+                response_deserializer=demo__pb2.RepairResponse.FromString,
+                _registered_method=True)
 
 
 class KeyValueServicer(object):
@@ -99,6 +169,34 @@ class KeyValueServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ClusterView(self, request, context):
+        """Thành viên cụm, cấu hình hash ring và trạng thái các node theo góc nhìn của node nhận
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Stats(self, request, context):
+        """Số đo của node: histogram độ trễ theo RPC, counter sao lưu/WAL và các gauge (số key, bộ nhớ, hàng đợi)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Resync(self, request, context):
+        """Primary yêu cầu replica đồng bộ lại toàn bộ khi hàng đợi hint không còn đủ thay đổi
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Gossip(self, request, context):
+        """Trao đổi bảng heartbeat giữa hai node (failure detector chế độ gossip), trả về bảng của node nhận
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def RequestFullSnapshot(self, request, context):
         """RPC mới cho việc yêu cầu snapshot
         """
@@ -106,6 +204,76 @@ class KeyValueServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamSnapshot(self, request, context):
+        """Snapshot dạng stream: gửi các chunk có kích thước giới hạn, chunk cuối mang checksum
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CatchUp(self, request, context):
+        """Catch-up: chỉ lấy các thay đổi có seq lớn hơn watermark của node yêu cầu
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MultiGet(self, request, context):
+        """Thao tác theo lô: node nhận gom key theo primary, tự xử lý phần của mình và gửi
+        một lô con tới mỗi primary khác. Kết quả trả về theo từng key.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MultiPut(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MultiDelete(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Scan(self, request, context):
+        """Duyệt key theo thứ tự (khoảng [start, end) và/hoặc prefix), có phân trang. Node nhận gộp
+        các stream đã sắp xếp từ mọi primary (hoặc chỉ đọc bản cục bộ với READ_ANY).
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Watch(self, request, context):
+        """Theo dõi thay đổi của một key hoặc prefix: node nhận stream các thao tác PUT/DELETE theo seq
+        do primary cấp (origin, seq), có thể tiếp tục từ vị trí cũ sau khi kết nối lại.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MerkleNodes(self, request, context):
+        """Anti-entropy: so sánh cây Merkle theo từng tầng, lấy digest các key trong lá lệch
+        và ghi đè các key lệch bằng bản của primary.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MerkleLeaves(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Repair(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_KeyValueServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -134,11 +302,81 @@ def add_KeyValueServicer_to_server(servicer, server):
                     request_deserializer=demo__pb2.HealthCheckRequest.FromString,
                     response_serializer=demo__pb2.HealthCheckResponse.SerializeToString,
             ),
+            'ClusterView': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClusterView,
+                    request_deserializer=demo__pb2.ClusterViewRequest.FromString,
+                    response_serializer=demo__pb2.ClusterViewResponse.SerializeToString,
+            ),
+            'Stats': grpc.unary_unary_rpc_method_handler(
+                    servicer.Stats,
+                    request_deserializer=demo__pb2.StatsRequest.FromString,
+                    response_serializer=demo__pb2.StatsResponse.SerializeToString,
+            ),
+            'Resync': grpc.unary_unary_rpc_method_handler(
+                    servicer.Resync,
+                    request_deserializer=demo__pb2.ResyncRequest.FromString,
+                    response_serializer=demo__pb2.ResyncResponse.SerializeToString,
+            ),
+            'Gossip': grpc.unary_unary_rpc_method_handler(
+                    servicer.Gossip,
+                    request_deserializer=demo__pb2.GossipMessage.FromString,
+                    response_serializer=demo__pb2.GossipMessage.SerializeToString,
+            ),
             'RequestFullSnapshot': grpc.unary_unary_rpc_method_handler(
                     servicer.RequestFullSnapshot,
                     request_deserializer=demo__pb2.EmptyRequest.FromString,
                     response_serializer=demo__pb2.FullSnapshotResponse.SerializeToString,
             ),
+            'StreamSnapshot': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamSnapshot,
+                    request_deserializer=demo__pb2.SnapshotStreamRequest.FromString,
+                    response_serializer=demo__pb2.SnapshotChunk.SerializeToString,
+            ),
+            'CatchUp': grpc.unary_unary_rpc_method_handler(
+                    servicer.CatchUp,
+                    request_deserializer=demo__pb2.CatchUpRequest.FromString,
+                    response_serializer=demo__pb2.CatchUpResponse.SerializeToString,
+            ),
+            'MultiGet': grpc.unary_unary_rpc_method_handler(
+                    servicer.MultiGet,
+                    request_deserializer=demo__pb2.MultiGetRequest.FromString,
+                    response_serializer=demo__pb2.MultiGetResponse.SerializeToString,
+            ),
+            'MultiPut': grpc.unary_unary_rpc_method_handler(
+                    servicer.MultiPut,
+                    request_deserializer=demo__pb2.MultiPutRequest.FromString,
+                    response_serializer=demo__pb2.MultiWriteResponse.SerializeToString,
+            ),
+            'MultiDelete': grpc.unary_unary_rpc_method_handler(
+                    servicer.MultiDelete,
+                    request_deserializer=demo__pb2.MultiDeleteRequest.FromString,
+                    response_serializer=demo__pb2.MultiWriteResponse.SerializeToString,
+            ),
+            'Scan': grpc.unary_stream_rpc_method_handler(
+                    servicer.Scan,
+                    request_deserializer=demo__pb2.ScanRequest.FromString,
+                    response_serializer=demo__pb2.ScanChunk.SerializeToString,
+            ),
+            'Watch': grpc.unary_stream_rpc_method_handler(
+                    servicer.Watch,
+                    request_deserializer=demo__pb2.WatchRequest.FromString,
+                    response_serializer=demo__pb2.WatchResponse.SerializeToString,
+            ),
+            'MerkleNodes': grpc.unary_unary_rpc_method_handler(
+                    servicer.MerkleNodes,
+                    request_deserializer=demo__pb2.MerkleNodesRequest.FromString,
+                    response_serializer=demo__pb2.MerkleNodesResponse.SerializeToString,
+            ),
+            'MerkleLeaves': grpc.unary_unary_rpc_method_handler(
+                    servicer.MerkleLeaves,
+                    request_deserializer=demo__pb2.MerkleNodesRequest.FromString,
+                    response_serializer=demo__pb2.MerkleLeavesResponse.SerializeToString,
+            ),
+            'Repair': grpc.unary_unary_rpc_method_handler(
+                    servicer.Repair,
+                    request_deserializer=demo__pb2.RepairRequest.FromString,
+                    response_serializer=demo__pb2.RepairResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'keyvalue.KeyValue', rpc_method_handlers)
@@ -285,6 +523,114 @@ class KeyValue(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ClusterView(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/ClusterView',
+            demo__pb2.ClusterViewRequest.SerializeToString,
+            demo__pb2.ClusterViewResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Stats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/Stats',
+            demo__pb2.StatsRequest.SerializeToString,
+            demo__pb2.StatsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Resync(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/Resync',
+            demo__pb2.ResyncRequest.SerializeToString,
+            demo__pb2.ResyncResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Gossip(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/Gossip',
+            demo__pb2.GossipMessage.SerializeToString,
+            demo__pb2.GossipMessage.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def RequestFullSnapshot(request,
             target,
@@ -311,3 +657,273 @@ class KeyValue(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamSnapshot(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/keyvalue.KeyValue/StreamSnapshot',
+            demo__pb2.SnapshotStreamRequest.SerializeToString,
+            demo__pb2.SnapshotChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CatchUp(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/CatchUp',
+            demo__pb2.CatchUpRequest.SerializeToString,
+            demo__pb2.CatchUpResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MultiGet(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/MultiGet',
+            demo__pb2.MultiGetRequest.SerializeToString,
+            demo__pb2.MultiGetResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MultiPut(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/MultiPut',
+            demo__pb2.MultiPutRequest.SerializeToString,
+            demo__pb2.MultiWriteResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MultiDelete(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/MultiDelete',
+            demo__pb2.MultiDeleteRequest.SerializeToString,
+            demo__pb2.MultiWriteResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Scan(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/keyvalue.KeyValue/Scan',
+            demo__pb2.ScanRequest.SerializeToString,
+            demo__pb2.ScanChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Watch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/keyvalue.KeyValue/Watch',
+            demo__pb2.WatchRequest.SerializeToString,
+            demo__pb2.WatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MerkleNodes(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/MerkleNodes',
+            demo__pb2.MerkleNodesRequest.SerializeToString,
+            demo__pb2.MerkleNodesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MerkleLeaves(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/MerkleLeaves',
+            demo__pb2.MerkleNodesRequest.SerializeToString,
+            demo__pb2.MerkleLeavesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Repair(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/keyvalue.KeyValue/Repair',
+            demo__pb2.RepairRequest.SerializeToString,
+            demo__pb2.RepairResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
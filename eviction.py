@@ -0,0 +1,127 @@
+# eviction.py
+# Chính sách chọn key để xóa khi node vượt ngân sách bộ nhớ (chế độ cache).
+#
+# Mọi thao tác của chính sách là O(1):
+#   LRUPolicy: OrderedDict theo thứ tự truy cập, key truy cập lâu nhất bị xóa trước.
+#   LFUPolicy: các nút tần suất nối thành danh sách liên kết đôi tăng dần, mỗi nút giữ các key có
+#              cùng số lần truy cập theo thứ tự truy cập (Shah, Mitra, Matani: "An O(1) algorithm
+#              for implementing the LFU cache eviction scheme"). Key ít truy cập nhất bị xóa trước,
+#              cùng tần suất thì key truy cập lâu nhất bị xóa trước.
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+POLICIES = ("lru", "lfu")
+
+
+class LRUPolicy:
+    """Thứ tự xóa theo lần truy cập gần nhất. Có thể dùng từ nhiều luồng."""
+
+    def __init__(self):
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def insert(self, key):
+        # Key mới hoặc vừa được ghi lại: coi như một lần truy cập.
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+
+    def access(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def victims(self, count: int) -> list:
+        # Tối đa count key theo thứ tự sẽ bị xóa, không bỏ key khỏi chính sách.
+        with self._lock:
+            return list(islice(self._keys, count))
+
+
+class _FreqNode:
+    __slots__ = ("count", "keys", "prev", "next")
+
+    def __init__(self, count: int):
+        self.count = count
+        self.keys = OrderedDict()
+        self.prev = self.next = self
+
+
+class LFUPolicy:
+    """Thứ tự xóa theo số lần truy cập. Có thể dùng từ nhiều luồng."""
+
+    def __init__(self):
+        self._head = _FreqNode(0) # Nút gác của danh sách vòng, không chứa key
+        self._where = {} # key -> nút tần suất đang chứa key
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _node_after(self, node: _FreqNode, count: int) -> _FreqNode:
+        # Nút có tần suất count ngay sau node, tạo mới nếu chưa có.
+        nxt = node.next
+        if nxt is not self._head and nxt.count == count:
+            return nxt
+        created = _FreqNode(count)
+        created.prev, created.next = node, nxt
+        node.next = nxt.prev = created
+        return created
+
+    def _unlink_if_empty(self, node: _FreqNode):
+        if not node.keys:
+            node.prev.next = node.next
+            node.next.prev = node.prev
+
+    def insert(self, key):
+        with self._lock:
+            if key in self._where:
+                self._access_locked(key)
+                return
+            node = self._node_after(self._head, 1)
+            node.keys[key] = None
+            self._where[key] = node
+
+    def access(self, key):
+        with self._lock:
+            if key in self._where:
+                self._access_locked(key)
+
+    def _access_locked(self, key):
+        node = self._where[key]
+        target = self._node_after(node, node.count + 1)
+        del node.keys[key]
+        target.keys[key] = None
+        self._where[key] = target
+        self._unlink_if_empty(node)
+
+    def remove(self, key):
+        with self._lock:
+            node = self._where.pop(key, None)
+            if node is not None:
+                del node.keys[key]
+                self._unlink_if_empty(node)
+
+    def victims(self, count: int) -> list:
+        with self._lock:
+            selected = []
+            node = self._head.next
+            while node is not self._head and len(selected) < count:
+                selected.extend(islice(node.keys, count - len(selected)))
+                node = node.next
+            return selected
+
+
+def make_policy(name: str):
+    if name == "lru":
+        return LRUPolicy()
+    if name == "lfu":
+        return LFUPolicy()
+    raise ValueError(f"Chính sách eviction không hợp lệ: {name}")
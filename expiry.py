@@ -0,0 +1,117 @@
+# expiry.py
+# Hết hạn key theo TTL bằng timing wheel phân cấp (hierarchical timing wheel, Varghese & Lauck).
+#
+# Thời gian được chia thành tick (mặc định 0.1 giây). Tầng 0 có `slots` ô, mỗi ô ứng với một tick;
+# tầng l có `slots` ô, mỗi ô ứng với slots^l tick. Key được đặt ở tầng thấp nhất mà thời điểm hết
+# hạn nằm trong cùng khối với tick hiện tại; khi kim tầng 0 quay hết một vòng, ô tương ứng của tầng
+# trên được dồn xuống tầng dưới. Thêm/hủy một key là O(1) và mỗi tick chỉ chạm tới các key hết hạn
+# trong tick đó (cùng số key được dồn tầng), không phải quét toàn bộ store.
+#
+# Thời điểm hết hạn là tuyệt đối (Unix, giây) do primary tính khi nhận PutKey và được sao lưu
+# nguyên vẹn, nên các replica hết hạn key cùng lúc (sai khác bằng độ lệch đồng hồ giữa các node).
+import math
+import threading
+import time
+
+DEFAULT_TICK_SECONDS = 0.1
+DEFAULT_SLOTS = 64 # Lũy thừa của 2
+DEFAULT_LEVELS = 4 # 64^4 tick * 0.1s ~ 19 ngày; xa hơn được giữ ở danh sách tràn
+
+
+def deadline(ttl_seconds: float, now: float = None) -> float:
+    # Thời điểm hết hạn từ TTL tương đối; 0 = không hết hạn.
+    if not ttl_seconds or ttl_seconds <= 0:
+        return 0.0
+    return (time.time() if now is None else now) + ttl_seconds
+
+
+def is_expired(expires_at: float, now: float = None) -> bool:
+    return bool(expires_at) and expires_at <= (time.time() if now is None else now)
+
+
+class TimingWheel:
+    """Timing wheel phân cấp cho các key có TTL. Có thể dùng từ nhiều luồng.
+
+    schedule() thay thời điểm hết hạn cũ của key (nếu có); advance(now) trả về các
+    (key, expires_at) đã tới hạn. Key không bao giờ được trả về sớm hơn expires_at.
+    """
+
+    def __init__(self, tick_seconds: float = DEFAULT_TICK_SECONDS, slots: int = DEFAULT_SLOTS,
+                 levels: int = DEFAULT_LEVELS, now: float = None):
+        if slots & (slots - 1):
+            raise ValueError(f"Số ô mỗi tầng phải là lũy thừa của 2: {slots}")
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self.levels = levels
+        self._bits = slots.bit_length() - 1
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)] # ô: key -> expires_at
+        self._overflow = {}
+        self._where = {} # key -> dict (ô hoặc danh sách tràn) đang chứa key
+        self._tick = self._tick_of(time.time() if now is None else now)
+        self._lock = threading.Lock()
+
+    def _tick_of(self, t: float) -> int:
+        return math.floor(t / self.tick_seconds)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def schedule(self, key, expires_at: float):
+        with self._lock:
+            self._remove_locked(key)
+            self._place_locked(key, expires_at)
+
+    def cancel(self, key):
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key):
+        bucket = self._where.pop(key, None)
+        if bucket is not None:
+            del bucket[key]
+
+    def _place_locked(self, key, expires_at: float):
+        # Tick hết hạn được làm tròn lên để key không bị trả về sớm.
+        due_tick = max(math.ceil(expires_at / self.tick_seconds), self._tick)
+        bucket = self._overflow
+        for level in range(self.levels):
+            shift = self._bits * (level + 1)
+            if due_tick >> shift == self._tick >> shift:
+                bucket = self._wheels[level][(due_tick >> (self._bits * level)) & (self.slots - 1)]
+                break
+        bucket[key] = expires_at
+        self._where[key] = bucket
+
+    def _cascade_locked(self, bucket: dict):
+        items = list(bucket.items())
+        bucket.clear()
+        for key, expires_at in items:
+            self._place_locked(key, expires_at)
+
+    def advance(self, now: float) -> list:
+        """Quay kim tới thời điểm now, trả về list (key, expires_at) đã hết hạn."""
+        expired = []
+        target = self._tick_of(now)
+        with self._lock:
+            # Key đặt đúng tick hiện tại (hết hạn trong quá khứ hoặc ngay tick này) chưa được lấy ra.
+            self._take_locked(self._wheels[0][self._tick & (self.slots - 1)], expired)
+            while self._tick < target:
+                if not self._where:
+                    self._tick = target
+                    break
+                self._tick += 1
+                tick = self._tick
+                # Dồn từ tầng cao xuống để key vừa dồn có thể tiếp tục xuống tầng 0 trong cùng tick.
+                if tick & ((1 << (self._bits * self.levels)) - 1) == 0:
+                    self._cascade_locked(self._overflow)
+                for level in range(self.levels - 1, 0, -1):
+                    if tick & ((1 << (self._bits * level)) - 1) == 0:
+                        self._cascade_locked(self._wheels[level][(tick >> (self._bits * level)) & (self.slots - 1)])
+                self._take_locked(self._wheels[0][tick & (self.slots - 1)], expired)
+        return expired
+
+    def _take_locked(self, bucket: dict, expired: list):
+        for key, expires_at in bucket.items():
+            del self._where[key]
+            expired.append((key, expires_at))
+        bucket.clear()
@@ -0,0 +1,100 @@
+# failure_detector.py
+# Phi-accrual failure detector (Hayashibara và cộng sự): thay vì kết luận DEAD sau một lần
+# heartbeat lỗi/chậm, mỗi peer có mức nghi ngờ phi = -log10(xác suất heartbeat kế tiếp còn đến
+# muộn hơn khoảng thời gian đã chờ), tính từ phân phối khoảng cách giữa các heartbeat gần nhất.
+# phi = 1 ứng với xác suất nhầm ~10%, phi = 8 ~ 1e-8. Peer bị coi là DEAD khi phi vượt ngưỡng.
+#
+# Ngoài heartbeat, mọi phản hồi/request khác từ peer (sao lưu, forward...) là bằng chứng peer còn
+# sống (piggyback): chúng làm mới thời điểm nghe thấy peer gần nhất nhưng không đưa vào phân phối,
+# để lưu lượng dày đặc không làm detector quá nhạy khi lưu lượng dừng lại.
+import math
+import threading
+from collections import deque
+
+DEFAULT_THRESHOLD = 8.0
+DEFAULT_WINDOW = 100
+DEFAULT_MIN_STD_SECONDS = 0.2
+
+
+def phi(elapsed: float, mean: float, std: float) -> float:
+    # Xấp xỉ logistic của hàm phân phối chuẩn (như Akka/Cassandra): với e = exp(exponent),
+    # phi = -log10(e / (1 + e)), tính theo hai nhánh để exp() không tràn số.
+    y = (elapsed - mean) / std
+    exponent = -y * (1.5976 + 0.070566 * y * y)
+    if exponent > 0:
+        return math.log1p(math.exp(-exponent)) / math.log(10)
+    return (-exponent + math.log1p(math.exp(exponent))) / math.log(10)
+
+
+class _History:
+    def __init__(self, now: float, first_interval: float, window: int):
+        # Chưa có heartbeat nào: giả định khoảng cách bằng first_interval, độ lệch first_interval/4.
+        self.intervals = deque([first_interval - first_interval / 4, first_interval + first_interval / 4], maxlen=window)
+        self.last_heartbeat = None
+        self.last_seen = now # Thời điểm cuối cùng có bằng chứng peer còn sống (hoặc lúc bắt đầu theo dõi)
+
+
+class PhiAccrualDetector:
+    """Theo dõi nhiều peer. Có thể dùng từ nhiều luồng.
+
+    first_interval: chu kỳ heartbeat dự kiến, dùng khi chưa đủ mẫu.
+    acceptable_pause: khoảng dừng được chấp nhận thêm (GC, mạng chậm) trước khi phi tăng nhanh.
+    """
+
+    def __init__(self, first_interval: float, threshold: float = DEFAULT_THRESHOLD, window: int = DEFAULT_WINDOW,
+                 min_std: float = DEFAULT_MIN_STD_SECONDS, acceptable_pause: float = 0.0):
+        self.first_interval = first_interval
+        self.threshold = threshold
+        self.window = window
+        self.min_std = min_std
+        self.acceptable_pause = acceptable_pause
+        self._peers = {}
+        self._lock = threading.Lock()
+
+    def _history(self, peer_id: str, now: float) -> _History:
+        history = self._peers.get(peer_id)
+        if history is None:
+            history = self._peers[peer_id] = _History(now, self.first_interval, self.window)
+        return history
+
+    def track(self, peer_id: str, now: float):
+        # Bắt đầu theo dõi: peer chưa từng trả lời cũng bị nghi ngờ dần từ thời điểm này.
+        with self._lock:
+            self._history(peer_id, now)
+
+    def heartbeat(self, peer_id: str, now: float):
+        with self._lock:
+            history = self._history(peer_id, now)
+            # Khoảng cách kéo dài qua lúc peer bị coi là DEAD (peer restart, mạng đứt) không phản ánh
+            # chu kỳ heartbeat bình thường nên không được đưa vào phân phối.
+            if history.last_heartbeat is not None and self._phi_locked(history, now) < self.threshold:
+                history.intervals.append(now - history.last_heartbeat)
+            history.last_heartbeat = now
+            history.last_seen = max(history.last_seen, now)
+
+    def seen(self, peer_id: str, now: float):
+        # Bằng chứng piggyback (không phải heartbeat).
+        with self._lock:
+            history = self._peers.get(peer_id)
+            if history is not None and now > history.last_seen:
+                history.last_seen = now
+
+    def last_seen(self, peer_id: str):
+        with self._lock:
+            history = self._peers.get(peer_id)
+            return history.last_seen if history is not None else None
+
+    def phi(self, peer_id: str, now: float) -> float:
+        with self._lock:
+            history = self._peers.get(peer_id)
+            return self._phi_locked(history, now) if history is not None else 0.0
+
+    def _phi_locked(self, history: _History, now: float) -> float:
+        intervals = history.intervals
+        mean = sum(intervals) / len(intervals)
+        variance = sum((x - mean) ** 2 for x in intervals) / len(intervals)
+        std = max(math.sqrt(variance), self.min_std)
+        return phi(now - history.last_seen, mean + self.acceptable_pause, std)
+
+    def is_available(self, peer_id: str, now: float) -> bool:
+        return self.phi(peer_id, now) < self.threshold
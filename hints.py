@@ -0,0 +1,177 @@
+# hints.py
+# Hinted handoff: primary giữ lại các thao tác ghi không gửi được tới một replica (replica không
+# ALIVE, hoặc RPC sao lưu lỗi) để phát lại khi replica sống lại, thay vì bỏ hẳn thao tác đó.
+#
+# Mỗi peer có một HintQueue, lưu bền vững thành file append-only dùng cùng định dạng frame với
+# WAL (wal.encode_record), mỗi record đứng sau thời điểm tạo hint (8 byte, little-endian double).
+# Hàng đợi có giới hạn số hint, tổng kích thước và tuổi tối đa. Khi vượt giới hạn hoặc có hint
+# quá hạn, một phần thay đổi cho peer đã bị mất: hàng đợi bị bỏ và peer được đánh dấu cần đồng bộ
+# lại toàn bộ (needs_resync). Dấu này được ghi vào file bằng một record OP_RESYNC.
+import os
+import struct
+import threading
+from collections import deque
+
+import wal
+
+OP_RESYNC = 3
+_CREATED_AT = struct.Struct("<d")
+
+DEFAULT_MAX_HINTS = 100000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 3600
+
+
+class HintQueue:
+    """Hàng đợi hint của một peer. Hint: (op, key, value, origin, seq, expires_at), value là None
+    với thao tác xóa. Có thể dùng từ nhiều luồng.
+
+    File chỉ được ghi thêm khi có hint mới (flush, không fsync: hint mất khi máy sập vẫn được
+    anti-entropy sửa sau đó) và được ghi lại toàn bộ khi kết thúc một lượt phát lại.
+    """
+
+    def __init__(self, path: str, max_hints: int = DEFAULT_MAX_HINTS, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_hints = max_hints
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.needs_resync = False
+        self._hints = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._delivering = False
+        self._dirty = False # Bộ nhớ và file lệch nhau (đã bỏ hint ở đầu hàng đợi)
+
+    def load(self):
+        """Đọc lại hint từ file (bỏ phần đuôi hỏng) và mở file để ghi thêm."""
+        data = b""
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+        offset = 0
+        with self._lock:
+            while offset + _CREATED_AT.size <= len(data):
+                (created_at,) = _CREATED_AT.unpack_from(data, offset)
+                decoded = wal.decode_frame(data, offset + _CREATED_AT.size)
+                if decoded is None:
+                    break
+                (op, key, value, origin, seq, expires_at), next_offset = decoded
+                if op == OP_RESYNC:
+                    self.needs_resync = True
+                else:
+                    self._hints.append((op, key, value, origin, seq, expires_at, created_at, next_offset - offset))
+                    self._bytes += next_offset - offset
+                offset = next_offset
+            if offset != len(data):
+                with open(self.path, "r+b") as f:
+                    f.truncate(offset)
+            self._file = open(self.path, "ab")
+        return len(self._hints)
+
+    def __len__(self) -> int:
+        return len(self._hints)
+
+    def has_work(self) -> bool:
+        return self.needs_resync or bool(self._hints)
+
+    def add(self, op: int, key: str, value, origin: str, seq: int, expires_at: float, now: float):
+        """Thêm một hint. Trả về False nếu hint không được giữ (peer đã hoặc vừa bị đánh dấu
+        cần đồng bộ lại toàn bộ, lần đồng bộ đó sẽ bao gồm cả thay đổi này)."""
+        frame = _CREATED_AT.pack(now) + wal.encode_record(op, key, value, origin, seq, expires_at)
+        with self._lock:
+            if self.needs_resync:
+                return False
+            self._expire_locked(now)
+            if self.needs_resync or len(self._hints) >= self.max_hints or self._bytes + len(frame) > self.max_bytes:
+                self._mark_resync_locked()
+                return False
+            self._hints.append((op, key, value, origin, seq, expires_at, now, len(frame)))
+            self._bytes += len(frame)
+            if self._file is not None:
+                self._file.write(frame)
+                self._file.flush()
+            return True
+
+    def expire(self, now: float) -> bool:
+        # Trả về True nếu có hint quá hạn (hàng đợi bị bỏ, peer cần đồng bộ lại toàn bộ).
+        with self._lock:
+            return self._expire_locked(now)
+
+    def _expire_locked(self, now: float) -> bool:
+        if self._hints and now - self._hints[0][6] > self.ttl_seconds:
+            self._mark_resync_locked()
+            return True
+        return False
+
+    def _mark_resync_locked(self):
+        self.needs_resync = True
+        self._hints.clear()
+        self._bytes = 0
+        self._dirty = True
+        if self._delivering:
+            return # File được ghi lại khi lượt phát lại kết thúc
+        self._rewrite_locked()
+
+    def mark_resync(self):
+        with self._lock:
+            self._mark_resync_locked()
+
+    def clear_resync(self):
+        with self._lock:
+            self.needs_resync = False
+            self._dirty = True
+
+    def begin_delivery(self) -> bool:
+        # Chỉ một luồng được phát lại hàng đợi tại một thời điểm.
+        with self._lock:
+            if self._delivering:
+                return False
+            self._delivering = True
+            return True
+
+    def end_delivery(self):
+        with self._lock:
+            self._delivering = False
+            if self._dirty:
+                self._rewrite_locked()
+
+    def peek(self, limit: int) -> list:
+        with self._lock:
+            return [self._hints[i][:6] for i in range(min(limit, len(self._hints)))]
+
+    def remove(self, count: int):
+        # Bỏ count hint đầu hàng đợi (đã giao xong). File được ghi lại ở end_delivery().
+        with self._lock:
+            for _ in range(min(count, len(self._hints))):
+                self._bytes -= self._hints.popleft()[7]
+            self._dirty = True
+
+    def _rewrite_locked(self):
+        # Ghi lại file từ nội dung trong bộ nhớ: ghi ra file tạm rồi rename.
+        if self._file is None:
+            self._dirty = False
+            return
+        frames = []
+        if self.needs_resync:
+            frames.append(_CREATED_AT.pack(0) + wal.encode_record(OP_RESYNC, ""))
+        for op, key, value, origin, seq, expires_at, created_at, _ in self._hints:
+            frames.append(_CREATED_AT.pack(created_at) + wal.encode_record(op, key, value, origin, seq, expires_at))
+        self._file.close()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(frames))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "ab")
+        self._dirty = False
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                if self._dirty:
+                    self._rewrite_locked()
+                self._file.close()
+                self._file = None
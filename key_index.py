@@ -0,0 +1,126 @@
+# key_index.py
+# Chỉ mục có thứ tự trên các key của một node, phục vụ RPC Scan (theo prefix hoặc khoảng key).
+#
+# Key được giữ trong một danh sách các khối đã sắp xếp (mỗi khối tối đa 2 * load key), kèm key
+# lớn nhất của từng khối. Tìm khối bằng bisect trên các key lớn nhất rồi bisect trong khối, nên
+# thêm/xóa một key là O(log n + load) và duyệt một khoảng chỉ tốn thời gian tỉ lệ với số key
+# được trả về, không phụ thuộc kích thước store.
+import bisect
+import threading
+
+DEFAULT_LOAD = 512
+DEFAULT_PAGE = 256
+
+
+class KeyIndex:
+    """Tập key có thứ tự. Có thể dùng từ nhiều luồng; mỗi thao tác chỉ giữ lock trong chốc lát."""
+
+    def __init__(self, keys=(), load: int = DEFAULT_LOAD):
+        self._load = max(8, load)
+        self._lock = threading.Lock()
+        self._chunks = [] # Các khối key tăng dần, không rỗng
+        self._maxes = [] # Key lớn nhất của từng khối
+        self._len = 0
+        if keys:
+            self.build(keys)
+
+    def build(self, keys):
+        # Thay toàn bộ nội dung bằng keys (không cần sắp xếp trước).
+        ordered = sorted(set(keys))
+        chunks = [ordered[i:i + self._load] for i in range(0, len(ordered), self._load)]
+        with self._lock:
+            self._chunks = chunks
+            self._maxes = [chunk[-1] for chunk in chunks]
+            self._len = len(ordered)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            i = bisect.bisect_left(self._maxes, key)
+            if i == len(self._maxes):
+                return False
+            chunk = self._chunks[i]
+            return chunk[bisect.bisect_left(chunk, key)] == key
+
+    def add(self, key) -> bool:
+        """Thêm key; trả về False nếu key đã có."""
+        with self._lock:
+            if not self._chunks:
+                self._chunks.append([key])
+                self._maxes.append(key)
+                self._len = 1
+                return True
+            i = bisect.bisect_left(self._maxes, key)
+            if i == len(self._maxes):
+                i -= 1 # Lớn hơn mọi key hiện có: thêm vào cuối khối cuối
+            chunk = self._chunks[i]
+            j = bisect.bisect_left(chunk, key)
+            if j < len(chunk) and chunk[j] == key:
+                return False
+            chunk.insert(j, key)
+            self._maxes[i] = chunk[-1]
+            self._len += 1
+            if len(chunk) > 2 * self._load:
+                self._chunks[i:i + 1] = [chunk[:self._load], chunk[self._load:]]
+                self._maxes[i:i + 1] = [self._chunks[i][-1], self._chunks[i + 1][-1]]
+            return True
+
+    def discard(self, key) -> bool:
+        """Xóa key; trả về False nếu key không có."""
+        with self._lock:
+            i = bisect.bisect_left(self._maxes, key)
+            if i == len(self._maxes):
+                return False
+            chunk = self._chunks[i]
+            j = bisect.bisect_left(chunk, key)
+            if chunk[j] != key:
+                return False
+            del chunk[j]
+            self._len -= 1
+            if not chunk:
+                del self._chunks[i]
+                del self._maxes[i]
+                return True
+            # Gộp khối quá nhỏ với khối sau để số khối không tăng mãi khi xóa nhiều.
+            if len(chunk) < self._load // 2 and i + 1 < len(self._chunks):
+                chunk.extend(self._chunks.pop(i + 1))
+                del self._maxes[i + 1]
+                if len(chunk) > 2 * self._load:
+                    self._chunks[i:i + 1] = [chunk[:self._load], chunk[self._load:]]
+                    self._maxes[i:i + 1] = [self._chunks[i][-1], self._chunks[i + 1][-1]]
+                    return True
+            self._maxes[i] = chunk[-1]
+            return True
+
+    def keys_from(self, lower, inclusive: bool = True, count: int = DEFAULT_PAGE) -> list:
+        """Tối đa count key tăng dần từ lower (gồm lower nếu inclusive, nếu không thì lớn hơn lower)."""
+        find = bisect.bisect_left if inclusive else bisect.bisect_right
+        result = []
+        with self._lock:
+            i = find(self._maxes, lower)
+            if i == len(self._chunks):
+                return result
+            chunk = self._chunks[i]
+            j = find(chunk, lower)
+            result.extend(chunk[j:j + count])
+            i += 1
+            while len(result) < count and i < len(self._chunks):
+                result.extend(self._chunks[i][:count - len(result)])
+                i += 1
+        return result
+
+    def iter_range(self, lower="", inclusive: bool = True, upper=None, page: int = DEFAULT_PAGE):
+        """Duyệt các key từ lower tới trước upper (None = không giới hạn), lấy từng trang page key.
+        Lock chỉ được giữ khi lấy một trang: key thêm/xóa trong lúc duyệt có thể có hoặc không
+        có trong kết quả, nhưng kết quả luôn tăng dần và không trùng."""
+        keys = self.keys_from(lower, inclusive, page)
+        while keys:
+            for key in keys:
+                if upper is not None and key >= upper:
+                    return
+                yield key
+            if len(keys) < page:
+                return
+            keys = self.keys_from(keys[-1], False, page)
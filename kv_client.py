@@ -0,0 +1,512 @@
+# kv_client.py
+# Thư viện client dùng chung cho các script và TUI.
+#
+# Client giữ một view của cụm (thành viên, hash ring, trạng thái node) và gửi mỗi request thẳng
+# tới primary của key qua channel lấy từ pool, nên không tốn thêm bước forward giữa các server.
+# Khi gặp lỗi định tuyến (node không kết nối được / timeout), client hỏi lại view của cụm qua RPC
+# ClusterView rồi thử lại; thao tác đọc có thể chuyển sang replica nếu primary không trả lời.
+#
+#   kv = KVClient()
+#   kv.put("k", "v")          # value là str (gửi dạng UTF-8) hoặc bytes
+#   response = kv.get("k")   # response.value (bytes), response.served_by, response.staleness_seconds
+#   for entry in kv.scan(prefix="user:"):   # entry.key, entry.value theo thứ tự key
+#   for event in kv.watch(prefix="user:"):  # event.type (PUT/DELETE), event.key, event.value, event.seq
+#
+#   kv = KVClient(cache_max_entries=10000)   # cache GET phía client, xem read_cache.py
+#   kv.stats()["cache"]                      # hits, misses, hit_ratio, invalidations, ...
+import threading
+import time
+
+import grpc
+import demo_pb2
+import read_cache
+import routing
+from channel_pool import ChannelPool, COMPRESSION_ALGORITHMS
+
+DEFAULT_CLUSTER_CONFIG = {
+    "node1": "localhost:50051",
+    "node2": "localhost:50052",
+    "node3": "localhost:50053",
+}
+KEY_NOT_FOUND_MSG = b"<KEY_NOT_FOUND>"
+DEFAULT_TIMEOUT_SECONDS = 10
+HEALTH_CHECK_TIMEOUT_SECONDS = 1
+# Mã lỗi cho thấy node đích không phục vụ được request: cập nhật view rồi thử node khác.
+ROUTING_ERROR_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+WATCH_RETRY_SECONDS = 1 # Thời gian chờ trước khi kết nối lại stream Watch tới node khác
+BATCH_RESULT_ERROR = 2 # KeyResult.code khi primary của key không xử lý được (xem server.py)
+
+
+def is_routing_error(e: grpc.RpcError) -> bool:
+    return e.code() in ROUTING_ERROR_CODES
+
+
+def to_bytes(value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def display_value(value: bytes) -> str:
+    # Value để in ra màn hình: đọc như UTF-8, byte không hợp lệ được thay thế.
+    return value.decode("utf-8", "replace")
+
+
+class KVClient:
+    """Client định tuyến trực tiếp tới primary, dùng chung channel theo từng node.
+
+    read_failover: khi primary không trả lời, GET được gửi tới các replica theo thứ tự trên
+    ring. Lần đọc READ_PRIMARY khi đó được hạ xuống READ_ANY; served_by và staleness_seconds
+    trong phản hồi cho biết bản đã đọc đến từ đâu.
+    compression: nén message gRPC gửi tới server ("none", "gzip", "deflate"); chỉ dùng khi
+    client tự tạo pool.
+    cache_max_entries > 0: cache các lần GET READ_PRIMARY (read_cache.ReadCache, tối đa
+    cache_max_bytes byte), được xóa theo stream Watch tới từng primary; khi stream bị ngắt,
+    entry chỉ dùng được trong cache_fallback_ttl_seconds.
+    Có thể dùng từ nhiều luồng.
+    """
+
+    def __init__(self, cluster_config: dict = None, vnodes: int = routing.DEFAULT_VNODES, weights: dict = None,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS, read_failover: bool = True, pool: ChannelPool = None,
+                 compression: str = "none", cache_max_entries: int = 0,
+                 cache_max_bytes: int = read_cache.DEFAULT_MAX_BYTES,
+                 cache_fallback_ttl_seconds: float = read_cache.DEFAULT_FALLBACK_TTL_SECONDS):
+        self.timeout = timeout
+        self.read_failover = read_failover
+        self.pool = pool if pool is not None else ChannelPool(compression=COMPRESSION_ALGORITHMS[compression])
+        self._lock = threading.Lock()
+        self.cache = None
+        self._invalidation_nodes = {} # node_id -> địa chỉ, các node đang có luồng xóa cache
+        self._invalidation_streams = {} # node_id -> WatchStream hiện tại của luồng đó
+        self._closed = False
+        self._set_view(dict(cluster_config or DEFAULT_CLUSTER_CONFIG), vnodes, dict(weights or {}), {})
+        self._stats = {"direct": 0, "explicit": 0, "read_failovers": 0, "view_refreshes": 0, "routing_errors": 0}
+        if cache_max_entries > 0:
+            self.cache = read_cache.ReadCache(cache_max_entries, cache_max_bytes, cache_fallback_ttl_seconds)
+            self._sync_invalidation_streams()
+
+    # --- View của cụm ---
+    def _set_view(self, cluster_config: dict, vnodes: int, weights: dict, statuses: dict):
+        with self._lock:
+            self.cluster_config = cluster_config
+            self.ring = routing.HashRing(cluster_config.keys(), vnodes=vnodes, weights=weights)
+            self.node_status = {nid: statuses.get(nid, "UNKNOWN") for nid in cluster_config}
+        self._sync_invalidation_streams()
+
+    def primary_for(self, key: str) -> str:
+        with self._lock:
+            return self.ring.primary_for(key)
+
+    def replicas_for(self, key: str) -> list:
+        # Các node giữ bản sao của key theo thứ tự trên ring, bắt đầu từ primary.
+        with self._lock:
+            return self.ring.preference_list(key, len(self.ring))
+
+    def address_of(self, node_id: str) -> str:
+        with self._lock:
+            return self.cluster_config[node_id]
+
+    def refresh_view(self) -> bool:
+        """Hỏi ClusterView từ một node trả lời được (ưu tiên node chưa bị đánh dấu DEAD)."""
+        with self._lock:
+            candidates = sorted(self.cluster_config, key=lambda nid: self.node_status.get(nid) == "DEAD")
+            addresses = {nid: self.cluster_config[nid] for nid in candidates}
+        self._count("view_refreshes")
+        for node_id in candidates:
+            address = addresses[node_id]
+            try:
+                view = self.pool.get_stub(address).ClusterView(demo_pb2.ClusterViewRequest(), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+            except grpc.RpcError as e:
+                self._note_error(address, e)
+                self._mark(node_id, "DEAD")
+                continue
+            self.pool.report_success(address)
+            self._set_view({n.node_id: n.address for n in view.nodes}, view.vnodes or routing.DEFAULT_VNODES,
+                           {n.node_id: n.weight for n in view.nodes if n.weight and n.weight != 1.0},
+                           {n.node_id: n.status for n in view.nodes})
+            return True
+        return False
+
+    def _mark(self, node_id: str, status: str):
+        with self._lock:
+            if node_id in self.node_status:
+                self.node_status[node_id] = status
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _note_error(self, address: str, e: grpc.RpcError):
+        if e.code() == grpc.StatusCode.UNAVAILABLE:
+            self.pool.report_failure(address)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+        result["channels"] = self.pool.stats()
+        if self.cache is not None:
+            result["cache"] = self.cache.stats()
+        return result
+
+    # --- Gửi request ---
+    def _invoke(self, address: str, method: str, request):
+        try:
+            response = getattr(self.pool.get_stub(address), method)(request, timeout=self.timeout)
+        except grpc.RpcError as e:
+            self._note_error(address, e)
+            raise
+        self.pool.report_success(address)
+        return response
+
+    def _call_primary(self, key: str, method: str, request):
+        # Gửi tới primary theo view hiện tại; nếu lỗi định tuyến thì làm mới view và thử lại
+        # một lần nếu primary của key đã đổi.
+        primary_id = self.primary_for(key)
+        try:
+            response = self._invoke(self.address_of(primary_id), method, request)
+            self._count("direct")
+            return response
+        except grpc.RpcError as e:
+            if not is_routing_error(e):
+                raise
+            self._count("routing_errors")
+            self._mark(primary_id, "DEAD")
+            if not self.refresh_view() or self.primary_for(key) == primary_id:
+                raise
+        response = self._invoke(self.address_of(self.primary_for(key)), method, request)
+        self._count("direct")
+        return response
+
+    def _call(self, key: str, method: str, request, address: str = None):
+        if address:
+            self._count("explicit")
+            return self._invoke(address, method, request)
+        return self._call_primary(key, method, request)
+
+    def put(self, key: str, value, address: str = None, ttl_seconds: float = 0):
+        """value: str (gửi dạng UTF-8) hoặc bytes.
+        address: gửi tới một node cụ thể thay vì primary (node đó sẽ tự forward).
+        ttl_seconds: key tự bị xóa sau khoảng thời gian này; 0 = không hết hạn."""
+        request = demo_pb2.PutKeyRequest(key=key, value=to_bytes(value), is_replica=False, ttl_seconds=ttl_seconds)
+        try:
+            return self._call(key, "PutKey", request, address)
+        finally:
+            self._invalidate([key])
+
+    def delete(self, key: str, address: str = None):
+        try:
+            return self._call(key, "DeleteKey", demo_pb2.DeleteKeyRequest(key=key, is_replica=False), address)
+        finally:
+            self._invalidate([key])
+
+    def get(self, key: str, consistency=demo_pb2.READ_PRIMARY, max_staleness_seconds: float = 0, address: str = None):
+        """Đọc key: response.value (bytes, KEY_NOT_FOUND_MSG nếu không có), response.served_by.
+        Khi bật cache, lần đọc READ_PRIMARY không chỉ định address được trả từ cache nếu có."""
+        if self.cache is None or address or consistency != demo_pb2.READ_PRIMARY:
+            return self._get(key, consistency, max_staleness_seconds, address)
+        response = self.cache.get(key)
+        if response is not None:
+            return response
+        token = self.cache.begin_fill(key)
+        response = None
+        try:
+            response = self._get(key, consistency, max_staleness_seconds, address)
+            return response
+        finally:
+            # Chỉ cache bản đọc từ primary (không phải bản của replica khi primary không trả lời).
+            cacheable = response is not None and response.staleness_seconds == 0
+            self.cache.finish_fill(key, token, response if cacheable else None, self.primary_for(key),
+                                   len(key.encode("utf-8")) + len(response.value) if cacheable else 0)
+
+    def _get(self, key: str, consistency, max_staleness_seconds: float, address: str):
+        request = demo_pb2.Key(key=key, consistency=consistency, max_staleness_seconds=max_staleness_seconds)
+        try:
+            return self._call(key, "GetKey", request, address)
+        except grpc.RpcError as e:
+            if address or not self.read_failover or not is_routing_error(e):
+                raise
+            last_error = e
+        if consistency == demo_pb2.READ_PRIMARY:
+            request = demo_pb2.Key(key=key, consistency=demo_pb2.READ_ANY)
+        for node_id in self.replicas_for(key)[1:]:
+            try:
+                response = self._invoke(self.address_of(node_id), "GetKey", request)
+                self._count("read_failovers")
+                return response
+            except grpc.RpcError as e:
+                if not is_routing_error(e):
+                    raise
+                self._mark(node_id, "DEAD")
+                last_error = e
+        raise last_error
+
+    def get_value(self, key: str, **kwargs):
+        # Trả về value (bytes), hoặc None nếu key không tồn tại.
+        value = self.get(key, **kwargs).value
+        return None if value == KEY_NOT_FOUND_MSG else value
+
+    # --- Thao tác theo lô ---
+    def _run_batch(self, method: str, keys, build_request) -> list:
+        # Chia lô theo primary và gửi song song một lô con tới mỗi primary. Node nhận vẫn tự chia
+        # lại nếu view của client đã cũ. Lô con gửi lỗi định tuyến được gửi lại qua node khác.
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(self.primary_for(key), []).append(i)
+        calls = []
+        for primary_id, indices in groups.items():
+            address = self.address_of(primary_id)
+            request = build_request(indices)
+            calls.append((primary_id, indices, request,
+                          getattr(self.pool.get_stub(address), method).future(request, timeout=self.timeout)))
+
+        results = [None] * len(keys)
+        for primary_id, indices, request, call in calls:
+            try:
+                sub_results = call.result().results
+                self._count("direct")
+            except grpc.RpcError as e:
+                if not is_routing_error(e):
+                    raise
+                self._count("routing_errors")
+                self._mark(primary_id, "DEAD")
+                sub_results = self._retry_elsewhere(method, request, exclude=primary_id, error=e)
+            for i, result in zip(indices, sub_results):
+                results[i] = result
+        return results
+
+    def _retry_elsewhere(self, method: str, request, exclude: str, error: grpc.RpcError):
+        if error is not None:
+            self.refresh_view()
+        with self._lock:
+            others = [nid for nid in self.cluster_config if nid != exclude and self.node_status.get(nid) != "DEAD"]
+        for node_id in others:
+            try:
+                return self._invoke(self.address_of(node_id), method, request).results
+            except grpc.RpcError as e:
+                if not is_routing_error(e):
+                    raise
+                error = e
+        if error is None:
+            raise grpc.RpcError("Không còn node nào sẵn sàng.")
+        raise error
+
+    def multi_get(self, keys) -> list:
+        keys = list(keys)
+        results = self._run_batch("MultiGet", keys, lambda indices: demo_pb2.MultiGetRequest(keys=[keys[i] for i in indices]))
+        failed = [i for i, r in enumerate(results) if r.code == BATCH_RESULT_ERROR]
+        if failed and self.read_failover:
+            # Primary của các key này không sẵn sàng: đọc bản cục bộ trên một replica còn sống
+            # (forwarded=True để replica không chuyển tiếp tới primary).
+            request = demo_pb2.MultiGetRequest(keys=[keys[i] for i in failed], forwarded=True)
+            try:
+                sub_results = self._retry_elsewhere("MultiGet", request, exclude=None, error=None)
+            except grpc.RpcError:
+                return results
+            self._count("read_failovers")
+            for i, result in zip(failed, sub_results):
+                results[i] = result
+        return results
+
+    def multi_put(self, entries) -> list:
+        # entries: list (key, value str hoặc bytes). Kết quả: list KeyResult theo thứ tự entries.
+        entries = [(k, to_bytes(v)) for k, v in entries]
+        try:
+            return self._run_batch("MultiPut", [k for k, _ in entries], lambda indices: demo_pb2.MultiPutRequest(
+                entries=[demo_pb2.KeyValuePair(key=entries[i][0], value=entries[i][1]) for i in indices]))
+        finally:
+            self._invalidate(k for k, _ in entries)
+
+    def multi_delete(self, keys) -> list:
+        keys = list(keys)
+        try:
+            return self._run_batch("MultiDelete", keys, lambda indices: demo_pb2.MultiDeleteRequest(keys=[keys[i] for i in indices]))
+        finally:
+            self._invalidate(keys)
+
+    # --- Scan ---
+    def scan_page(self, prefix: str = "", start: str = "", end: str = "", limit: int = 0, page_token: str = "",
+                  keys_only: bool = False, consistency=demo_pb2.READ_PRIMARY, address: str = None):
+        """Một trang Scan: (list ScanEntry tăng dần theo key, next_page_token). Khoảng key là
+        [start, end), end rỗng = không giới hạn; next_page_token rỗng khi đã hết key.
+        Node nhận tự gộp kết quả từ mọi primary nên request được gửi tới node bất kỳ còn sống."""
+        request = demo_pb2.ScanRequest(start=start, end=end, prefix=prefix, limit=limit, page_token=page_token,
+                                       keys_only=keys_only, consistency=consistency)
+        addresses = [address] if address else self._addresses_by_status()
+        last_error = None
+        for target in addresses:
+            entries = []
+            next_page_token = ""
+            try:
+                for chunk in self.pool.get_stub(target).Scan(request, timeout=self.timeout):
+                    entries.extend(chunk.entries)
+                    next_page_token = chunk.next_page_token or next_page_token
+            except grpc.RpcError as e:
+                self._note_error(target, e)
+                if address or not is_routing_error(e):
+                    raise
+                last_error = e
+                continue
+            self.pool.report_success(target)
+            return entries, next_page_token
+        raise last_error
+
+    def scan(self, prefix: str = "", start: str = "", end: str = "", page_size: int = 1000, keys_only: bool = False,
+             consistency=demo_pb2.READ_PRIMARY):
+        """Duyệt mọi key thỏa điều kiện theo thứ tự (generator ScanEntry), mỗi lần lấy một trang page_size key."""
+        page_token = ""
+        while True:
+            entries, page_token = self.scan_page(prefix, start, end, page_size, page_token, keys_only, consistency)
+            yield from entries
+            if not page_token:
+                return
+
+    # --- Watch ---
+    def _addresses_by_status(self) -> list:
+        # Địa chỉ mọi node, node chưa bị đánh dấu DEAD trước.
+        with self._lock:
+            candidates = sorted(self.cluster_config, key=lambda nid: self.node_status.get(nid) == "DEAD")
+            return [self.cluster_config[nid] for nid in candidates]
+
+    def watch(self, key: str = "", prefix: str = "", since: dict = None, keys_only: bool = False,
+              address: str = None, origins=(), on_response=None, on_disconnect=None) -> "WatchStream":
+        """Theo dõi thay đổi của key (hoặc mọi key có prefix): iterator WatchEvent. since: vị trí đã
+        nhận tới (WatchStream.positions của lần trước) để tiếp tục mà không mất event.
+        origins: chỉ nhận thay đổi do các node này cấp seq (thao tác ghi mà node đó làm primary).
+        on_response(response): gọi sau khi đã trả hết event của mỗi response, kể cả response chỉ
+        báo vị trí (server gửi định kỳ), nên dùng được để biết stream còn sống.
+        on_disconnect(): gọi mỗi khi kết nối của stream kết thúc ngoài ý muốn (trước khi kết nối lại
+        hoặc ném lỗi); có thể đã có thay đổi không nhận được cho tới khi kết nối lại."""
+        request = demo_pb2.WatchRequest(key=key, prefix=prefix, since=since or {}, keys_only=keys_only, origins=origins)
+        return WatchStream(self, request, address, on_response, on_disconnect)
+
+    # --- Cache ---
+    def _invalidate(self, keys):
+        if self.cache is not None:
+            for key in keys:
+                self.cache.invalidate(key)
+
+    def _sync_invalidation_streams(self):
+        # Mỗi node trong view có một luồng _invalidation_loop: chạy luồng cho node mới, dừng stream
+        # của node đã rời cụm (luồng kết thúc) hoặc đổi địa chỉ (luồng Watch lại địa chỉ mới).
+        if self.cache is None:
+            return
+        with self._lock:
+            old = self._invalidation_nodes
+            self._invalidation_nodes = dict(self.cluster_config)
+            added = [nid for nid in self._invalidation_nodes if nid not in old]
+            changed = [nid for nid, address in old.items() if self._invalidation_nodes.get(nid) != address]
+            stopped = [self._invalidation_streams.pop(nid) for nid in changed if nid in self._invalidation_streams]
+        if added or changed:
+            # Key có thể đã đổi primary: entry nạp trước đó không còn được tin tuyệt đối.
+            for node_id in set(old) | set(self._invalidation_nodes):
+                self.cache.stream_lost(node_id)
+        for stream in stopped:
+            stream.cancel()
+        for node_id in added:
+            threading.Thread(target=self._invalidation_loop, args=(node_id,), daemon=True).start()
+
+    def _invalidation_loop(self, node_id: str):
+        # Nhận key của các thao tác ghi do node_id cấp seq (các key node_id làm primary) để xóa
+        # khỏi cache. WatchStream tự kết nối lại tới node_id và tiếp tục từ vị trí cũ; trong lúc mất
+        # kết nối, entry của node_id chỉ dùng được trong thời gian fallback của cache.
+        positions = {}
+        while True:
+            with self._lock:
+                address = self._invalidation_nodes.get(node_id)
+                if self._closed or address is None:
+                    return # Client đã đóng hoặc node đã rời cụm
+                stream = self.watch(keys_only=True, since=positions, origins=[node_id], address=address,
+                                    on_response=lambda _: self.cache.stream_alive(node_id),
+                                    on_disconnect=lambda: self.cache.stream_lost(node_id))
+                self._invalidation_streams[node_id] = stream
+            try:
+                for event in stream:
+                    self.cache.invalidate(event.key)
+                positions = stream.positions # Bị dừng do view thay đổi: tiếp tục từ vị trí cũ
+            except grpc.RpcError:
+                # Server không còn đủ lịch sử (OUT_OF_RANGE) hoặc từ chối stream: có thể đã bỏ sót
+                # event, bỏ toàn bộ cache rồi Watch lại từ vị trí hiện tại.
+                self.cache.reset(node_id)
+                positions = {}
+                time.sleep(WATCH_RETRY_SECONDS)
+
+    # --- Health ---
+    def check_health(self, address: str, timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS) -> str:
+        """Trả về status của node (SERVING, ...) hoặc None nếu không kết nối được."""
+        try:
+            response = self.pool.get_stub(address).CheckHealth(demo_pb2.HealthCheckRequest(), timeout=timeout)
+        except grpc.RpcError as e:
+            self._note_error(address, e)
+            return None
+        self.pool.report_success(address)
+        return response.status
+
+    def node_stats(self, address: str):
+        """Số đo của một node (RPC Stats): histogram độ trễ, counter và gauge."""
+        return self._invoke(address, "Stats", demo_pb2.StatsRequest())
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            streams = list(self._invalidation_streams.values())
+        for stream in streams:
+            stream.cancel()
+        self.pool.close_all()
+
+
+class WatchStream:
+    """Iterator WatchEvent của KVClient.watch().
+
+    Khi stream bị ngắt do lỗi định tuyến, kết nối lại (tới node khác nếu không chỉ định address)
+    và tiếp tục từ positions nên không mất event. Ném grpc.RpcError với OUT_OF_RANGE khi server
+    không còn đủ lịch sử để tiếp tục: khi đó đọc lại dữ liệu rồi Watch lại không kèm since.
+    positions: mọi thay đổi có seq <= positions[origin] đã được xét; response_count tăng sau mỗi
+    response nhận được (kể cả response chỉ báo vị trí, gửi định kỳ khi không có thay đổi).
+    """
+
+    def __init__(self, client: KVClient, request, address: str = None, on_response=None, on_disconnect=None):
+        self.client = client
+        self.request = request
+        self.address = address
+        self.on_response = on_response
+        self.on_disconnect = on_disconnect
+        self.positions = dict(request.since)
+        self.response_count = 0
+        self.reconnects = 0
+        self._call = None
+        self._cancelled = False
+
+    def __iter__(self):
+        while not self._cancelled:
+            for target in [self.address] if self.address else self.client._addresses_by_status():
+                request = demo_pb2.WatchRequest()
+                request.CopyFrom(self.request)
+                request.since.update(self.positions)
+                self._call = self.client.pool.get_stub(target).Watch(request)
+                try:
+                    for response in self._call:
+                        self.client.pool.report_success(target)
+                        self.response_count += 1
+                        yield from response.events
+                        self.positions.update(response.positions)
+                        if self.on_response is not None:
+                            self.on_response(response)
+                except grpc.RpcError as e:
+                    if self._cancelled or e.code() == grpc.StatusCode.CANCELLED:
+                        return
+                    self.client._note_error(target, e)
+                    if self.on_disconnect is not None:
+                        self.on_disconnect()
+                    if not is_routing_error(e):
+                        raise
+                    self.reconnects += 1
+                    continue
+                if self._cancelled:
+                    return
+                if self.on_disconnect is not None:
+                    self.on_disconnect() # Server kết thúc stream (ví dụ đang tắt)
+            time.sleep(WATCH_RETRY_SECONDS)
+
+    def cancel(self):
+        """Dừng stream (gọi được từ luồng khác); vòng lặp đang đọc kết thúc bình thường."""
+        self._cancelled = True
+        if self._call is not None:
+            self._call.cancel()
@@ -0,0 +1,86 @@
+# merkle.py
+# Cây băm (Merkle tree) trên không gian hash của key, dùng cho anti-entropy giữa các replica.
+#
+# Cây có hình dạng cố định: 2^depth lá, key thuộc lá theo các bit cao của routing.hash_key(key).
+# Mỗi key đóng góp một digest 128-bit của (key, codec, value như lưu trữ); hash của một nút là XOR digest của mọi
+# key trong phạm vi nút đó. Nhờ XOR, mỗi lần ghi chỉ cần cập nhật depth + 1 nút trên đường từ
+# lá lên gốc. Hai node so sánh gốc, rồi chỉ đi xuống các nhánh khác nhau, nên lưu lượng đồng
+# bộ tỉ lệ với mức độ lệch chứ không phải với kích thước dữ liệu.
+#
+# Nút được đánh số kiểu heap: gốc là 1, con của nút i là 2i và 2i + 1, lá là 2^depth + bucket.
+import hashlib
+
+import routing
+import value_codec
+
+DEFAULT_DEPTH = 10
+
+
+def item_digest(key: str, value) -> int:
+    # Digest của một cặp key-value; key không tồn tại (value None) có digest 0.
+    if value is None:
+        return 0
+    # Băm bản lưu trữ (đã nén) để không phải giải nén; primary nén một lần và replica giữ nguyên
+    # bản đó, nên các node có cùng cấu hình nén cho cùng digest.
+    data = key.encode("utf-8") + b"\0" + bytes((value_codec.codec_of(value),)) + value
+    return int.from_bytes(hashlib.blake2b(data, digest_size=16).digest(), "big")
+
+
+def digest_to_bytes(digest: int) -> bytes:
+    return digest.to_bytes(16, "big") if digest else b""
+
+
+def digest_from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, "big") if data else 0
+
+
+class MerkleTree:
+    """Cây băm cập nhật tăng dần. Không tự khóa; người gọi giữ merkle_lock của server."""
+
+    def __init__(self, depth: int = DEFAULT_DEPTH):
+        self.depth = depth
+        self.leaf_offset = 1 << depth
+        self._nodes = [0] * (2 << depth)
+        self._leaf_digests = {} # chỉ số lá -> {key: digest}
+
+    def leaf_for(self, key: str) -> int:
+        return self.leaf_offset + (routing.hash_key(key) >> (64 - self.depth))
+
+    def update(self, key: str, new_value):
+        """Cập nhật cây khi value của key đổi thành new_value (None = key bị xóa)."""
+        new_digest = item_digest(key, new_value)
+        leaf = self.leaf_for(key)
+        digests = self._leaf_digests.setdefault(leaf, {})
+        old_digest = digests.pop(key, 0)
+        if new_digest:
+            digests[key] = new_digest
+        delta = old_digest ^ new_digest
+        if not delta:
+            return
+        node = leaf
+        while node:
+            self._nodes[node] ^= delta
+            node >>= 1
+
+    def build(self, items):
+        # Dựng lại cây từ đầu từ các cặp (key, value).
+        self._nodes = [0] * (2 << self.depth)
+        self._leaf_digests = {}
+        for key, value in items:
+            self.update(key, value)
+
+    @property
+    def root(self) -> int:
+        return self._nodes[1]
+
+    def node_hashes(self, indices) -> list:
+        return [self._nodes[i] if 0 < i < len(self._nodes) else 0 for i in indices]
+
+    def leaf_digests(self, leaf: int) -> dict:
+        return dict(self._leaf_digests.get(leaf, {}))
+
+    def key_digest(self, key: str) -> int:
+        return self._leaf_digests.get(self.leaf_for(key), {}).get(key, 0)
+
+    def is_leaf(self, index: int) -> bool:
+        return index >= self.leaf_offset
@@ -0,0 +1,186 @@
+# metrics.py
+# Số đo trong tiến trình của node server: histogram độ trễ, counter và gauge.
+#
+# Một Registry giữ mọi series (tên metric + nhãn) và xuất ra hai dạng: collect() cho RPC Stats
+# và render_prometheus() theo định dạng text của Prometheus, phục vụ qua HTTP tại /metrics
+# (start_http_server). Histogram dùng bucket cố định nên observe() chỉ tốn một lần tìm nhị
+# phân và vài phép cộng; phân vị (p50/p99/p999) được nội suy trong bucket khi đọc.
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Biên trên các bucket (giây): cấp số nhân hệ số sqrt(2), từ 50 µs tới ~50 s.
+DEFAULT_BUCKETS = tuple(0.00005 * 2 ** (i / 2) for i in range(41))
+QUANTILES = (0.5, 0.99, 0.999)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1) # Bucket cuối: lớn hơn mọi biên (+Inf)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self):
+        # (số mẫu mỗi bucket, tổng, số mẫu, giá trị lớn nhất) tại một thời điểm nhất quán.
+        with self._lock:
+            return list(self._counts), self._sum, self._count, self._max
+
+    def quantile(self, q: float, snapshot=None) -> float:
+        counts, _, count, max_value = snapshot or self.snapshot()
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for i, n in enumerate(counts):
+            if n and cumulative + n >= rank:
+                if i == len(self.buckets):
+                    return max_value
+                lower = self.buckets[i - 1] if i else 0.0
+                estimate = lower + (self.buckets[i] - lower) * (rank - cumulative) / n
+                return min(estimate, max_value)
+            cumulative += n
+        return max_value
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Registry:
+    """Tập các metric của một tiến trình. Lấy series bằng histogram()/counter() (tạo nếu
+    chưa có); gauge() đăng ký hàm được gọi mỗi lần đọc, trả về một số hoặc list (nhãn, số)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {} # tên -> [loại, mô tả, {nhãn (tuple đã sắp xếp): series}]
+        self._gauges = {} # tên -> (mô tả, hàm)
+
+    def _series(self, kind: str, factory, name: str, help_text: str, labels: dict):
+        label_key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        series = family[2].get(label_key) if family is not None else None
+        if series is not None:
+            return series
+        with self._lock:
+            family = self._families.setdefault(name, [kind, help_text, {}])
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} đã được đăng ký với loại {family[0]}")
+            return family[2].setdefault(label_key, factory())
+
+    def histogram(self, name: str, help_text: str, **labels) -> Histogram:
+        return self._series("histogram", Histogram, name, help_text, labels)
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        return self._series("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, fn):
+        with self._lock:
+            self._gauges[name] = (help_text, fn)
+
+    def collect(self):
+        """Trả về (histograms, counters, gauges). histograms: list (tên, nhãn, snapshot của
+        Histogram, Histogram); counters và gauges: list (tên, nhãn, giá trị). Nhãn là dict."""
+        with self._lock:
+            families = [(name, kind, dict(series)) for name, (kind, _, series) in self._families.items()]
+            gauges = list(self._gauges.items())
+        histograms, counters, gauge_values = [], [], []
+        for name, kind, series in families:
+            for label_key, metric in series.items():
+                if kind == "histogram":
+                    histograms.append((name, dict(label_key), metric.snapshot(), metric))
+                else:
+                    counters.append((name, dict(label_key), metric.value))
+        for name, (_, fn) in gauges:
+            value = fn()
+            if isinstance(value, (list, tuple)):
+                gauge_values.extend((name, dict(labels), v) for labels, v in value)
+            else:
+                gauge_values.append((name, {}, value))
+        return histograms, counters, gauge_values
+
+    def render_prometheus(self) -> str:
+        histograms, counters, gauges = self.collect()
+        with self._lock:
+            helps = {name: (kind, help_text) for name, (kind, help_text, _) in self._families.items()}
+            helps.update({name: ("gauge", help_text) for name, (help_text, _) in self._gauges.items()})
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name not in seen:
+                seen.add(name)
+                kind, help_text = helps[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for name, labels, (counts, total, count, _), metric in sorted(histograms, key=_sort_key):
+            header(name)
+            cumulative = 0
+            for bound, n in zip(metric.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(labels, le=f'{bound:.6g}')} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for name, labels, value in sorted(counters, key=_sort_key) + sorted(gauges, key=_sort_key):
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _sort_key(item):
+    return item[0], sorted(item[1].items())
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def start_http_server(registry: Registry, port: int, host: str = "127.0.0.1"):
+    """Phục vụ registry.render_prometheus() tại http://host:port/metrics trong một luồng nền."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Không in mỗi lần scrape ra log của node
+
+    httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
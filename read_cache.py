@@ -0,0 +1,156 @@
+# read_cache.py
+# Cache đọc phía client cho kv_client.KVClient (bật bằng cache_max_entries > 0).
+#
+# Lưu phản hồi GetKey (kể cả "không tìm thấy") theo LRU, giới hạn theo số entry và tổng số byte
+# key/value. Entry bị xóa khi client nhận event của key qua stream Watch tới primary của key
+# (invalidate), khi chính client ghi key đó, hoặc khi key tới thời điểm hết hạn (expires_at).
+#
+# Entry chỉ được tin tuyệt đối khi stream Watch của primary đang sống (có response trong
+# liveness_seconds; server gửi response báo vị trí định kỳ khi không có thay đổi) và entry được
+# nạp sau khi kết nối hiện tại của stream bắt đầu. Ngoài ra (stream chưa kết nối, bị ngắt:
+# stream_lost()) entry chỉ dùng được trong fallback_ttl_seconds kể từ lúc nạp. Stream kết nối lại tiếp tục từ vị trí cũ nên không bỏ sót
+# event; nếu server không còn đủ lịch sử, client xóa toàn bộ cache (reset).
+#
+# Lần nạp (GET bị miss) bắt đầu bằng begin_fill(): nếu key bị invalidate trong lúc đang đọc từ
+# server, kết quả đọc có thể đã cũ nên finish_fill() bỏ qua, không đưa vào cache.
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_FALLBACK_TTL_SECONDS = 1.0
+DEFAULT_LIVENESS_SECONDS = 12.0 # Lâu hơn chu kỳ response báo vị trí của server (5 giây)
+
+
+class ReadCache:
+    """Cache LRU các phản hồi GetKey. Có thể dùng từ nhiều luồng."""
+
+    def __init__(self, max_entries: int, max_bytes: int = DEFAULT_MAX_BYTES,
+                 fallback_ttl_seconds: float = DEFAULT_FALLBACK_TTL_SECONDS,
+                 liveness_seconds: float = DEFAULT_LIVENESS_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.liveness_seconds = liveness_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # key -> (response, size, filled_at, expires_at, primary_id)
+        self._bytes = 0
+        self._filling = {} # key -> số lần nạp đang chạy
+        self._epochs = {} # key -> số lần bị invalidate trong lúc đang nạp
+        self._stream_started = {} # primary_id -> thời điểm (monotonic) stream Watch hiện tại bắt đầu
+        self._stream_seen = {} # primary_id -> thời điểm nhận response gần nhất
+        self._stats = {"hits": 0, "misses": 0, "fallback_hits": 0, "invalidations": 0, "evictions": 0,
+                       "expired": 0, "stale_fills": 0, "resets": 0}
+
+    def _trusted_locked(self, primary_id: str, filled_at: float, now: float) -> bool:
+        started = self._stream_started.get(primary_id)
+        return (started is not None and filled_at >= started
+                and now - self._stream_seen[primary_id] <= self.liveness_seconds)
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+    def get(self, key: str):
+        """Phản hồi đã cache của key, hoặc None (miss)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            response, _, filled_at, expires_at, primary_id = entry
+            if expires_at and expires_at <= time.time():
+                self._remove_locked(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            if not self._trusted_locked(primary_id, filled_at, now):
+                if now - filled_at >= self.fallback_ttl_seconds:
+                    self._remove_locked(key)
+                    self._stats["expired"] += 1
+                    self._stats["misses"] += 1
+                    return None
+                self._stats["fallback_hits"] += 1
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return response
+
+    def begin_fill(self, key: str) -> tuple:
+        # Gọi trước khi đọc key từ server; truyền kết quả cho finish_fill().
+        with self._lock:
+            self._filling[key] = self._filling.get(key, 0) + 1
+            return self._epochs.get(key, 0), time.monotonic()
+
+    def finish_fill(self, key: str, token: tuple, response, primary_id: str, size: int):
+        # response None: lần đọc lỗi, chỉ hủy đăng ký nạp.
+        epoch, filled_at = token
+        with self._lock:
+            current_epoch = self._epochs.get(key, 0)
+            remaining = self._filling[key] - 1
+            if remaining:
+                self._filling[key] = remaining
+            else:
+                del self._filling[key]
+                self._epochs.pop(key, None)
+            if response is None:
+                return
+            if current_epoch != epoch:
+                self._stats["stale_fills"] += 1
+                return
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (response, size, filled_at, response.expires_at, primary_id)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove_locked(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._filling:
+                self._epochs[key] = self._epochs.get(key, 0) + 1
+            if key in self._entries:
+                self._remove_locked(key)
+                self._stats["invalidations"] += 1
+
+    def stream_alive(self, primary_id: str):
+        # Gọi mỗi khi nhận một response từ stream Watch của primary_id.
+        now = time.monotonic()
+        with self._lock:
+            self._stream_started.setdefault(primary_id, now)
+            self._stream_seen[primary_id] = now
+
+    def stream_lost(self, primary_id: str):
+        """Stream Watch của primary_id bị ngắt (hoặc primary của key có thể đã đổi): entry của nó
+        chỉ dùng được trong fallback_ttl_seconds, kể cả sau khi stream kết nối lại (entry nạp trước
+        lần kết nối lại không được tin tuyệt đối)."""
+        with self._lock:
+            self._stream_started.pop(primary_id, None)
+
+    def reset(self, primary_id: str = None):
+        """Xóa mọi entry (stream Watch phải bắt đầu lại từ đầu nên có thể đã bỏ sót event);
+        với primary_id, stream mới của primary đó phải nhận response đầu tiên trước khi entry
+        nạp sau đó được tin tuyệt đối."""
+        with self._lock:
+            for key in self._filling:
+                self._epochs[key] = self._epochs.get(key, 0) + 1
+            self._entries.clear()
+            self._bytes = 0
+            if primary_id is not None:
+                self._stream_started.pop(primary_id, None)
+            self._stats["resets"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+            result["entries"] = len(self._entries)
+            result["bytes"] = self._bytes
+        lookups = result["hits"] + result["misses"]
+        result["hit_ratio"] = round(result["hits"] / lookups, 4) if lookups else 0.0
+        return result
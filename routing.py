@@ -0,0 +1,104 @@
+# routing.py
+# Consistent-hash ring dùng chung cho server và client để xác định node primary của một key.
+#
+# Mỗi node được đặt tại nhiều điểm (virtual node) trên vòng băm 64-bit; primary của một key
+# là node sở hữu điểm đầu tiên theo chiều kim đồng hồ kể từ hash của key. Khi thêm/bớt một
+# node, chỉ các key nằm trên các đoạn vòng của node đó bị chuyển chủ, thay vì gần như toàn bộ
+# như khi chia lấy dư theo số node.
+#
+# Công cụ dòng lệnh: ước lượng số key bị chuyển khi thay đổi thành viên cụm
+#   python routing.py --nodes node1 node2 node3 --add node4
+#   python routing.py --remove node2 --keys 500000
+import argparse
+import bisect
+import hashlib
+import json
+
+DEFAULT_VNODES = 128
+
+
+def hash_key(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, node_ids, vnodes: int = DEFAULT_VNODES, weights: dict = None):
+        # weights: node_id -> hệ số (mặc định 1.0); node có hệ số 2.0 nhận khoảng gấp đôi số key.
+        self.vnodes = vnodes
+        self.weights = dict(weights or {})
+        self.node_ids = sorted(set(node_ids))
+        points = []
+        for node_id in self.node_ids:
+            count = max(1, round(vnodes * self.weights.get(node_id, 1.0)))
+            for i in range(count):
+                points.append((hash_key(f"{node_id}#{i}"), node_id))
+        points.sort()
+        self._hashes = [h for h, _ in points]
+        self._owners = [n for _, n in points]
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def _index_for(self, key: str) -> int:
+        i = bisect.bisect_right(self._hashes, hash_key(key))
+        return i if i < len(self._hashes) else 0
+
+    def primary_for(self, key: str):
+        if not self._hashes:
+            return None
+        return self._owners[self._index_for(key)]
+
+    def preference_list(self, key: str, count: int) -> list:
+        """Trả về tối đa `count` node khác nhau theo thứ tự trên vòng, bắt đầu từ primary."""
+        result = []
+        if not self._hashes:
+            return result
+        count = min(count, len(self.node_ids))
+        i = self._index_for(key)
+        while len(result) < count:
+            owner = self._owners[i]
+            if owner not in result:
+                result.append(owner)
+            i = (i + 1) % len(self._owners)
+        return result
+
+
+def count_moved_keys(old_ring: HashRing, new_ring: HashRing, keys) -> int:
+    return sum(1 for key in keys if old_ring.primary_for(key) != new_ring.primary_for(key))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ước lượng số key đổi primary khi thay đổi thành viên cụm.")
+    parser.add_argument("--nodes", nargs="+", default=["node1", "node2", "node3"], help="Thành viên hiện tại")
+    parser.add_argument("--add", nargs="*", default=[], help="Các node sẽ thêm vào")
+    parser.add_argument("--remove", nargs="*", default=[], help="Các node sẽ bỏ ra")
+    parser.add_argument("--vnodes", type=int, default=DEFAULT_VNODES)
+    parser.add_argument("--keys", type=int, default=100000, help="Số key mẫu dùng để ước lượng")
+    parser.add_argument("--key-prefix", default="key_")
+    args = parser.parse_args()
+
+    new_nodes = [n for n in args.nodes if n not in args.remove] + [n for n in args.add if n not in args.nodes]
+    if not new_nodes:
+        parser.error("Cụm sau thay đổi không còn node nào.")
+    old_ring = HashRing(args.nodes, vnodes=args.vnodes)
+    new_ring = HashRing(new_nodes, vnodes=args.vnodes)
+    keys = [f"{args.key_prefix}{i}" for i in range(args.keys)]
+
+    moved = count_moved_keys(old_ring, new_ring, keys)
+    distribution = {}
+    for key in keys:
+        owner = new_ring.primary_for(key)
+        distribution[owner] = distribution.get(owner, 0) + 1
+    print(json.dumps({
+        "old_nodes": old_ring.node_ids,
+        "new_nodes": new_ring.node_ids,
+        "vnodes": args.vnodes,
+        "sample_keys": args.keys,
+        "moved_keys": moved,
+        "moved_fraction": round(moved / max(args.keys, 1), 4),
+        "new_distribution": distribution,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
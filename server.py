@@ -1,18 +1,54 @@
 import os
 import sys
 import json
+import hashlib
 import time 
+import math
+import argparse
+import random
+import heapq
+import base64
 import threading 
 from concurrent import futures
 import grpc
 import demo_pb2 
 import demo_pb2_grpc 
+import wal
+import snapshot_format
+import store_engine
+import sqlite_engine
+import bitcask_engine
+import routing
+import changelog
+import merkle
+import metrics
+import hints
+import failure_detector
+import expiry
+import eviction
+import value_codec
+import key_index
+from channel_pool import ChannelPool, SERVER_KEEPALIVE_OPTIONS, COMPRESSION_ALGORITHMS
 
 # --- Cấu hình Node và Cụm ---
 PORT = None
 NODE_ID = None 
-store = {}
-DATA_FILE = None
+# Store theo giao diện store_engine.StorageEngine, chọn bằng STORAGE_ENGINE: "memory" (store chia
+# stripe trong RAM + snapshot nhị phân), "sqlite" (value trên đĩa, sqlite_engine.py) hoặc "bitcask"
+# (value nối vào các file segment, chỉ key directory trong RAM, bitcask_engine.py). Thao tác ghi giữ
+# store.lock_for(key) quanh việc sửa store, phiên bản của key và ghi record vào WAL, để thứ tự
+# trong WAL khớp với thứ tự áp dụng của key đó.
+STORAGE_ENGINE = "memory" # Xem store_engine.ENGINES
+STORE_STRIPES = store_engine.DEFAULT_STRIPES
+store = store_engine.StripedStore()
+DATA_FILE = None # Snapshot nhị phân (data_<node_id>.snap)
+LEGACY_DATA_FILE = None # File JSON cũ (data_<node_id>.json), chỉ đọc khi chưa có snapshot nhị phân
+SQLITE_FILE = None # Database của engine sqlite (data_<node_id>.sqlite)
+SQLITE_BATCH_SIZE = sqlite_engine.DEFAULT_BATCH_SIZE # Số thao tác ghi trong một transaction sqlite
+SQLITE_CACHE_BYTES = sqlite_engine.DEFAULT_CACHE_BYTES
+BITCASK_DIR = None # Thư mục segment của engine bitcask (data_<node_id>.bitcask)
+BITCASK_MAX_SEGMENT_BYTES = bitcask_engine.DEFAULT_MAX_SEGMENT_BYTES
+BITCASK_MERGE_RATIO = bitcask_engine.DEFAULT_MERGE_RATIO
 
 CLUSTER_CONFIG = {
     "node1": "localhost:50051",
@@ -20,52 +56,607 @@ CLUSTER_CONFIG = {
     "node3": "localhost:50053",
 }
 SORTED_NODE_IDS = sorted(CLUSTER_CONFIG.keys())
+# Hệ số trọng số cho từng node trên hash ring (mặc định 1.0). Client phải dùng cùng cấu hình.
+RING_WEIGHTS = {}
+RING = routing.HashRing(CLUSTER_CONFIG.keys(), vnodes=routing.DEFAULT_VNODES, weights=RING_WEIGHTS)
 
 # --- Heartbeat Configuration ---
-HEARTBEAT_INTERVAL_SECONDS = 5 
+HEARTBEAT_INTERVAL_SECONDS = 1
 HEARTBEAT_TIMEOUT_SECONDS = 2  
+# Failure detector: "probe" gửi CheckHealth song song tới mọi peer mỗi chu kỳ; "gossip" mỗi chu
+# kỳ chỉ trao đổi bảng heartbeat với GOSSIP_FANOUT peer ngẫu nhiên (O(N) message mỗi chu kỳ cho
+# cả cụm thay vì O(N²)). Cả hai dùng phi-accrual: peer bị coi là DEAD khi phi >= PHI_THRESHOLD.
+FAILURE_DETECTOR_MODE = "probe"
+PHI_THRESHOLD = failure_detector.DEFAULT_THRESHOLD
+GOSSIP_FANOUT = 1
+peer_detector = failure_detector.PhiAccrualDetector(HEARTBEAT_INTERVAL_SECONDS, acceptable_pause=HEARTBEAT_INTERVAL_SECONDS)
+GOSSIP_GENERATION = int(time.time() * 1000) # Entry của node này trong bảng gossip
+gossip_state = {} # node_id -> (generation, heartbeat) mới nhất đã biết
+gossip_lock = threading.Lock()
 
 peer_status = {}
 peer_status_lock = threading.Lock()
+channel_pool = ChannelPool() # Channel dùng chung cho forward, sao lưu, heartbeat và khôi phục
 # --- Kết thúc Heartbeat ---
 
+# --- Persistence (WAL) Configuration ---
+WAL_FILE = None
+WAL_DURABILITY = "fsync" # "fsync" | "interval" | "os", xem wal.DURABILITY_MODES
+WAL_FSYNC_INTERVAL_SECONDS = 0.05 # Chỉ dùng với chế độ "interval"
+WAL_COMPACT_THRESHOLD_BYTES = 4 * 1024 * 1024 # Kích thước log để kích hoạt compaction thành snapshot
+write_log = None
+# --- Kết thúc Persistence ---
+
+# --- Batch Configuration ---
+FORWARD_TIMEOUT_SECONDS = 5
+BATCH_RESULT_OK = 0
+BATCH_RESULT_NO_QUORUM = 1 # Đã ghi trên primary nhưng chưa đạt write quorum
+BATCH_RESULT_ERROR = 2
+batch_executor = futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="batch")
+# --- Kết thúc Batch ---
+
+# --- Replication Configuration ---
+REPLICATION_TIMEOUT_SECONDS = 5
+# Số bản ghi (tính cả primary) cần xác nhận trước khi trả lời client. None = đa số cụm.
+# Các replica chưa trả lời kịp vẫn tiếp tục được ghi ở nền.
+WRITE_QUORUM = None
+replication_executor = futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="replicate")
+# --- Kết thúc Replication ---
+
+# --- Hinted Handoff Configuration ---
+# Thao tác ghi không gửi được tới một replica được giữ trong hàng đợi hint của replica đó (file
+# hints_<node>_<peer>.log) và phát lại khi replica ALIVE trở lại. Hàng đợi tràn hoặc có hint quá
+# hạn thì replica được yêu cầu đồng bộ lại toàn bộ (RPC Resync).
+HINT_MAX_PER_PEER = hints.DEFAULT_MAX_HINTS
+HINT_MAX_BYTES_PER_PEER = hints.DEFAULT_MAX_BYTES
+HINT_TTL_SECONDS = hints.DEFAULT_TTL_SECONDS
+HINT_REPLAY_BATCH_SIZE = 500
+HINT_REPLAY_TIMEOUT_SECONDS = 10
+hint_queues = {} # peer_id -> hints.HintQueue, tạo trong init_hint_queues()
+hint_executor = futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="hints")
+resync_lock = threading.Lock() # Giữ trong lúc node này đang đồng bộ lại theo yêu cầu Resync
+# --- Kết thúc Hinted Handoff ---
+
 # --- Data Recovery Configuration ---
 INITIAL_RECOVERY_DELAY_SECONDS = 3 # Chờ 1 chút sau khi khởi động trước khi cố gắng khôi phục
+SNAPSHOT_CHUNK_BYTES = 1024 * 1024 # Kích thước tối đa (xấp xỉ) của một chunk snapshot, dưới giới hạn 4 MB của gRPC
+SNAPSHOT_STREAM_TIMEOUT_SECONDS = 300
+CATCHUP_BATCH_SIZE = 5000 # Số thay đổi tối đa trong một phản hồi CatchUp
+CATCHUP_MAX_BYTES = SNAPSHOT_CHUNK_BYTES # Tổng key/value tối đa (xấp xỉ) của một phản hồi CatchUp
+CATCHUP_TIMEOUT_SECONDS = 30
+CHANGE_HISTORY_PER_ORIGIN = changelog.DEFAULT_HISTORY_PER_ORIGIN # Số thay đổi gần nhất giữ cho mỗi origin (CatchUp, Watch)
 # --- Kết thúc Data Recovery ---
 
+# --- Sequence Numbers / Catch-up ---
+# local_seq: seq cuối cùng node này đã cấp khi là primary.
+# applied_seqs: origin -> SeqTracker (watermark các thay đổi đã áp dụng liên tục).
+# key_versions: key -> (origin, seq) của lần ghi gần nhất, để bỏ qua thao tác cũ đến trễ.
+# key_versions và dấu xóa của một key được đọc/ghi khi giữ lock stripe của key; local_seq,
+# applied_seqs, change_history và replica_fresh_at khi giữ state_lock (lấy sau lock stripe).
+state_lock = threading.Lock()
+TOMBSTONE_TTL_SECONDS = 3600
+local_seq = 0
+applied_seqs = {}
+key_versions = {}
+tombstones = changelog.TombstoneSet(TOMBSTONE_TTL_SECONDS)
+change_history = changelog.ChangeHistory(CHANGE_HISTORY_PER_ORIGIN)
+# snapshot_touched_keys: mỗi snapshot đang nhận giữ một tập các key được ghi qua _apply_locked
+# trong lúc nhận, để không ghi đè/xóa chúng bằng dữ liệu cũ hơn của nguồn. Danh sách chỉ thay đổi
+# khi giữ mọi stripe (store.lock_all()).
+snapshot_touched_keys = []
+# replica_fresh_at: origin -> thời điểm (đồng hồ cục bộ) gần nhất mà node này chắc chắn đã có mọi
+# thao tác ghi của origin, xác nhận qua heartbeat. Dùng để tính độ cũ khi đọc từ replica.
+replica_fresh_at = {}
+# --- Kết thúc Sequence Numbers ---
+
+# --- TTL ---
+# key_expiry: key -> thời điểm hết hạn (Unix, giây) của các key có TTL, đọc/ghi khi giữ lock stripe
+# của key. expiry_wheel chỉ chứa key của key_expiry; luồng expiry_worker quay wheel mỗi tick và xóa
+# các key tới hạn. Thao tác đọc tự kiểm tra thời điểm hết hạn nên không bao giờ trả về key đã hết
+# hạn, kể cả khi wheel chưa kịp xóa.
+TTL_TICK_SECONDS = expiry.DEFAULT_TICK_SECONDS
+key_expiry = {}
+expiry_wheel = expiry.TimingWheel(TTL_TICK_SECONDS)
+# --- Kết thúc TTL ---
+
+# --- Eviction (chế độ cache) ---
+# Khi tổng số byte key/value trong store (store.data_bytes()) vượt MAX_MEMORY_BYTES, node xóa bớt
+# các key mà nó là primary theo chính sách LRU/LFU và sao lưu thao tác xóa đó như một DeleteKey
+# có seq, nên replica xóa đúng các key primary đã chọn. eviction_policy chỉ chứa key có primary
+# là node này và chỉ được tạo khi bật ngân sách bộ nhớ.
+MAX_MEMORY_BYTES = 0 # 0 = không giới hạn
+EVICTION_POLICY = "lru" # Xem eviction.POLICIES
+EVICTION_BATCH_SIZE = 100 # Số key tối đa xóa (và sao lưu) trong một lô
+EVICTION_ROUND_INTERVAL_SECONDS = 0.05 # Chờ thao tác xóa của các primary khác trước lượt kế tiếp
+eviction_policy = None
+eviction_needed = threading.Event()
+# --- Kết thúc Eviction ---
+
+# --- Nén value ---
+# Value là bytes. Primary nén value lớn (value_codec) một lần khi nhận PutKey/MultiPut; bản nén
+# cùng mã codec được sao lưu, ghi WAL/snapshot/hint và tính vào ngân sách bộ nhớ nguyên vẹn, chỉ
+# được giải nén khi trả về cho client. Các node nên dùng cùng cấu hình để anti-entropy (so sánh
+# digest của bản lưu trữ) không coi bản nén khác cấu hình là lệch.
+VALUE_CODEC = value_codec.DEFAULT_CODEC # "none" | "zlib" | "lzma"
+COMPRESSION_LEVEL = value_codec.DEFAULT_LEVEL
+COMPRESSION_MIN_BYTES = value_codec.DEFAULT_MIN_BYTES
+GRPC_COMPRESSION = "none" # Nén message gRPC giữa các node và trả về client, xem COMPRESSION_ALGORITHMS
+KEY_NOT_FOUND_VALUE = b"<KEY_NOT_FOUND>"
+# --- Kết thúc Nén value ---
+
+# --- Scan ---
+# Mỗi node giữ chỉ mục có thứ tự (key_index.KeyIndex) của các key trong store cục bộ, tách theo
+# primary của key để Scan con chỉ duyệt đúng phần của primary. Chỉ mục được dựng trong nền sau
+# khi nạp store (build_key_indexes) và từ đó cập nhật trên mỗi thao tác ghi vào store.
+SCAN_CHUNK_ENTRIES = 100 # Số entry tối đa trong một ScanChunk
+SCAN_TIMEOUT_SECONDS = 300 # Thời hạn của stream Scan con tới một primary
+key_indexes = None # primary_id -> KeyIndex; None khi chưa dựng xong
+# --- Kết thúc Scan ---
+
+# --- Watch ---
+# Stream Watch đọc các thay đổi từ change_history (lịch sử có giới hạn của từng origin, như
+# CatchUp) theo thứ tự seq, mỗi stream chỉ giữ vị trí đã xét tới của từng origin. Watcher chậm
+# (client đọc chậm nên gRPC ngừng kéo response) không làm tăng bộ nhớ của server; nếu tụt lại
+# quá phần lịch sử còn giữ, stream kết thúc với OUT_OF_RANGE và client phải đọc lại dữ liệu.
+# Key hết TTL (xóa độc lập trên mỗi node, không cấp seq) không tạo event: event PUT đã mang expires_at.
+WATCH_BATCH_EVENTS = 256 # Số thay đổi tối đa xét cho mỗi origin trong một WatchResponse
+WATCH_PROGRESS_SECONDS = 5 # Gửi response không có event (báo vị trí, giữ kết nối) sau chừng này giây
+WATCH_MAX_STREAMS = 64 # Số stream Watch đồng thời tối đa của node
+watch_cond = threading.Condition() # Báo cho các stream Watch khi watermark của một origin tiến lên
+watch_version = 0
+watch_streams = 0
+watch_listeners = [] # Callback gọi mỗi khi có thay đổi mới (aio_server.py đánh thức event loop)
+# --- Kết thúc Watch ---
+
+# --- Anti-entropy ---
+# Cây Merkle được dựng khi luồng anti-entropy bắt đầu (sau khi khôi phục xong) và từ đó được
+# cập nhật trên mỗi thao tác ghi vào store. Đọc/ghi khi giữ merkle_lock.
+ANTI_ENTROPY_INTERVAL_SECONDS = 30 # 0 = tắt
+ANTI_ENTROPY_TIMEOUT_SECONDS = 10
+MERKLE_DEPTH = merkle.DEFAULT_DEPTH
+merkle_tree = None
+merkle_lock = threading.Lock()
+recovery_done = threading.Event()
+# --- Kết thúc Anti-entropy ---
+
+# --- Metrics ---
+METRICS_PORT = 0 # Cổng HTTP (chỉ nghe trên 127.0.0.1) phục vụ /metrics dạng Prometheus; 0 = tắt
+metrics_registry = metrics.Registry()
+# Tên -> executor có hàng đợi cần theo dõi; serve() thêm executor của gRPC server.
+executors = {"batch": batch_executor, "replicate": replication_executor, "hints": hint_executor}
+wal_wait_histogram = metrics_registry.histogram(
+    "kv_wal_wait_seconds", "Thời gian thao tác ghi chờ WAL ghi bền vững, gồm cả lúc chờ nhóm ghi trước")
+wal_flush_histogram = metrics_registry.histogram(
+    "kv_wal_flush_seconds", "Thời gian ghi một nhóm record xuống WAL (write + fsync nếu durability=fsync)")
+wal_records_counter = metrics_registry.counter("kv_wal_records_total", "Số record đã ghi xuống WAL")
+wal_flushes_counter = metrics_registry.counter("kv_wal_flushes_total", "Số lần ghi nhóm xuống WAL")
+snapshot_save_histogram = metrics_registry.histogram(
+    "kv_snapshot_save_seconds", "Thời gian ghi snapshot toàn bộ store (compaction, sau khôi phục)")
+expired_keys_counter = metrics_registry.counter("kv_expired_keys_total", "Số key đã bị xóa do hết TTL")
+read_hits_counter = metrics_registry.counter("kv_reads_total", "Số lần đọc key cục bộ theo kết quả", result="hit")
+read_misses_counter = metrics_registry.counter("kv_reads_total", "Số lần đọc key cục bộ theo kết quả", result="miss")
+value_raw_bytes_counter = metrics_registry.counter(
+    "kv_put_value_bytes_total", "Số byte value ghi trên primary, trước và sau khi nén", form="raw")
+value_stored_bytes_counter = metrics_registry.counter(
+    "kv_put_value_bytes_total", "Số byte value ghi trên primary, trước và sau khi nén", form="stored")
+scan_entries_counter = metrics_registry.counter("kv_scan_entries_total", "Số key đã trả về cho client qua Scan")
+watch_events_counter = metrics_registry.counter("kv_watch_events_total", "Số event đã gửi cho client qua Watch")
+# --- Kết thúc Metrics ---
+
 
 def load_store():
-    global store
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            try:
-                store = json.load(f)
-                print(f"[INFO] Node {NODE_ID} ({PORT}): Dữ liệu được nạp từ {DATA_FILE}")
-            except json.JSONDecodeError:
-                print(f"[ERROR] Node {NODE_ID} ({PORT}): Lỗi đọc file {DATA_FILE}. Khởi tạo store rỗng.")
-                store = {}
+    # Mở store theo STORAGE_ENGINE rồi áp dụng lại phần đuôi log (WAL_FILE) ghi sau lần checkpoint cuối.
+    # Engine memory mở snapshot (DATA_FILE) bằng mmap, value chỉ được đọc khi có request truy cập;
+    # engine sqlite mở database có sẵn, engine bitcask dựng key directory từ các file hint. Không
+    # engine nào phải đọc toàn bộ value khi khởi động.
+    global store, write_log
+    if STORAGE_ENGINE in ("sqlite", "bitcask"):
+        store = open_disk_store()
+    elif os.path.exists(DATA_FILE):
+        try:
+            reader = snapshot_format.SnapshotReader(DATA_FILE)
+            store = store_engine.StripedStore(reader, STORE_STRIPES, path=DATA_FILE)
+            restore_seq_state(reader.meta)
+            print(f"[INFO] Node {NODE_ID} ({PORT}): Mở snapshot {DATA_FILE} ({len(reader)} keys, seq cục bộ {local_seq}).")
+        except (OSError, snapshot_format.SnapshotCorruptError) as e:
+            print(f"[ERROR] Node {NODE_ID} ({PORT}): Lỗi đọc file {DATA_FILE}: {e}. Khởi tạo store rỗng.")
+            store = store_engine.StripedStore(stripes=STORE_STRIPES, path=DATA_FILE)
+    elif os.path.exists(LEGACY_DATA_FILE):
+        try:
+            store = store_engine.StripedStore(snapshot_format.load_json_store(LEGACY_DATA_FILE), STORE_STRIPES, path=DATA_FILE)
+            print(f"[INFO] Node {NODE_ID} ({PORT}): Dữ liệu được nạp từ file JSON cũ {LEGACY_DATA_FILE}")
+        except json.JSONDecodeError:
+            print(f"[ERROR] Node {NODE_ID} ({PORT}): Lỗi đọc file {LEGACY_DATA_FILE}. Khởi tạo store rỗng.")
+            store = store_engine.StripedStore(stripes=STORE_STRIPES, path=DATA_FILE)
     else:
-        store = {}
+        store = store_engine.StripedStore(stripes=STORE_STRIPES, path=DATA_FILE)
         print(f"[INFO] Node {NODE_ID} ({PORT}): Không tìm thấy {DATA_FILE}, khởi tạo store rỗng.")
+    for engine, path in (("sqlite", SQLITE_FILE), ("bitcask", BITCASK_DIR)):
+        if STORAGE_ENGINE != engine and os.path.exists(path):
+            print(f"[WARN] Node {NODE_ID} ({PORT}): Bỏ qua {path} (engine {STORAGE_ENGINE} không đọc dữ liệu của engine {engine}).")
+
+    write_log = wal.WriteAheadLog(WAL_FILE, durability=WAL_DURABILITY,
+                                  fsync_interval=WAL_FSYNC_INTERVAL_SECONDS,
+                                  compact_threshold_bytes=WAL_COMPACT_THRESHOLD_BYTES,
+                                  snapshot_fn=save_store, flush_observer=observe_wal_flush)
+    records = write_log.replay()
+    with store.lock_all():
+        for op, key, value, origin, seq, expires_at in records:
+            _apply_locked(key, value if op == wal.OP_PUT else None, origin, seq, expires_at, log=False)
+        with state_lock:
+            _sync_local_seq_locked()
+    if records:
+        print(f"[INFO] Node {NODE_ID} ({PORT}): Đã áp dụng lại {len(records)} thao tác từ {WAL_FILE}")
+    write_log.open()
+
+def open_disk_store():
+    # Engine sqlite/bitcask. Lần đầu chuyển sang engine này: chép snapshot nhị phân sẵn có (nếu có)
+    # vào store mới để phần đuôi WAL phát lại sau đó vẫn áp dụng lên đúng trạng thái.
+    if STORAGE_ENGINE == "sqlite":
+        path = SQLITE_FILE
+        fresh = not os.path.exists(path)
+        disk_store = sqlite_engine.SqliteStore(path, STORE_STRIPES, batch_size=SQLITE_BATCH_SIZE,
+                                               cache_bytes=SQLITE_CACHE_BYTES)
+    else:
+        path = BITCASK_DIR
+        fresh = not os.path.exists(path)
+        disk_store = bitcask_engine.BitcaskStore(path, STORE_STRIPES, max_segment_bytes=BITCASK_MAX_SEGMENT_BYTES,
+                                                 merge_ratio=BITCASK_MERGE_RATIO)
+    if fresh and os.path.exists(DATA_FILE):
+        reader = snapshot_format.SnapshotReader(DATA_FILE)
+        for key, value in reader.items():
+            disk_store[key] = value
+        disk_store.checkpoint(lambda: reader.meta)
+        print(f"[INFO] Node {NODE_ID} ({PORT}): Đã chép snapshot {DATA_FILE} ({len(reader)} keys) sang {path}.")
+        reader.close()
+    restore_seq_state(disk_store.meta)
+    print(f"[INFO] Node {NODE_ID} ({PORT}): Mở store {STORAGE_ENGINE} {path} ({len(disk_store)} keys, seq cục bộ {local_seq}).")
+    return disk_store
 
 def save_store():
-    # Thêm lock nếu có nhiều luồng cùng lúc gọi save_store,
-    # nhưng hiện tại save_store chủ yếu được gọi từ luồng chính của RPC handler.
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(store, f, ensure_ascii=False, indent=2)
-    # print(f"[DEBUG] Node {NODE_ID}: Dữ liệu đã lưu vào {DATA_FILE}")
+    # Ghi bền vững toàn bộ store cùng seq/dấu xóa/TTL (dùng khi compaction WAL và sau khi khôi phục).
+    # Engine memory ghi snapshot nhị phân từ một view copy-on-write (ghi ra file tạm rồi rename),
+    # engine sqlite commit transaction đang mở, engine bitcask fsync segment đang ghi; mọi stripe
+    # chỉ bị giữ trong lúc lấy meta.
+    started = time.perf_counter()
+    store.checkpoint(checkpoint_meta)
+    snapshot_save_histogram.observe(time.perf_counter() - started)
+    # print(f"[DEBUG] Node {NODE_ID}: Snapshot đã lưu vào {DATA_FILE}")
+
+def checkpoint_meta() -> dict:
+    # Gọi bởi store.checkpoint() khi đang giữ mọi stripe.
+    with state_lock:
+        tombstones.purge(time.time())
+        return {"node_id": NODE_ID, "created_at": time.time(), "local_seq": local_seq,
+                "applied_seqs": {origin: t.watermark for origin, t in applied_seqs.items()},
+                "tombstones": tombstones.to_dict(), "expires": dict(key_expiry)}
+
+def restore_seq_state(meta: dict):
+    global local_seq, applied_seqs
+    local_seq = meta.get("local_seq", 0)
+    applied_seqs = {origin: changelog.SeqTracker(w) for origin, w in meta.get("applied_seqs", {}).items()}
+    tombstones.load(meta.get("tombstones", {}))
+    for key, expires_at in meta.get("expires", {}).items():
+        _set_expiry_locked(key, expires_at)
+
+def _sync_local_seq_locked():
+    # Nếu cụm đã thấy các seq do node này cấp mà node không còn nhớ (ví dụ mất dữ liệu cục bộ),
+    # tiếp tục đánh số sau đó để không cấp trùng seq.
+    global local_seq
+    own_tracker = applied_seqs.get(NODE_ID)
+    if own_tracker is not None:
+        local_seq = max(local_seq, own_tracker.watermark)
+
+def _set_expiry_locked(key: str, expires_at: float):
+    if expires_at:
+        key_expiry[key] = expires_at
+        expiry_wheel.schedule(key, expires_at)
+    elif key_expiry.pop(key, None) is not None:
+        expiry_wheel.cancel(key)
+
+def compress_value(raw: bytes) -> bytes:
+    # Bản lưu trữ của value client gửi tới primary (bytes thường hoặc bản nén của value_codec).
+    stored = value_codec.compress(raw, value_codec.CODECS[VALUE_CODEC], COMPRESSION_LEVEL, COMPRESSION_MIN_BYTES)
+    value_raw_bytes_counter.inc(len(raw))
+    value_stored_bytes_counter.inc(len(stored))
+    return stored
+
+def _store_set_locked(key: str, value: bytes, expires_at: float = 0):
+    store[key] = value
+    _set_expiry_locked(key, expires_at)
+    if eviction_policy is not None:
+        if RING.primary_for(key) == NODE_ID:
+            eviction_policy.insert(key)
+        if store.data_bytes() > MAX_MEMORY_BYTES:
+            eviction_needed.set()
+    if key_indexes is not None:
+        key_indexes[RING.primary_for(key)].add(key)
+    if merkle_tree is not None:
+        with merkle_lock:
+            merkle_tree.update(key, value)
+
+def _store_delete_locked(key: str):
+    store.pop(key, None)
+    _set_expiry_locked(key, 0)
+    if eviction_policy is not None:
+        eviction_policy.remove(key)
+    if key_indexes is not None:
+        key_indexes[RING.primary_for(key)].discard(key)
+    if merkle_tree is not None:
+        with merkle_lock:
+            merkle_tree.update(key, None)
+
+def _live_get_locked(key: str, now: float = None):
+    # (value, expires_at) của key khi đang giữ lock stripe; value None nếu key không tồn tại hoặc đã hết hạn.
+    value = store.get(key)
+    expires_at = key_expiry.get(key, 0)
+    if value is None or expiry.is_expired(expires_at, now):
+        return None, 0
+    return value, expires_at
+
+def live_get(key: str):
+    with store.lock_for(key):
+        return _live_get_locked(key)
+
+def read_key(key: str):
+    # Đọc phục vụ client (GetKey/MultiGet cục bộ): như live_get, kèm đếm hit/miss và ghi nhận
+    # lần truy cập cho chính sách eviction.
+    value, expires_at = live_get(key)
+    if value is None:
+        read_misses_counter.inc()
+    else:
+        read_hits_counter.inc()
+        if eviction_policy is not None:
+            eviction_policy.access(key)
+    return value, expires_at
+
+def raw_key_result(key: str):
+    # KeyResult của MultiGet với raw (giữa các node): bản lưu trữ kèm codec, không tính là lần đọc
+    # của client (không đếm hit/miss, không ghi nhận truy cập cho eviction).
+    value, expires_at = live_get(key)
+    return demo_pb2.KeyResult(key=key, code=BATCH_RESULT_OK, found=value is not None, value=value or b"",
+                              expires_at=expires_at, codec=value_codec.codec_of(value))
+
+def _apply_locked(key: str, value, origin: str, seq: int, expires_at: float = 0, log: bool = True) -> int:
+    # Áp dụng một thay đổi (value None = xóa) khi đang giữ store.lock_for(key). origin rỗng nghĩa là
+    # thay đổi không kèm phiên bản (từ node chạy phiên bản cũ). Trả về ticket WAL (0 nếu bỏ qua).
+    if origin and seq:
+        with state_lock:
+            tracker = applied_seqs.get(origin)
+            if tracker is None:
+                tracker = applied_seqs[origin] = changelog.SeqTracker()
+            watermark = tracker.watermark
+            if not tracker.observe(seq):
+                return 0 # Đã áp dụng trước đó
+            change_history.append(origin, seq, key, value, expires_at)
+        if watch_streams and tracker.watermark != watermark:
+            notify_watchers()
+        current = key_versions.get(key) or tombstones.get(key)
+        if current is not None and current[0] == origin and current[1] > seq:
+            return 0 # Thao tác cũ đến trễ, đã có phiên bản mới hơn
+    else:
+        origin, seq = None, 0
+    for touched in snapshot_touched_keys:
+        touched.add(key)
+    if value is not None and expiry.is_expired(expires_at):
+        # PUT đã hết hạn khi tới nơi (phát lại từ WAL, hint, catch-up): tương đương xóa ở phiên bản đó.
+        value = None
+    if value is None:
+        _store_delete_locked(key)
+        key_versions.pop(key, None)
+        if origin:
+            tombstones.add(key, origin, seq, time.time())
+        return write_log.submit(wal.OP_DELETE, key, None, origin, seq) if log else 0
+    _store_set_locked(key, value, expires_at)
+    tombstones.discard(key)
+    if origin:
+        key_versions[key] = (origin, seq)
+    return write_log.submit(wal.OP_PUT, key, value, origin, seq, expires_at) if log else 0
+
+def expire_keys(now: float) -> int:
+    """Xóa các key đã tới hạn theo expiry_wheel. Key hết hạn được xóa độc lập trên mỗi node (thời
+    điểm hết hạn đã được sao lưu cùng value) nên không cấp seq, không sao lưu và không ghi WAL:
+    khi phát lại WAL, PUT đã hết hạn tự được coi là xóa. Trả về số key đã xóa."""
+    expired = 0
+    for key, expires_at in expiry_wheel.advance(now):
+        with store.lock_for(key):
+            if key_expiry.get(key) != expires_at:
+                continue # Key đã được ghi lại với TTL khác
+            _store_delete_locked(key)
+            version = key_versions.pop(key, None)
+            if version is not None:
+                # Giữ dấu xóa như với DeleteKey để thao tác ghi cũ hơn đến trễ không làm sống lại key.
+                tombstones.add(key, version[0], version[1], now)
+            expired += 1
+    if expired:
+        expired_keys_counter.inc(expired)
+    return expired
+
+def init_eviction():
+    # Gọi sau load_store(): đưa các key hiện có mà node này là primary vào chính sách eviction.
+    global eviction_policy
+    if not MAX_MEMORY_BYTES:
+        return
+    with store.lock_all():
+        policy = eviction_policy = eviction_policy_from_store()
+    print(f"[INFO] Node {NODE_ID} ({PORT}): Ngân sách bộ nhớ {MAX_MEMORY_BYTES} bytes ({EVICTION_POLICY}), "
+          f"hiện dùng {store.data_bytes()} bytes, {len(policy)} key có thể bị xóa.")
+    threading.Thread(target=eviction_worker, daemon=True).start()
+
+def eviction_policy_from_store():
+    # Chính sách eviction chứa các key hiện có mà node này là primary. Gọi khi đang giữ store.lock_all().
+    policy = eviction.make_policy(EVICTION_POLICY)
+    for key in store:
+        if RING.primary_for(key) == NODE_ID:
+            policy.insert(key)
+    return policy
+
+def note_evictions(role: str, count: int):
+    # role: primary (node này chọn key), replica (áp dụng lựa chọn của primary)
+    metrics_registry.counter("kv_evictions_total", "Số key bị xóa do vượt ngân sách bộ nhớ", role=role).inc(count)
+
+def evict_round() -> int:
+    """Một lượt xóa các key ít dùng nhất (theo eviction_policy) mà node này là primary.
+
+    Mọi node giữ đủ bản sao nên cùng thấy store vượt ngân sách gần như cùng lúc; mỗi primary chỉ
+    xóa phần byte vượt tương ứng với tỉ lệ key nó làm primary (tối đa EVICTION_BATCH_SIZE key), rồi
+    chờ thao tác xóa của các primary khác tới trước khi tính lại. Lô được xóa như MultiDelete trên
+    primary (cấp seq, ghi WAL) và sao lưu kèm cờ evicted. Trả về số key đã xóa, -1 nếu node không
+    còn key nào là primary để xóa."""
+    used = store.data_bytes()
+    excess = used - MAX_MEMORY_BYTES
+    if excess <= 0:
+        return 0
+    own, total = len(eviction_policy), len(store)
+    if not own:
+        return -1
+    # Số key cần xóa theo kích thước trung bình (used / total), nhân với tỉ lệ key của node này (own / total).
+    share = math.ceil(excess / (used / total) * own / total)
+    victims = eviction_policy.victims(max(1, min(EVICTION_BATCH_SIZE, share)))
+    deleted = apply_delete_many(victims)
+    keys = [k for k, (f, _) in zip(victims, deleted) if f]
+    seqs = [seq for f, seq in deleted if f]
+    if keys:
+        replica_request = demo_pb2.MultiDeleteRequest(keys=keys, is_replica=True, origin=NODE_ID, seqs=seqs, evicted=True)
+        replicate_write("Evict", f"{len(keys)} keys",
+                        lambda stub: stub.MultiDelete(replica_request, timeout=REPLICATION_TIMEOUT_SECONDS),
+                        [(k, None, seq, 0) for k, seq in zip(keys, seqs)])
+        note_evictions("primary", len(keys))
+    return len(keys)
+
+def eviction_worker():
+    warned = False
+    while True:
+        eviction_needed.wait()
+        eviction_needed.clear()
+        try:
+            evicted = evict_round()
+        except Exception as e:
+            print(f"[ERROR] Node {NODE_ID}: Lỗi khi xóa key vượt ngân sách bộ nhớ: {e}")
+            time.sleep(1)
+            continue
+        if evicted < 0:
+            if not warned:
+                print(f"[WARN] Node {NODE_ID}: Store vượt ngân sách bộ nhớ ({store.data_bytes()}/{MAX_MEMORY_BYTES} bytes) "
+                      f"nhưng node không còn key nào là primary để xóa.")
+                warned = True
+            continue
+        warned = False
+        if evicted and store.data_bytes() > MAX_MEMORY_BYTES:
+            time.sleep(EVICTION_ROUND_INTERVAL_SECONDS)
+            eviction_needed.set()
+
+def expiry_worker():
+    while True:
+        time.sleep(TTL_TICK_SECONDS)
+        try:
+            expire_keys(time.time())
+        except Exception as e:
+            print(f"[ERROR] Node {NODE_ID}: Lỗi khi xóa key hết hạn: {e}")
+
+def wait_durable(ticket: int, first_ticket: int = 0):
+    # Chờ WAL ghi bền vững tới ticket (0 = không có gì để chờ) và ghi nhận thời gian chờ. Thao tác
+    # theo lô truyền thêm ticket đầu tiên của lô: raise wal.WALWriteError nếu có record nào của lô
+    # không ghi được, để không xác nhận thao tác ghi chưa nằm trên đĩa.
+    if not ticket:
+        return
+    started = time.perf_counter()
+    write_log.wait(ticket, first_ticket)
+    wal_wait_histogram.observe(time.perf_counter() - started)
+
+def observe_wal_flush(seconds: float, records: int):
+    wal_flush_histogram.observe(seconds)
+    wal_records_counter.inc(records)
+    wal_flushes_counter.inc()
+
+def _next_seq() -> int:
+    # Gọi khi giữ lock stripe của key: seq của cùng một key tăng theo thứ tự áp dụng. Seq của các
+    # key khác stripe có thể được áp dụng lệch thứ tự, SeqTracker xử lý như với sao lưu song song.
+    global local_seq
+    with state_lock:
+        local_seq += 1
+        return local_seq
+
+def apply_put(key: str, value: bytes, expires_at: float = 0) -> int:
+    # Ghi trên primary: cấp seq mới, trả về seq để gửi kèm khi sao lưu.
+    with store.lock_for(key):
+        seq = _next_seq()
+        ticket = _apply_locked(key, value, NODE_ID, seq, expires_at)
+    wait_durable(ticket)
+    return seq
+
+def apply_delete(key: str):
+    # Xóa trên primary. Trả về (key có tồn tại không, seq); không cấp seq nếu key không tồn tại.
+    with store.lock_for(key):
+        if _live_get_locked(key)[0] is None:
+            return False, 0
+        seq = _next_seq()
+        ticket = _apply_locked(key, None, NODE_ID, seq)
+    wait_durable(ticket)
+    return True, seq
+
+def apply_put_many(entries) -> list:
+    # Ghi nhiều cặp key-value trên primary, chỉ chờ WAL một lần cho cả lô. Trả về list seq.
+    seqs = []
+    ticket = first_ticket = 0
+    for key, value in entries:
+        with store.lock_for(key):
+            seq = _next_seq()
+            ticket = _apply_locked(key, value, NODE_ID, seq) or ticket
+            first_ticket = first_ticket or ticket
+        seqs.append(seq)
+    wait_durable(ticket, first_ticket)
+    return seqs
+
+def apply_delete_many(keys) -> list:
+    # Trả về list (key có tồn tại không, seq) theo thứ tự keys.
+    results = []
+    ticket = first_ticket = 0
+    for key in keys:
+        with store.lock_for(key):
+            if _live_get_locked(key)[0] is not None:
+                seq = _next_seq()
+                ticket = _apply_locked(key, None, NODE_ID, seq) or ticket
+                first_ticket = first_ticket or ticket
+                results.append((True, seq))
+            else:
+                results.append((False, 0))
+    wait_durable(ticket, first_ticket)
+    return results
+
+def apply_replicated(changes, origin: str):
+    # Áp dụng các thay đổi primary `origin` đã đánh số: changes là list (key, value hoặc None, seq,
+    # expires_at). Trả về list cho biết key có tồn tại trước đó không.
+    note_peer_alive(origin)
+    existed = []
+    ticket = first_ticket = 0
+    for key, value, seq, expires_at in changes:
+        with store.lock_for(key):
+            existed.append(_live_get_locked(key)[0] is not None)
+            ticket = _apply_locked(key, value, origin, seq, expires_at) or ticket
+            first_ticket = first_ticket or ticket
+    with state_lock:
+        _sync_local_seq_locked()
+    wait_durable(ticket, first_ticket)
+    return existed
+
+
+def update_snapshot_checksum(hasher, key: str, value: bytes):
+    # Checksum của snapshot stream: mỗi record là độ dài key + key + codec + độ dài value + value
+    # (bản lưu trữ).
+    key_bytes = key.encode("utf-8")
+    hasher.update(len(key_bytes).to_bytes(4, "little"))
+    hasher.update(key_bytes)
+    hasher.update(bytes((value_codec.codec_of(value),)))
+    hasher.update(len(value).to_bytes(4, "little"))
+    hasher.update(value)
 
 
 def get_primary_node_id_for_key(key: str) -> str:
     if not SORTED_NODE_IDS:
         print("[CRITICAL] CLUSTER_CONFIG không được định nghĩa hoặc rỗng.")
         return None
-    key_hash = 0
-    for char in key:
-        key_hash = (key_hash * 31 + ord(char)) & 0xFFFFFFFF
-    primary_node_index = key_hash % len(SORTED_NODE_IDS)
-    primary_node_id = SORTED_NODE_IDS[primary_node_index]
-    return primary_node_id
+    return RING.primary_for(key)
 
 # --- Heartbeat Functions ---
 def update_peer_status(peer_id, status):
@@ -75,55 +666,649 @@ def update_peer_status(peer_id, status):
         if current_status != status:
             print(f"[HEARTBEAT] Node {NODE_ID}: Trạng thái của peer {peer_id} thay đổi từ {current_status} -> {status}")
             peer_status[peer_id] = status
+    if current_status != status:
+        metrics_registry.counter("kv_peer_status_changes_total", "Số lần trạng thái peer thay đổi",
+                                 peer=peer_id, status=status).inc()
+    if status == "DEAD" and current_status != "DEAD":
+        # Bỏ channel tới peer đã chết, khi peer sống lại sẽ kết nối bằng channel mới.
+        channel_pool.evict(CLUSTER_CONFIG[peer_id])
+    elif status == "ALIVE":
+        maybe_deliver_hints(peer_id)
+
+def note_peer_rpc_error(peer_id: str, e: grpc.RpcError):
+    if e.code() == grpc.StatusCode.UNAVAILABLE:
+        channel_pool.report_failure(CLUSTER_CONFIG[peer_id])
+
+def note_peer_seq(peer_id: str, peer_local_seq: int, checked_at: float):
+    # peer trả lời heartbeat gửi lúc checked_at với seq cuối cùng nó đã cấp. Nếu node này đã áp
+    # dụng tới seq đó thì bản cục bộ của các key do peer làm primary mới ít nhất tới checked_at.
+    with state_lock:
+        tracker = applied_seqs.get(peer_id)
+        watermark = tracker.watermark if tracker is not None else 0
+        if watermark >= peer_local_seq:
+            replica_fresh_at[peer_id] = max(replica_fresh_at.get(peer_id, 0), checked_at)
+
+def staleness_for(primary_id: str):
+    # Độ cũ tối đa (giây) của bản cục bộ các key do primary_id làm primary; None nếu chưa biết.
+    if primary_id == NODE_ID:
+        return 0.0
+    with state_lock:
+        fresh_at = replica_fresh_at.get(primary_id)
+    if fresh_at is None:
+        return None
+    return max(0.0, time.time() - fresh_at)
+
+def local_read(key: str, primary_id: str):
+    value, expires_at = read_key(key)
+    staleness = staleness_for(primary_id)
+    return demo_pb2.Value(value=value_codec.decompress(value) if value is not None else KEY_NOT_FOUND_VALUE, served_by=NODE_ID,
+                          staleness_seconds=staleness if staleness is not None else -1, expires_at=expires_at)
 
-def _send_single_heartbeat(peer_id_to_check: str, peer_address_to_check: str):
+def can_read_locally(request, primary_id: str) -> bool:
+    if primary_id == NODE_ID or request.consistency == demo_pb2.READ_ANY:
+        return True
+    if request.consistency == demo_pb2.READ_BOUNDED_STALENESS:
+        staleness = staleness_for(primary_id)
+        return staleness is not None and staleness <= request.max_staleness_seconds
+    return False
+
+def note_peer_alive(peer_id: str):
+    # Bằng chứng piggyback: peer vừa trả lời hoặc gửi request (sao lưu, heartbeat, gossip) tới node này.
+    if peer_id in CLUSTER_CONFIG and peer_id != NODE_ID:
+        peer_detector.seen(peer_id, time.time())
+
+def note_heartbeat(peer_id: str, status: str = "ALIVE"):
+    peer_detector.heartbeat(peer_id, time.time())
+    update_peer_status(peer_id, status)
+
+def check_suspicion():
+    # Đánh dấu DEAD các peer có phi vượt ngưỡng. Thời gian phát hiện: từ lần cuối nghe thấy peer
+    # tới lúc đánh dấu (chỉ đo với peer đã từng ALIVE).
+    now = time.time()
+    for peer_id in SORTED_NODE_IDS:
+        if peer_id == NODE_ID or peer_detector.is_available(peer_id, now):
+            continue
+        with peer_status_lock:
+            current_status = peer_status.get(peer_id)
+        if current_status == "DEAD":
+            continue
+        last_seen = peer_detector.last_seen(peer_id)
+        if current_status in ("ALIVE", "UNHEALTHY") and last_seen is not None:
+            metrics_registry.histogram("kv_failure_detection_seconds", "Thời gian từ lần cuối nghe thấy peer tới lúc đánh dấu DEAD",
+                                       peer=peer_id).observe(now - last_seen)
+        print(f"[HEARTBEAT] Node {NODE_ID}: Nghi ngờ {peer_id} (phi={peer_detector.phi(peer_id, now):.1f}, "
+              f"không nghe thấy {now - (last_seen or now):.1f}s).")
+        update_peer_status(peer_id, "DEAD")
+
+def _on_probe_done(peer_id: str, address: str, checked_at: float, call):
     try:
-        with grpc.insecure_channel(peer_address_to_check) as channel:
-            stub = demo_pb2_grpc.KeyValueStub(channel)
-            response = stub.CheckHealth(demo_pb2.HealthCheckRequest(), timeout=HEARTBEAT_TIMEOUT_SECONDS)
-            if response.status == "SERVING":
-                update_peer_status(peer_id_to_check, "ALIVE")
-            else:
-                update_peer_status(peer_id_to_check, "UNHEALTHY")
-    except grpc.RpcError:
-        update_peer_status(peer_id_to_check, "DEAD")
-    except Exception: # Bắt các lỗi khác như không resolve được host
-        update_peer_status(peer_id_to_check, "DEAD")
+        response = call.result()
+    except grpc.RpcError as e:
+        note_peer_rpc_error(peer_id, e) # Không kết luận DEAD ngay, để failure detector quyết định
+        return
+    channel_pool.report_success(address)
+    note_peer_seq(peer_id, response.local_seq, checked_at)
+    note_heartbeat(peer_id, "ALIVE" if response.status == "SERVING" else "UNHEALTHY")
+
+def probe_peers():
+    # Gửi CheckHealth tới mọi peer cùng lúc qua channel trong pool, không chờ kết quả: một peer
+    # chậm không làm trễ các peer khác hay chu kỳ heartbeat kế tiếp.
+    request = demo_pb2.HealthCheckRequest(sender_id=NODE_ID)
+    for peer_id in SORTED_NODE_IDS:
+        if peer_id == NODE_ID:
+            continue
+        address = CLUSTER_CONFIG[peer_id]
+        checked_at = time.time()
+        call = channel_pool.get_stub(address).CheckHealth.future(request, timeout=HEARTBEAT_TIMEOUT_SECONDS)
+        call.add_done_callback(lambda f, p=peer_id, a=address, t=checked_at: _on_probe_done(p, a, t, f))
+
+def gossip_message(bump: bool = False) -> demo_pb2.GossipMessage:
+    # Bảng heartbeat hiện tại; bump=True tăng bộ đếm của chính node này (đầu mỗi chu kỳ gossip).
+    with gossip_lock:
+        if bump or NODE_ID not in gossip_state:
+            generation, heartbeat = gossip_state.get(NODE_ID, (GOSSIP_GENERATION, 0))
+            gossip_state[NODE_ID] = (generation, heartbeat + 1)
+        entries = [demo_pb2.GossipEntry(node_id=nid, generation=g, heartbeat=h) for nid, (g, h) in gossip_state.items()]
+    return demo_pb2.GossipMessage(sender_id=NODE_ID, local_seq=local_seq, entries=entries)
+
+def merge_gossip(message):
+    # Node có entry mới hơn bảng cục bộ được coi là vừa gửi một heartbeat (trực tiếp hoặc qua node khác).
+    updated = []
+    with gossip_lock:
+        for entry in message.entries:
+            if entry.node_id == NODE_ID or entry.node_id not in CLUSTER_CONFIG:
+                continue
+            version = (entry.generation, entry.heartbeat)
+            if version > gossip_state.get(entry.node_id, (0, 0)):
+                gossip_state[entry.node_id] = version
+                updated.append(entry.node_id)
+    for peer_id in updated:
+        note_heartbeat(peer_id)
+
+def gossip_targets() -> list:
+    peers = [nid for nid in SORTED_NODE_IDS if nid != NODE_ID]
+    return random.sample(peers, min(GOSSIP_FANOUT, len(peers)))
+
+def _on_gossip_done(peer_id: str, address: str, checked_at: float, call):
+    try:
+        reply = call.result()
+    except grpc.RpcError as e:
+        note_peer_rpc_error(peer_id, e)
+        return
+    channel_pool.report_success(address)
+    note_peer_alive(peer_id)
+    note_peer_seq(peer_id, reply.local_seq, checked_at)
+    merge_gossip(reply)
+
+def gossip_round():
+    request = gossip_message(bump=True)
+    for peer_id in gossip_targets():
+        address = CLUSTER_CONFIG[peer_id]
+        checked_at = time.time()
+        call = channel_pool.get_stub(address).Gossip.future(request, timeout=HEARTBEAT_TIMEOUT_SECONDS)
+        call.add_done_callback(lambda f, p=peer_id, a=address, t=checked_at: _on_gossip_done(p, a, t, f))
+
+def start_failure_detection():
+    now = time.time()
+    for peer_id in SORTED_NODE_IDS:
+        if peer_id != NODE_ID:
+            peer_detector.track(peer_id, now)
 
 def heartbeat_worker():
-    print(f"[INFO] Node {NODE_ID}: Luồng Heartbeat bắt đầu.")
+    print(f"[INFO] Node {NODE_ID}: Luồng Heartbeat bắt đầu ({FAILURE_DETECTOR_MODE}, phi >= {PHI_THRESHOLD} là DEAD).")
     time.sleep(INITIAL_RECOVERY_DELAY_SECONDS / 2) 
+    start_failure_detection()
     while True: 
-        # Tạo bản sao của keys để tránh lỗi "dictionary changed size during iteration"
-        # nếu CLUSTER_CONFIG có thể thay đổi động (hiện tại là không)
-        current_cluster_keys = list(CLUSTER_CONFIG.keys())
-        for peer_id in current_cluster_keys:
-            if peer_id == NODE_ID: 
-                continue
-            peer_address = CLUSTER_CONFIG[peer_id] # Giả sử CLUSTER_CONFIG không thay đổi sau khi worker bắt đầu
-            _send_single_heartbeat(peer_id, peer_address)
+        try:
+            if FAILURE_DETECTOR_MODE == "gossip":
+                gossip_round()
+            else:
+                probe_peers()
+            check_suspicion()
+        except Exception as e:
+            print(f"[ERROR] Node {NODE_ID}: Lỗi trong chu kỳ heartbeat: {e}")
         time.sleep(HEARTBEAT_INTERVAL_SECONDS)
 # --- Kết thúc Heartbeat Functions ---
 
+# --- Replication Functions ---
+def write_quorum() -> int:
+    if WRITE_QUORUM is None:
+        return len(CLUSTER_CONFIG) // 2 + 1
+    return max(1, min(WRITE_QUORUM, len(CLUSTER_CONFIG)))
+
+def _replicate_to_one(replica_id: str, op_name: str, key: str, send_fn, mutations) -> bool:
+    stub = channel_pool.get_stub(CLUSTER_CONFIG[replica_id])
+    try:
+        # print(f"[DEBUG] Node {NODE_ID} (Primary): Gửi {op_name} replica tới {replica_id} cho key '{key}'")
+        send_fn(stub)
+        note_replication(replica_id, "acked")
+        note_peer_alive(replica_id)
+        return True
+    except grpc.RpcError as e:
+        print(f"[WARN] Node {NODE_ID} (Primary): Lỗi RPC khi sao lưu {op_name}('{key}') tới replica {replica_id}: {e.details()}")
+        note_peer_rpc_error(replica_id, e)
+        note_replication(replica_id, "failed")
+        store_hints(replica_id, mutations)
+        return False
+
+def replicate_write(op_name: str, key: str, send_fn, mutations):
+    """Gửi song song thao tác ghi tới các replica đang ALIVE.
+
+    send_fn(stub) thực hiện RPC sao lưu. mutations: list (key, value hoặc None, seq, expires_at) mà RPC
+    mang theo, được giữ làm hint cho replica bị bỏ qua hoặc gửi lỗi. Trả về ngay khi đủ write
+    quorum (hoặc hết REPLICATION_TIMEOUT_SECONDS); các replica chậm vẫn được ghi tiếp ở nền.
+    Kết quả: (số ack tính cả primary, số replica).
+    """
+    replica_node_ids = [nid for nid in SORTED_NODE_IDS if nid != NODE_ID]
+    pending = set()
+    for replica_id in replica_node_ids:
+        with peer_status_lock:
+            status = peer_status.get(replica_id, "UNKNOWN")
+        if status != "ALIVE":
+            print(f"[WARN] Node {NODE_ID} (Primary): Bỏ qua sao lưu {op_name}('{key}') tới replica {replica_id} (trạng thái: {status}).")
+            note_replication(replica_id, "skipped")
+            store_hints(replica_id, mutations)
+            continue
+        pending.add(replication_executor.submit(_replicate_to_one, replica_id, op_name, key, send_fn, mutations))
+
+    acks = 1 # Bản ghi trên chính primary
+    needed = write_quorum()
+    deadline = time.monotonic() + REPLICATION_TIMEOUT_SECONDS
+    while pending and acks < needed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = futures.wait(pending, timeout=remaining, return_when=futures.FIRST_COMPLETED)
+        acks += sum(1 for f in done if f.result())
+    return acks, len(replica_node_ids)
+# --- Kết thúc Replication Functions ---
+
+# --- Hinted Handoff Functions ---
+def init_hint_queues():
+    for peer_id in SORTED_NODE_IDS:
+        if peer_id == NODE_ID:
+            continue
+        queue = hints.HintQueue(f"hints_{NODE_ID}_{peer_id}.log", max_hints=HINT_MAX_PER_PEER,
+                                max_bytes=HINT_MAX_BYTES_PER_PEER, ttl_seconds=HINT_TTL_SECONDS)
+        loaded = queue.load()
+        hint_queues[peer_id] = queue
+        if loaded or queue.needs_resync:
+            print(f"[HINT] Node {NODE_ID}: Nạp {loaded} hint cho {peer_id}"
+                  f"{' (cần đồng bộ lại toàn bộ)' if queue.needs_resync else ''}.")
+
+def note_hints(peer_id: str, event: str, count: int = 1):
+    # event: queued (đã giữ), dropped (bỏ do tràn/quá hạn), delivered (đã phát lại), resync
+    metrics_registry.counter("kv_hints_total", "Số hint theo peer và sự kiện", peer=peer_id, event=event).inc(count)
+
+def store_hints(peer_id: str, mutations):
+    # Giữ các thay đổi (key, value hoặc None, seq, expires_at) do node này đánh số cho replica peer_id.
+    queue = hint_queues.get(peer_id)
+    if queue is None or not mutations:
+        return
+    was_resync = queue.needs_resync
+    now = time.time()
+    kept = 0
+    for key, value, seq, expires_at in mutations:
+        if queue.add(wal.OP_PUT if value is not None else wal.OP_DELETE, key, value, NODE_ID, seq, expires_at, now):
+            kept += 1
+    if kept:
+        note_hints(peer_id, "queued", kept)
+    if kept < len(mutations):
+        note_hints(peer_id, "dropped", len(mutations) - kept)
+    if queue.needs_resync and not was_resync:
+        print(f"[WARN] Node {NODE_ID}: Hàng đợi hint cho {peer_id} vượt giới hạn hoặc quá hạn. "
+              f"{peer_id} sẽ được yêu cầu đồng bộ lại toàn bộ khi ALIVE.")
+
+def maybe_deliver_hints(peer_id: str):
+    queue = hint_queues.get(peer_id)
+    if queue is not None and queue.has_work():
+        hint_executor.submit(deliver_hints, peer_id)
+
+def _send_hint_batch(stub, batch):
+    # Gửi hint theo từng đoạn liên tiếp cùng loại thao tác, dưới dạng lô sao lưu (is_replica)
+    # giữ nguyên origin và seq, nên replica bỏ qua thay đổi đã có hoặc cũ hơn bản hiện tại.
+    start = 0
+    while start < len(batch):
+        op, origin = batch[start][0], batch[start][3]
+        end = start
+        while end < len(batch) and batch[end][0] == op and batch[end][3] == origin:
+            end += 1
+        run = batch[start:end]
+        if op == wal.OP_PUT:
+            request = demo_pb2.MultiPutRequest(entries=[demo_pb2.KeyValuePair(key=h[1], value=h[2], expires_at=h[5],
+                                                                              codec=value_codec.codec_of(h[2])) for h in run],
+                                               is_replica=True, origin=origin, seqs=[h[4] for h in run])
+            stub.MultiPut(request, timeout=HINT_REPLAY_TIMEOUT_SECONDS)
+        else:
+            request = demo_pb2.MultiDeleteRequest(keys=[h[1] for h in run], is_replica=True, origin=origin,
+                                                  seqs=[h[4] for h in run])
+            stub.MultiDelete(request, timeout=HINT_REPLAY_TIMEOUT_SECONDS)
+        start = end
+
+def deliver_hints(peer_id: str):
+    """Phát lại hàng đợi hint của peer_id theo lô (HINT_REPLAY_BATCH_SIZE). Nếu hàng đợi đã mất
+    một phần thay đổi (tràn hoặc quá hạn), yêu cầu peer đồng bộ lại toàn bộ từ node này."""
+    queue = hint_queues[peer_id]
+    if not queue.begin_delivery():
+        return
+    stub = channel_pool.get_stub(CLUSTER_CONFIG[peer_id])
+    delivered = 0
+    try:
+        if queue.expire(time.time()):
+            print(f"[WARN] Node {NODE_ID}: Hint cho {peer_id} đã quá hạn ({HINT_TTL_SECONDS}s).")
+        if queue.needs_resync:
+            queue.clear_resync() # Thay đổi bị bỏ qua từ lúc này lại được giữ làm hint
+            try:
+                response = stub.Resync(demo_pb2.ResyncRequest(source_id=NODE_ID), timeout=HINT_REPLAY_TIMEOUT_SECONDS)
+            except grpc.RpcError:
+                queue.mark_resync()
+                raise
+            note_hints(peer_id, "resync")
+            print(f"[HINT] Node {NODE_ID}: Yêu cầu {peer_id} đồng bộ lại toàn bộ từ node này"
+                  f"{'' if response.accepted else ' (peer đang đồng bộ)'}.")
+        while True:
+            batch = queue.peek(HINT_REPLAY_BATCH_SIZE)
+            if not batch:
+                break
+            _send_hint_batch(stub, batch)
+            queue.remove(len(batch))
+            delivered += len(batch)
+    except grpc.RpcError as e:
+        print(f"[WARN] Node {NODE_ID}: Lỗi RPC khi phát lại hint tới {peer_id}: {e.details()}")
+        note_peer_rpc_error(peer_id, e)
+    finally:
+        queue.end_delivery()
+        if delivered:
+            note_hints(peer_id, "delivered", delivered)
+            print(f"[HINT] Node {NODE_ID}: Đã phát lại {delivered} hint tới {peer_id} ({len(queue)} còn lại).")
+
+def resync_from(source_id: str):
+    # Chạy trong luồng riêng khi nhận Resync; resync_lock đã được giữ bởi handler.
+    try:
+        if not recover_from(source_id):
+            print(f"[WARN] Node {NODE_ID}: Đồng bộ lại từ {source_id} không thành công.")
+    except grpc.RpcError as e:
+        print(f"[WARN] Node {NODE_ID}: Lỗi RPC khi đồng bộ lại từ {source_id}: {e.details()}")
+        note_peer_rpc_error(source_id, e)
+    except Exception as e:
+        print(f"[ERROR] Node {NODE_ID}: Lỗi khi đồng bộ lại từ {source_id}: {e}")
+    finally:
+        resync_lock.release()
+# --- Kết thúc Hinted Handoff Functions ---
+
+# --- Batch Functions ---
+def group_indices_by_primary(keys) -> dict:
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(get_primary_node_id_for_key(key), []).append(i)
+    return groups
+
+def run_batch(op_name: str, keys, forwarded: bool, local_fn, remote_fn) -> list:
+    """Chia lô theo primary: phần của node này gọi local_fn(indices), mỗi primary khác nhận
+    một lô con qua remote_fn(stub, indices), gửi song song. Cả hai trả về list KeyResult
+    theo thứ tự indices. Lỗi của một primary chỉ ảnh hưởng tới các key của primary đó."""
+    results = [None] * len(keys)
+    groups = {NODE_ID: list(range(len(keys)))} if forwarded else group_indices_by_primary(keys)
+
+    remote_calls = {}
+    for primary_id, indices in groups.items():
+        if primary_id == NODE_ID:
+            continue
+        with peer_status_lock:
+            primary_status = peer_status.get(primary_id, "UNKNOWN")
+        if primary_status != "ALIVE" and primary_status != "UNKNOWN":
+            error = f"Primary node {primary_id} ({CLUSTER_CONFIG.get(primary_id)}) không sẵn sàng."
+            for i in indices:
+                results[i] = demo_pb2.KeyResult(key=keys[i], code=BATCH_RESULT_ERROR, error=error)
+            continue
+        stub = channel_pool.get_stub(CLUSTER_CONFIG[primary_id])
+        remote_calls[batch_executor.submit(remote_fn, stub, indices)] = (primary_id, indices)
+
+    local_indices = groups.get(NODE_ID)
+    if local_indices:
+        for i, result in zip(local_indices, local_fn(local_indices)):
+            results[i] = result
+
+    for call, (primary_id, indices) in remote_calls.items():
+        try:
+            sub_results = list(call.result())
+        except grpc.RpcError as e:
+            print(f"[ERROR] Node {NODE_ID}: Lỗi RPC khi forward {op_name} ({len(indices)} keys) đến {primary_id}: {e.details()}")
+            note_peer_rpc_error(primary_id, e)
+            error = f"Lỗi khi chuyển tiếp {op_name} tới {primary_id}: {e.details()}"
+            sub_results = [demo_pb2.KeyResult(key=keys[i], code=BATCH_RESULT_ERROR, error=error) for i in indices]
+        for i, result in zip(indices, sub_results):
+            results[i] = result
+    return results
+
+def _write_result_code(acks: int) -> int:
+    return BATCH_RESULT_OK if acks >= write_quorum() else BATCH_RESULT_NO_QUORUM
+# --- Kết thúc Batch Functions ---
+
+# --- Scan Functions ---
+def build_key_indexes():
+    # Dựng chỉ mục từ mọi key hiện có (chỉ đọc key, không đọc value); giữ mọi stripe để không
+    # bỏ sót thao tác ghi nào trong lúc dựng.
+    global key_indexes
+    started = time.monotonic()
+    with store.lock_all():
+        groups = {node_id: [] for node_id in SORTED_NODE_IDS}
+        for key in store:
+            groups[RING.primary_for(key)].append(key)
+        key_indexes = {node_id: key_index.KeyIndex(keys) for node_id, keys in groups.items()}
+    print(f"[INFO] Node {NODE_ID} ({PORT}): Đã dựng chỉ mục key ({len(store)} keys) trong {time.monotonic() - started:.2f}s.")
+
+def rebuild_store_indexes():
+    # Sau khi toàn bộ nội dung store bị thay (SegmentReceiver): dựng lại các cấu trúc suy ra từ
+    # store thay vì cập nhật theo từng key. Gọi khi đang giữ store.lock_all().
+    global eviction_policy
+    if key_indexes is not None:
+        build_key_indexes()
+    if merkle_tree is not None:
+        with merkle_lock:
+            merkle_tree.build(store.items())
+    if eviction_policy is not None:
+        eviction_policy = eviction_policy_from_store()
+
+def encode_page_token(last_key: str) -> str:
+    return base64.urlsafe_b64encode(last_key.encode("utf-8")).decode("ascii")
+
+def decode_page_token(token: str) -> str:
+    # Key cuối cùng của trang trước; ValueError nếu token không hợp lệ.
+    return base64.b64decode(token.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+
+def scan_local(request, primary_ids, after):
+    """Các (key, value lưu trữ, expires_at) còn sống, tăng dần theo key, trong chỉ mục của
+    primary_ids thỏa điều kiện của request. after là key cuối của trang trước (hoặc None)."""
+    lower, inclusive = max(request.start, request.prefix), True
+    if after is not None and after >= lower:
+        lower, inclusive = after, False
+    upper = request.end or None
+    for key in heapq.merge(*(key_indexes[p].iter_range(lower, inclusive, upper) for p in primary_ids)):
+        if not key.startswith(request.prefix):
+            return # Các key có cùng prefix nằm liền nhau, đã qua hết
+        value, expires_at = live_get(key)
+        if value is not None:
+            yield key, value, expires_at
+
+def scan_remote(primary_id: str, request):
+    # Stream Scan con tới primary_id; hủy RPC khi generator được đóng (đã đủ key hoặc client ngừng đọc).
+    sub_request = demo_pb2.ScanRequest()
+    sub_request.CopyFrom(request)
+    sub_request.forwarded = True
+    if request.limit:
+        sub_request.limit = request.limit + 1 # Thêm một key để biết còn trang sau hay không
+    call = channel_pool.get_stub(CLUSTER_CONFIG[primary_id]).Scan(sub_request, timeout=SCAN_TIMEOUT_SECONDS)
+    try:
+        for chunk in call:
+            for entry in chunk.entries:
+                yield entry.key, value_codec.wrap(entry.codec, entry.value), entry.expires_at
+    except grpc.RpcError as e:
+        if e.code() != grpc.StatusCode.CANCELLED:
+            print(f"[ERROR] Node {NODE_ID}: Lỗi RPC trong Scan con tới {primary_id}: {e.details()}")
+            note_peer_rpc_error(primary_id, e)
+        raise
+    finally:
+        call.cancel()
+# --- Kết thúc Scan Functions ---
+
+# --- Watch Functions ---
+class WatchTruncated(Exception):
+    """Lịch sử thay đổi của một origin không còn đủ để tiếp tục stream Watch."""
+
+class WatchCursor:
+    """Vị trí của một stream Watch: mọi thay đổi có seq <= positions[origin] đã được xét."""
+
+    def __init__(self, request):
+        self.key = request.key
+        self.prefix = request.prefix
+        self.keys_only = request.keys_only
+        self.origins = set(request.origins)
+        self.caught_up = False # Đã xét hết các thay đổi tới watermark hiện tại
+        self.last_sent = float("-inf") # Response đầu tiên (vị trí bắt đầu) được gửi ngay
+        with state_lock:
+            self.positions = {origin: t.watermark for origin, t in applied_seqs.items()}
+        self.positions.update(request.since)
+
+    def matches(self, key: str) -> bool:
+        return key == self.key if self.key else key.startswith(self.prefix)
+
+    def poll(self):
+        """WatchResponse tiếp theo (event mới, hoặc chỉ vị trí nếu đã WATCH_PROGRESS_SECONDS chưa
+        gửi gì), hoặc None nếu chưa cần gửi. Ném WatchTruncated."""
+        changes = []
+        self.caught_up = True
+        with state_lock:
+            for origin, tracker in applied_seqs.items():
+                if self.origins and origin not in self.origins:
+                    continue
+                after = self.positions.get(origin, 0) # Origin mới xuất hiện: mọi seq của nó đều mới
+                up_to = min(tracker.watermark, after + WATCH_BATCH_EVENTS)
+                if up_to <= after:
+                    continue
+                history = change_history.changes_between(origin, after, up_to)
+                if history is None:
+                    raise WatchTruncated(origin)
+                changes.extend((origin, entry) for entry in history if self.matches(entry[1]))
+                self.positions[origin] = up_to
+                if up_to < tracker.watermark:
+                    self.caught_up = False
+        if not changes and time.monotonic() - self.last_sent < WATCH_PROGRESS_SECONDS:
+            return None
+        events = []
+        for origin, (seq, key, value, expires_at) in changes:
+            if value is None:
+                events.append(demo_pb2.WatchEvent(type=demo_pb2.WatchEvent.DELETE, key=key, origin=origin, seq=seq))
+            else:
+                events.append(demo_pb2.WatchEvent(type=demo_pb2.WatchEvent.PUT, key=key, expires_at=expires_at,
+                                                  value=b"" if self.keys_only else value_codec.decompress(value),
+                                                  origin=origin, seq=seq))
+        watch_events_counter.inc(len(events))
+        self.last_sent = time.monotonic()
+        return demo_pb2.WatchResponse(events=events, positions=self.positions)
+
+    def idle_timeout(self) -> float:
+        # Thời gian chờ thay đổi mới trước khi phải gửi response báo vị trí.
+        return max(0.05, self.last_sent + WATCH_PROGRESS_SECONDS - time.monotonic())
+
+def open_watch(request):
+    # Trả về WatchCursor cho một stream mới, hoặc None nếu node đã có đủ WATCH_MAX_STREAMS stream.
+    global watch_streams
+    with watch_cond:
+        if watch_streams >= WATCH_MAX_STREAMS:
+            return None
+        watch_streams += 1
+    return WatchCursor(request)
+
+def close_watch():
+    global watch_streams
+    with watch_cond:
+        watch_streams -= 1
+
+def notify_watchers():
+    global watch_version
+    with watch_cond:
+        watch_version += 1
+        watch_cond.notify_all()
+    for listener in list(watch_listeners):
+        listener()
+
+def wait_watch_change(version: int, timeout: float):
+    # Chờ tới khi có thay đổi sau version (watch_version đọc trước lần poll cuối) hoặc hết timeout.
+    with watch_cond:
+        watch_cond.wait_for(lambda: watch_version != version, timeout)
+
+def watch_truncated_details(origin: str) -> str:
+    return (f"Node {NODE_ID} không còn đủ lịch sử thay đổi của {origin} để tiếp tục Watch; "
+            f"đọc lại dữ liệu rồi Watch lại từ đầu.")
+# --- Kết thúc Watch Functions ---
+
+# --- Metrics Functions ---
+def rpc_route(rpc: str, request) -> str:
+    # Cách node xử lý request: local (tự trả lời), forwarded (chuyển tới primary), replica
+    # (bản sao do primary gửi tới) hoặc batch (lô chưa chia theo primary, có thể gồm cả hai).
+    if getattr(request, "is_replica", False):
+        return "replica"
+    if rpc == "GetKey":
+        return "local" if can_read_locally(request, get_primary_node_id_for_key(request.key)) else "forwarded"
+    if rpc in ("PutKey", "DeleteKey"):
+        return "local" if get_primary_node_id_for_key(request.key) == NODE_ID else "forwarded"
+    if rpc in ("MultiGet", "MultiPut", "MultiDelete") and not request.forwarded:
+        return "batch"
+    return "local"
+
+def observe_rpc(rpc: str, route: str, seconds: float, failed: bool):
+    metrics_registry.histogram("kv_rpc_duration_seconds", "Thời gian xử lý RPC trên node, theo RPC và route",
+                               rpc=rpc, route=route).observe(seconds)
+    if failed:
+        metrics_registry.counter("kv_rpc_errors_total", "Số RPC kết thúc bằng lỗi", rpc=rpc, route=route).inc()
+
+def note_replication(replica_id: str, result: str):
+    # result: acked (replica xác nhận), skipped (replica không ALIVE), failed (RPC lỗi)
+    metrics_registry.counter("kv_replication_total", "Số lần sao lưu tới replica theo kết quả",
+                             replica=replica_id, result=result).inc()
+
+def _executor_queue_depths():
+    # _work_queue là hàng đợi nội bộ của ThreadPoolExecutor: các tác vụ chưa có luồng nhận.
+    return [({"executor": name}, executor._work_queue.qsize()) for name, executor in executors.items()]
+
+metrics_registry.gauge("kv_store_keys", "Số key trong store", lambda: len(store))
+metrics_registry.gauge("kv_ttl_keys", "Số key có TTL đang chờ hết hạn", lambda: len(expiry_wheel))
+metrics_registry.gauge("kv_store_data_bytes", "Tổng số byte key/value trong store (đơn vị của ngân sách bộ nhớ)",
+                       lambda: store.data_bytes())
+metrics_registry.gauge("kv_memory_budget_bytes", "Ngân sách bộ nhớ (--max-memory-bytes), 0 = không giới hạn",
+                       lambda: MAX_MEMORY_BYTES)
+metrics_registry.gauge("kv_watch_streams", "Số stream Watch đang mở", lambda: watch_streams)
+metrics_registry.gauge("kv_read_hit_ratio", "Tỉ lệ lần đọc tìm thấy key trên tổng số lần đọc cục bộ",
+                       lambda: read_hits_counter.value / max(1, read_hits_counter.value + read_misses_counter.value))
+metrics_registry.gauge("kv_store_memory_bytes", "Bộ nhớ ước lượng của store (overlay trong RAM, snapshot được mmap, page cache sqlite, key directory và mmap của bitcask)",
+                       lambda: [({"part": part}, n) for part, n in store.memory_usage().items()])
+metrics_registry.gauge("kv_peer_phi", "Mức nghi ngờ (phi) của failure detector theo peer",
+                       lambda: [({"peer": peer_id}, round(peer_detector.phi(peer_id, time.time()), 3))
+                                for peer_id in SORTED_NODE_IDS if peer_id != NODE_ID])
+metrics_registry.gauge("kv_hints_pending", "Số hint đang chờ phát lại theo peer",
+                       lambda: [({"peer": peer_id}, len(queue)) for peer_id, queue in hint_queues.items()])
+metrics_registry.gauge("kv_executor_queue_depth", "Số tác vụ đang chờ trong hàng đợi của executor", _executor_queue_depths)
+
+def stats_response():
+    histograms, counters, gauges = metrics_registry.collect()
+    latency = []
+    for name, labels, snapshot, histogram in histograms:
+        p50, p99, p999 = (histogram.quantile(q, snapshot) for q in metrics.QUANTILES)
+        latency.append(demo_pb2.LatencyStats(name=name, labels=labels, count=snapshot[2], sum_seconds=snapshot[1],
+                                             max_seconds=snapshot[3], p50_seconds=p50, p99_seconds=p99, p999_seconds=p999))
+    return demo_pb2.StatsResponse(
+        node_id=NODE_ID, histograms=latency,
+        counters=[demo_pb2.MetricValue(name=name, labels=labels, value=value) for name, labels, value in counters],
+        gauges=[demo_pb2.MetricValue(name=name, labels=labels, value=value) for name, labels, value in gauges])
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    """Đo thời gian và đếm lỗi của mọi RPC unary ở biên server (gồm cả phần forward/sao lưu)."""
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+        rpc = handler_call_details.method.rsplit("/", 1)[-1]
+        behavior = handler.unary_unary
+
+        def timed(request, context):
+            started = time.perf_counter()
+            route = rpc_route(rpc, request)
+            failed = True
+            try:
+                response = behavior(request, context)
+                failed = False
+                return response
+            finally:
+                observe_rpc(rpc, route, time.perf_counter() - started, failed)
+
+        return grpc.unary_unary_rpc_method_handler(timed, request_deserializer=handler.request_deserializer,
+                                                   response_serializer=handler.response_serializer)
+# --- Kết thúc Metrics Functions ---
+
 
 class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
     
-    def _get_stub_and_channel(self, target_node_id: str):
+    def _get_stub(self, target_node_id: str):
         target_address = CLUSTER_CONFIG.get(target_node_id)
         if not target_address:
             print(f"[ERROR] Node {NODE_ID}: Không tìm thấy địa chỉ cho target_node_id '{target_node_id}' trong CLUSTER_CONFIG.")
-            return None, None
-        # Channel nên được quản lý cẩn thận hơn trong môi trường production (ví dụ: connection pooling)
-        # Ở đây, tạo mới và đóng sau mỗi lần sử dụng cho đơn giản.
-        channel = grpc.insecure_channel(target_address)
-        stub = demo_pb2_grpc.KeyValueStub(channel)
-        return stub, channel
+            return None
+        # Channel lấy từ pool dùng chung, không đóng sau mỗi lần sử dụng.
+        return channel_pool.get_stub(target_address)
 
     def RequestFullSnapshot(self, request, context):
         print(f"[SNAPSHOT] Node {NODE_ID} ({PORT}): Nhận yêu cầu RequestFullSnapshot.")
         try:
-            # Giả sử ở đây việc đọc `store` để dump là an toàn.
-            data_json_snapshot = json.dumps(store)
+            with store.lock_all():
+                view = store.snapshot()
+                expires = dict(key_expiry)
+            with view:
+                now = time.time()
+                # JSON chỉ chứa chuỗi: value được giải nén và đọc như UTF-8 (byte không hợp lệ bị thay thế).
+                data_json_snapshot = json.dumps({k: value_codec.decompress(v).decode("utf-8", "replace")
+                                                 for k, v in view.items() if not expiry.is_expired(expires.get(k, 0), now)})
             print(f"[SNAPSHOT] Node {NODE_ID} ({PORT}): Đã tạo snapshot, kích thước: {len(data_json_snapshot)} bytes. Gửi phản hồi.")
             return demo_pb2.FullSnapshotResponse(data_json=data_json_snapshot)
         except Exception as e:
@@ -131,6 +1316,137 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
             context.abort(grpc.StatusCode.INTERNAL, "Lỗi khi tạo snapshot trên server.")
             return demo_pb2.FullSnapshotResponse()
 
+    def StreamSnapshot(self, request, context):
+        # Stream một view copy-on-write của store (chụp cùng lúc với watermark), value được đọc
+        # khi gửi từng chunk nên không phải giữ hai bản toàn bộ store trong bộ nhớ. Generator chỉ
+        # được gRPC kéo tiếp khi cửa sổ flow control của HTTP/2 còn chỗ, nên bên nhận chậm sẽ làm
+        # server chậm lại thay vì dồn bộ nhớ.
+        max_chunk_bytes = request.max_chunk_bytes or SNAPSHOT_CHUNK_BYTES
+        if request.accept_segments and isinstance(store, bitcask_engine.BitcaskStore):
+            yield from self._stream_segments(max_chunk_bytes)
+            return
+        with store.lock_all():
+            view = store.snapshot()
+            expires = dict(key_expiry)
+            versions = dict(key_versions)
+            with state_lock:
+                watermarks = {origin: t.watermark for origin, t in applied_seqs.items()}
+        print(f"[SNAPSHOT] Node {NODE_ID} ({PORT}): Bắt đầu stream snapshot {len(view)} keys (chunk tối đa {max_chunk_bytes} bytes).")
+        hasher = hashlib.sha256()
+        sent = 0
+        entries = []
+        chunk_bytes = 0
+        with view:
+            for key in view:
+                value = view[key]
+                expires_at = expires.get(key, 0)
+                if expiry.is_expired(expires_at):
+                    continue
+                update_snapshot_checksum(hasher, key, value)
+                origin, seq = versions.get(key, ("", 0))
+                entries.append(demo_pb2.KeyValuePair(key=key, value=value, expires_at=expires_at,
+                                                     codec=value_codec.codec_of(value), origin=origin, seq=seq))
+                sent += 1
+                chunk_bytes += len(key) + len(value)
+                if chunk_bytes >= max_chunk_bytes:
+                    yield demo_pb2.SnapshotChunk(entries=entries, applied_seqs=watermarks)
+                    entries = []
+                    chunk_bytes = 0
+        yield demo_pb2.SnapshotChunk(entries=entries, last=True, total_entries=sent, checksum=hasher.hexdigest(),
+                                     applied_seqs=watermarks)
+        print(f"[SNAPSHOT] Node {NODE_ID} ({PORT}): Đã stream xong snapshot ({sent} keys).")
+
+    def _stream_segments(self, max_chunk_bytes: int):
+        # Cả hai node dùng engine bitcask: gửi nguyên các file segment và hint đã đóng thay vì đọc
+        # và mã hóa lại từng key; bên nhận dùng luôn các file này làm store (SegmentReceiver).
+        def capture_state():
+            with state_lock:
+                return dict(key_expiry), {origin: t.watermark for origin, t in applied_seqs.items()}
+
+        with store.frozen_segments(capture_state) as (paths, count, (expires, watermarks)):
+            print(f"[SNAPSHOT] Node {NODE_ID} ({PORT}): Bắt đầu gửi {len(paths)} file segment ({count} keys).")
+            hasher = hashlib.sha256()
+            sent_bytes = 0
+            for path in paths:
+                name = os.path.basename(path)
+                with open(path, "rb") as f:
+                    data = f.read(max_chunk_bytes)
+                    while True:
+                        hasher.update(data)
+                        sent_bytes += len(data)
+                        yield demo_pb2.SnapshotChunk(segments=[demo_pb2.SegmentPart(name=name, data=data)], raw_segments=True,
+                                                     applied_seqs=watermarks)
+                        data = f.read(max_chunk_bytes)
+                        if not data:
+                            break
+        yield demo_pb2.SnapshotChunk(last=True, raw_segments=True, total_entries=count, checksum=hasher.hexdigest(),
+                                     applied_seqs=watermarks, expires=expires)
+        print(f"[SNAPSHOT] Node {NODE_ID} ({PORT}): Đã gửi xong {len(paths)} file segment ({sent_bytes} bytes).")
+
+    def CatchUp(self, request, context):
+        # Gửi các thay đổi mà bên yêu cầu còn thiếu: với mỗi origin, các seq trong khoảng
+        # (since[origin], watermark của node này]. Origin có lịch sử đã bị cắt bớt được báo
+        # trong truncated_origins để bên yêu cầu chuyển sang lấy toàn bộ snapshot. Phản hồi dừng
+        # khi đủ max_mutations thay đổi hoặc CATCHUP_MAX_BYTES byte (như chunk của StreamSnapshot,
+        # để không vượt giới hạn message của gRPC); seq của mỗi origin vẫn liên tục từ since.
+        budget = request.max_mutations or CATCHUP_BATCH_SIZE
+        mutations = []
+        truncated_origins = []
+        has_more = False
+        response_bytes = 0
+        with state_lock:
+            for origin, tracker in applied_seqs.items():
+                if len(mutations) >= budget or response_bytes >= CATCHUP_MAX_BYTES:
+                    has_more = True
+                    break
+                since = request.since.get(origin, 0)
+                up_to = min(tracker.watermark, since + budget - len(mutations))
+                if up_to < tracker.watermark:
+                    has_more = True
+                changes = change_history.changes_between(origin, since, up_to)
+                if changes is None:
+                    truncated_origins.append(origin)
+                    continue
+                for seq, key, value, expires_at in changes:
+                    if mutations and response_bytes >= CATCHUP_MAX_BYTES:
+                        has_more = True
+                        break
+                    mutations.append(demo_pb2.Mutation(origin=origin, seq=seq, key=key, value=value or b"",
+                                                       deleted=value is None, expires_at=expires_at,
+                                                       codec=value_codec.codec_of(value)))
+                    response_bytes += len(key) + len(value or b"")
+        return demo_pb2.CatchUpResponse(mutations=mutations, truncated_origins=truncated_origins, has_more=has_more)
+
+    def _check_merkle_request(self, request, context):
+        if merkle_tree is None:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "Cây Merkle chưa sẵn sàng.")
+        if request.depth != MERKLE_DEPTH:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION,
+                          f"Độ sâu cây Merkle không khớp ({request.depth} != {MERKLE_DEPTH}).")
+
+    def MerkleNodes(self, request, context):
+        self._check_merkle_request(request, context)
+        with merkle_lock:
+            hashes = merkle_tree.node_hashes(request.indices)
+        return demo_pb2.MerkleNodesResponse(hashes=[merkle.digest_to_bytes(h) for h in hashes])
+
+    def MerkleLeaves(self, request, context):
+        self._check_merkle_request(request, context)
+        entries = []
+        with merkle_lock:
+            for leaf in request.indices:
+                for key, digest in merkle_tree.leaf_digests(leaf).items():
+                    entries.append(demo_pb2.KeyDigest(key=key, digest=merkle.digest_to_bytes(digest)))
+        return demo_pb2.MerkleLeavesResponse(entries=entries)
+
+    def Repair(self, request, context):
+        if merkle_tree is None:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "Cây Merkle chưa sẵn sàng.")
+        entries = [(e.key, None if e.deleted else value_codec.wrap(e.codec, e.value),
+                    merkle.digest_from_bytes(e.expected_digest), e.expires_at) for e in request.entries]
+        applied = apply_repairs(entries)
+        return demo_pb2.RepairResponse(applied=applied, skipped=len(entries) - applied)
+
     def GetKey(self, request, context):
         key = request.key
         primary_node_id_for_key = get_primary_node_id_for_key(key)
@@ -140,11 +1456,8 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
              return demo_pb2.Value() 
 
         # print(f"[DEBUG] Node {NODE_ID}: GetKey('{key}'). Primary: {primary_node_id_for_key}")
-        if NODE_ID == primary_node_id_for_key:
-            if key in store:
-                return demo_pb2.Value(value=store[key])
-            else:
-                return demo_pb2.Value(value="<KEY_NOT_FOUND>")
+        if can_read_locally(request, primary_node_id_for_key):
+            return local_read(key, primary_node_id_for_key)
         else:
             with peer_status_lock: 
                 primary_status = peer_status.get(primary_node_id_for_key, "UNKNOWN")
@@ -154,20 +1467,18 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
                 context.abort(grpc.StatusCode.UNAVAILABLE, f"Primary node {primary_node_id_for_key} ({CLUSTER_CONFIG.get(primary_node_id_for_key)}) không sẵn sàng.")
                 return demo_pb2.Value()
 
-            stub, channel = self._get_stub_and_channel(primary_node_id_for_key)
+            stub = self._get_stub(primary_node_id_for_key)
             if not stub:
                 context.abort(grpc.StatusCode.INTERNAL, f"Lỗi tạo stub khi chuyển tiếp GetKey đến {primary_node_id_for_key}")
                 return demo_pb2.Value()
             try:
                 # print(f"[DEBUG] Node {NODE_ID}: Forwarding GetKey('{key}') to {primary_node_id_for_key}")
-                response = stub.GetKey(demo_pb2.Key(key=key), timeout=5) 
+                response = stub.GetKey(demo_pb2.Key(key=key), timeout=5)
                 return response
             except grpc.RpcError as e:
                 print(f"[ERROR] Node {NODE_ID}: Lỗi RPC khi forward GetKey('{key}') đến {primary_node_id_for_key}: {e.details()}")
+                note_peer_rpc_error(primary_node_id_for_key, e)
                 context.abort(e.code(), f"Lỗi khi chuyển tiếp GetKey: {e.details()}")
-            finally:
-                if channel:
-                    channel.close()
 
     def PutKey(self, request, context):
         key = request.key
@@ -180,47 +1491,33 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
              return demo_pb2.PutKeyReturn()
 
         # print(f"[DEBUG] Node {NODE_ID}: PutKey('{key}'). Primary: {primary_node_id_for_key}. IsReplica: {is_replica_req}")
+        if is_replica_req:
+            value = value_codec.wrap(request.codec, value) # Bản lưu trữ do primary gửi
         if NODE_ID == primary_node_id_for_key: 
             if is_replica_req: 
                 # print(f"[DEBUG] Node {NODE_ID} (Primary): Nhận PutKey is_replica=True cho '{key}'. Chỉ ghi.")
-                store[key] = value
-                save_store()
+                apply_replicated([(key, value, request.seq, request.expires_at)], request.origin)
                 return demo_pb2.PutKeyReturn(code=0, message=f"Đã lưu (Primary - Ghi từ replica request): {key}")
 
             # print(f"[DEBUG] Node {NODE_ID} (Primary): Xử lý ghi cho '{key}'.")
-            store[key] = value
-            save_store()
+            expires_at = expiry.deadline(request.ttl_seconds)
+            value = compress_value(value)
+            seq = apply_put(key, value, expires_at)
             
-            successful_replicas = 0
-            replica_node_ids = [nid for nid in SORTED_NODE_IDS if nid != NODE_ID]
-            if replica_node_ids:
-                # print(f"[DEBUG] Node {NODE_ID} (Primary): Bắt đầu sao lưu PutKey('{key}') tới replicas: {replica_node_ids}")
-                for replica_id in replica_node_ids:
-                    with peer_status_lock:
-                        status = peer_status.get(replica_id, "UNKNOWN") 
-                    
-                    if status != "ALIVE":
-                        print(f"[WARN] Node {NODE_ID} (Primary): Bỏ qua sao lưu PutKey('{key}') tới replica {replica_id} (trạng thái: {status}).")
-                        continue
-
-                    r_stub, r_channel = self._get_stub_and_channel(replica_id)
-                    if not r_stub: continue
-                    try:
-                        # print(f"[DEBUG] Node {NODE_ID} (Primary): Gửi PutKey replica tới {replica_id} cho key '{key}'")
-                        r_stub.PutKey(demo_pb2.PutKeyRequest(key=key, value=value, is_replica=True), timeout=5)
-                        successful_replicas += 1
-                    except grpc.RpcError as e:
-                        print(f"[WARN] Node {NODE_ID} (Primary): Lỗi RPC khi sao lưu PutKey('{key}') tới replica {replica_id}: {e.details()}")
-                    finally:
-                        if r_channel: r_channel.close()
-            
-            return demo_pb2.PutKeyReturn(code=0, message=f"Đã lưu (Primary): {key}. Sao lưu tới {successful_replicas}/{len(replica_node_ids)} replicas.")
+            replica_request = demo_pb2.PutKeyRequest(key=key, value=value, is_replica=True, origin=NODE_ID, seq=seq,
+                                                     expires_at=expires_at, codec=value_codec.codec_of(value))
+            acks, replica_count = replicate_write(
+                "PutKey", key, lambda stub: stub.PutKey(replica_request, timeout=REPLICATION_TIMEOUT_SECONDS),
+                [(key, value, seq, expires_at)])
+            needed = write_quorum()
+            if acks < needed:
+                return demo_pb2.PutKeyReturn(code=1, acks=acks, message=f"Đã lưu (Primary): {key} nhưng chưa đạt write quorum ({acks}/{needed} ack).")
+            return demo_pb2.PutKeyReturn(code=0, acks=acks, message=f"Đã lưu (Primary): {key}. Sao lưu tới {acks - 1}/{replica_count} replicas (quorum {needed}).")
 
         else: 
             if is_replica_req: 
                 # print(f"[DEBUG] Node {NODE_ID} (Replica): Nhận lệnh ghi từ primary cho '{key}'.")
-                store[key] = value
-                save_store()
+                apply_replicated([(key, value, request.seq, request.expires_at)], request.origin)
                 return demo_pb2.PutKeyReturn(code=0, message=f"Đã lưu (Replica): {key}")
             else: 
                 with peer_status_lock:
@@ -231,19 +1528,19 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
                     context.abort(grpc.StatusCode.UNAVAILABLE, f"Primary node {primary_node_id_for_key} ({CLUSTER_CONFIG.get(primary_node_id_for_key)}) không sẵn sàng.")
                     return demo_pb2.PutKeyReturn()
 
-                stub, channel = self._get_stub_and_channel(primary_node_id_for_key)
+                stub = self._get_stub(primary_node_id_for_key)
                 if not stub:
                     context.abort(grpc.StatusCode.INTERNAL, f"Lỗi tạo stub khi chuyển tiếp PutKey đến {primary_node_id_for_key}")
                     return demo_pb2.PutKeyReturn()
                 try:
                     # print(f"[DEBUG] Node {NODE_ID}: Forwarding PutKey('{key}') to {primary_node_id_for_key}")
-                    response = stub.PutKey(demo_pb2.PutKeyRequest(key=key, value=value, is_replica=False), timeout=5)
+                    response = stub.PutKey(demo_pb2.PutKeyRequest(key=key, value=value, is_replica=False,
+                                                                  ttl_seconds=request.ttl_seconds), timeout=5)
                     return response
                 except grpc.RpcError as e:
                     print(f"[ERROR] Node {NODE_ID}: Lỗi RPC khi forward PutKey('{key}') đến {primary_node_id_for_key}: {e.details()}")
+                    note_peer_rpc_error(primary_node_id_for_key, e)
                     context.abort(e.code(), f"Lỗi khi chuyển tiếp PutKey: {e.details()}")
-                finally:
-                    if channel: channel.close()
 
     def DeleteKey(self, request, context):
         key = request.key
@@ -258,47 +1555,24 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
         if NODE_ID == primary_node_id_for_key: 
             if is_replica_req:
                 # print(f"[DEBUG] Node {NODE_ID} (Primary): Nhận DeleteKey is_replica=True cho '{key}'. Chỉ xóa.")
-                if key in store: del store[key]; save_store()
+                apply_replicated([(key, None, request.seq, 0)], request.origin)
                 return demo_pb2.Message(msg=f"Đã xóa (Primary - Replica request): '{key}'.")
             
             # print(f"[DEBUG] Node {NODE_ID} (Primary): Xử lý xóa cho '{key}'.")
-            existed = key in store
-            if existed:
-                del store[key]
-                save_store()
-            
-            successful_replicas = 0
-            if existed: 
-                replica_node_ids = [nid for nid in SORTED_NODE_IDS if nid != NODE_ID]
-                if replica_node_ids:
-                    # print(f"[DEBUG] Node {NODE_ID} (Primary): Bắt đầu sao lưu DeleteKey('{key}') tới replicas: {replica_node_ids}")
-                    for replica_id in replica_node_ids:
-                        with peer_status_lock:
-                            status = peer_status.get(replica_id, "UNKNOWN")
-                        
-                        if status != "ALIVE":
-                            print(f"[WARN] Node {NODE_ID} (Primary): Bỏ qua sao lưu DeleteKey('{key}') tới replica {replica_id} (trạng thái: {status}).")
-                            continue
-                        
-                        r_stub, r_channel = self._get_stub_and_channel(replica_id)
-                        if not r_stub: continue
-                        try:
-                            # print(f"[DEBUG] Node {NODE_ID} (Primary): Gửi DeleteKey replica tới {replica_id} cho key '{key}'")
-                            r_stub.DeleteKey(demo_pb2.DeleteKeyRequest(key=key, is_replica=True), timeout=5)
-                            successful_replicas +=1
-                        except grpc.RpcError as e:
-                            print(f"[WARN] Node {NODE_ID} (Primary): Lỗi RPC khi sao lưu DeleteKey('{key}') tới replica {replica_id}: {e.details()}")
-                        finally:
-                            if r_channel: r_channel.close()
+            existed, seq = apply_delete(key)
             
-            return demo_pb2.Message(msg=f"Khóa '{key}' {'đã được xóa' if existed else 'không tồn tại'} (Primary). Sao lưu tới {successful_replicas}/{len(replica_node_ids) if existed else 0} replicas.")
+            if not existed:
+                return demo_pb2.Message(msg=f"Khóa '{key}' không tồn tại (Primary). Sao lưu tới 0/0 replicas.")
+            replica_request = demo_pb2.DeleteKeyRequest(key=key, is_replica=True, origin=NODE_ID, seq=seq)
+            acks, replica_count = replicate_write(
+                "DeleteKey", key, lambda stub: stub.DeleteKey(replica_request, timeout=REPLICATION_TIMEOUT_SECONDS),
+                [(key, None, seq, 0)])
+            return demo_pb2.Message(msg=f"Khóa '{key}' đã được xóa (Primary). Sao lưu tới {acks - 1}/{replica_count} replicas (quorum {write_quorum()}).")
 
         else: 
             if is_replica_req: 
                 # print(f"[DEBUG] Node {NODE_ID} (Replica): Nhận lệnh xóa từ primary cho '{key}'.")
-                if key in store:
-                    del store[key]
-                    save_store()
+                apply_replicated([(key, None, request.seq, 0)], request.origin)
                 return demo_pb2.Message(msg=f"Lệnh xóa cho '{key}' đã xử lý trên replica.")
             else: 
                 with peer_status_lock:
@@ -309,7 +1583,7 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
                     context.abort(grpc.StatusCode.UNAVAILABLE, f"Primary node {primary_node_id_for_key} ({CLUSTER_CONFIG.get(primary_node_id_for_key)}) không sẵn sàng.")
                     return demo_pb2.Message()
 
-                stub, channel = self._get_stub_and_channel(primary_node_id_for_key)
+                stub = self._get_stub(primary_node_id_for_key)
                 if not stub:
                     context.abort(grpc.StatusCode.INTERNAL, f"Lỗi tạo stub khi chuyển tiếp DeleteKey đến {primary_node_id_for_key}")
                     return demo_pb2.Message()
@@ -319,30 +1593,444 @@ class KeyValueServicer(demo_pb2_grpc.KeyValueServicer):
                     return response
                 except grpc.RpcError as e:
                     print(f"[ERROR] Node {NODE_ID}: Lỗi RPC khi forward DeleteKey('{key}') đến {primary_node_id_for_key}: {e.details()}")
+                    note_peer_rpc_error(primary_node_id_for_key, e)
                     context.abort(e.code(), f"Lỗi khi chuyển tiếp DeleteKey: {e.details()}")
-                finally:
-                    if channel: channel.close()
     
+    def MultiGet(self, request, context):
+        keys = list(request.keys)
+
+        def local_get(indices):
+            if request.raw:
+                return [raw_key_result(keys[i]) for i in indices]
+            results = []
+            for i in indices:
+                value, expires_at = read_key(keys[i])
+                results.append(demo_pb2.KeyResult(key=keys[i], code=BATCH_RESULT_OK, found=value is not None,
+                                                  value=value_codec.decompress(value) if value is not None else b"",
+                                                  expires_at=expires_at))
+            return results
+
+        def remote_get(stub, indices):
+            sub_request = demo_pb2.MultiGetRequest(keys=[keys[i] for i in indices], forwarded=True, raw=request.raw)
+            return stub.MultiGet(sub_request, timeout=FORWARD_TIMEOUT_SECONDS).results
+
+        return demo_pb2.MultiGetResponse(results=run_batch("MultiGet", keys, request.forwarded, local_get, remote_get))
+
+    def Scan(self, request, context):
+        # Gộp (heapq.merge) các nguồn đã sắp xếp: chỉ mục cục bộ cho key do node này làm primary
+        # và một stream Scan con từ mỗi primary khác. Mỗi nguồn chỉ được đọc tới khi đủ limit key,
+        # nên chi phí tỉ lệ với số key trả về; generator chỉ được kéo tiếp khi client nhận kịp.
+        if key_indexes is None:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "Chỉ mục key chưa sẵn sàng.")
+        try:
+            after = decode_page_token(request.page_token) if request.page_token else None
+        except ValueError:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "page_token không hợp lệ.")
+        if request.forwarded:
+            sources = [scan_local(request, [NODE_ID], after)]
+        elif request.consistency == demo_pb2.READ_ANY:
+            sources = [scan_local(request, SORTED_NODE_IDS, after)]
+        else:
+            with peer_status_lock:
+                dead = [p for p in SORTED_NODE_IDS if p != NODE_ID and peer_status.get(p) == "DEAD"]
+            if dead:
+                context.abort(grpc.StatusCode.UNAVAILABLE, f"Primary node {', '.join(dead)} không sẵn sàng.")
+            sources = [scan_local(request, [NODE_ID], after)]
+            sources += [scan_remote(p, request) for p in SORTED_NODE_IDS if p != NODE_ID]
+
+        entries = []
+        sent = 0
+        last_key = None
+        next_page_token = ""
+        try:
+            for key, value, expires_at in heapq.merge(*sources, key=lambda item: item[0]):
+                if request.limit and sent == request.limit:
+                    next_page_token = encode_page_token(last_key)
+                    break
+                if request.keys_only:
+                    entry = demo_pb2.ScanEntry(key=key, expires_at=expires_at)
+                elif request.forwarded:
+                    entry = demo_pb2.ScanEntry(key=key, value=value, expires_at=expires_at, codec=value_codec.codec_of(value))
+                else:
+                    entry = demo_pb2.ScanEntry(key=key, value=value_codec.decompress(value), expires_at=expires_at)
+                entries.append(entry)
+                sent += 1
+                last_key = key
+                if len(entries) >= SCAN_CHUNK_ENTRIES:
+                    yield demo_pb2.ScanChunk(entries=entries)
+                    entries = []
+        except grpc.RpcError as e:
+            context.abort(e.code(), f"Lỗi khi Scan từ primary khác: {e.details()}")
+        finally:
+            for source in sources:
+                source.close()
+        if not request.forwarded:
+            scan_entries_counter.inc(sent)
+        yield demo_pb2.ScanChunk(entries=entries, next_page_token=next_page_token)
+
+    def Watch(self, request, context):
+        # Mọi node áp dụng đủ các thay đổi (kèm origin, seq của primary) nên node nào cũng phục vụ
+        # được Watch của mọi key. Mỗi stream giữ một luồng của thread pool trong lúc chờ thay đổi.
+        cursor = open_watch(request)
+        if cursor is None:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Node {NODE_ID} đã có {WATCH_MAX_STREAMS} stream Watch.")
+        try:
+            while context.is_active():
+                version = watch_version
+                try:
+                    response = cursor.poll()
+                except WatchTruncated as e:
+                    context.abort(grpc.StatusCode.OUT_OF_RANGE, watch_truncated_details(str(e)))
+                if response is not None:
+                    yield response
+                elif cursor.caught_up:
+                    wait_watch_change(version, cursor.idle_timeout())
+        finally:
+            close_watch()
+
+    def MultiPut(self, request, context):
+        entries = [(e.key, e.value) for e in request.entries]
+        if request.is_replica:
+            seqs = list(request.seqs) or [0] * len(entries)
+            apply_replicated([(e.key, value_codec.wrap(e.codec, e.value), seq, e.expires_at)
+                              for e, seq in zip(request.entries, seqs)], request.origin)
+            return demo_pb2.MultiWriteResponse(results=[demo_pb2.KeyResult(key=k, code=BATCH_RESULT_OK, acks=1) for k, _ in entries])
+
+        keys = [k for k, _ in entries]
+
+        def local_put(indices):
+            local_entries = [(entries[i][0], compress_value(entries[i][1])) for i in indices]
+            seqs = apply_put_many(local_entries)
+            replica_request = demo_pb2.MultiPutRequest(
+                entries=[demo_pb2.KeyValuePair(key=k, value=v, codec=value_codec.codec_of(v)) for k, v in local_entries],
+                is_replica=True, origin=NODE_ID, seqs=seqs)
+            acks, _ = replicate_write("MultiPut", f"{len(local_entries)} keys",
+                                      lambda stub: stub.MultiPut(replica_request, timeout=REPLICATION_TIMEOUT_SECONDS),
+                                      [(k, v, seq, 0) for (k, v), seq in zip(local_entries, seqs)])
+            code = _write_result_code(acks)
+            return [demo_pb2.KeyResult(key=k, code=code, acks=acks) for k, _ in local_entries]
+
+        def remote_put(stub, indices):
+            sub_request = demo_pb2.MultiPutRequest(
+                entries=[demo_pb2.KeyValuePair(key=entries[i][0], value=entries[i][1]) for i in indices], forwarded=True)
+            return stub.MultiPut(sub_request, timeout=FORWARD_TIMEOUT_SECONDS).results
+
+        return demo_pb2.MultiWriteResponse(results=run_batch("MultiPut", keys, request.forwarded, local_put, remote_put))
+
+    def MultiDelete(self, request, context):
+        keys = list(request.keys)
+        if request.is_replica:
+            seqs = list(request.seqs) or [0] * len(keys)
+            existed = apply_replicated([(k, None, seq, 0) for k, seq in zip(keys, seqs)], request.origin)
+            if request.evicted:
+                note_evictions("replica", sum(existed))
+            return demo_pb2.MultiWriteResponse(results=[demo_pb2.KeyResult(key=k, code=BATCH_RESULT_OK, found=f, acks=1)
+                                                        for k, f in zip(keys, existed)])
+
+        def local_delete(indices):
+            local_keys = [keys[i] for i in indices]
+            deleted = apply_delete_many(local_keys)
+            existed = [f for f, _ in deleted]
+            deleted_keys = [k for k, (f, _) in zip(local_keys, deleted) if f]
+            acks = 1
+            if deleted_keys:
+                replica_request = demo_pb2.MultiDeleteRequest(keys=deleted_keys, is_replica=True, origin=NODE_ID,
+                                                              seqs=[seq for f, seq in deleted if f])
+                acks, _ = replicate_write("MultiDelete", f"{len(deleted_keys)} keys",
+                                          lambda stub: stub.MultiDelete(replica_request, timeout=REPLICATION_TIMEOUT_SECONDS),
+                                          [(k, None, seq, 0) for k, (f, seq) in zip(local_keys, deleted) if f])
+            code = _write_result_code(acks)
+            return [demo_pb2.KeyResult(key=k, code=code if f else BATCH_RESULT_OK, found=f, acks=acks if f else 1)
+                    for k, f in zip(local_keys, existed)]
+
+        def remote_delete(stub, indices):
+            sub_request = demo_pb2.MultiDeleteRequest(keys=[keys[i] for i in indices], forwarded=True)
+            return stub.MultiDelete(sub_request, timeout=FORWARD_TIMEOUT_SECONDS).results
+
+        return demo_pb2.MultiWriteResponse(results=run_batch("MultiDelete", keys, request.forwarded, local_delete, remote_delete))
+
     def TinhTong(self, request, context): # Giữ lại nếu bạn vẫn dùng
         result = request.a + request.b
         return demo_pb2.KetQuaTinhTong(answer=result)
 
     def CheckHealth(self, request, context):
-        return demo_pb2.HealthCheckResponse(status="SERVING")
+        note_peer_alive(request.sender_id)
+        return demo_pb2.HealthCheckResponse(status="SERVING", local_seq=local_seq)
+
+    def Gossip(self, request, context):
+        note_peer_alive(request.sender_id)
+        merge_gossip(request)
+        return gossip_message()
+
+    def Resync(self, request, context):
+        source_id = request.source_id
+        if source_id not in CLUSTER_CONFIG or source_id == NODE_ID:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Node nguồn không hợp lệ: '{source_id}'")
+        if not resync_lock.acquire(blocking=False):
+            return demo_pb2.ResyncResponse(accepted=False)
+        print(f"[RECOVERY] Node {NODE_ID}: {source_id} yêu cầu đồng bộ lại toàn bộ (hint không còn đủ).")
+        threading.Thread(target=resync_from, args=(source_id,), daemon=True).start()
+        return demo_pb2.ResyncResponse(accepted=True)
+
+    def Stats(self, request, context):
+        return stats_response()
+
+    def ClusterView(self, request, context):
+        nodes = []
+        with peer_status_lock:
+            for node_id in SORTED_NODE_IDS:
+                status = "ALIVE" if node_id == NODE_ID else peer_status.get(node_id, "UNKNOWN")
+                nodes.append(demo_pb2.NodeInfo(node_id=node_id, address=CLUSTER_CONFIG[node_id], status=status,
+                                               weight=RING_WEIGHTS.get(node_id, 1.0)))
+        return demo_pb2.ClusterViewResponse(node_id=NODE_ID, nodes=nodes, vnodes=RING.vnodes)
 
 # --- Data Recovery Function ---
-def attempt_data_recovery():
-    global store
-    # Chỉ thực hiện khôi phục nếu đây không phải là lần khởi động đầu tiên (ví dụ, file data đã tồn tại)
-    # hoặc có một cơ chế khác để quyết định khi nào cần khôi phục.
-    
-    print(f"[RECOVERY] Node {NODE_ID}: Chờ {INITIAL_RECOVERY_DELAY_SECONDS} giây trước khi thử khôi phục dữ liệu...")
-    time.sleep(INITIAL_RECOVERY_DELAY_SECONDS)
+def start_tracking_touched_keys() -> set:
+    # Tập key được ghi từ giờ tới khi gọi stop_tracking_touched_keys() (xem snapshot_touched_keys).
+    touched = set()
+    with store.lock_all():
+        snapshot_touched_keys.append(touched)
+    return touched
+
+def stop_tracking_touched_keys(touched: set):
+    with store.lock_all():
+        snapshot_touched_keys[:] = [t for t in snapshot_touched_keys if t is not touched]
+
+def _local_newer_locked(key: str, watermarks, touched: set) -> bool:
+    # Key có thay đổi cục bộ mà nguồn snapshot có thể chưa có: được ghi trong lúc nhận snapshot,
+    # hoặc phiên bản (kể cả dấu xóa) mới hơn watermark của nguồn cho origin đó. Gọi khi giữ lock
+    # stripe của key.
+    if key in touched:
+        return True
+    current = key_versions.get(key) or tombstones.get(key)
+    return current is not None and current[1] > watermarks.get(current[0], 0)
+
+class SnapshotReceiver:
+    """Áp dụng snapshot stream từ source_id theo từng chunk ngay khi nhận được, thay vì giữ
+    toàn bộ snapshot trong bộ nhớ.
+
+    Các chunk được ghi thẳng vào store (không qua WAL) vì người gọi sẽ compact thành snapshot
+    sau khi stream hoàn tất; chỉ giữ lại tập key để xóa các key không còn tồn tại ở nguồn.
+    Node vẫn phục vụ trong lúc nhận, nên key có thay đổi cục bộ mới hơn snapshot (xem
+    _local_newer_locked) được giữ nguyên, không bị ghi đè hay xóa.
+    """
+
+    def __init__(self, source_id: str, touched: set):
+        self.source_id = source_id
+        self.hasher = hashlib.sha256()
+        self.received_keys = set()
+        self.chunk_count = 0
+        self.kept_count = 0
+        self.touched = touched # Key được ghi cục bộ kể từ khi yêu cầu snapshot
+
+    def apply_chunk(self, chunk):
+        # Trả về None khi chưa tới chunk cuối, True/False khi snapshot đầy đủ và hợp lệ/không hợp lệ.
+        self.chunk_count += 1
+        for entry in chunk.entries:
+            value = value_codec.wrap(entry.codec, entry.value)
+            with store.lock_for(entry.key):
+                if _local_newer_locked(entry.key, chunk.applied_seqs, self.touched):
+                    self.kept_count += 1
+                else:
+                    _store_set_locked(entry.key, value, entry.expires_at)
+                    tombstones.discard(entry.key)
+                    if entry.origin:
+                        key_versions[entry.key] = (entry.origin, entry.seq)
+                    else:
+                        key_versions.pop(entry.key, None)
+            self.received_keys.add(entry.key)
+            update_snapshot_checksum(self.hasher, entry.key, value)
+        if not chunk.last:
+            return None
+        if chunk.total_entries != len(self.received_keys) or chunk.checksum != self.hasher.hexdigest():
+            print(f"[ERROR] Node {NODE_ID}: Snapshot từ {self.source_id} sai checksum hoặc số lượng key "
+                  f"({len(self.received_keys)}/{chunk.total_entries}). Bỏ qua nguồn này.")
+            return False
+        with store.lock_all(), state_lock:
+            stale_keys = [key for key in store if key not in self.received_keys
+                          and not _local_newer_locked(key, chunk.applied_seqs, self.touched)]
+            for key in stale_keys:
+                _store_delete_locked(key)
+                key_versions.pop(key, None)
+            adopt_watermarks_locked(chunk.applied_seqs)
+        print(f"[RECOVERY] Node {NODE_ID}: Nhận snapshot từ {self.source_id}: {len(self.received_keys)} keys trong {self.chunk_count} chunk, "
+              f"xóa {len(stale_keys)} key cục bộ không còn tồn tại, giữ {self.kept_count} key có thay đổi cục bộ mới hơn.")
+        return True
+
+class SegmentReceiver:
+    """Nhận snapshot dạng file segment bitcask (StreamSnapshot với accept_segments) vào thư mục
+    tạm của store, kiểm tra checksum rồi thay toàn bộ store bằng các file đó mà không phải ghi
+    lại từng key. Như SnapshotReceiver, người gọi compact WAL sau khi nhận xong; key có thay đổi
+    cục bộ mới hơn snapshot được đọc ra trước khi thay store và ghi lại sau đó."""
+
+    def __init__(self, source_id: str, touched: set):
+        self.source_id = source_id
+        self.hasher = hashlib.sha256()
+        self.staging_dir = store.incoming_dir()
+        self.chunk_count = 0
+        self.received_bytes = 0
+        self.file = None
+        self.name = None
+        self.touched = touched
+
+    def apply_chunk(self, chunk):
+        # Trả về None khi chưa tới chunk cuối, True/False khi snapshot đầy đủ và hợp lệ/không hợp lệ.
+        self.chunk_count += 1
+        for part in chunk.segments:
+            if part.name != self.name:
+                if not bitcask_engine.is_segment_file(part.name):
+                    print(f"[ERROR] Node {NODE_ID}: Snapshot từ {self.source_id} có tên file segment không hợp lệ: {part.name!r}.")
+                    self.close()
+                    return False
+                self.close()
+                self.file = open(os.path.join(self.staging_dir, part.name), "wb")
+                self.name = part.name
+            self.file.write(part.data)
+            self.hasher.update(part.data)
+            self.received_bytes += len(part.data)
+        if not chunk.last:
+            return None
+        self.close()
+        if chunk.checksum != self.hasher.hexdigest():
+            print(f"[ERROR] Node {NODE_ID}: Snapshot segment từ {self.source_id} sai checksum. Bỏ qua nguồn này.")
+            return False
+
+        kept = {}
+
+        def keep_local():
+            # Gọi khi giữ mọi stripe, trước khi thay store: value hiện tại (None nếu đã xóa) của các
+            # key có thay đổi cục bộ mới hơn snapshot.
+            for key in set(self.touched).union(key_versions, tombstones.to_dict()):
+                if _local_newer_locked(key, chunk.applied_seqs, self.touched):
+                    kept[key] = _live_get_locked(key)
+
+        def adopt_state():
+            # Gọi khi store đã mang nội dung của nguồn và còn giữ mọi stripe.
+            for key in list(key_expiry):
+                _set_expiry_locked(key, 0)
+            for key, expires_at in chunk.expires.items():
+                _set_expiry_locked(key, expires_at)
+            for key, (value, expires_at) in kept.items():
+                if value is None:
+                    store.pop(key, None)
+                    _set_expiry_locked(key, 0)
+                else:
+                    store[key] = value
+                    _set_expiry_locked(key, expires_at)
+            with state_lock:
+                adopt_watermarks_locked(chunk.applied_seqs)
+            rebuild_store_indexes()
+
+        count = store.install_segments(adopt_state, before_install=keep_local)
+        if count != chunk.total_entries:
+            print(f"[WARN] Node {NODE_ID}: Snapshot segment từ {self.source_id} có {count} keys, nguồn báo {chunk.total_entries}.")
+        print(f"[RECOVERY] Node {NODE_ID}: Nhận snapshot từ {self.source_id}: {count} keys trong "
+              f"{self.received_bytes} bytes file segment ({self.chunk_count} chunk), giữ {len(kept)} key có thay đổi cục bộ mới hơn.")
+        return True
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.name = None
+
+def adopt_watermarks_locked(watermarks):
+    # Store giờ có mọi thay đổi nguồn snapshot đã áp dụng, nên lấy watermark của nguồn nếu lớn hơn.
+    # Không hạ watermark: các thay đổi cục bộ mới hơn đã được giữ lại khi nhận snapshot. Gọi khi
+    # đang giữ state_lock.
+    for origin, watermark in watermarks.items():
+        tracker = applied_seqs.get(origin)
+        if tracker is None:
+            applied_seqs[origin] = changelog.SeqTracker(watermark)
+        elif watermark > tracker.watermark:
+            tracker.reset(watermark)
+    _sync_local_seq_locked()
+
+def apply_snapshot_stream(source_id: str, stub) -> bool:
+    # Node dùng engine bitcask nhận file segment nếu nguồn cũng là bitcask (chunk có raw_segments),
+    # nếu không thì nhận từng key như bình thường.
+    receiver = None
+    request = demo_pb2.SnapshotStreamRequest(accept_segments=isinstance(store, bitcask_engine.BitcaskStore))
+    touched = start_tracking_touched_keys() # Trước khi nguồn chụp snapshot
+    try:
+        for chunk in stub.StreamSnapshot(request, timeout=SNAPSHOT_STREAM_TIMEOUT_SECONDS):
+            if receiver is None:
+                receiver = (SegmentReceiver if chunk.raw_segments else SnapshotReceiver)(source_id, touched)
+            result = receiver.apply_chunk(chunk)
+            if result is not None:
+                return result
+    finally:
+        stop_tracking_touched_keys(touched)
+        if isinstance(receiver, SegmentReceiver):
+            receiver.close()
+    print(f"[WARN] Node {NODE_ID}: Snapshot stream từ {source_id} kết thúc trước chunk cuối.")
+    return False
+
+def catch_up_request():
+    with state_lock:
+        since = {origin: t.watermark for origin, t in applied_seqs.items()}
+    return demo_pb2.CatchUpRequest(since=since, max_mutations=CATCHUP_BATCH_SIZE)
+
+def apply_catch_up_response(source_id: str, response):
+    # Trả về số thay đổi đã áp dụng, hoặc None nếu nguồn không còn đủ lịch sử của một origin.
+    if response.truncated_origins:
+        print(f"[RECOVERY] Node {NODE_ID}: {source_id} không còn đủ lịch sử thay đổi của {list(response.truncated_origins)}.")
+        return None
+    # Các mutation được gom theo origin, theo thứ tự seq.
+    by_origin = {}
+    for m in response.mutations:
+        value = None if m.deleted else value_codec.wrap(m.codec, m.value)
+        by_origin.setdefault(m.origin, []).append((m.key, value, m.seq, m.expires_at))
+    for origin, changes in by_origin.items():
+        apply_replicated(changes, origin)
+    return len(response.mutations)
+
+def apply_catch_up(source_id: str, stub):
+    """Lấy các thay đổi còn thiếu từ source_id theo từng trang.
+
+    Trả về số thay đổi đã nhận, hoặc None nếu nguồn không còn đủ lịch sử cho một origin
+    (khi đó phải lấy toàn bộ snapshot).
+    """
+    received = 0
+    while True:
+        response = stub.CatchUp(catch_up_request(), timeout=CATCHUP_TIMEOUT_SECONDS)
+        applied = apply_catch_up_response(source_id, response)
+        if applied is None:
+            return None
+        received += applied
+        if not response.has_more or not response.mutations:
+            return received
+
+def recover_from(source_id: str) -> bool:
+    """Lấy các thay đổi còn thiếu từ source_id qua CatchUp; nếu nguồn không còn đủ lịch sử thì
+    lấy toàn bộ snapshot. Trả về True nếu thành công; lỗi kết nối ném grpc.RpcError."""
+    stub = channel_pool.get_stub(CLUSTER_CONFIG[source_id])
+    print(f"[RECOVERY] Node {NODE_ID}: Gửi CatchUp đến {source_id}.")
+    received = apply_catch_up(source_id, stub)
+    if received is not None:
+        print(f"[RECOVERY] Node {NODE_ID}: Khôi phục dữ liệu thành công từ {source_id}: nhận {received} thay đổi (incremental).")
+        return True
+
+    print(f"[RECOVERY] Node {NODE_ID}: Gửi StreamSnapshot đến {source_id}.")
+    if apply_snapshot_stream(source_id, stub):
+        # Lấy các thay đổi nguồn nhận được trong lúc stream (sau watermark của snapshot).
+        received = apply_catch_up(source_id, stub)
+        if received:
+            print(f"[RECOVERY] Node {NODE_ID}: Nhận thêm {received} thay đổi từ {source_id} sau snapshot.")
+        write_log.compact() # Ghi snapshot mới, bỏ phần log cũ không còn đúng nữa
+        print(f"[RECOVERY] Node {NODE_ID}: Khôi phục dữ liệu thành công từ {source_id}. Store đã được cập nhật.")
+        return True
+    return False
+
+def recover_from_peers():
+    """Thử recover_from lần lượt các node khác (thứ tự ngẫu nhiên, bỏ qua node đã biết là DEAD)
+    đến khi một node thành công, rồi đặt recovery_done. Dùng chung cho chế độ thread và aio."""
     print(f"[RECOVERY] Node {NODE_ID}: Bắt đầu quá trình khôi phục dữ liệu.")
     
     potential_source_nodes = [nid for nid in SORTED_NODE_IDS if nid != NODE_ID]
     if not potential_source_nodes:
         print(f"[RECOVERY] Node {NODE_ID}: Không có node nào khác để khôi phục.")
+        recovery_done.set()
         return
 
     recovered_successfully = False
@@ -363,50 +2051,237 @@ def attempt_data_recovery():
         if not target_address: continue
 
         try:
-            # Sử dụng with statement để đảm bảo channel được đóng
-            with grpc.insecure_channel(target_address) as recovery_channel:
-                recovery_stub = demo_pb2_grpc.KeyValueStub(recovery_channel)
-                
-                print(f"[RECOVERY] Node {NODE_ID}: Gửi RequestFullSnapshot đến {candidate_id}.")
-                response = recovery_stub.RequestFullSnapshot(demo_pb2.EmptyRequest(), timeout=15) # Tăng timeout
-                
-                if response and response.data_json:
-                    print(f"[RECOVERY] Node {NODE_ID}: Nhận snapshot từ {candidate_id} (kích thước: {len(response.data_json)} bytes).")
-                    new_store_data = json.loads(response.data_json)
-                    
-                    # Chiến lược: Ghi đè hoàn toàn store cục bộ
-                    print(f"[RECOVERY] Node {NODE_ID}: Store hiện tại có {len(store)} keys. Snapshot có {len(new_store_data)} keys.")
-                    store = new_store_data 
-                    save_store()
-                    print(f"[RECOVERY] Node {NODE_ID}: Khôi phục dữ liệu thành công từ {candidate_id}. Store đã được cập nhật.")
-                    recovered_successfully = True
-                    break 
-                else:
-                    print(f"[WARN] Node {NODE_ID}: Phản hồi snapshot rỗng hoặc không có data_json từ {candidate_id}.")
+            if recover_from(candidate_id):
+                recovered_successfully = True
+                break
 
         except grpc.RpcError as e:
+            note_peer_rpc_error(candidate_id, e)
             if e.code() == grpc.StatusCode.UNAVAILABLE or e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
                  print(f"[WARN] Node {NODE_ID}: Không thể kết nối hoặc timeout khi yêu cầu snapshot từ {candidate_id}.")
             else:
                  print(f"[WARN] Node {NODE_ID}: Lỗi RPC khác khi yêu cầu snapshot từ {candidate_id}: Code={e.code()}, Details={e.details()}")
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] Node {NODE_ID}: Lỗi giải mã JSON từ snapshot của {candidate_id}: {e}")
         except Exception as e:
             print(f"[ERROR] Node {NODE_ID}: Lỗi không xác định khi khôi phục từ {candidate_id}: {e}")
             
     if not recovered_successfully:
         print(f"[WARN] Node {NODE_ID}: Không thể khôi phục dữ liệu từ bất kỳ node nào khác. Sử dụng dữ liệu cục bộ (nếu có).")
+    recovery_done.set()
+
+def attempt_data_recovery():
+    # Chỉ thực hiện khôi phục nếu đây không phải là lần khởi động đầu tiên (ví dụ, file data đã tồn tại)
+    # hoặc có một cơ chế khác để quyết định khi nào cần khôi phục.
+    
+    print(f"[RECOVERY] Node {NODE_ID}: Chờ {INITIAL_RECOVERY_DELAY_SECONDS} giây trước khi thử khôi phục dữ liệu...")
+    time.sleep(INITIAL_RECOVERY_DELAY_SECONDS)
+    recover_from_peers()
 # --- Kết thúc Data Recovery Function ---
 
+# --- Anti-entropy Functions ---
+def apply_repairs(entries) -> int:
+    """Áp dụng các key sửa lỗi: entries là list (key, value hoặc None, digest mong đợi, expires_at).
 
-def serve():
-    global PORT, NODE_ID, DATA_FILE, peer_status
+    Key chỉ được ghi đè nếu digest hiện tại vẫn bằng digest lúc so sánh, để không đè lên
+    một thao tác ghi mới hơn đến trong lúc đồng bộ. Trả về số key đã áp dụng.
+    """
+    applied = 0
+    ticket = first_ticket = 0
+    for key, value, expected_digest, expires_at in entries:
+        with store.lock_for(key):
+            with merkle_lock:
+                current_digest = merkle_tree.key_digest(key)
+            if current_digest != expected_digest:
+                continue
+            ticket = _apply_locked(key, value, None, 0, expires_at) or ticket
+            first_ticket = first_ticket or ticket
+            applied += 1
+    wait_durable(ticket, first_ticket)
+    return applied
 
-    if len(sys.argv) != 2:
-        print("Cách dùng: python server.py <port>")
-        sys.exit(1)
+def _remote_node_hashes(stub, indices) -> list:
+    response = stub.MerkleNodes(demo_pb2.MerkleNodesRequest(depth=MERKLE_DEPTH, indices=indices),
+                                timeout=ANTI_ENTROPY_TIMEOUT_SECONDS)
+    return [merkle.digest_from_bytes(h) for h in response.hashes]
+
+def sync_with_peer(peer_id: str):
+    """So sánh cây Merkle với peer và sửa các key lệch. Primary của key là bản đúng: key do
+    node này làm primary được đẩy sang peer, key do peer làm primary được kéo về. Key của
+    primary thứ ba sẽ được sửa khi primary đó đồng bộ với từng node.
+    Trả về (số key lệch, số key đẩy đi, số key kéo về)."""
+    stub = channel_pool.get_stub(CLUSTER_CONFIG[peer_id])
+    # Đi xuống từng tầng, mỗi tầng một RPC chỉ chứa con của các nút đang lệch.
+    indices = [1]
+    while True:
+        remote = _remote_node_hashes(stub, indices)
+        with merkle_lock:
+            local = merkle_tree.node_hashes(indices)
+        differing = [i for i, a, b in zip(indices, local, remote) if a != b]
+        if not differing:
+            return 0, 0, 0
+        if merkle_tree.is_leaf(differing[0]):
+            break
+        indices = [child for i in differing for child in (2 * i, 2 * i + 1)]
+
+    response = stub.MerkleLeaves(demo_pb2.MerkleNodesRequest(depth=MERKLE_DEPTH, indices=differing),
+                                 timeout=ANTI_ENTROPY_TIMEOUT_SECONDS)
+    remote_digests = {e.key: merkle.digest_from_bytes(e.digest) for e in response.entries}
+    local_digests = {}
+    with merkle_lock:
+        for leaf in differing:
+            local_digests.update(merkle_tree.leaf_digests(leaf))
+    divergent = [k for k in set(local_digests) | set(remote_digests)
+                 if local_digests.get(k, 0) != remote_digests.get(k, 0)]
+
+    push = []
+    pull = []
+    for key in divergent:
+        primary_id = get_primary_node_id_for_key(key)
+        if primary_id == NODE_ID:
+            value, expires_at = live_get(key)
+            push.append(demo_pb2.RepairEntry(key=key, value=value or b"", deleted=value is None, expires_at=expires_at,
+                                             codec=value_codec.codec_of(value),
+                                             expected_digest=merkle.digest_to_bytes(remote_digests.get(key, 0))))
+        elif primary_id == peer_id:
+            pull.append(key)
+
+    if push:
+        stub.Repair(demo_pb2.RepairRequest(entries=push), timeout=ANTI_ENTROPY_TIMEOUT_SECONDS)
+    if pull:
+        results = stub.MultiGet(demo_pb2.MultiGetRequest(keys=pull, forwarded=True, raw=True),
+                                timeout=ANTI_ENTROPY_TIMEOUT_SECONDS).results
+        # Giữ nguyên bản lưu trữ và codec của primary (như khi sao lưu), không nén lại theo cấu hình của node này.
+        apply_repairs([(r.key, value_codec.wrap(r.codec, r.value) if r.found else None, local_digests.get(r.key, 0),
+                        r.expires_at) for r in results])
+    return len(divergent), len(push), len(pull)
 
-    PORT = sys.argv[1]
+def anti_entropy_worker():
+    global merkle_tree
+    recovery_done.wait()
+    # Dựng cây một lần (đọc toàn bộ value), sau đó cây được cập nhật tăng dần trên mỗi thao tác ghi.
+    started = time.monotonic()
+    tree = merkle.MerkleTree(MERKLE_DEPTH)
+    with store.lock_all():
+        tree.build(store.items())
+        merkle_tree = tree
+    print(f"[ANTI-ENTROPY] Node {NODE_ID}: Đã dựng cây Merkle ({len(store)} keys) trong {time.monotonic() - started:.2f}s.")
+    while True:
+        time.sleep(ANTI_ENTROPY_INTERVAL_SECONDS)
+        for peer_id in SORTED_NODE_IDS:
+            if peer_id == NODE_ID:
+                continue
+            with peer_status_lock:
+                status = peer_status.get(peer_id, "UNKNOWN")
+            if status != "ALIVE":
+                continue
+            try:
+                divergent, pushed, pulled = sync_with_peer(peer_id)
+                if divergent:
+                    print(f"[ANTI-ENTROPY] Node {NODE_ID}: Lệch {divergent} keys với {peer_id}: đẩy {pushed}, kéo về {pulled}.")
+            except grpc.RpcError as e:
+                print(f"[WARN] Node {NODE_ID}: Lỗi RPC khi đồng bộ anti-entropy với {peer_id}: {e.details()}")
+                note_peer_rpc_error(peer_id, e)
+            except Exception as e:
+                print(f"[ERROR] Node {NODE_ID}: Lỗi khi đồng bộ anti-entropy với {peer_id}: {e}")
+# --- Kết thúc Anti-entropy Functions ---
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Node server của hệ thống key-value phân tán.")
+    parser.add_argument("port", help="Cổng của node, phải có trong CLUSTER_CONFIG")
+    parser.add_argument("--durability", choices=wal.DURABILITY_MODES, default=WAL_DURABILITY,
+                        help="fsync: fsync mỗi nhóm ghi; interval: fsync định kỳ; os: để OS tự ghi xuống đĩa")
+    parser.add_argument("--fsync-interval-ms", type=int, default=int(WAL_FSYNC_INTERVAL_SECONDS * 1000),
+                        help="Chu kỳ fsync (ms) khi --durability=interval")
+    parser.add_argument("--write-quorum", type=int, default=WRITE_QUORUM,
+                        help="Số bản ghi (tính cả primary) cần xác nhận trước khi trả lời PUT/DELETE; mặc định là đa số cụm")
+    parser.add_argument("--server-mode", choices=("thread", "aio"), default="thread",
+                        help="thread: gRPC server dùng thread pool; aio: grpc.aio, forward/sao lưu/heartbeat/khôi phục là coroutine")
+    parser.add_argument("--anti-entropy-interval", type=float, default=ANTI_ENTROPY_INTERVAL_SECONDS,
+                        help="Chu kỳ (giây) so sánh cây Merkle với các peer; 0 để tắt")
+    parser.add_argument("--heartbeat-interval", type=float, default=HEARTBEAT_INTERVAL_SECONDS,
+                        help="Chu kỳ heartbeat/gossip (giây)")
+    parser.add_argument("--failure-detector", choices=("probe", "gossip"), default=FAILURE_DETECTOR_MODE,
+                        help="probe: CheckHealth tới mọi peer mỗi chu kỳ; gossip: trao đổi bảng heartbeat với --gossip-fanout peer ngẫu nhiên")
+    parser.add_argument("--phi-threshold", type=float, default=PHI_THRESHOLD,
+                        help="Ngưỡng phi để coi peer là DEAD (cao hơn: ít báo nhầm hơn nhưng phát hiện chậm hơn)")
+    parser.add_argument("--gossip-fanout", type=int, default=GOSSIP_FANOUT,
+                        help="Số peer trao đổi mỗi chu kỳ ở chế độ gossip")
+    parser.add_argument("--store-stripes", type=int, default=STORE_STRIPES,
+                        help="Số stripe (lock riêng) của store; thao tác ghi trên các stripe khác nhau chạy song song")
+    parser.add_argument("--storage-engine", choices=store_engine.ENGINES, default=STORAGE_ENGINE,
+                        help="memory: value trong RAM, snapshot nhị phân; sqlite: value trên đĩa (data_<node_id>.sqlite), dữ liệu có thể lớn hơn RAM; "
+                             "bitcask: value nối vào file segment (data_<node_id>.bitcask/), chỉ key directory trong RAM")
+    parser.add_argument("--sqlite-batch-size", type=int, default=SQLITE_BATCH_SIZE,
+                        help="Số thao tác ghi trong một transaction của engine sqlite")
+    parser.add_argument("--sqlite-cache-mb", type=int, default=SQLITE_CACHE_BYTES // (1024 * 1024),
+                        help="Page cache (MB) của engine sqlite")
+    parser.add_argument("--bitcask-segment-mb", type=int, default=BITCASK_MAX_SEGMENT_BYTES // (1024 * 1024),
+                        help="Kích thước tối đa (MB) của một file segment bitcask trước khi mở file mới")
+    parser.add_argument("--bitcask-merge-ratio", type=float, default=BITCASK_MERGE_RATIO,
+                        help="Merge các segment bitcask khi byte chết (key bị ghi đè/xóa) chiếm từ tỉ lệ này")
+    parser.add_argument("--max-watch-streams", type=int, default=WATCH_MAX_STREAMS,
+                        help="Số stream Watch đồng thời tối đa của node (chế độ thread: mỗi stream giữ một luồng)")
+    parser.add_argument("--max-memory-bytes", type=int, default=MAX_MEMORY_BYTES,
+                        help="Ngân sách byte key/value của store; vượt ngưỡng thì xóa key ít dùng (chế độ cache). 0 = không giới hạn")
+    parser.add_argument("--eviction-policy", choices=eviction.POLICIES, default=EVICTION_POLICY,
+                        help="lru: xóa key truy cập lâu nhất; lfu: xóa key ít truy cập nhất")
+    parser.add_argument("--value-compression", choices=tuple(value_codec.CODECS), default=VALUE_CODEC,
+                        help="Codec nén value lớn trong store, WAL, snapshot và khi sao lưu")
+    parser.add_argument("--compression-level", type=int, default=COMPRESSION_LEVEL,
+                        help="Mức nén: zlib 1-9, lzma preset 0-9 (cao hơn: nhỏ hơn nhưng chậm hơn)")
+    parser.add_argument("--compression-min-bytes", type=int, default=COMPRESSION_MIN_BYTES,
+                        help="Chỉ nén value có kích thước từ ngưỡng này (byte)")
+    parser.add_argument("--grpc-compression", choices=tuple(COMPRESSION_ALGORITHMS), default=GRPC_COMPRESSION,
+                        help="Nén message gRPC giữa các node và trong phản hồi cho client")
+    parser.add_argument("--hint-ttl", type=float, default=HINT_TTL_SECONDS,
+                        help="Tuổi tối đa (giây) của hint; quá hạn thì replica được đồng bộ lại toàn bộ")
+    parser.add_argument("--max-hints-per-peer", type=int, default=HINT_MAX_PER_PEER,
+                        help="Số hint tối đa giữ cho mỗi replica")
+    parser.add_argument("--history-per-origin", type=int, default=CHANGE_HISTORY_PER_ORIGIN,
+                        help="Số thay đổi gần nhất giữ cho mỗi origin; node tụt lại xa hơn phải lấy toàn bộ snapshot")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Cổng HTTP trên 127.0.0.1 phục vụ /metrics (định dạng Prometheus); 0 để tắt")
+    return parser.parse_args()
+
+def serve():
+    global PORT, NODE_ID, DATA_FILE, LEGACY_DATA_FILE, WAL_FILE, WAL_DURABILITY, WAL_FSYNC_INTERVAL_SECONDS, WRITE_QUORUM, ANTI_ENTROPY_INTERVAL_SECONDS, METRICS_PORT, peer_status
+    global HINT_TTL_SECONDS, HINT_MAX_PER_PEER, CHANGE_HISTORY_PER_ORIGIN, STORE_STRIPES, MAX_MEMORY_BYTES, EVICTION_POLICY
+    global STORAGE_ENGINE, SQLITE_FILE, SQLITE_BATCH_SIZE, SQLITE_CACHE_BYTES
+    global BITCASK_DIR, BITCASK_MAX_SEGMENT_BYTES, BITCASK_MERGE_RATIO, WATCH_MAX_STREAMS
+    global VALUE_CODEC, COMPRESSION_LEVEL, COMPRESSION_MIN_BYTES, GRPC_COMPRESSION
+    global HEARTBEAT_INTERVAL_SECONDS, FAILURE_DETECTOR_MODE, PHI_THRESHOLD, GOSSIP_FANOUT, peer_detector
+
+    args = parse_args()
+    PORT = args.port
+    WAL_DURABILITY = args.durability
+    WAL_FSYNC_INTERVAL_SECONDS = args.fsync_interval_ms / 1000
+    WRITE_QUORUM = args.write_quorum
+    ANTI_ENTROPY_INTERVAL_SECONDS = args.anti_entropy_interval
+    METRICS_PORT = args.metrics_port
+    HINT_TTL_SECONDS = args.hint_ttl
+    HINT_MAX_PER_PEER = args.max_hints_per_peer
+    CHANGE_HISTORY_PER_ORIGIN = max(1, args.history_per_origin)
+    change_history.max_per_origin = CHANGE_HISTORY_PER_ORIGIN
+    STORE_STRIPES = max(1, args.store_stripes)
+    STORAGE_ENGINE = args.storage_engine
+    SQLITE_BATCH_SIZE = max(1, args.sqlite_batch_size)
+    SQLITE_CACHE_BYTES = max(1, args.sqlite_cache_mb) * 1024 * 1024
+    BITCASK_MAX_SEGMENT_BYTES = max(1, args.bitcask_segment_mb) * 1024 * 1024
+    BITCASK_MERGE_RATIO = args.bitcask_merge_ratio
+    WATCH_MAX_STREAMS = max(0, args.max_watch_streams)
+    MAX_MEMORY_BYTES = max(0, args.max_memory_bytes)
+    EVICTION_POLICY = args.eviction_policy
+    VALUE_CODEC = args.value_compression
+    COMPRESSION_LEVEL = args.compression_level
+    COMPRESSION_MIN_BYTES = max(0, args.compression_min_bytes)
+    GRPC_COMPRESSION = args.grpc_compression
+    channel_pool.compression = COMPRESSION_ALGORITHMS[GRPC_COMPRESSION]
+    HEARTBEAT_INTERVAL_SECONDS = args.heartbeat_interval
+    FAILURE_DETECTOR_MODE = args.failure_detector
+    PHI_THRESHOLD = args.phi_threshold
+    GOSSIP_FANOUT = max(1, args.gossip_fanout)
+    peer_detector = failure_detector.PhiAccrualDetector(HEARTBEAT_INTERVAL_SECONDS, threshold=PHI_THRESHOLD,
+                                                        acceptable_pause=HEARTBEAT_INTERVAL_SECONDS)
     
     current_node_id_found = False
     for nid, addr in CLUSTER_CONFIG.items():
@@ -419,8 +2294,15 @@ def serve():
         print(f"Lỗi: Port {PORT} không được tìm thấy trong CLUSTER_CONFIG.")
         sys.exit(1)
 
-    DATA_FILE = f"data_{NODE_ID}.json"
+    DATA_FILE = f"data_{NODE_ID}.snap"
+    LEGACY_DATA_FILE = f"data_{NODE_ID}.json"
+    WAL_FILE = f"data_{NODE_ID}.wal"
+    SQLITE_FILE = f"data_{NODE_ID}.sqlite"
+    BITCASK_DIR = f"data_{NODE_ID}.bitcask"
     load_store() # Tải dữ liệu cục bộ trước
+    init_hint_queues()
+    init_eviction()
+    threading.Thread(target=build_key_indexes, daemon=True).start()
 
     # Khởi tạo trạng thái ban đầu của các peer là UNKNOWN
     with peer_status_lock:
@@ -428,6 +2310,21 @@ def serve():
             if peer_id_init != NODE_ID:
                 peer_status[peer_id_init] = "UNKNOWN"
 
+    if ANTI_ENTROPY_INTERVAL_SECONDS > 0:
+        threading.Thread(target=anti_entropy_worker, daemon=True).start()
+    threading.Thread(target=expiry_worker, daemon=True).start()
+
+    print(f"[INFO] === Node ID: {NODE_ID}, Port: {PORT}. Server bắt đầu ({args.server_mode}). ===")
+    print(f"[INFO] Cấu hình cụm: {CLUSTER_CONFIG}")
+    if METRICS_PORT:
+        metrics.start_http_server(metrics_registry, METRICS_PORT)
+        print(f"[INFO] Node {NODE_ID} ({PORT}): Metrics tại http://127.0.0.1:{METRICS_PORT}/metrics")
+    if args.server_mode == "aio":
+        import aio_server
+        aio_server.serve(sys.modules[__name__])
+        shutdown_node()
+        return
+
     # Khởi động luồng heartbeat
     hb_thread = threading.Thread(target=heartbeat_worker, daemon=True)
     hb_thread.start()
@@ -438,12 +2335,12 @@ def serve():
     recovery_thread.start()
 
 
-    server_obj = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Stream Watch giữ luồng trong lúc chờ thay đổi: thêm luồng riêng cho chúng.
+    executors["grpc"] = futures.ThreadPoolExecutor(max_workers=10 + WATCH_MAX_STREAMS)
+    server_obj = grpc.server(executors["grpc"], interceptors=[MetricsInterceptor()], options=SERVER_KEEPALIVE_OPTIONS,
+                             compression=COMPRESSION_ALGORITHMS[GRPC_COMPRESSION])
     demo_pb2_grpc.add_KeyValueServicer_to_server(KeyValueServicer(), server_obj)
 
-    print(f"[INFO] === Node ID: {NODE_ID}, Port: {PORT}. Server bắt đầu. ===")
-    print(f"[INFO] Cấu hình cụm: {CLUSTER_CONFIG}")
-    
     server_obj.add_insecure_port(f"[::]:{PORT}")
     server_obj.start()
     print(f"[INFO] Node {NODE_ID} ({PORT}): Đang lắng nghe...")
@@ -455,9 +2352,17 @@ def serve():
             time.sleep(60) # Giữ luồng chính sống
     except KeyboardInterrupt:
         print(f"\n[INFO] Node {NODE_ID} ({PORT}): Nhận tín hiệu tắt (Ctrl+C). Đang tắt server...")
-        save_store() 
         # server_obj.stop(0) # Dừng server gRPC một cách nhẹ nhàng 
-        print(f"[INFO] Node {NODE_ID} ({PORT}): Server đã tắt.")
+        shutdown_node()
+
+def shutdown_node():
+    write_log.close()
+    store.close()
+    for queue in hint_queues.values():
+        queue.close()
+    print(f"[INFO] Node {NODE_ID} ({PORT}): Thống kê channel pool: {channel_pool.stats()}")
+    channel_pool.close_all()
+    print(f"[INFO] Node {NODE_ID} ({PORT}): Server đã tắt.")
 
 
 if __name__ == "__main__":
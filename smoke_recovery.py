@@ -0,0 +1,244 @@
+# smoke_recovery.py
+# Kiểm tra đầu-cuối quá trình khôi phục của một node trên cụm 3 node chạy cục bộ.
+#
+# Mỗi kịch bản khởi động cụm (bench_cluster.start_cluster, thư mục dữ liệu tạm), tắt một node,
+# ghi thêm dữ liệu trong lúc node đó vắng mặt rồi khởi động lại nó và chờ log báo khôi phục xong.
+# Sau đó so sánh digest của từng key (RPC MerkleLeaves) giữa các node: node vừa khôi phục phải
+# giống hệt các node còn lại. Anti-entropy được đặt chu kỳ rất dài để không che lỗi khôi phục.
+#
+#   catchup-large: value lớn (mặc định 12 x 600 KB), tổng vượt giới hạn message 4 MB của gRPC;
+#                  node khôi phục bằng CatchUp nhiều trang.
+#   snapshot:      node mất toàn bộ dữ liệu trên đĩa và lịch sử thay đổi của các node được giới hạn
+#                  nhỏ (--history-per-origin), nên node phải lấy toàn bộ snapshot (hint phát lại
+#                  không lấp được phần đầu); trong lúc khôi phục vẫn có client ghi vào cụm.
+#   snapshot-bitcask: như snapshot nhưng với --storage-engine bitcask, snapshot được truyền dạng
+#                  file segment (SegmentReceiver).
+#
+# Mỗi kịch bản chạy với từng chế độ server (--modes, mặc định thread và aio) để hai chế độ
+# không lệch nhau. Kết quả in ra dạng JSON; mã thoát 1 nếu có kịch bản thất bại.
+#
+# Cách dùng:
+#   python smoke_recovery.py
+#   python smoke_recovery.py --scenarios snapshot --modes aio --server-args="--durability os"
+import argparse
+import json
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import grpc
+import demo_pb2
+import merkle
+from bench_cluster import SERVER_SCRIPT, STARTUP_TIMEOUT_SECONDS, start_cluster, wait_until_ready, stop_cluster
+from kv_client import KVClient
+from server import CLUSTER_CONFIG
+
+# Tham số server thêm cho từng kịch bản, và dòng log bắt buộc phải có khi khôi phục (kịch bản có
+# dòng này xóa dữ liệu của node trước khi khởi động lại).
+SNAPSHOT_MARK = "Gửi StreamSnapshot"
+SEGMENT_MARK = "bytes file segment"
+SCENARIOS = {
+    "catchup-large": ([], None),
+    "snapshot": (["--history-per-origin", "50"], SNAPSHOT_MARK),
+    "snapshot-bitcask": (["--history-per-origin", "50", "--storage-engine", "bitcask"], SEGMENT_MARK),
+}
+MODES = ("thread", "aio")
+CONVERGE_TIMEOUT_SECONDS = 20
+RECOVERY_TIMEOUT_SECONDS = 120
+# Log của node khi khôi phục xong (thành công hoặc không), xem server.recover_from_peers.
+RECOVERED_MARK = "Khôi phục dữ liệu thành công"
+FAILED_MARK = "Không thể khôi phục dữ liệu"
+BASE_SERVER_ARGS = ["--anti-entropy-interval", "3600"]
+
+
+def stop_node(process):
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def wipe_node_data(data_root: str, node_id: str):
+    # Xóa dữ liệu của node (snapshot, WAL, file của engine, hint), chỉ giữ log.
+    node_dir = os.path.join(data_root, node_id)
+    for name in os.listdir(node_dir):
+        path = os.path.join(node_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif not name.startswith("server."):
+            os.remove(path)
+
+
+def restart_node(data_root: str, node_id: str, server_args: list):
+    node_dir = os.path.join(data_root, node_id)
+    log_path = os.path.join(node_dir, "server.restart.log")
+    with open(log_path, "w") as log_file:
+        process = subprocess.Popen([sys.executable, "-u", SERVER_SCRIPT, CLUSTER_CONFIG[node_id].rsplit(":", 1)[1]]
+                                   + server_args, cwd=node_dir, stdout=log_file, stderr=subprocess.STDOUT)
+    return process, log_path
+
+
+def wait_recovered(process, log_path: str) -> str:
+    # Trả về dòng log kết thúc khôi phục.
+    deadline = time.monotonic() + RECOVERY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Node đã thoát (mã {process.returncode}), xem {log_path}")
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if RECOVERED_MARK in line or FAILED_MARK in line:
+                    return line.strip()
+        time.sleep(0.5)
+    raise RuntimeError(f"Node chưa khôi phục xong sau {RECOVERY_TIMEOUT_SECONDS} giây, xem {log_path}")
+
+
+def key_digests(kv: KVClient, address: str) -> dict:
+    # Digest của mọi key trên node (bản cục bộ), lấy từ các lá của cây Merkle.
+    depth = merkle.DEFAULT_DEPTH
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            response = kv.pool.get_stub(address).MerkleLeaves(
+                demo_pb2.MerkleNodesRequest(depth=depth, indices=list(range(1 << depth, 1 << (depth + 1)))), timeout=10)
+            return {e.key: e.digest for e in response.entries}
+        except grpc.RpcError as e:
+            # Cây Merkle chỉ có sau khi node khôi phục xong.
+            if e.code() != grpc.StatusCode.UNAVAILABLE or time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def keys_not_on(kv: KVClient, node_id: str, prefix: str, count: int) -> list:
+    # Key mà node_id không làm primary: ghi được khi node_id đang tắt.
+    keys = []
+    i = 0
+    while len(keys) < count:
+        key = f"{prefix}{i}"
+        if kv.primary_for(key) != node_id:
+            keys.append(key)
+        i += 1
+    return keys
+
+
+def write_large_values(kv: KVClient, down_id: str, args) -> int:
+    value = os.urandom(args.large_value_kb * 1024)
+    for key in keys_not_on(kv, down_id, "large_", args.large_values):
+        if kv.put(key, value).code != 0:
+            raise RuntimeError(f"PUT {key} không đạt write quorum")
+    return args.large_values
+
+
+def write_small_values(kv: KVClient, down_id: str, prefix: str, count: int) -> int:
+    keys = keys_not_on(kv, down_id, prefix, count)
+    for i in range(0, len(keys), 500):
+        results = kv.multi_put([(key, f"{prefix}{key}") for key in keys[i:i + 500]])
+        if any(r.code != 0 for r in results):
+            raise RuntimeError(f"MultiPut {prefix}* không đạt write quorum")
+    return count
+
+
+def write_until(kv: KVClient, down_id: str, stop: threading.Event, written: list):
+    # Client ghi liên tục trong lúc node khôi phục (key có primary đang sống).
+    keys = keys_not_on(kv, down_id, "during_", 1000)
+    i = 0
+    while not stop.is_set():
+        key = keys[i % len(keys)]
+        try:
+            kv.put(key, f"during_{i}")
+            written[0] += 1
+        except grpc.RpcError:
+            pass
+        i += 1
+
+
+def compare_digests(kv: KVClient, down_id: str) -> dict:
+    # Chờ các thao tác ghi cuối (sao lưu, hint) tới hết, rồi so sánh với node đầu tiên.
+    deadline = time.monotonic() + CONVERGE_TIMEOUT_SECONDS
+    while True:
+        digests = {node_id: key_digests(kv, address) for node_id, address in CLUSTER_CONFIG.items()}
+        reference = digests[sorted(CLUSTER_CONFIG)[0]]
+        if all(d == reference for d in digests.values()) or time.monotonic() > deadline:
+            break
+        time.sleep(1)
+    return {
+        "keys": len(reference),
+        "mismatched_keys": sorted(k for k in set(reference) | set(digests[down_id])
+                                  if reference.get(k) != digests[down_id].get(k))[:20],
+        "converged": all(d == reference for d in digests.values()),
+    }
+
+
+def run_scenario(name: str, mode: str, extra_args: list, args) -> dict:
+    scenario_args, required_mark = SCENARIOS[name]
+    server_args = BASE_SERVER_ARGS + ["--server-mode", mode] + scenario_args + extra_args
+    result = {"scenario": name, "mode": mode, "server_args": server_args}
+    down_id = sorted(CLUSTER_CONFIG)[-1]
+    with tempfile.TemporaryDirectory(prefix="smoke_recovery_") as data_root:
+        processes = start_cluster(data_root, server_args)
+        kv = KVClient(cluster_config=dict(CLUSTER_CONFIG))
+        try:
+            wait_until_ready(kv, processes, STARTUP_TIMEOUT_SECONDS)
+            kv.multi_put([(f"base_{i}", f"v{i}") for i in range(200)])
+            stop_node(processes[down_id])
+            if required_mark:
+                wipe_node_data(data_root, down_id)
+            kv.refresh_view()
+            if name == "catchup-large":
+                result["written_while_down"] = write_large_values(kv, down_id, args)
+            else:
+                result["written_while_down"] = write_small_values(kv, down_id, "down_", args.keys_while_down)
+            stop_writer = threading.Event()
+            written = [0]
+            writer = threading.Thread(target=write_until, args=(kv, down_id, stop_writer, written), daemon=True)
+            writer.start()
+            try:
+                processes[down_id], log_path = restart_node(data_root, down_id, server_args)
+                result["recovery_log"] = wait_recovered(processes[down_id], log_path)
+            finally:
+                stop_writer.set()
+                writer.join()
+            result["written_during_recovery"] = written[0]
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                log_text = f.read()
+            result["used_snapshot"] = SNAPSHOT_MARK in log_text
+            if required_mark:
+                result["required_log"] = required_mark in log_text
+            result.update(compare_digests(kv, down_id))
+            result["ok"] = RECOVERED_MARK in result["recovery_log"] and result["converged"] and \
+                result.get("required_log", True)
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = str(e)
+        finally:
+            kv.close()
+            stop_cluster(processes)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra khôi phục node trên cụm 3 node cục bộ.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--modes", default=",".join(MODES), help="Chế độ server (--server-mode) cần kiểm tra")
+    parser.add_argument("--server-args", default="", help="Tham số thêm cho server.py của mọi node")
+    parser.add_argument("--large-values", type=int, default=12)
+    parser.add_argument("--large-value-kb", type=int, default=600)
+    parser.add_argument("--keys-while-down", type=int, default=2000, help="Số key ghi khi node tắt (kịch bản snapshot)")
+    args = parser.parse_args()
+
+    extra_args = shlex.split(args.server_args)
+    results = [run_scenario(name, mode, extra_args, args)
+               for name in args.scenarios.split(",") for mode in args.modes.split(",")]
+    print(json.dumps({"ok": all(r["ok"] for r in results), "results": results}, indent=2, ensure_ascii=False))
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
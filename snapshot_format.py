@@ -0,0 +1,274 @@
+# snapshot_format.py
+# Định dạng snapshot nhị phân cho store của một node.
+#
+# Bố cục file (mọi số nguyên đều little-endian):
+#   header  : magic, số key, offset của các vùng, crc32 của index và của chính header
+#   index   : `count` entry kích thước cố định, sắp xếp theo key
+#             (offset key, độ dài key, offset value, độ dài value, crc32 của value, mã codec)
+#   keys    : các key (UTF-8) nối liền nhau
+#   values  : các value (bytes, bản nén giữ nguyên như trong store) nối liền nhau
+#   meta    : một object JSON nhỏ (node_id, thời điểm tạo, ...)
+#
+# SnapshotReader mở file bằng mmap và chỉ đọc value khi được truy cập, nên thời gian
+# khởi động không phụ thuộc vào kích thước dữ liệu.
+#
+# Phiên bản 1 (KVSNAP01) không có mã codec trong index và value là chuỗi UTF-8; file cũ vẫn đọc
+# được (value trả về là các byte UTF-8 đó). write_snapshot luôn ghi phiên bản 2.
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from collections.abc import Mapping, MutableMapping
+
+import value_codec
+
+MAGIC = b"KVSNAP02"
+MAGIC_V1 = b"KVSNAP01"
+
+# magic, count, index_offset, keys_offset, values_offset, meta_offset, meta_len, index_crc
+_HEADER_BODY = struct.Struct("<8sQQQQQQI")
+_HEADER_CRC = struct.Struct("<I")
+HEADER_SIZE = _HEADER_BODY.size + _HEADER_CRC.size
+# key_offset, key_len, value_offset, value_len, value_crc, codec
+_INDEX_ENTRY = struct.Struct("<QIQIIB")
+# Phiên bản 1: không có codec
+_INDEX_ENTRY_V1 = struct.Struct("<QIQII")
+
+
+class SnapshotCorruptError(ValueError):
+    pass
+
+
+def is_snapshot_file(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) in (MAGIC, MAGIC_V1)
+
+
+def write_snapshot(path: str, data: Mapping, meta: dict = None):
+    """Ghi `data` (key -> value kiểu bytes, có thể là bản nén của value_codec) thành file
+    snapshot, ghi file tạm rồi rename."""
+    keys = sorted(data.keys())
+    encoded_keys = [k.encode("utf-8") for k in keys]
+    values = [data[k] for k in keys]
+
+    index = bytearray()
+    key_offset = 0
+    value_offset = 0
+    for key_bytes, value_bytes in zip(encoded_keys, values):
+        index += _INDEX_ENTRY.pack(key_offset, len(key_bytes), value_offset, len(value_bytes),
+                                   zlib.crc32(value_bytes), value_codec.codec_of(value_bytes))
+        key_offset += len(key_bytes)
+        value_offset += len(value_bytes)
+
+    meta_bytes = json.dumps(meta or {}, ensure_ascii=False).encode("utf-8")
+    index_offset = HEADER_SIZE
+    keys_offset = index_offset + len(index)
+    values_offset = keys_offset + key_offset
+    meta_offset = values_offset + value_offset
+    header = _HEADER_BODY.pack(MAGIC, len(keys), index_offset, keys_offset, values_offset,
+                               meta_offset, len(meta_bytes), zlib.crc32(index))
+    header += _HEADER_CRC.pack(zlib.crc32(header))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(index)
+        for key_bytes in encoded_keys:
+            f.write(key_bytes)
+        for value_bytes in values:
+            f.write(value_bytes)
+        f.write(meta_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader(Mapping):
+    """Mapping chỉ-đọc trên một file snapshot, value được đọc lười qua mmap.
+
+    Việc mở file chỉ kiểm tra header (O(1)); verify() kiểm tra toàn bộ index và value.
+    """
+
+    def __init__(self, path: str, verify_index: bool = False):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            self._file.close()
+            raise SnapshotCorruptError(f"{path}: file quá ngắn để là snapshot")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._mm[:_HEADER_BODY.size]
+        (header_crc,) = _HEADER_CRC.unpack_from(self._mm, _HEADER_BODY.size)
+        if zlib.crc32(header) != header_crc:
+            self.close()
+            raise SnapshotCorruptError(f"{path}: sai checksum header")
+        (magic, self._count, self._index_offset, self._keys_offset, self._values_offset,
+         self._meta_offset, self._meta_len, self._index_crc) = _HEADER_BODY.unpack(header)
+        self._entry_struct = _INDEX_ENTRY if magic == MAGIC else _INDEX_ENTRY_V1
+        if magic not in (MAGIC, MAGIC_V1) or self._meta_offset + self._meta_len > size:
+            self.close()
+            raise SnapshotCorruptError(f"{path}: header không hợp lệ")
+        if verify_index:
+            self._verify_index()
+
+    def _verify_index(self):
+        index = self._mm[self._index_offset:self._keys_offset]
+        if zlib.crc32(index) != self._index_crc:
+            raise SnapshotCorruptError(f"{self.path}: sai checksum index")
+
+    def verify(self):
+        self._verify_index()
+        for i in range(self._count):
+            self._read_value(i)
+
+    @property
+    def meta(self) -> dict:
+        raw = self._mm[self._meta_offset:self._meta_offset + self._meta_len]
+        return json.loads(raw.decode("utf-8")) if raw else {}
+
+    def _entry(self, i: int):
+        # (key_offset, key_len, value_offset, value_len, value_crc, codec)
+        entry = self._entry_struct.unpack_from(self._mm, self._index_offset + i * self._entry_struct.size)
+        return entry if len(entry) == 6 else entry + (value_codec.CODEC_NONE,)
+
+    def _key_bytes(self, i: int) -> bytes:
+        key_offset, key_len, _, _, _, _ = self._entry(i)
+        start = self._keys_offset + key_offset
+        return self._mm[start:start + key_len]
+
+    def _read_value(self, i: int) -> bytes:
+        _, _, value_offset, value_len, value_crc, codec = self._entry(i)
+        start = self._values_offset + value_offset
+        value_bytes = self._mm[start:start + value_len]
+        if zlib.crc32(value_bytes) != value_crc:
+            raise SnapshotCorruptError(f"{self.path}: sai checksum value tại entry {i}")
+        return value_codec.wrap(codec, value_bytes)
+
+    def _find(self, key: str) -> int:
+        target = key.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_bytes(lo) == target:
+            return lo
+        return -1
+
+    def __getitem__(self, key: str) -> bytes:
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._read_value(i)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def data_bytes(self) -> int:
+        # Tổng số byte của mọi key (UTF-8) và value (như lưu trữ), lấy từ header mà không đọc value.
+        return self._meta_offset - self._keys_offset
+
+    @property
+    def size_bytes(self) -> int:
+        # Kích thước vùng mmap (chỉ các trang đã được đọc mới thực sự nằm trong RAM).
+        return len(self._mm) if self._mm is not None else 0
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+class LazyStore(MutableMapping):
+    """Store dùng snapshot (hoặc bất kỳ Mapping nào) làm lớp nền chỉ-đọc.
+
+    Các thao tác ghi sau khi khởi động nằm trong lớp overlay (dict) và tập key đã xóa,
+    lớp nền không bao giờ bị thay đổi.
+    """
+
+    def __init__(self, base: Mapping = None):
+        self.base = base if base is not None else {}
+        self._overlay = {}
+        self._deleted = set()
+        self._len = len(self.base)
+        self._overlay_bytes = 0 # Tổng sys.getsizeof của key và value trong overlay
+        if isinstance(self.base, SnapshotReader):
+            self._base_bytes = self.base.size_bytes
+        else:
+            self._base_bytes = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.base.items())
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        return self.base[key]
+
+    def __contains__(self, key) -> bool:
+        if key in self._overlay:
+            return True
+        return key not in self._deleted and key in self.base
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._len += 1
+        old = self._overlay.get(key)
+        if old is None:
+            self._overlay_bytes += sys.getsizeof(key) + sys.getsizeof(value)
+        else:
+            self._overlay_bytes += sys.getsizeof(value) - sys.getsizeof(old)
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        old = self._overlay.pop(key, None)
+        if old is not None:
+            self._overlay_bytes -= sys.getsizeof(key) + sys.getsizeof(old)
+        if key in self.base:
+            self._deleted.add(key)
+        self._len -= 1
+
+    def __iter__(self):
+        for key in self.base:
+            if key not in self._overlay and key not in self._deleted:
+                yield key
+        yield from self._overlay
+
+    def __len__(self) -> int:
+        return self._len
+
+    def memory_usage(self) -> dict:
+        """Ước lượng bộ nhớ (byte): overlay gồm dict, tập key đã xóa và các key/value trong
+        overlay; base là kích thước snapshot được mmap (hoặc của dict nền)."""
+        overlay = self._overlay_bytes + sys.getsizeof(self._overlay) + sys.getsizeof(self._deleted)
+        return {"overlay": overlay, "base": self._base_bytes}
+
+
+def load_json_store(path: str) -> dict:
+    # File JSON cũ lưu value dạng chuỗi; store dùng bytes.
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: v.encode("utf-8") for k, v in json.load(f).items()}
+
+
+def convert_json_to_snapshot(json_path: str, snapshot_path: str, node_id: str = None) -> int:
+    data = load_json_store(json_path)
+    write_snapshot(snapshot_path, data, meta={"node_id": node_id, "created_at": time.time(),
+                                              "source": os.path.basename(json_path)})
+    return len(data)
@@ -0,0 +1,259 @@
+# sqlite_engine.py
+# Engine lưu trữ trên đĩa bằng sqlite3 (thư viện chuẩn) cho node server: --storage-engine sqlite
+#
+# Value nằm trong file data_<node_id>.sqlite, bộ nhớ chỉ giữ page cache của sqlite (giới hạn bởi
+# cache_bytes), nên dữ liệu có thể lớn hơn RAM. Thao tác ghi chạy trong một transaction mở sẵn
+# và được commit theo lô (batch_size thao tác) thay vì commit từng key; độ bền của từng thao tác
+# vẫn do WAL của node đảm bảo (wal.py). Khi compaction WAL, checkpoint() commit phần còn lại cùng
+# meta (seq, tombstone, TTL) trong cùng transaction, sau đó WAL mới xóa phần log cũ. Sau sự cố,
+# file sqlite có thể đã chứa một phần các thao tác sau checkpoint; phát lại WAL ghi lại đúng các
+# value đó theo thứ tự nên trạng thái cuối vẫn đúng.
+#
+# Database dùng journal_mode=WAL: snapshot() mở một connection chỉ-đọc giữ transaction đọc, thấy
+# đúng trạng thái lúc commit trong khi connection chính tiếp tục ghi.
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+import value_codec
+from store_engine import StorageEngine, DEFAULT_STRIPES, entry_size
+
+DEFAULT_BATCH_SIZE = 1000 # Số thao tác ghi tối đa trong một transaction
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024 # Page cache của connection chính
+_PAGE_ROWS = 1000 # Số dòng mỗi lần đọc khi duyệt key
+_ABSENT = object()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, codec INTEGER NOT NULL DEFAULT 0)",
+    # len/data_bytes được cập nhật trong cùng transaction với dữ liệu; meta ghi ở mỗi checkpoint.
+    "CREATE TABLE IF NOT EXISTS engine_state (name TEXT PRIMARY KEY, value)",
+)
+
+
+def _connect(path: str, cache_bytes: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute(f"PRAGMA cache_size=-{max(1, cache_bytes // 1024)}")
+    return conn
+
+
+class SqliteStore(StorageEngine):
+    """Store trên sqlite3, cùng giao diện với StripedStore (xem store_engine.StorageEngine).
+
+    Mọi câu lệnh trên connection chính được tuần tự hóa bằng một lock; các stripe lock chỉ để
+    người gọi giữ nhất quán giữa store và trạng thái khác của key, như với StripedStore.
+    """
+
+    def __init__(self, path: str, stripes: int = DEFAULT_STRIPES, batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.cache_bytes = cache_bytes
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+        self._db_lock = threading.Lock()
+        self._conn = _connect(path, cache_bytes)
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        state = dict(self._conn.execute("SELECT name, value FROM engine_state"))
+        self._len = state.get("len", 0)
+        self._data_bytes = state.get("data_bytes", 0)
+        self._meta = json.loads(state["meta"]) if "meta" in state else {}
+        self._pending = 0 # Số thao tác ghi chưa commit
+
+    @property
+    def meta(self) -> dict:
+        return self._meta
+
+    @property
+    def stripe_count(self) -> int:
+        return len(self._locks)
+
+    def lock_for(self, key):
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def lock_all(self):
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    # Các hàm *_locked chạy khi đang giữ self._db_lock.
+    def _commit_locked(self, meta: dict = None):
+        rows = [("len", self._len), ("data_bytes", self._data_bytes)]
+        if meta is not None:
+            rows.append(("meta", json.dumps(meta)))
+        self._conn.executemany("INSERT OR REPLACE INTO engine_state (name, value) VALUES (?, ?)", rows)
+        self._conn.commit()
+        self._pending = 0
+
+    def _note_write_locked(self):
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self._commit_locked()
+
+    def _old_size_locked(self, key):
+        row = self._conn.execute("SELECT length(value) FROM kv WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def get(self, key, default=None):
+        with self._db_lock:
+            row = self._conn.execute("SELECT value, codec FROM kv WHERE key = ?", (key,)).fetchone()
+        return default if row is None else value_codec.wrap(row[1], row[0])
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        with self._db_lock:
+            return self._conn.execute("SELECT 1 FROM kv WHERE key = ?", (key,)).fetchone() is not None
+
+    def __setitem__(self, key, value):
+        with self.lock_for(key), self._db_lock:
+            old_size = self._old_size_locked(key)
+            self._conn.execute("INSERT OR REPLACE INTO kv (key, value, codec) VALUES (?, ?, ?)",
+                               (key, bytes(value), value_codec.codec_of(value)))
+            if old_size is None:
+                self._len += 1
+            else:
+                self._data_bytes -= entry_size(key, b"") + old_size
+            self._data_bytes += entry_size(key, value)
+            self._note_write_locked()
+
+    def __delitem__(self, key):
+        with self.lock_for(key), self._db_lock:
+            old_size = self._old_size_locked(key)
+            if old_size is None:
+                raise KeyError(key)
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+            self._len -= 1
+            self._data_bytes -= entry_size(key, b"") + old_size
+            self._note_write_locked()
+
+    def pop(self, key, default=_ABSENT):
+        with self.lock_for(key):
+            value = self.get(key)
+            if value is None:
+                if default is _ABSENT:
+                    raise KeyError(key)
+                return default
+            del self[key]
+            return value
+
+    def _pages(self, columns: str):
+        # Duyệt theo thứ tự key, mỗi lần một trang, không giữ cursor mở giữa các trang.
+        last = None
+        while True:
+            with self._db_lock:
+                if last is None:
+                    rows = self._conn.execute(f"SELECT {columns} FROM kv ORDER BY key LIMIT ?", (_PAGE_ROWS,)).fetchall()
+                else:
+                    rows = self._conn.execute(f"SELECT {columns} FROM kv WHERE key > ? ORDER BY key LIMIT ?",
+                                              (last, _PAGE_ROWS)).fetchall()
+            yield from rows
+            if len(rows) < _PAGE_ROWS:
+                return
+            last = rows[-1][0]
+
+    def __iter__(self):
+        # Không phải một thời điểm cố định: dùng snapshot() nếu cần.
+        for (key,) in self._pages("key"):
+            yield key
+
+    def items(self):
+        for key, value, codec in self._pages("key, value, codec"):
+            yield key, value_codec.wrap(codec, value)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def snapshot(self) -> "SqliteSnapshot":
+        with self.lock_all():
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> "SqliteSnapshot":
+        with self._db_lock:
+            self._commit_locked()
+        return SqliteSnapshot(self.path, self._len)
+
+    def checkpoint(self, meta_fn):
+        # Commit mọi thao tác đang chờ cùng meta. Không phải ghi lại toàn bộ dữ liệu như
+        # snapshot của engine memory, nên chỉ giữ mọi stripe trong thời gian một lần commit.
+        with self.lock_all():
+            meta = meta_fn()
+            with self._db_lock:
+                self._commit_locked(meta)
+        self._meta = meta
+
+    def data_bytes(self) -> int:
+        return self._data_bytes
+
+    def memory_usage(self) -> dict:
+        # sqlite3 không cho biết bộ nhớ thực dùng của connection: báo giới hạn page cache.
+        return {"sqlite_cache": self.cache_bytes}
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+
+    def close(self):
+        with self._db_lock:
+            self._commit_locked()
+            self._conn.close()
+
+
+class SqliteSnapshot(Mapping):
+    """View chỉ-đọc của SqliteStore: một connection riêng giữ transaction đọc mở từ lúc tạo."""
+
+    def __init__(self, path: str, length: int):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("BEGIN")
+        self._conn.execute("SELECT count(*) FROM engine_state").fetchone() # Cố định thời điểm đọc
+        self._len = length
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, codec FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return value_codec.wrap(row[1], row[0])
+
+    def __iter__(self):
+        last = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self._conn.execute("SELECT key FROM kv ORDER BY key LIMIT ?", (_PAGE_ROWS,)).fetchall()
+                else:
+                    rows = self._conn.execute("SELECT key FROM kv WHERE key > ? ORDER BY key LIMIT ?",
+                                              (last, _PAGE_ROWS)).fetchall()
+            for (key,) in rows:
+                yield key
+            if len(rows) < _PAGE_ROWS:
+                return
+            last = rows[-1][0]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,332 @@
+# store_engine.py
+# Store key-value trong bộ nhớ cho node server, an toàn khi nhiều luồng cùng ghi.
+#
+# Key được chia vào các stripe theo hash, mỗi stripe có lock riêng và phần dữ liệu riêng (overlay
+# các key đã ghi, tập key đã xóa) trên một lớp nền chỉ-đọc dùng chung (snapshot mmap lúc khởi động,
+# giống LazyStore). Thao tác ghi trên các key thuộc stripe khác nhau không chờ nhau.
+#
+# snapshot() trả về một view chỉ-đọc tại một thời điểm (copy-on-write): tạo view chỉ cần giữ mọi
+# stripe trong chốc lát; sau đó mỗi thao tác ghi đầu tiên lên một key sẽ lưu value cũ của key vào
+# các view đang mở. Việc đọc/ghi view ra file hay stream không chặn thao tác ghi.
+#
+# StorageEngine mô tả giao diện store mà server.py dùng; StripedStore là engine "memory" (toàn bộ
+# value trong bộ nhớ, bền vững nhờ WAL và snapshot nhị phân), sqlite_engine.SqliteStore là engine
+# "sqlite" (value nằm trên đĩa, chỉ phần đang dùng được cache), bitcask_engine.BitcaskStore là engine
+# "bitcask" (value nối vào file segment, chỉ key directory trong RAM).
+import abc
+import sys
+import threading
+from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+
+import snapshot_format
+from snapshot_format import SnapshotReader
+
+DEFAULT_STRIPES = 64
+ENGINES = ("memory", "sqlite", "bitcask")
+_ABSENT = object() # Key chưa tồn tại tại thời điểm tạo view
+
+
+def entry_size(key: str, value: bytes) -> int:
+    # Số byte của key (UTF-8) và value như lưu trữ (bản nén nếu có), đơn vị của ngân sách bộ nhớ.
+    return len(key.encode("utf-8")) + len(value)
+
+
+class _Stripe:
+    __slots__ = ("lock", "overlay", "deleted", "len_delta", "overlay_bytes", "data_delta")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.overlay = {}
+        self.deleted = set()
+        self.len_delta = 0 # Số key tăng/giảm so với lớp nền
+        self.overlay_bytes = 0 # Tổng sys.getsizeof của key và value trong overlay
+        self.data_delta = 0 # Số byte key/value (entry_size) tăng/giảm so với lớp nền
+
+
+class StorageEngine(MutableMapping, metaclass=abc.ABCMeta):
+    """Giao diện store của node: key str -> value bytes (bytes thường hoặc bản nén của value_codec).
+
+    Ngoài các thao tác của MutableMapping (get, gán, pop, duyệt key, len), mỗi engine cung cấp:
+      lock_for(key), lock_all(): lock theo stripe, quy ước như StripedStore.
+      snapshot(): view chỉ-đọc (Mapping) tại một thời điểm, gọi close() hoặc dùng `with` khi xong.
+      checkpoint(meta_fn): ghi bền vững toàn bộ store cùng meta_fn() (được gọi khi engine đang giữ
+          lock_all(), trạng thái trả về phải khớp với store lúc đó) để WAL bỏ được phần log cũ.
+      meta: meta của lần checkpoint gần nhất, đọc được khi mở store.
+      data_bytes(), memory_usage(): cho ngân sách bộ nhớ và metrics.
+      close(): gọi khi node tắt.
+    Engine thiếu một phương thức bắt buộc sẽ báo TypeError ngay khi khởi tạo.
+    """
+
+    @property
+    def meta(self) -> dict:
+        return {}
+
+    @abc.abstractmethod
+    def lock_for(self, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lock_all(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def snapshot(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def checkpoint(self, meta_fn):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def data_bytes(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def memory_usage(self) -> dict:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class StripedStore(StorageEngine):
+    """Store chia stripe trên lớp nền chỉ-đọc `base`. Mọi phương thức tự khóa stripe của key.
+
+    Người gọi cần giữ nhất quán giữa store và trạng thái khác của key (phiên bản, WAL) thì
+    giữ lock_for(key) quanh cả cụm thao tác (lock là RLock nên các phương thức vẫn dùng được
+    bên trong). lock_all() giữ mọi stripe theo thứ tự, dùng cho thao tác cần toàn bộ store đứng
+    yên; không được giữ lock của hai stripe theo cách khác để tránh deadlock.
+    """
+
+    def __init__(self, base: Mapping = None, stripes: int = DEFAULT_STRIPES, path: str = None):
+        self.base = base if base is not None else {}
+        self.path = path # File snapshot mà checkpoint() ghi ra
+        self._stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self._snapshots = () # Các view đang mở; chỉ thay (không sửa tại chỗ) khi giữ mọi stripe
+        if isinstance(self.base, SnapshotReader):
+            self._base_bytes = self.base.size_bytes
+            self._base_data_bytes = self.base.data_bytes
+        else:
+            self._base_bytes = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.base.items())
+            self._base_data_bytes = sum(entry_size(k, v) for k, v in self.base.items())
+        self._base_len = len(self.base)
+
+    @property
+    def meta(self) -> dict:
+        return self.base.meta if isinstance(self.base, SnapshotReader) else {}
+
+    @property
+    def stripe_count(self) -> int:
+        return len(self._stripes)
+
+    def _stripe(self, key) -> _Stripe:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def lock_for(self, key):
+        return self._stripe(key).lock
+
+    @contextmanager
+    def lock_all(self):
+        for stripe in self._stripes:
+            stripe.lock.acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(self._stripes):
+                stripe.lock.release()
+
+    # Các hàm *_in(stripe, ...) chạy khi đang giữ stripe.lock.
+    def _get_in(self, stripe: _Stripe, key, default=None):
+        value = stripe.overlay.get(key, _ABSENT)
+        if value is not _ABSENT:
+            return value
+        if key in stripe.deleted:
+            return default
+        return self.base.get(key, default)
+
+    def _preserve_in(self, stripe: _Stripe, key):
+        for view in self._snapshots:
+            view._preserve(stripe, key)
+
+    def __getitem__(self, key):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            value = self._get_in(stripe, key, _ABSENT)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return self._get_in(stripe, key, default)
+
+    def __contains__(self, key) -> bool:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            return self._get_in(stripe, key, _ABSENT) is not _ABSENT
+
+    def __setitem__(self, key, value):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            self._preserve_in(stripe, key)
+            old = stripe.overlay.get(key, _ABSENT)
+            if old is _ABSENT:
+                if key in stripe.deleted or key not in self.base:
+                    stripe.len_delta += 1
+                else:
+                    stripe.data_delta -= entry_size(key, self.base[key]) # Ghi đè key của lớp nền
+                stripe.overlay_bytes += sys.getsizeof(key) + sys.getsizeof(value)
+            else:
+                stripe.overlay_bytes += sys.getsizeof(value) - sys.getsizeof(old)
+                stripe.data_delta -= entry_size(key, old)
+            stripe.data_delta += entry_size(key, value)
+            stripe.overlay[key] = value
+
+    def __delitem__(self, key):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            current = self._get_in(stripe, key, _ABSENT)
+            if current is _ABSENT:
+                raise KeyError(key)
+            self._preserve_in(stripe, key)
+            stripe.data_delta -= entry_size(key, current)
+            old = stripe.overlay.pop(key, _ABSENT)
+            if old is not _ABSENT:
+                stripe.overlay_bytes -= sys.getsizeof(key) + sys.getsizeof(old)
+            if key in self.base:
+                stripe.deleted.add(key)
+            stripe.len_delta -= 1
+
+    def pop(self, key, default=_ABSENT):
+        stripe = self._stripe(key)
+        with stripe.lock:
+            value = self._get_in(stripe, key, _ABSENT)
+            if value is _ABSENT:
+                if default is _ABSENT:
+                    raise KeyError(key)
+                return default
+            del self[key]
+            return value
+
+    def __iter__(self):
+        # Không phải một thời điểm cố định: dùng snapshot() nếu cần.
+        for key in self.base:
+            stripe = self._stripe(key)
+            with stripe.lock:
+                # Key đã ghi lại được trả về ở vòng overlay
+                live = key not in stripe.overlay and key not in stripe.deleted
+            if live:
+                yield key
+        for stripe in self._stripes:
+            with stripe.lock:
+                keys = list(stripe.overlay)
+            yield from keys
+
+    def __len__(self) -> int:
+        return self._base_len + sum(stripe.len_delta for stripe in self._stripes)
+
+    def snapshot(self) -> "StoreSnapshot":
+        """View chỉ-đọc của store tại thời điểm gọi. Gọi close() (hoặc dùng `with`) khi xong
+        để thao tác ghi không phải lưu value cũ cho view nữa."""
+        with self.lock_all():
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> "StoreSnapshot":
+        # Như snapshot() khi người gọi đã giữ lock_all() (để chụp thêm trạng thái khác cùng lúc).
+        view = StoreSnapshot(self, len(self))
+        self._snapshots = self._snapshots + (view,)
+        return view
+
+    def _release(self, view: "StoreSnapshot"):
+        with self.lock_all():
+            self._snapshots = tuple(v for v in self._snapshots if v is not view)
+
+    def checkpoint(self, meta_fn):
+        # Chỉ giữ mọi stripe trong lúc chụp view cùng meta; việc ghi file đọc từ view nên các
+        # thao tác ghi vẫn tiếp tục. write_snapshot ghi ra file tạm rồi rename.
+        with self.lock_all():
+            view = self._snapshot_locked()
+            meta = meta_fn()
+        with view:
+            snapshot_format.write_snapshot(self.path, view, meta=meta)
+
+    def data_bytes(self) -> int:
+        """Tổng entry_size của mọi key hiện có, gồm cả key của lớp nền."""
+        return self._base_data_bytes + sum(stripe.data_delta for stripe in self._stripes)
+
+    def memory_usage(self) -> dict:
+        """Ước lượng bộ nhớ (byte): overlay gồm dict, tập key đã xóa và các key/value trong
+        overlay của mọi stripe; base là kích thước snapshot được mmap (hoặc của dict nền)."""
+        overlay = sum(s.overlay_bytes + sys.getsizeof(s.overlay) + sys.getsizeof(s.deleted) for s in self._stripes)
+        return {"overlay": overlay, "base": self._base_bytes}
+
+
+class StoreSnapshot(Mapping):
+    """View chỉ-đọc của StripedStore tại một thời điểm. Key bị ghi/xóa sau thời điểm đó được
+    đọc từ bản value cũ đã lưu lại (theo từng stripe); key chưa đổi được đọc thẳng từ store."""
+
+    def __init__(self, store: StripedStore, length: int):
+        self._store = store
+        self._len = length
+        self._preserved = {} # id(stripe) -> {key: value cũ hoặc _ABSENT}
+        self._closed = False
+
+    def _preserve(self, stripe: _Stripe, key):
+        # Gọi bởi store khi giữ stripe.lock, trước lần ghi đầu tiên lên key kể từ khi tạo view.
+        preserved = self._preserved.setdefault(id(stripe), {})
+        if key not in preserved:
+            preserved[key] = self._store._get_in(stripe, key, _ABSENT)
+
+    def _get_in(self, stripe: _Stripe, key):
+        preserved = self._preserved.get(id(stripe))
+        if preserved is not None and key in preserved:
+            return preserved[key]
+        return self._store._get_in(stripe, key, _ABSENT)
+
+    def __getitem__(self, key):
+        stripe = self._store._stripe(key)
+        with stripe.lock:
+            value = self._get_in(stripe, key)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        stripe = self._store._stripe(key)
+        with stripe.lock:
+            return self._get_in(stripe, key) is not _ABSENT
+
+    def __iter__(self):
+        # Mỗi key được quyết định đúng một lần khi giữ lock của stripe chứa nó: key của lớp nền
+        # ở vòng đầu, key chỉ có trong overlay hoặc trong phần đã lưu ở vòng theo stripe.
+        store = self._store
+        base = store.base
+        for key in base:
+            stripe = store._stripe(key)
+            with stripe.lock:
+                present = self._get_in(stripe, key) is not _ABSENT
+            if present:
+                yield key
+        for stripe in store._stripes:
+            with stripe.lock:
+                preserved = self._preserved.get(id(stripe), {})
+                keys = [k for k in stripe.overlay if k not in preserved and k not in base]
+                keys.extend(k for k, v in preserved.items() if v is not _ABSENT and k not in base)
+            yield from keys
+
+    def __len__(self) -> int:
+        return self._len
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._store._release(self)
+            self._preserved = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
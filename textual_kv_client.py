@@ -3,8 +3,8 @@ import threading
 import time
 import json
 import demo_pb2
-import demo_pb2_grpc
 import random
+from kv_client import KVClient, KEY_NOT_FOUND_MSG, display_value
 
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal, Vertical
@@ -17,18 +17,27 @@ CLIENT_SIDE_CLUSTER_CONFIG = {
     "node2": "localhost:50052",
     "node3": "localhost:50053",
 }
-SERVER_ADDRESSES_OPTIONS = [(f"{nid} ({addr})", addr) for nid, addr in CLIENT_SIDE_CLUSTER_CONFIG.items()]
-KEY_NOT_FOUND_MSG = "<KEY_NOT_FOUND>"
+AUTO_ROUTE = "auto" # Gửi thẳng tới primary của key
+SERVER_ADDRESSES_OPTIONS = [("Tự động (primary của key)", AUTO_ROUTE)] + \
+    [(f"{nid} ({addr})", addr) for nid, addr in CLIENT_SIDE_CLUSTER_CONFIG.items()]
 ASSUMED_SERVER_HEARTBEAT_INTERVAL = 3
+# Client dùng chung (hash ring phải trùng với cấu hình của server, channel được giữ trong pool)
+kv = KVClient(CLIENT_SIDE_CLUSTER_CONFIG)
+READ_CONSISTENCY_OPTIONS = {"PRIMARY": demo_pb2.READ_PRIMARY, "ANY": demo_pb2.READ_ANY,
+                            "BOUNDED": demo_pb2.READ_BOUNDED_STALENESS}
 
 # --- Hàm tiện ích ---
 def get_primary_node_id_for_key_client(key: str) -> str:
-    sorted_node_ids = sorted(CLIENT_SIDE_CLUSTER_CONFIG.keys())
-    if not sorted_node_ids: return "N/A"
-    key_hash = 0
-    for char in key: key_hash = (key_hash * 31 + ord(char)) & 0xFFFFFFFF
-    primary_node_index = key_hash % len(sorted_node_ids)
-    return sorted_node_ids[primary_node_index]
+    return kv.primary_for(key) or "N/A"
+
+def check_node_status_markup(address: str) -> str:
+    try:
+        status = kv.check_health(address, timeout=0.8)
+    except Exception:
+        return "[magenta]ERROR_CONNECT[/]"
+    if status is None: return "[red]DEAD[/]"
+    if status == "SERVING": return "[green]ALIVE[/]"
+    return f"[yellow]UNHEALTHY ({status})[/]"
 
 class KVApp(App[None]):
     CSS_PATH = "kv_app.tcss"
@@ -54,7 +63,7 @@ class KVApp(App[None]):
                 else:
                     yield Static("Lỗi: Cấu hình server rỗng.")
 
-                yield Label("Lệnh (PUT key value / GET key / DELETE key):")
+                yield Label("Lệnh (PUT key value / GET key [ANY | BOUNDED giây] / DELETE key):")
                 yield Input(placeholder="VD: PUT mykey myvalue", id="command_input")
                 with Horizontal(id="button_bar"):
                     yield Button("Gửi Lệnh", id="send_button_widget", variant="primary") # ID widget
@@ -98,17 +107,8 @@ class KVApp(App[None]):
             new_statuses = {}
             # self.call_from_thread(self.append_client_log, "TUI: Bắt đầu chu kỳ kiểm tra health...") 
             for node_id, address in CLIENT_SIDE_CLUSTER_CONFIG.items():
-                status_str = "[red]DEAD[/]" 
                 # self.call_from_thread(self.append_client_log, f"TUI: Đang check {node_id} tại {address}")
-                try:
-                    with grpc.insecure_channel(address) as channel:
-                        stub = demo_pb2_grpc.KeyValueStub(channel)
-                        response = stub.CheckHealth(demo_pb2.HealthCheckRequest(), timeout=0.8)
-                        if response.status == "SERVING": status_str = "[green]ALIVE[/]"
-                        else: status_str = f"[yellow]UNHEALTHY ({response.status})[/]"
-                except grpc.RpcError: pass 
-                except Exception: status_str = "[magenta]ERROR_CONNECT[/]"
-                new_statuses[node_id] = status_str
+                new_statuses[node_id] = check_node_status_markup(address)
             
             def update_ui_from_thread():
                 with self.status_lock: self.cluster_status_data = new_statuses
@@ -152,16 +152,7 @@ class KVApp(App[None]):
     def _manual_refresh_status(self):
         temp_statuses = {}
         for node_id, address in CLIENT_SIDE_CLUSTER_CONFIG.items():
-            status_str = "[red]DEAD[/]"
-            try:
-                with grpc.insecure_channel(address) as channel:
-                    stub = demo_pb2_grpc.KeyValueStub(channel)
-                    response = stub.CheckHealth(demo_pb2.HealthCheckRequest(), timeout=0.8)
-                    if response.status == "SERVING": status_str = "[green]ALIVE[/]"
-                    else: status_str = f"[yellow]UNHEALTHY ({response.status})[/]"
-            except grpc.RpcError: pass
-            except Exception: status_str = "[magenta]ERROR_CONNECT[/]"
-            temp_statuses[node_id] = status_str
+            temp_statuses[node_id] = check_node_status_markup(address)
         
         def update_ui_from_manual_refresh():
             with self.status_lock: self.cluster_status_data = temp_statuses
@@ -180,28 +171,34 @@ class KVApp(App[None]):
         if len(parts) > 1: key = parts[1]
         if len(parts) > 2: value_str = parts[2]
         
-        result_message = f"Lệnh không hợp lệ: '{command_text}'. Dùng PUT key value | GET key | DELETE key"
+        result_message = f"Lệnh không hợp lệ: '{command_text}'. Dùng PUT key value | GET key [ANY | BOUNDED giây] | DELETE key"
         is_error_rpc = False
         
         if key:
             expected_primary = get_primary_node_id_for_key_client(key)
             self.call_from_thread(self.append_client_log, f"Dự kiến primary cho '{key}': {expected_primary}")
 
+        # Chế độ tự động: kv gửi thẳng tới primary; nếu chọn một server cụ thể thì server đó tự forward.
+        address = None if server_address == AUTO_ROUTE else server_address
         try:
-            with grpc.insecure_channel(server_address) as channel:
-                stub = demo_pb2_grpc.KeyValueStub(channel)
-                if operation == "PUT" and key and value_str:
-                    response = stub.PutKey(demo_pb2.PutKeyRequest(key=key, value=value_str, is_replica=False), timeout=10)
-                    result_message = f"PUT: {response.message}"
-                elif operation == "GET" and key:
-                    response = stub.GetKey(demo_pb2.Key(key=key), timeout=10)
-                    if response.value == KEY_NOT_FOUND_MSG:
-                        result_message = f"GET '{key}': KHÔNG TÌM THẤY"
-                    else:
-                        result_message = f"GET '{key}': '{response.value}'"
-                elif operation == "DELETE" and key:
-                    response = stub.DeleteKey(demo_pb2.DeleteKeyRequest(key=key, is_replica=False), timeout=10)
-                    result_message = f"DELETE: {response.msg}"
+            if operation == "PUT" and key and value_str:
+                response = kv.put(key, value_str, address=address)
+                result_message = f"PUT: {response.message}"
+            elif operation == "GET" and key:
+                read_args = value_str.upper().split()
+                consistency = READ_CONSISTENCY_OPTIONS.get(read_args[0] if read_args else "PRIMARY")
+                max_staleness = float(read_args[1]) if len(read_args) > 1 else 0
+                if consistency is None:
+                    raise ValueError(f"Mức nhất quán không hợp lệ: {value_str}")
+                response = kv.get(key, consistency=consistency, max_staleness_seconds=max_staleness, address=address)
+                served = f"(đọc từ {response.served_by}, độ cũ {response.staleness_seconds:.1f}s)"
+                if response.value == KEY_NOT_FOUND_MSG:
+                    result_message = f"GET '{key}': KHÔNG TÌM THẤY {served}"
+                else:
+                    result_message = f"GET '{key}': '{display_value(response.value)}' {served}"
+            elif operation == "DELETE" and key:
+                response = kv.delete(key, address=address)
+                result_message = f"DELETE: {response.msg}"
         except grpc.RpcError as e:
             result_message = f"Lỗi RPC: {e.code()} - {e.details()}"
             is_error_rpc = True 
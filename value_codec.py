@@ -0,0 +1,71 @@
+# value_codec.py
+# Nén value trong store, trên đĩa (WAL, snapshot, hint) và khi truyền giữa các node.
+#
+# Value luôn là bytes. Value lớn hơn ngưỡng được nén bằng zlib hoặc lzma (thư viện chuẩn) nếu
+# bản nén nhỏ hơn bản gốc; bản nén được giữ dưới dạng lớp con của bytes (ZlibValue, LzmaValue)
+# nên cờ codec đi theo từng value mà không tốn thêm bộ nhớ, còn len() là số byte thực sự lưu.
+# Value không nén là bytes thường. Primary nén một lần khi nhận PutKey; replica, WAL, snapshot
+# và hint giữ nguyên bản nén cùng mã codec, chỉ giải nén khi trả value cho client.
+import lzma
+import zlib
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "lzma": CODEC_LZMA}
+
+DEFAULT_CODEC = "zlib"
+DEFAULT_LEVEL = 6 # zlib: 1-9; lzma: preset 0-9
+DEFAULT_MIN_BYTES = 1024 # Value nhỏ hơn ngưỡng này không được nén
+
+
+class ZlibValue(bytes):
+    __slots__ = ()
+    codec = CODEC_ZLIB
+
+
+class LzmaValue(bytes):
+    __slots__ = ()
+    codec = CODEC_LZMA
+
+
+_WRAPPERS = {CODEC_ZLIB: ZlibValue, CODEC_LZMA: LzmaValue}
+
+
+def codec_of(value: bytes) -> int:
+    return getattr(value, "codec", CODEC_NONE)
+
+
+def wrap(codec: int, data: bytes) -> bytes:
+    """Value lưu trữ từ mã codec và dữ liệu (đã nén nếu codec khác CODEC_NONE), ví dụ đọc từ
+    file hoặc nhận từ node khác."""
+    if codec == CODEC_NONE:
+        return data
+    wrapper = _WRAPPERS.get(codec)
+    if wrapper is None:
+        raise ValueError(f"Codec không hỗ trợ: {codec}")
+    return wrapper(data)
+
+
+def compress(raw: bytes, codec: int = CODEC_ZLIB, level: int = DEFAULT_LEVEL, min_bytes: int = DEFAULT_MIN_BYTES) -> bytes:
+    # Trả về raw nếu không nén (codec none, value nhỏ, hoặc nén không nhỏ hơn).
+    if codec == CODEC_NONE or len(raw) < min_bytes:
+        return raw
+    if codec == CODEC_ZLIB:
+        data = zlib.compress(raw, level)
+    elif codec == CODEC_LZMA:
+        data = lzma.compress(raw, preset=level)
+    else:
+        raise ValueError(f"Codec không hỗ trợ: {codec}")
+    if len(data) >= len(raw):
+        return raw
+    return _WRAPPERS[codec](data)
+
+
+def decompress(value: bytes) -> bytes:
+    codec = codec_of(value)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(value)
+    if codec == CODEC_LZMA:
+        return lzma.decompress(value)
+    return value
@@ -0,0 +1,369 @@
+# wal.py
+# Write-ahead log (append-only) cho store của một node.
+#
+# Mỗi thao tác PUT/DELETE được ghi thành một record ở cuối file log thay vì ghi lại
+# toàn bộ file JSON. Nhiều luồng ghi đồng thời được gom thành một lần write + fsync
+# (group commit). Định kỳ, log được nén (compaction) thành một snapshot và xóa phần
+# log cũ.
+import os
+import struct
+import threading
+import time
+import zlib
+
+import value_codec
+
+OP_PUT = 1
+OP_DELETE = 2
+# Bit đánh dấu record có kèm phiên bản (origin, seq). Record ghi bởi phiên bản cũ không có bit này.
+_OP_VERSIONED = 0x80
+# Bit đánh dấu record PUT có thời điểm hết hạn (TTL).
+_OP_EXPIRES = 0x40
+# Bit đánh dấu record PUT có value đã nén (value_codec), theo sau là một byte mã codec.
+_OP_CODEC = 0x20
+
+# Các chế độ bền vững (durability):
+#   "fsync"    - mỗi nhóm ghi được fsync trước khi trả về cho client (an toàn nhất)
+#   "interval" - ghi xuống OS ngay, fsync định kỳ mỗi fsync_interval giây
+#   "os"       - chỉ ghi vào buffer của OS, không bao giờ fsync chủ động
+DURABILITY_MODES = ("fsync", "interval", "os")
+
+_MAX_FAILURES = 64 # Số nhóm ghi lỗi gần nhất được giữ để báo cho luồng đang chờ
+
+_FRAME_HEADER = struct.Struct("<II")   # (độ dài payload, crc32 của payload)
+_RECORD_HEADER = struct.Struct("<BI")  # (op, độ dài key)
+_VERSION_HEADER = struct.Struct("<QB")  # (seq, độ dài origin), chỉ có khi op mang bit _OP_VERSIONED
+_EXPIRES_HEADER = struct.Struct("<d")  # Thời điểm hết hạn (Unix, giây), chỉ có khi op mang bit _OP_EXPIRES
+_CODEC_HEADER = struct.Struct("<B")  # Mã codec của value, chỉ có khi op mang bit _OP_CODEC
+
+
+def encode_record(op: int, key: str, value: bytes = None, origin: str = None, seq: int = 0,
+                  expires_at: float = 0) -> bytes:
+    # value là bytes như trong store: bản nén (value_codec) được ghi nguyên kèm mã codec.
+    key_bytes = key.encode("utf-8")
+    value_bytes = value if value is not None else b""
+    version = b""
+    if origin is not None:
+        origin_bytes = origin.encode("utf-8")
+        version = _VERSION_HEADER.pack(seq, len(origin_bytes)) + origin_bytes
+        op |= _OP_VERSIONED
+    if expires_at:
+        version += _EXPIRES_HEADER.pack(expires_at)
+        op |= _OP_EXPIRES
+    codec = value_codec.codec_of(value)
+    if codec:
+        version += _CODEC_HEADER.pack(codec)
+        op |= _OP_CODEC
+    payload = _RECORD_HEADER.pack(op, len(key_bytes)) + version + key_bytes + value_bytes
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_record(payload: bytes):
+    """Trả về (op, key, value, origin, seq, expires_at); origin là None với record không kèm phiên
+    bản, expires_at là 0 nếu không có TTL. value là bytes như khi ghi (bản nén giữ nguyên codec);
+    record ghi bởi phiên bản cũ chứa chuỗi UTF-8 nên đọc ra đúng các byte đó."""
+    op, key_len = _RECORD_HEADER.unpack_from(payload, 0)
+    start = _RECORD_HEADER.size
+    origin = None
+    seq = 0
+    expires_at = 0
+    codec = value_codec.CODEC_NONE
+    if op & _OP_VERSIONED:
+        op &= ~_OP_VERSIONED
+        seq, origin_len = _VERSION_HEADER.unpack_from(payload, start)
+        start += _VERSION_HEADER.size
+        origin = payload[start:start + origin_len].decode("utf-8")
+        start += origin_len
+    if op & _OP_EXPIRES:
+        op &= ~_OP_EXPIRES
+        (expires_at,) = _EXPIRES_HEADER.unpack_from(payload, start)
+        start += _EXPIRES_HEADER.size
+    if op & _OP_CODEC:
+        op &= ~_OP_CODEC
+        (codec,) = _CODEC_HEADER.unpack_from(payload, start)
+        start += _CODEC_HEADER.size
+    key = payload[start:start + key_len].decode("utf-8")
+    value = None
+    if op == OP_PUT:
+        value = value_codec.wrap(codec, payload[start + key_len:])
+    return op, key, value, origin, seq, expires_at
+
+
+def decode_frame(data: bytes, offset: int):
+    """Giải mã frame bắt đầu tại offset. Trả về (record, offset ngay sau frame), hoặc None nếu
+    frame bị cắt dở hay sai checksum."""
+    if offset + _FRAME_HEADER.size > len(data):
+        return None
+    length, crc = _FRAME_HEADER.unpack_from(data, offset)
+    start = offset + _FRAME_HEADER.size
+    payload = data[start:start + length]
+    if len(payload) < length or zlib.crc32(payload) != crc:
+        return None
+    return decode_record(payload), start + length
+
+
+def read_log(path: str):
+    """Đọc các record hợp lệ trong file log.
+
+    Trả về (records, valid_length). Việc đọc dừng lại ở record đầu tiên bị cắt dở
+    hoặc sai checksum (ví dụ do tiến trình bị kill giữa chừng khi đang ghi).
+    """
+    records = []
+    if not os.path.exists(path):
+        return records, 0
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while True:
+        decoded = decode_frame(data, offset)
+        if decoded is None:
+            break
+        record, offset = decoded
+        records.append(record)
+    return records, offset
+
+
+class WALWriteError(IOError):
+    """Nhóm record chứa ticket đang chờ không ghi được xuống log (ví dụ đĩa đầy, fsync lỗi)."""
+
+
+def _fsync_dir(path: str):
+    # Đảm bảo thao tác rename/tạo file được ghi bền vững (không hỗ trợ trên Windows).
+    dir_path = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Log append-only với group commit.
+
+    Người gọi dùng submit() để xếp record vào hàng đợi (nhanh, có thể gọi khi đang giữ
+    lock của store để thứ tự trong log khớp với thứ tự áp dụng vào bộ nhớ), sau đó gọi
+    wait() bên ngoài lock để chờ record được ghi bền vững theo chế độ durability.
+
+    snapshot_fn(): được gọi khi compaction, phải ghi bền vững trạng thái hiện tại của
+    store (trạng thái này đã bao gồm mọi record nằm trong log cũ).
+
+    flush_observer(seconds, records): nếu có, được gọi sau mỗi lần ghi một nhóm record
+    (write + fsync nếu durability là "fsync"), dùng để đo thời gian ghi bền vững.
+
+    Nếu ghi một nhóm bị lỗi, mọi luồng chờ ticket trong nhóm đó nhận WALWriteError và file log
+    được cắt về kích thước trước nhóm (bỏ frame ghi dở) trước khi nhận nhóm tiếp theo. Nếu không
+    cắt được, lỗi được giữ lại và mọi lần ghi sau đều thất bại.
+    """
+
+    def __init__(self, path: str, durability: str = "fsync", fsync_interval: float = 0.05,
+                 compact_threshold_bytes: int = 4 * 1024 * 1024, snapshot_fn=None, flush_observer=None):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Chế độ durability không hợp lệ: {durability}")
+        self.path = path
+        self.old_path = path + ".old"
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self.compact_threshold_bytes = compact_threshold_bytes
+        self.snapshot_fn = snapshot_fn
+        self.flush_observer = flush_observer
+
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._next_ticket = 1
+        self._written_ticket = 0
+        self._leader_active = False
+        self._file = None
+        self._size = 0
+        self._dirty = False # Có dữ liệu đã ghi xuống OS nhưng chưa fsync
+        self._closed = False
+        self._failures = [] # (ticket đầu, ticket cuối, lỗi) của các nhóm ghi lỗi gần đây
+        self._broken = None # Lỗi khiến log không còn ghi được (không cắt được phần ghi dở)
+        self._compact_lock = threading.Lock()
+
+    def replay(self):
+        """Trả về các record của log cũ (nếu compaction trước đó chưa xong) và log hiện tại, theo thứ tự."""
+        old_records, _ = read_log(self.old_path)
+        records, valid_length = read_log(self.path)
+        # Cắt bỏ phần đuôi hỏng để các record mới không bị ghi nối sau dữ liệu rác.
+        if os.path.exists(self.path) and os.path.getsize(self.path) != valid_length:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_length)
+        return old_records + records
+
+    def open(self):
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        if self.durability == "interval":
+            threading.Thread(target=self._fsync_worker, daemon=True).start()
+        if self.snapshot_fn is not None:
+            threading.Thread(target=self._compaction_worker, daemon=True).start()
+
+    def submit(self, op: int, key: str, value: bytes = None, origin: str = None, seq: int = 0,
+               expires_at: float = 0) -> int:
+        frame = encode_record(op, key, value, origin, seq, expires_at)
+        with self._cond:
+            self._buffer.append(frame)
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            return ticket
+
+    def wait(self, ticket: int, first_ticket: int = 0):
+        """Chờ tới khi ticket được ghi. Với first_ticket (thao tác theo lô chỉ chờ ticket cuối),
+        mọi ticket trong [first_ticket, ticket] phải được ghi thành công.
+
+        Raises:
+            WALWriteError: có record trong khoảng đó không được ghi xuống log.
+        """
+        with self._cond:
+            while self._written_ticket < ticket:
+                if self._leader_active:
+                    # Một luồng khác đang ghi, lượt ghi tiếp theo sẽ gom luôn record của mình.
+                    self._cond.wait()
+                    continue
+                self._leader_active = True
+                batch = self._buffer
+                self._buffer = []
+                batch_last_ticket = self._next_ticket - 1
+                self._cond.release()
+                try:
+                    error = self._write_batch_checked(batch)
+                finally:
+                    self._cond.acquire()
+                    self._leader_active = False
+                    self._finish_batch_locked(batch_last_ticket, error)
+                    self._cond.notify_all()
+            first_ticket = first_ticket or ticket
+            for failed_first, failed_last, error in self._failures:
+                if failed_first <= ticket and first_ticket <= failed_last:
+                    raise WALWriteError(f"WAL {self.path}: Không ghi được record: {error}") from error
+
+    def append(self, op: int, key: str, value: bytes = None, origin: str = None, seq: int = 0,
+               expires_at: float = 0):
+        self.wait(self.submit(op, key, value, origin, seq, expires_at))
+
+    def _write_batch(self, batch):
+        if not batch:
+            return
+        if self._broken is not None:
+            raise self._broken
+        started = time.perf_counter()
+        data = b"".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        if self.durability == "fsync":
+            os.fsync(self._file.fileno())
+        else:
+            self._dirty = True
+        self._size += len(data) # Chỉ tính phần đã ghi xong: dùng để cắt bỏ nhóm ghi lỗi
+        if self.flush_observer is not None:
+            self.flush_observer(time.perf_counter() - started, len(batch))
+
+    def _write_batch_checked(self, batch):
+        # Ghi một nhóm; khi lỗi, cắt log về kích thước trước nhóm và trả về lỗi thay vì raise.
+        try:
+            self._write_batch(batch)
+            return None
+        except Exception as e:
+            print(f"[ERROR] WAL {self.path}: Lỗi khi ghi {len(batch)} record: {e}")
+            if e is not self._broken:
+                self._discard_partial_write()
+            return e
+
+    def _discard_partial_write(self):
+        # Frame ghi dở nằm giữa log sẽ làm lúc phát lại bỏ qua mọi record ghi sau nó.
+        try:
+            try:
+                self._file.close() # Có thể flush lại phần còn trong buffer, bị cắt ngay sau đây
+            except OSError:
+                pass
+            os.truncate(self.path, self._size)
+            self._file = open(self.path, "ab")
+            os.fsync(self._file.fileno())
+        except Exception as e:
+            print(f"[ERROR] WAL {self.path}: Không cắt được phần ghi dở, ngừng nhận thao tác ghi: {e}")
+            self._broken = WALWriteError(f"WAL {self.path} hỏng sau lỗi ghi: {e}")
+
+    def _finish_batch_locked(self, batch_last_ticket: int, error):
+        if error is not None:
+            self._failures.append((self._written_ticket + 1, batch_last_ticket, error))
+            del self._failures[:-_MAX_FAILURES]
+        self._written_ticket = batch_last_ticket
+
+    def _fsync_worker(self):
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            with self._cond:
+                while self._leader_active:
+                    self._cond.wait()
+                if self._dirty and not self._closed:
+                    os.fsync(self._file.fileno())
+                    self._dirty = False
+
+    def _compaction_worker(self):
+        while not self._closed:
+            time.sleep(1)
+            if self._size >= self.compact_threshold_bytes or os.path.exists(self.old_path):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"[ERROR] WAL {self.path}: Lỗi khi compaction: {e}")
+
+    def _rotate(self):
+        # Chuyển log hiện tại thành log cũ và mở một file log mới (rỗng).
+        with self._cond:
+            while self._leader_active:
+                self._cond.wait()
+            batch = self._buffer
+            self._buffer = []
+            error = self._write_batch_checked(batch)
+            self._finish_batch_locked(self._next_ticket - 1, error)
+            self._cond.notify_all()
+            if error is not None:
+                raise error
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.path, self.old_path)
+            self._file = open(self.path, "ab")
+            self._size = 0
+            self._dirty = False
+            _fsync_dir(self.path)
+            self._cond.notify_all()
+
+    def compact(self):
+        """Ghi snapshot của trạng thái hiện tại rồi xóa phần log đã được snapshot bao phủ."""
+        if self.snapshot_fn is None:
+            return
+        with self._compact_lock:
+            if self._closed:
+                return
+            # Nếu log cũ còn sót lại (compaction trước bị gián đoạn) thì không xoay vòng nữa,
+            # snapshot mới vẫn bao phủ nó.
+            if not os.path.exists(self.old_path):
+                self._rotate()
+            self.snapshot_fn()
+            os.remove(self.old_path)
+            _fsync_dir(self.path)
+
+    def close(self):
+        with self._cond:
+            while self._leader_active:
+                self._cond.wait()
+            self._closed = True
+            if self._file is None:
+                return
+            batch = self._buffer
+            self._buffer = []
+            self._finish_batch_locked(self._next_ticket - 1, self._write_batch_checked(batch))
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            finally:
+                self._file.close()
+                self._file = None
+            self._cond.notify_all()